@@ -3,7 +3,7 @@
 from abc import ABC, abstractmethod
 from typing import Any, Optional
 import logging
-from app.config.models import ModelConfig
+from app.config.models import ModelCandidate, ModelConfig
 
 logger = logging.getLogger(__name__)
 
@@ -30,6 +30,10 @@ class BaseAgent(ABC):
         self.name = name
         self.model_config = model_config
         self.model = model or model_config.model
+        # Routing candidates; an explicit model override pins routing to it
+        self.candidates = (
+            [ModelCandidate(model=model)] if model else model_config.candidate_models()
+        )
         self.temperature = temperature if temperature is not None else model_config.temperature
         self.logger = logging.getLogger(f"agent.{name}")
     
@@ -0,0 +1,104 @@
+"""Per-turn latency budget shared by the orchestrator and agents."""
+
+import asyncio
+import logging
+import time
+from typing import Awaitable, Optional, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class TurnDeadline:
+    """
+    Deadline for one turn.
+    
+    Created by the orchestrator and passed to agents as context["deadline"].
+    Each stage waits at most min(remaining budget, its own cap); a stage
+    that runs out of time degrades (skips memory, keyword intent, fallback
+    narrative) and is recorded in `degraded`.
+    """
+    
+    def __init__(self, budget: Optional[float] = None):
+        """
+        Args:
+            budget: Total seconds for the turn (None or <= 0 = unlimited)
+        """
+        self.budget = budget if budget and budget > 0 else None
+        self.started_at = time.monotonic()
+        self.degraded: list[str] = []
+    
+    @property
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started_at
+    
+    def remaining(self) -> Optional[float]:
+        """Seconds left (None if unlimited)."""
+        if self.budget is None:
+            return None
+        return max(0.0, self.budget - self.elapsed)
+    
+    @property
+    def expired(self) -> bool:
+        remaining = self.remaining()
+        return remaining is not None and remaining <= 0
+    
+    def timeout(self, cap: Optional[float] = None) -> Optional[float]:
+        """Timeout for a stage: remaining budget limited by cap."""
+        remaining = self.remaining()
+        if cap is None or cap <= 0:
+            return remaining
+        if remaining is None:
+            return cap
+        return min(remaining, cap)
+    
+    def degrade(self, stage: str, reason: str = "timeout"):
+        """Record that stage fell back to its degraded path."""
+        if stage not in self.degraded:
+            self.degraded.append(stage)
+        logger.warning(
+            f"Turn stage '{stage}' degraded ({reason}) after {self.elapsed:.2f}s"
+        )
+
+
+async def within_deadline(
+    deadline: Optional[TurnDeadline],
+    stage: str,
+    awaitable: Awaitable[T],
+    cap: Optional[float] = None,
+) -> T:
+    """
+    Await with the stage's timeout.
+    
+    Args:
+        deadline: Turn deadline (None = no limit)
+        stage: Stage name recorded on timeout
+        awaitable: Coroutine to run
+        cap: Stage-specific max seconds
+        
+    Returns:
+        Awaitable result
+        
+    Raises:
+        asyncio.TimeoutError: If the stage ran out of time (recorded as degraded)
+    """
+    if deadline is None:
+        return await awaitable
+    
+    timeout = deadline.timeout(cap)
+    if timeout is None:
+        return await awaitable
+    
+    if timeout <= 0:
+        # Budget already spent: do not start the call at all
+        if asyncio.iscoroutine(awaitable):
+            awaitable.close()
+        deadline.degrade(stage, "no budget left")
+        raise asyncio.TimeoutError(stage)
+    
+    try:
+        return await asyncio.wait_for(awaitable, timeout=timeout)
+    except asyncio.TimeoutError:
+        deadline.degrade(stage, f"timeout {timeout:.2f}s")
+        raise
@@ -1,10 +1,14 @@
 """Narrative Director Agent for story generation."""
 
-from typing import Any
+import asyncio
+from typing import Any, AsyncIterator, Awaitable, Callable, Optional
 from app.agents.base import BaseAgent
+from app.agents.deadline import TurnDeadline, within_deadline
+from app.config import settings
 from app.config.models import AGENT_CONFIGS
 from app.config.prompts import NarrativeDirectorPrompts
 from app.llm.client import llm_client
+from app.observability.metrics import record_fallback
 import logging
 import json
 import re
@@ -25,6 +29,7 @@ class NarrativeDirectorAgent(BaseAgent):
             name="NarrativeDirector",
             model_config=AGENT_CONFIGS.NARRATIVE_DIRECTOR
         )
+        self.combat_state_config = AGENT_CONFIGS.NARRATIVE_COMBAT_STATE
         self.prompts = NarrativeDirectorPrompts
     
     async def execute(self, context: dict[str, Any]) -> dict[str, Any]:
@@ -49,7 +54,11 @@ class NarrativeDirectorAgent(BaseAgent):
                 "narrative_hints": list[str],
                 "game_state": dict,
                 "success": bool,
-                "recent_history": list[str]
+                "recent_history": list[str],
+                "on_token": Optional async callback receiving narrative
+                    tokens as they stream (two-call mode only),
+                "deadline": Optional TurnDeadline; out of time -> fallback
+                    combat state / fallback narrative
             }
             
         Returns:
@@ -68,6 +77,8 @@ class NarrativeDirectorAgent(BaseAgent):
         narrative_hints = context.get("narrative_hints", [])
         game_state = context.get("game_state", {})
         success = context.get("success", True)
+        on_token: Optional[Callable[[str], Awaitable[None]]] = context.get("on_token")
+        deadline: Optional[TurnDeadline] = context.get("deadline")
         
         # Build mechanics context string
         mechanics_context = self._build_mechanics_context(mechanics_result, success)
@@ -83,12 +94,35 @@ class NarrativeDirectorAgent(BaseAgent):
             enemies = ", ".join(game_state.get("enemies", []))
             combat_context = f"\n\nТЕКУЩИЙ БОЙ: Игрок сражается с {enemies}"
         
+        # Single-call mode: narrative + combat state in one structured response
+        if settings.narrative_single_call:
+            result = await self._generate_narrative_and_combat_state(
+                user_action,
+                game_state,
+                mechanics_result,
+                success,
+                mechanics_context,
+                hints_text,
+                combat_context,
+                deadline
+            )
+            if result is not None:
+                narrative, game_state_updates = result
+                output = {
+                    "narrative": narrative,
+                    "game_state_updates": game_state_updates
+                }
+                self.log_execution(context, output)
+                return output
+            logger.warning("Single-call narrative failed - falling back to two calls")
+        
         # Step 1: Generate combat state first (to know about enemy attacks)
         game_state_updates = await self._generate_combat_state(
             user_action, 
             game_state, 
             mechanics_result, 
-            success
+            success,
+            deadline
         )
         
         # Build enemy attack hint for narrative
@@ -121,20 +155,20 @@ class NarrativeDirectorAgent(BaseAgent):
         
         try:
             # Step 2: Generate narrative text (combat state already generated above)
-            response = await llm_client.get_completion(
-                messages=messages,
-                model=self.model,
-                temperature=self.temperature,
-                max_tokens=self.model_config.max_tokens,
-                frequency_penalty=self.model_config.frequency_penalty,
-                presence_penalty=self.model_config.presence_penalty
+            response = await within_deadline(
+                deadline, "narrative", self._generate_narrative(messages, on_token)
             )
-            
             narrative = response.strip()
+        
+        except asyncio.TimeoutError:
+            # Out of time: fallback narrative, keep the combat state we have
+            record_fallback("narrative")
+            narrative = f"Ты {user_action}. " + ("Успех!" if success else "Неудача.")
             
         except Exception as e:
             logger.error(f"Error generating narrative: {e}", exc_info=True)
             # Fallback simple narrative
+            record_fallback("narrative")
             narrative = f"Ты {user_action}. " + ("Успех!" if success else "Неудача.")
             game_state_updates = game_state
         
@@ -146,27 +180,62 @@ class NarrativeDirectorAgent(BaseAgent):
         self.log_execution(context, output)
         return output
     
-    async def _generate_combat_state(
+    async def _generate_narrative(
+        self,
+        messages: list[dict[str, str]],
+        on_token: Optional[Callable[[str], Awaitable[None]]] = None
+    ) -> str:
+        """Generate narrative text, streaming tokens to on_token if given."""
+        if on_token is None:
+            return await llm_client.get_completion(
+                messages=messages,
+                model=self.model,
+                temperature=self.temperature,
+                max_tokens=self.model_config.max_tokens,
+                frequency_penalty=self.model_config.frequency_penalty,
+                presence_penalty=self.model_config.presence_penalty,
+                raise_on_error=True,
+                candidates=self.candidates
+            )
+        
+        # Streaming: forward tokens to caller (progressive Telegram edits)
+        chunks = []
+        async for token in self.stream_narrative(messages):
+            chunks.append(token)
+            await on_token(token)
+        return "".join(chunks)
+    
+    async def stream_narrative(self, messages: list[dict[str, str]]) -> AsyncIterator[str]:
+        """
+        Stream narrative text for prepared messages.
+        
+        Yields:
+            Narrative tokens as they arrive from the LLM
+        """
+        async for token in llm_client.stream_completion(
+            messages=messages,
+            model=self.model,
+            temperature=self.temperature,
+            max_tokens=self.model_config.max_tokens,
+            frequency_penalty=self.model_config.frequency_penalty,
+            presence_penalty=self.model_config.presence_penalty,
+            candidates=self.candidates
+        ):
+            yield token
+    
+    def _build_combat_rules(
         self,
         user_action: str,
         current_game_state: dict,
         mechanics_result: dict,
         success: bool
-    ) -> dict:
-        """
-        Generate combat state update using JSON mode for reliability.
-        
-        Separate call ensures valid JSON without narrative text interference.
-        """
-        # Detect if combat should start (heuristic)
+    ) -> str:
+        """Build combat state rules prompt (shared by two-call and single-call modes)."""
         action_type = mechanics_result.get("action_type", "other")
-        is_attack = action_type == "attack"
-        
-        # Build context for combat state decision
         current_enemies = current_game_state.get("enemies", [])
         in_combat = current_game_state.get("in_combat", False)
         
-        combat_prompt = f"""Ты Game Master D&D игры. Определи состояние боя после действия игрока.
+        return f"""Ты Game Master D&D игры. Определи состояние боя после действия игрока.
 
 Действие игрока: "{user_action}"
 Тип действия: {action_type}
@@ -239,9 +308,27 @@ class NarrativeDirectorAgent(BaseAgent):
   "enemies": [],
   "combat_ended": true,
   "enemy_attacks": []
-}}
-
-Верни ТОЛЬКО JSON, без комментариев."""
+}}"""
+    
+    async def _generate_combat_state(
+        self,
+        user_action: str,
+        current_game_state: dict,
+        mechanics_result: dict,
+        success: bool,
+        deadline: Optional[TurnDeadline] = None
+    ) -> dict:
+        """
+        Generate combat state update using JSON mode for reliability.
+        
+        Separate call ensures valid JSON without narrative text interference.
+        Limited by TURN_COMBAT_STATE_TIMEOUT; on timeout the heuristic
+        fallback state is used.
+        """
+        combat_rules = self._build_combat_rules(
+            user_action, current_game_state, mechanics_result, success
+        )
+        combat_prompt = combat_rules + "\n\nВерни ТОЛЬКО JSON, без комментариев."
 
         messages = [
             {"role": "system", "content": "Ты Game Master, управляющий боевой системой D&D. Возвращай ТОЛЬКО валидный JSON."},
@@ -249,73 +336,240 @@ class NarrativeDirectorAgent(BaseAgent):
         ]
         
         try:
-            response = await llm_client.get_completion(
-                messages=messages,
-                model=self.model,
-                temperature=0.3,  # Lower temperature for more consistent JSON
-                max_tokens=250,
-                response_format={"type": "json_object"}  # JSON mode
+            response = await within_deadline(
+                deadline,
+                "combat_state",
+                llm_client.get_completion(
+                    messages=messages,
+                    model=self.combat_state_config.model,
+                    temperature=self.combat_state_config.temperature,  # Low for consistent JSON
+                    max_tokens=self.combat_state_config.max_tokens,
+                    response_format={"type": "json_object"},  # JSON mode
+                    raise_on_error=True,
+                    candidates=self.combat_state_config.candidate_models()
+                ),
+                cap=settings.turn_combat_state_timeout
             )
             
             combat_state = json.loads(response)
-            
-            # Ensure all required fields exist
-            if "enemy_attacks" not in combat_state:
-                combat_state["enemy_attacks"] = []
-            if "in_combat" not in combat_state:
-                # Fallback heuristic: if attack action, start combat
-                combat_state["in_combat"] = is_attack or in_combat
-            if "enemies" not in combat_state:
-                combat_state["enemies"] = current_enemies
-            if "combat_ended" not in combat_state:
-                combat_state["combat_ended"] = False
-            
-            # Heuristic fix: If attack detected but no combat started, fix it
-            if is_attack and not combat_state["in_combat"] and not combat_state["combat_ended"]:
-                logger.warning("LLM didn't start combat on attack - applying heuristic fix")
-                combat_state["in_combat"] = True
-                # Try to extract enemy name from action
-                if not combat_state["enemies"]:
-                    enemy_name = self._extract_enemy_name(user_action)
-                    if enemy_name:
-                        combat_state["enemies"] = [enemy_name]
-                        # Add enemy attack
-                        import random
-                        combat_state["enemy_attacks"] = [{
-                            "attacker": enemy_name,
-                            "damage": random.randint(5, 12)
-                        }]
-            
-            logger.info(f"Generated combat state: in_combat={combat_state['in_combat']}, enemies={len(combat_state['enemies'])}, attacks={len(combat_state['enemy_attacks'])}")
-            
-            return combat_state
+            return self._normalize_combat_state(
+                combat_state, user_action, current_game_state, mechanics_result
+            )
+        
+        except asyncio.TimeoutError:
+            return self._fallback_combat_state(
+                user_action, current_game_state, mechanics_result, success
+            )
             
         except Exception as e:
             logger.error(f"Failed to generate combat state: {e}", exc_info=True)
-            
-            # Fallback: if attack action, assume combat started
-            if is_attack and not in_combat:
-                logger.warning("Combat state generation failed - using attack heuristic")
+            return self._fallback_combat_state(
+                user_action, current_game_state, mechanics_result, success
+            )
+    
+    def _normalize_combat_state(
+        self,
+        combat_state: dict,
+        user_action: str,
+        current_game_state: dict,
+        mechanics_result: dict
+    ) -> dict:
+        """Fill missing combat state fields and apply attack heuristics."""
+        is_attack = mechanics_result.get("action_type", "other") == "attack"
+        current_enemies = current_game_state.get("enemies", [])
+        in_combat = current_game_state.get("in_combat", False)
+        
+        # Ensure all required fields exist
+        if "enemy_attacks" not in combat_state:
+            combat_state["enemy_attacks"] = []
+        if "in_combat" not in combat_state:
+            # Fallback heuristic: if attack action, start combat
+            combat_state["in_combat"] = is_attack or in_combat
+        if "enemies" not in combat_state:
+            combat_state["enemies"] = current_enemies
+        if "combat_ended" not in combat_state:
+            combat_state["combat_ended"] = False
+        
+        # Heuristic fix: If attack detected but no combat started, fix it
+        if is_attack and not combat_state["in_combat"] and not combat_state["combat_ended"]:
+            logger.warning("LLM didn't start combat on attack - applying heuristic fix")
+            combat_state["in_combat"] = True
+            # Try to extract enemy name from action
+            if not combat_state["enemies"]:
                 enemy_name = self._extract_enemy_name(user_action)
-                import random
-                
-                # Enemy counter-attacks only if player missed
-                enemy_attacks = []
-                if not success:  # Player missed
-                    enemy_attacks = [{
-                        "attacker": enemy_name or "unknown enemy",
+                if enemy_name:
+                    combat_state["enemies"] = [enemy_name]
+                    # Add enemy attack
+                    import random
+                    combat_state["enemy_attacks"] = [{
+                        "attacker": enemy_name,
                         "damage": random.randint(5, 12)
                     }]
-                
-                return {
-                    "in_combat": True,
-                    "enemies": [enemy_name or "unknown enemy"],
-                    "combat_ended": False,
-                    "enemy_attacks": enemy_attacks
-                }
+        
+        logger.info(f"Generated combat state: in_combat={combat_state['in_combat']}, enemies={len(combat_state['enemies'])}, attacks={len(combat_state['enemy_attacks'])}")
+        
+        return combat_state
+    
+    def _fallback_combat_state(
+        self,
+        user_action: str,
+        current_game_state: dict,
+        mechanics_result: dict,
+        success: bool
+    ) -> dict:
+        """Combat state when the LLM gave no usable answer."""
+        record_fallback("combat_state")
+        is_attack = mechanics_result.get("action_type", "other") == "attack"
+        in_combat = current_game_state.get("in_combat", False)
+        
+        # Fallback: if attack action, assume combat started
+        if is_attack and not in_combat:
+            logger.warning("Combat state generation failed - using attack heuristic")
+            enemy_name = self._extract_enemy_name(user_action)
+            import random
             
-            # Otherwise keep current state
-            return current_game_state
+            # Enemy counter-attacks only if player missed
+            enemy_attacks = []
+            if not success:  # Player missed
+                enemy_attacks = [{
+                    "attacker": enemy_name or "unknown enemy",
+                    "damage": random.randint(5, 12)
+                }]
+            
+            return {
+                "in_combat": True,
+                "enemies": [enemy_name or "unknown enemy"],
+                "combat_ended": False,
+                "enemy_attacks": enemy_attacks
+            }
+        
+        # Otherwise keep current state
+        return current_game_state
+    
+    async def _generate_narrative_and_combat_state(
+        self,
+        user_action: str,
+        current_game_state: dict,
+        mechanics_result: dict,
+        success: bool,
+        mechanics_context: str,
+        hints_text: str,
+        combat_context: str,
+        deadline: Optional[TurnDeadline] = None
+    ) -> tuple[str, dict] | None:
+        """
+        Generate narrative and combat state in one structured LLM call.
+        
+        Enabled with NARRATIVE_SINGLE_CALL. Saves one round trip per turn.
+        
+        Returns:
+            (narrative, combat_state) or None if the response was unusable
+            (caller falls back to the two-call flow)
+        """
+        combat_rules = self._build_combat_rules(
+            user_action, current_game_state, mechanics_result, success
+        )
+        user_prompt = self.prompts.SINGLE_CALL_USER.format(
+            user_action=user_action,
+            mechanics_context=mechanics_context,
+            hints_text=hints_text,
+            combat_context=combat_context,
+            combat_rules=combat_rules,
+        )
+        
+        messages = [
+            {"role": "system", "content": self.prompts.SYSTEM},
+            {"role": "user", "content": user_prompt}
+        ]
+        
+        try:
+            response = await within_deadline(
+                deadline,
+                "narrative",
+                llm_client.get_completion(
+                    messages=messages,
+                    model=self.model,
+                    temperature=self.temperature,
+                    # Narrative plus combat state JSON
+                    max_tokens=self.model_config.max_tokens + 250,
+                    frequency_penalty=self.model_config.frequency_penalty,
+                    presence_penalty=self.model_config.presence_penalty,
+                    response_format={"type": "json_object"},
+                    raise_on_error=True,
+                    candidates=self.candidates
+                )
+            )
+        except asyncio.TimeoutError:
+            return None
+        except Exception as e:
+            logger.error(f"Error in single-call narrative: {e}", exc_info=True)
+            return None
+        
+        parsed = self._parse_single_call_response(response)
+        if parsed is None:
+            return None
+        
+        narrative, combat_state = parsed
+        combat_state = self._normalize_combat_state(
+            combat_state, user_action, current_game_state, mechanics_result
+        )
+        return narrative, combat_state
+    
+    def _parse_single_call_response(self, response: str) -> tuple[str, dict] | None:
+        """
+        Parse {"narrative": str, "combat_state": {...}} response.
+        
+        Falls back to the repair path (_fix_json_syntax, then
+        _parse_narrative_response for "text + COMBAT_STATE: {...}" answers).
+        
+        Returns:
+            (narrative, combat_state) or None if no combat state was found
+        """
+        if not response:
+            return None
+        
+        candidates = [response]
+        json_str = None
+        json_start = response.find("{")
+        if json_start >= 0:
+            json_str = self._extract_json_object(response, json_start)
+            if json_str:
+                candidates.append(json_str)
+        
+        for candidate in candidates:
+            parsed = self._load_single_call_json(candidate)
+            if parsed:
+                return parsed
+        
+        # Repair only what did not parse as is
+        if json_str:
+            parsed = self._load_single_call_json(self._fix_json_syntax(json_str))
+            if parsed:
+                record_fallback("json_repair")
+                return parsed
+        
+        # Model ignored JSON mode: try narrative text + COMBAT_STATE format
+        narrative, combat_state = self._parse_narrative_response(response, {})
+        if combat_state and narrative:
+            logger.info("Single-call response parsed via COMBAT_STATE fallback")
+            return narrative, combat_state
+        
+        logger.warning(f"Unusable single-call response: {response[:200]}")
+        return None
+    
+    @staticmethod
+    def _load_single_call_json(candidate: str) -> tuple[str, dict] | None:
+        """(narrative, combat_state) from a single-call JSON string, or None."""
+        try:
+            data = json.loads(candidate)
+        except json.JSONDecodeError:
+            return None
+        
+        narrative = data.get("narrative") if isinstance(data, dict) else None
+        combat_state = data.get("combat_state") if isinstance(data, dict) else None
+        if isinstance(narrative, str) and narrative.strip() and isinstance(combat_state, dict):
+            return narrative.strip(), combat_state
+        return None
     
     def _extract_enemy_name(self, user_action: str) -> str | None:
         """Extract enemy name from user action using simple heuristics."""
@@ -380,6 +634,8 @@ class NarrativeDirectorAgent(BaseAgent):
         - Missing commas between fields
         - Trailing commas
         - Single quotes instead of double quotes
+        
+        Callers count the json_repair fallback when the repaired string parses.
         """
         # Replace single quotes with double quotes (simple heuristic)
         fixed = json_str.replace("'", '"')
@@ -471,6 +727,7 @@ class NarrativeDirectorAgent(BaseAgent):
                     try:
                         combat_state = json.loads(fixed_json)
                         narrative = response[:match.start()].strip()
+                        record_fallback("json_repair")
                         
                         if "enemy_attacks" not in combat_state:
                             combat_state["enemy_attacks"] = []
@@ -514,6 +771,7 @@ class NarrativeDirectorAgent(BaseAgent):
                         combat_state["enemy_attacks"] = []
                     
                     if "in_combat" in combat_state:
+                        record_fallback("json_repair")
                         logger.info(f"Parsed standalone JSON (after fix): enemy_attacks={len(combat_state.get('enemy_attacks', []))}")
                         return narrative, combat_state
                 except json.JSONDecodeError as e:
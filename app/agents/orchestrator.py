@@ -1,14 +1,22 @@
 """Agent Orchestrator for coordinating multi-agent workflow."""
 
-from typing import Any, Optional
+import asyncio
+from typing import Any, Awaitable, Callable, Optional
 from uuid import UUID
 from app.agents.rules_arbiter import RulesArbiterAgent
 from app.agents.narrative_director import NarrativeDirectorAgent
 from app.agents.response_synthesizer import ResponseSynthesizerAgent
 from app.agents.memory_manager import MemoryManagerAgent
-from app.agents.world_state import WorldStateAgent
+from app.agents.world_state import WorldStateAgent, merge_world_state
+from app.agents.deadline import TurnDeadline, within_deadline
+from app.config import settings
 from app.game.character import CharacterSheet
+from app.db.models import TurnContext, EpisodicMemoryCreate
+from app.db.turn_commit import TurnCommit
 from app.memory.episodic import episodic_memory_manager
+from app.memory.write_queue import memory_write_queue
+from app.observability.metrics import record_fallback
+from app.observability.tracing import set_trace_attributes, span, traced
 import logging
 
 logger = logging.getLogger(__name__)
@@ -20,7 +28,7 @@ class AgentOrchestrator:
     
     Enhanced Workflow (Sprint 3):
     1. Memory Manager — retrieve relevant context from DB
-    2. Rules Arbiter — analyze intent + resolve mechanics
+    2. Rules Arbiter — analyze intent + resolve mechanics (concurrently with 1)
     3. Narrative Director — create description + detect combat state
     4. World State Agent — update game state + save to DB
     5. Response Synthesizer — build final message
@@ -45,6 +53,10 @@ class AgentOrchestrator:
         target_ac: int = 12,
         dc: int = 15,
         user_settings: Optional[dict] = None,
+        turn_commit: Optional[TurnCommit] = None,
+        on_narrative_token: Optional[Callable[[str], Awaitable[None]]] = None,
+        deadline: Optional[TurnDeadline] = None,
+        world_state_version: Optional[int] = None,
     ) -> tuple[str, CharacterSheet, dict]:
         """
         Process user action through enhanced agent system (Sprint 3).
@@ -58,48 +70,47 @@ class AgentOrchestrator:
             recent_history: Recent conversation history
             target_ac: Target armor class for combat
             dc: Difficulty class for skill checks
+            turn_commit: If provided, world state and memory writes are staged
+                into it instead of written immediately (caller commits)
+            on_narrative_token: Async callback receiving narrative tokens as
+                they stream (final message is still returned in full)
+            deadline: Turn latency budget, propagated to agents; stages that
+                run out of time degrade and are listed in deadline.degraded
+                (defaults to TURN_DEADLINE)
+            world_state_version: Version game_state was loaded at; makes the
+                world state save compare-and-swap (None overwrites)
             
         Returns:
-            (final_message, updated_character, updated_game_state)
+            (final_message, updated_character, updated_game_state);
+            updated_game_state["degraded_stages"] lists the stages that ran
+            out of time (not persisted)
         """
         logger.info(f"Processing action: {user_action} | Combat: {game_state.get('in_combat')}")
         
         if recent_history is None:
             recent_history = []
+        if deadline is None:
+            deadline = TurnDeadline(settings.turn_deadline)
         
-        # Step 0: Memory Manager - retrieve relevant context (if character_id provided)
-        memory_summary = ""
-        if character_id:
-            try:
-                memory_context = {
-                    "user_action": user_action,
-                    "character_id": character_id,
-                    "session_id": session_id,
-                    "top_k": 3,
-                    "recent_limit": 5,
-                    "min_importance": 3
-                }
-                memory_output = await self.memory_manager.execute(memory_context)
-                memory_summary = memory_output.get("memory_summary", "")
-                logger.info(
-                    f"Memory retrieval: {memory_output['total_found']} memories found"
-                )
-            except Exception as e:
-                logger.error(f"Memory Manager error: {e}", exc_info=True)
-                memory_summary = "💭 Память недоступна."
-        
-        # Step 1: Rules Arbiter with game_state and memory
-        # Step 1: Rules Arbiter with game_state and memory
+        # Steps 0-1 have no data dependency on each other, so memory retrieval
+        # and rules/intent analysis run concurrently. Narrative needs both.
+        #
+        #   memory ──┐
+        #            ├──> narrative ──> world state ──> synthesizer
+        #   rules ───┘
         rules_context = {
             "user_action": user_action,
             "character": character,
             "game_state": game_state,
-            "memory_context": memory_summary,  # Add memory context
             "target_ac": target_ac,
             "dc": dc,
             "user_settings": user_settings or {"combat_enabled": True},
+            "deadline": deadline,
         }
-        rules_output = await self.rules_arbiter.execute(rules_context)
+        memory_summary, rules_output = await asyncio.gather(
+            traced("memory", self._retrieve_memory(user_action, character_id, session_id, deadline)),
+            traced("rules", self.rules_arbiter.execute(rules_context)),
+        )
         
         # Step 2: Narrative Director with game_state and memory
         narrative_context = {
@@ -110,9 +121,12 @@ class AgentOrchestrator:
             "game_state": game_state,
             "success": rules_output["success"],
             "recent_history": recent_history,
-            "memory_context": memory_summary  # Add memory context
+            "memory_context": memory_summary,  # Add memory context
+            "on_token": on_narrative_token,
+            "deadline": deadline,
         }
-        narrative_output = await self.narrative_director.execute(narrative_context)
+        with span("narrative"):
+            narrative_output = await self.narrative_director.execute(narrative_context)
         
         # Step 3: World State Agent - update and persist game state
         world_state_context = {
@@ -120,9 +134,12 @@ class AgentOrchestrator:
             "game_state": game_state,
             "mechanics_result": rules_output["mechanics_result"],
             "action_type": rules_output["action_type"],
-            "narrative_updates": narrative_output.get("game_state_updates", {})
+            "narrative_updates": narrative_output.get("game_state_updates", {}),
+            "turn_commit": turn_commit,
+            "world_state_version": world_state_version,
         }
-        world_state_output = await self.world_state.execute(world_state_context)
+        with span("world_state"):
+            world_state_output = await self.world_state.execute(world_state_context)
         updated_game_state = world_state_output["updated_game_state"]
         
         logger.info(
@@ -150,27 +167,187 @@ class AgentOrchestrator:
             "game_state": updated_game_state,
             "user_settings": user_settings or {"combat_enabled": True},
         }
-        synthesizer_output = await self.response_synthesizer.execute(synthesizer_context)
+        with span("synthesizer"):
+            synthesizer_output = await self.response_synthesizer.execute(synthesizer_context)
         
         final_message = synthesizer_output["final_message"]
         
         # Step 7: Save memory (if character_id and session_id provided)
         if character_id and session_id:
             try:
-                await self._save_memory(
-                    character_id=character_id,
-                    session_id=session_id,
-                    user_action=user_action,
-                    assistant_response=final_message,
-                    mechanics_result=rules_output["mechanics_result"],
-                    game_state=updated_game_state
-                )
+                with span("save_memory"):
+                    await self._save_memory(
+                        character_id=character_id,
+                        session_id=session_id,
+                        user_action=user_action,
+                        assistant_response=final_message,
+                        mechanics_result=rules_output["mechanics_result"],
+                        game_state=updated_game_state,
+                        turn_commit=turn_commit,
+                    )
             except Exception as e:
                 logger.error(f"Failed to save memory: {e}", exc_info=True)
         
+        set_trace_attributes(action_type=rules_output["action_type"])
+        if deadline.degraded:
+            set_trace_attributes(degraded=deadline.degraded)
+            logger.warning(
+                f"Turn degraded after {deadline.elapsed:.2f}s: {', '.join(deadline.degraded)}"
+            )
+        
+        # Reported to the caller only; the world state was saved without it
+        updated_game_state = {**updated_game_state, "degraded_stages": list(deadline.degraded)}
+        
         logger.info(f"Action processed | New combat state: {updated_game_state.get('in_combat')}")
         return final_message, updated_character, updated_game_state
     
+    async def process_turn(
+        self,
+        user_action: str,
+        turn: TurnContext,
+        recent_history: Optional[list[str]] = None,
+        turn_commit: Optional[TurnCommit] = None,
+        on_narrative_token: Optional[Callable[[str], Awaitable[None]]] = None,
+        deadline: Optional[TurnDeadline] = None,
+    ) -> tuple[str, CharacterSheet, dict]:
+        """
+        Process user action using a preloaded TurnContext.
+        
+        Args:
+            user_action: Player's action text
+            turn: Character, session, settings and world state (see load_turn_context)
+            recent_history: Recent conversation history
+            turn_commit: Unit of work for end-of-turn writes (caller commits)
+            on_narrative_token: Async callback for streamed narrative tokens
+            deadline: Turn latency budget (see process_action)
+            
+        Returns:
+            (final_message, updated_character, updated_game_state), see process_action
+        """
+        return await self.process_action(
+            user_action=user_action,
+            character=turn.character,
+            game_state=turn.game_state,
+            character_id=turn.character.id,
+            session_id=turn.session_id,
+            recent_history=recent_history,
+            user_settings=turn.user_settings,
+            turn_commit=turn_commit,
+            on_narrative_token=on_narrative_token,
+            deadline=deadline,
+            world_state_version=turn.world_state_version,
+        )
+    
+    async def commit_turn(
+        self,
+        turn: TurnContext,
+        turn_commit: TurnCommit,
+        resolve_conflict: Optional[Callable[[dict, dict, dict], dict]] = None,
+        max_retries: Optional[int] = None,
+    ) -> bool:
+        """
+        Commit a turn, retrying if its world state save lost a version race.
+        
+        On conflict nothing was written. The current world state is reloaded,
+        this turn's changes are rebased onto it with
+        resolve_conflict(base, ours, theirs) and the whole unit of work is
+        committed again at the new version.
+        
+        Args:
+            turn: Context the turn started from (game_state is the merge base)
+            turn_commit: Staged end-of-turn writes
+            resolve_conflict: Merge hook (defaults to merge_world_state)
+            max_retries: Conflict retries (defaults to WORLD_STATE_COMMIT_RETRIES)
+            
+        Memories deferred with turn_commit.queue_memory are enqueued only
+        once the commit succeeded.
+        
+        Returns:
+            True if committed, False on failure or unresolved conflict
+        """
+        if resolve_conflict is None:
+            resolve_conflict = merge_world_state
+        if max_retries is None:
+            max_retries = settings.world_state_commit_retries
+        
+        base = turn.game_state
+        for attempt in range(max_retries + 1):
+            if await turn_commit.commit():
+                await self._write_queued_memories(turn_commit)
+                return True
+            if not turn_commit.conflict or turn_commit.world_state is None or attempt == max_retries:
+                break
+            
+            character_id = turn.character.id
+            theirs, version = await self.world_state.load_world_state_versioned(character_id)
+            ours = turn_commit.world_state
+            turn_commit.save_world_state(character_id, resolve_conflict(base, ours, theirs), version)
+            # Later conflicts rebase onto the state we merged with
+            base = theirs
+            logger.info(f"Retrying turn commit at world state version {version}")
+        
+        if turn_commit.conflict:
+            logger.error(f"World state conflict not resolved after {max_retries} retries")
+        if turn_commit.queued_memories:
+            logger.warning(
+                f"Dropping {len(turn_commit.queued_memories)} memories of an uncommitted turn"
+            )
+        return False
+    
+    async def _write_queued_memories(self, turn_commit: TurnCommit):
+        """Enqueue memories of a committed turn (inline write if the queue is full)."""
+        memories, turn_commit.queued_memories = turn_commit.queued_memories, []
+        for memory in memories:
+            if not memory_write_queue.enqueue(memory):
+                await episodic_memory_manager.create_memory(**memory.model_dump())
+    
+    async def _retrieve_memory(
+        self,
+        user_action: str,
+        character_id: Optional[UUID],
+        session_id: Optional[UUID],
+        deadline: Optional[TurnDeadline] = None,
+    ) -> str:
+        """
+        Retrieve memory summary for the action (Memory Manager).
+        
+        Never raises: a failed lookup degrades to a placeholder so it cannot
+        cancel the concurrently running rules analysis. A lookup slower than
+        TURN_MEMORY_TIMEOUT (or the turn deadline) is skipped.
+        
+        Returns:
+            Memory summary text ("" if character_id not provided)
+        """
+        if not character_id:
+            return ""
+        
+        try:
+            memory_context = {
+                "user_action": user_action,
+                "character_id": character_id,
+                "session_id": session_id,
+                "top_k": 3,
+                "recent_limit": 5,
+                "min_importance": 3
+            }
+            memory_output = await within_deadline(
+                deadline,
+                "memory",
+                self.memory_manager.execute(memory_context),
+                cap=settings.turn_memory_timeout,
+            )
+            logger.info(
+                f"Memory retrieval: {memory_output['total_found']} memories found"
+            )
+            return memory_output.get("memory_summary", "")
+        except asyncio.TimeoutError:
+            record_fallback("memory")
+            return ""
+        except Exception as e:
+            logger.error(f"Memory Manager error: {e}", exc_info=True)
+            record_fallback("memory")
+            return "💭 Память недоступна."
+    
     def _apply_mechanics_to_character(
         self, 
         character: CharacterSheet, 
@@ -224,11 +401,16 @@ class AgentOrchestrator:
         user_action: str,
         assistant_response: str,
         mechanics_result: dict,
-        game_state: dict
+        game_state: dict,
+        turn_commit: Optional[TurnCommit] = None,
     ):
         """
         Save episodic memory to database.
         
+        Enqueued to the background writer when it is running (after the
+        turn commits, if turn_commit is given); otherwise written (or
+        staged) inline.
+        
         Args:
             character_id: Character UUID
             session_id: Session UUID
@@ -236,6 +418,7 @@ class AgentOrchestrator:
             assistant_response: GM's response
             mechanics_result: Results from Rules Arbiter
             game_state: Current game state
+            turn_commit: If provided, stage the insert instead of writing now
         """
         try:
             # Extract metadata using Memory Manager
@@ -251,8 +434,7 @@ class AgentOrchestrator:
             # Get location from game_state
             location = game_state.get("location", "unknown")
             
-            # Save to DB
-            await episodic_memory_manager.create_memory(
+            memory = EpisodicMemoryCreate(
                 character_id=character_id,
                 session_id=session_id,
                 content=memory_content,
@@ -262,6 +444,25 @@ class AgentOrchestrator:
                 location=location
             )
             
+            # Hand off to background writer (embedding + insert off the reply path),
+            # but not before the turn it belongs to has committed
+            if turn_commit is not None and memory_write_queue.running:
+                turn_commit.queue_memory(memory)
+                logger.info(f"Memory for character {character_id} queued until turn commit")
+                return
+            if turn_commit is None and memory_write_queue.enqueue(memory):
+                logger.info(
+                    f"Queued memory for character {character_id} "
+                    f"(queue depth={memory_write_queue.depth})"
+                )
+                return
+            
+            # Queue not running or full: save to DB (or stage into the turn's unit of work)
+            if turn_commit is not None:
+                await episodic_memory_manager.stage_memory(turn_commit, **memory.model_dump())
+            else:
+                await episodic_memory_manager.create_memory(**memory.model_dump())
+            
             logger.info(
                 f"Saved memory for character {character_id}: "
                 f"type={metadata['memory_type']}, importance={metadata['importance_score']}"
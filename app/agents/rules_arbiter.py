@@ -1,12 +1,18 @@
 """Rules Arbiter Agent for game mechanics resolution."""
 
-from typing import Any
+import asyncio
+from typing import Any, Optional
 from app.agents.base import BaseAgent
+from app.agents.deadline import TurnDeadline, within_deadline
 from app.game.rules import RulesEngine
 from app.game.character import CharacterSheet
+from app.game.intent_classifier import IntentClassifier
+from app.game.intent_cache import IntentCache, make_intent_key
+from app.config import settings
 from app.config.models import AGENT_CONFIGS
 from app.config.prompts import RulesArbiterPrompts
 from app.llm.client import llm_client
+from app.observability.metrics import record_fallback
 import logging
 import json
 
@@ -29,20 +35,32 @@ class RulesArbiterAgent(BaseAgent):
         self.rules_engine = RulesEngine()
         self.prompts = RulesArbiterPrompts
         self.intent_config = AGENT_CONFIGS.RULES_ARBITER_INTENT
+        self.intent_classifier = IntentClassifier()
+        self.intent_cache = IntentCache(
+            max_entries=settings.intent_cache_size,
+            ttl_seconds=settings.intent_cache_ttl,
+        )
     
     async def _analyze_intent(
         self, 
         user_action: str, 
         character: CharacterSheet, 
-        game_state: dict
+        game_state: dict,
+        deadline: Optional[TurnDeadline] = None
     ) -> dict:
         """
-        Analyze user intent via LLM.
+        Analyze user intent (fast-path classifier, then LLM).
+        
+        Obvious actions are classified locally when the classifier is
+        confident enough (INTENT_FAST_PATH_THRESHOLD); repeated actions in the
+        same combat context are served from the intent cache; the rest go to
+        the LLM.
         
         Args:
             user_action: Player's action text
             character: Character sheet
             game_state: {"in_combat": bool, "enemies": list, "location": str}
+            deadline: Turn deadline; on timeout keyword detection is used
             
         Returns:
             {
@@ -55,6 +73,19 @@ class RulesArbiterAgent(BaseAgent):
                 "reasoning": str
             }
         """
+        # Fast path: deterministic classifier, no LLM round trip
+        if settings.intent_fast_path_enabled:
+            fast_intent = self._fast_path_intent(user_action, game_state)
+            if fast_intent is not None:
+                return fast_intent
+        
+        # Cache: same action in the same combat context
+        cache_key = make_intent_key(user_action, game_state)
+        cached_intent = self.intent_cache.get(cache_key)
+        if cached_intent is not None:
+            self.logger.info(f"Intent cache hit: {cached_intent['action_type']}")
+            return cached_intent
+        
         # Build context
         context_info = []
         if game_state.get("in_combat"):
@@ -77,18 +108,34 @@ class RulesArbiterAgent(BaseAgent):
         
         try:
             # Call LLM with intent analysis config + JSON mode
-            response = await llm_client.get_completion(
-                messages=messages,
-                model=self.intent_config.model,
-                temperature=self.intent_config.temperature,
-                max_tokens=self.intent_config.max_tokens,
-                response_format={"type": "json_object"}  # Enable JSON mode
+            response = await within_deadline(
+                deadline,
+                "intent",
+                llm_client.get_completion(
+                    messages=messages,
+                    model=self.intent_config.model,
+                    temperature=self.intent_config.temperature,
+                    max_tokens=self.intent_config.max_tokens,
+                    response_format={"type": "json_object"},  # Enable JSON mode
+                    raise_on_error=True,  # LLM errors -> keyword fallback below
+                    candidates=self.intent_config.candidate_models()
+                ),
+                cap=settings.turn_intent_timeout
             )
             
             # Parse JSON response
             intent = json.loads(response)
+            
+            # Cache only well-formed LLM answers (fallbacks are retried next time)
+            if isinstance(intent, dict) and "action_type" in intent and "requires_roll" in intent:
+                self.intent_cache.put(cache_key, intent)
+            
             return intent
         
+        except asyncio.TimeoutError:
+            # Out of time: keyword matching instead of waiting for the LLM
+            return self._fallback_keyword_detection(user_action)
+        
         except json.JSONDecodeError:
             # Fallback to keyword matching if LLM failed
             self.logger.warning(f"Failed to parse LLM intent response: {response}")
@@ -98,8 +145,36 @@ class RulesArbiterAgent(BaseAgent):
             self.logger.error(f"Error in intent analysis: {e}", exc_info=True)
             return self._fallback_keyword_detection(user_action)
     
+    def _fast_path_intent(self, user_action: str, game_state: dict) -> dict | None:
+        """
+        Classify intent locally if confidence is high enough.
+        
+        Returns:
+            Intent dict or None (caller should ask the LLM)
+        """
+        intent, confidence = self.intent_classifier.classify(user_action, game_state)
+        hit = intent is not None and confidence >= settings.intent_fast_path_threshold
+        self.intent_classifier.record(intent["action_type"] if intent else None, hit)
+        
+        stats = self.intent_classifier.stats()
+        if stats["attempts"] % 50 == 0:
+            self.logger.info(
+                f"Intent fast path hit rate: {stats['hit_rate']:.0%} "
+                f"({stats['hits']}/{stats['attempts']}), by type: {stats['hits_by_type']}"
+            )
+        
+        if not hit:
+            self.logger.debug(f"Intent fast path miss (confidence={confidence:.2f})")
+            return None
+        
+        self.logger.info(
+            f"Intent fast path: {intent['action_type']} (confidence={confidence:.2f})"
+        )
+        return intent
+    
     def _fallback_keyword_detection(self, user_action: str) -> dict:
         """Fallback method if LLM is unavailable."""
+        record_fallback("intent_keyword")
         action_type = self.rules_engine.detect_action_type(user_action)
         
         return {
@@ -126,7 +201,8 @@ class RulesArbiterAgent(BaseAgent):
                     "location": str
                 },
                 "target_ac": int (optional),
-                "dc": int (optional)
+                "dc": int (optional),
+                "deadline": TurnDeadline (optional)
             }
             
         Returns:
@@ -168,8 +244,10 @@ class RulesArbiterAgent(BaseAgent):
             self.log_execution(context, output)
             return output
         
-        # Step 1: Analyze intent via LLM
-        intent = await self._analyze_intent(user_action, character, game_state)
+        # Step 1: Analyze intent (fast path or LLM)
+        intent = await self._analyze_intent(
+            user_action, character, game_state, context.get("deadline")
+        )
         
         self.logger.info(f"Intent analysis: {intent['action_type']}, requires_roll: {intent['requires_roll']}")
         
@@ -10,7 +10,8 @@ import logging
 
 from app.agents.base import BaseAgent
 from app.config.models import AGENT_CONFIGS
-from app.db.supabase import get_db_connection
+from app.db.cache import world_state_cache
+from app.db.supabase import db_connection
 
 logger = logging.getLogger(__name__)
 
@@ -47,13 +48,16 @@ class WorldStateAgent(BaseAgent):
                 "mechanics_result": dict - Results from Rules Arbiter
                 "action_type": str - Type of action
                 "narrative_updates": dict (optional) - Updates from Narrative Director
+                "turn_commit": TurnCommit (optional) - Stage save instead of writing now
+                "world_state_version": int (optional) - Version game_state was
+                    loaded at; makes the save compare-and-swap
             }
             
         Returns:
             {
                 "updated_game_state": dict - New game state
                 "state_changes": List[str] - Human-readable changes
-                "persisted": bool - Whether state was saved to DB
+                "persisted": bool - Whether state was saved to DB (or staged)
             }
         """
         try:
@@ -92,8 +96,16 @@ class WorldStateAgent(BaseAgent):
                 )
                 self.logger.debug(f"After combat updates: in_combat={updated_state.get('in_combat')}, enemies={updated_state.get('enemies', [])}")
             
-            # Save to database
-            persisted = await self._save_world_state(character_id, updated_state)
+            # Save to database (or stage into the turn's unit of work)
+            turn_commit = context.get("turn_commit")
+            expected_version = context.get("world_state_version")
+            if turn_commit is not None:
+                turn_commit.save_world_state(character_id, updated_state, expected_version)
+                persisted = True
+            else:
+                persisted = await self._save_world_state(
+                    character_id, updated_state, expected_version
+                )
             
             output = {
                 "updated_game_state": updated_state,
@@ -186,7 +198,8 @@ class WorldStateAgent(BaseAgent):
     async def _save_world_state(
         self,
         character_id: UUID,
-        state_data: dict
+        state_data: dict,
+        expected_version: Optional[int] = None
     ) -> bool:
         """
         Save world state to database.
@@ -194,40 +207,76 @@ class WorldStateAgent(BaseAgent):
         Args:
             character_id: Character UUID
             state_data: Game state dict to save
+            expected_version: Version state_data was loaded at (0 = no row yet);
+                the save is skipped if the row has moved on. None overwrites.
             
         Returns:
-            True if saved successfully, False otherwise
+            True if saved successfully, False on error or version conflict
         """
         try:
-            conn = await get_db_connection()
-            
-            try:
+            async with db_connection() as conn:
                 # Convert dict to JSONB
                 import json
                 state_json = json.dumps(state_data)
                 
-                await conn.execute(
-                    """
-                    INSERT INTO world_state (character_id, state_data, version)
-                    VALUES ($1, $2::jsonb, 1)
-                    ON CONFLICT (character_id) 
-                    DO UPDATE SET 
-                        state_data = $2::jsonb,
-                        version = world_state.version + 1,
-                        updated_at = NOW()
-                    """,
-                    character_id,
-                    state_json
-                )
+                if expected_version is None:
+                    await conn.execute(
+                        """
+                        INSERT INTO world_state (character_id, state_data, version)
+                        VALUES ($1, $2::jsonb, 1)
+                        ON CONFLICT (character_id) 
+                        DO UPDATE SET 
+                            state_data = $2::jsonb,
+                            version = world_state.version + 1,
+                            updated_at = NOW()
+                        """,
+                        character_id,
+                        state_json
+                    )
+                elif expected_version == 0:
+                    saved = await conn.fetchval(
+                        """
+                        INSERT INTO world_state (character_id, state_data, version)
+                        VALUES ($1, $2::jsonb, 1)
+                        ON CONFLICT (character_id) DO NOTHING
+                        RETURNING version
+                        """,
+                        character_id,
+                        state_json
+                    )
+                else:
+                    saved = await conn.fetchval(
+                        """
+                        UPDATE world_state
+                        SET state_data = $2::jsonb,
+                            version = version + 1,
+                            updated_at = NOW()
+                        WHERE character_id = $1 AND version = $3
+                        RETURNING version
+                        """,
+                        character_id,
+                        state_json,
+                        expected_version
+                    )
+                
+                if expected_version is None:
+                    # New version unknown: next read goes to the database
+                    world_state_cache.invalidate(character_id)
+                elif saved is None:
+                    world_state_cache.invalidate(character_id)
+                    self.logger.warning(
+                        f"World state of character {character_id} changed since "
+                        f"version {expected_version}, not saved"
+                    )
+                    return False
+                else:
+                    world_state_cache.set(character_id, (state_data, saved))
                 
                 self.logger.debug(
                     f"Saved world state for character {character_id}"
                 )
                 return True
                 
-            finally:
-                await conn.close()
-                
         except Exception as e:
             self.logger.error(
                 f"Failed to save world state: {e}",
@@ -245,12 +294,30 @@ class WorldStateAgent(BaseAgent):
         Returns:
             Game state dict, or default state if not found
         """
-        try:
-            conn = await get_db_connection()
+        state, _ = await self.load_world_state_versioned(character_id)
+        return state
+    
+    async def load_world_state_versioned(self, character_id: UUID) -> tuple[dict, int]:
+        """
+        Load world state and its version (read-through cache).
+        
+        Pass the version back when saving to make the save compare-and-swap.
+        
+        Args:
+            character_id: Character UUID
             
-            try:
+        Returns:
+            (game state dict, version); default state and 0 if not found
+        """
+        cached = world_state_cache.get(character_id)
+        if cached is not None:
+            return cached
+        epoch = world_state_cache.epoch
+        
+        try:
+            async with db_connection() as conn:
                 row = await conn.fetchrow(
-                    "SELECT state_data FROM world_state WHERE character_id = $1",
+                    "SELECT state_data, version FROM world_state WHERE character_id = $1",
                     character_id
                 )
                 
@@ -260,30 +327,59 @@ class WorldStateAgent(BaseAgent):
                     if isinstance(state_data, str):
                         import json
                         state_data = json.loads(state_data)
-                    return dict(state_data)
+                    loaded = dict(state_data), row.get("version") or 0
                 else:
                     # Default state for new characters
-                    return self._default_game_state()
-                    
-            finally:
-                await conn.close()
+                    loaded = self._default_game_state(), 0
+                
+                world_state_cache.set(character_id, loaded, epoch=epoch)
+                return loaded
                 
         except Exception as e:
             self.logger.error(
                 f"Failed to load world state: {e}",
                 exc_info=True
             )
-            return self._default_game_state()
+            return self._default_game_state(), 0
     
     def _default_game_state(self) -> dict:
         """Return default game state for new characters."""
-        return {
-            "in_combat": False,
-            "enemies": [],
-            "location": "starting_area",
-            "quests": [],
-            "flags": {}
-        }
+        return default_game_state()
+
+
+def merge_world_state(base: dict, ours: dict, theirs: dict) -> dict:
+    """
+    Three-way merge of top-level game state keys.
+    
+    Keys this turn changed (ours vs base) win, everything else is taken from
+    the state another writer saved in the meantime (theirs).
+    
+    Args:
+        base: State the turn started from
+        ours: State the turn produced
+        theirs: Current state in the database
+        
+    Returns:
+        Merged game state
+    """
+    merged = dict(theirs)
+    for key in base.keys() | ours.keys():
+        if key not in ours:
+            merged.pop(key, None)
+        elif key not in base or ours[key] != base[key]:
+            merged[key] = ours[key]
+    return merged
+
+
+def default_game_state() -> dict:
+    """Return default game state for new characters."""
+    return {
+        "in_combat": False,
+        "enemies": [],
+        "location": "starting_area",
+        "quests": [],
+        "flags": {}
+    }
 
 
 # Global instance
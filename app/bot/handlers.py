@@ -3,13 +3,18 @@ Telegram bot handlers для обработки сообщений пользо
 """
 import asyncio
 import logging
+from typing import Optional
 from aiogram import Router, F
 from aiogram.filters import Command, StateFilter
 from aiogram.fsm.context import FSMContext
 from aiogram.types import Message, InlineKeyboardButton, InlineKeyboardMarkup, CallbackQuery
 
+from app.bot.mailbox import mark_turn_committing, turn_mailbox
 from app.bot.states import ConversationState
+from app.bot.streaming import NarrativeStream
+from app.config import settings
 from app.agents.orchestrator import AgentOrchestrator
+from app.agents.deadline import TurnDeadline
 from app.game.character import CharacterSheet
 from app.config.prompts import UIPrompts, CombatPrompts, SettingsPrompts
 from app.db.characters import (
@@ -18,13 +23,16 @@ from app.db.characters import (
     update_character,
     delete_character,
 )
-from app.db.sessions import get_or_create_session, update_session_stats
+from app.db.turn_commit import TurnCommit
+from app.llm.governor import set_llm_user
+from app.observability.tracing import span, start_trace
+from app.db.turn_context import load_turn_context, load_turn_context_for_character
+from app.memory.conversation import conversation_history
 from app.db.user_settings import (
     get_user_settings_by_telegram_id,
     create_or_update_user_settings,
     update_combat_enabled,
 )
-from app.agents.world_state import world_state_agent
 
 
 # Logger
@@ -302,8 +310,8 @@ async def callback_select_class(callback: CallbackQuery, state: FSMContext):
     await state.update_data(
         character=character.model_dump_for_storage(),
         game_state=game_state,
-        history=[]
     )
+    await conversation_history.reset(character.id)
     await state.set_state(ConversationState.in_conversation)
     
     # Format character sheet message
@@ -399,7 +407,39 @@ async def cmd_reset(message: Message, state: FSMContext):
 @router.message(ConversationState.in_conversation, F.text)
 async def handle_conversation(message: Message, state: FSMContext):
     """Main handler with database integration (Sprint 3)."""
-    user_message = message.text
+    telegram_user_id = message.from_user.id if message.from_user else 0
+    
+    # One turn per user at a time; messages sent meanwhile are merged (TURN_MAILBOX_POLICY)
+    await turn_mailbox.submit(
+        telegram_user_id, message, lambda messages: _run_turn(messages, state)
+    )
+
+
+async def _run_turn(messages: list[Message], state: FSMContext):
+    """Run one turn for the user's queued messages (combined into one action)."""
+    message = messages[-1]
+    telegram_user_id = message.from_user.id if message.from_user else 0
+    user_message = "\n".join(m.text for m in messages if m.text)
+    
+    # One trace per turn: stage/LLM/DB/embedding spans, exported as a JSON log line
+    with start_trace("turn", user_id=telegram_user_id, merged_messages=len(messages)):
+        await _process_conversation_turn(message, state, user_message)
+
+
+async def _process_conversation_turn(
+    message: Message,
+    state: FSMContext,
+    user_message: Optional[str] = None,
+):
+    """
+    Load turn context, run the orchestrator and commit the turn.
+    
+    Args:
+        message: Message to reply to
+        state: User's FSM context
+        user_message: Player action (defaults to message.text; merged text of coalesced messages)
+    """
+    user_message = user_message or message.text
     
     if not user_message:
         await message.answer(UIPrompts.ERROR_GENERIC)
@@ -407,52 +447,68 @@ async def handle_conversation(message: Message, state: FSMContext):
     
     telegram_user_id = message.from_user.id if message.from_user else 0
     
-    # Load character from database instead of FSM
-    character = await get_character_by_telegram_id(telegram_user_id)
+    # LLM calls of this turn queue fairly against other users' calls
+    set_llm_user(telegram_user_id)
+    
+    # Latency budget for the whole turn, counted from when the turn starts
+    # (time spent queued in the mailbox behind the previous turn is not included)
+    deadline = TurnDeadline(settings.turn_deadline)
     
-    if not character:
+    # Load character, settings, session and world state in one round trip
+    with span("load_turn_context"):
+        turn = await load_turn_context(telegram_user_id)
+    
+    if not turn:
         # Fallback: check FSM for in-memory character (backward compatibility)
         data = await state.get_data()
         character_data = data.get("character")
         
         if character_data:
-            character = CharacterSheet(**character_data)
+            turn = await load_turn_context_for_character(CharacterSheet(**character_data))
         else:
             await message.answer(UIPrompts.ERROR_NO_CHARACTER)
             return
     
-    # Load user settings (combat toggle)
-    user_settings = await get_user_settings_by_telegram_id(telegram_user_id)
-    if user_settings is None:
-        user_settings = await create_or_update_user_settings(telegram_user_id, combat_enabled=True)
-
-    # Get or create session
-    session_id = await get_or_create_session(character.id)
-    
-    # Load game state from World State Agent
-    game_state = await world_state_agent.load_world_state(character.id)
+    session_id = turn.session_id
+    game_state = turn.game_state
     
-    # Get history from FSM (will be migrated to DB in future)
-    data = await state.get_data()
-    history = data.get("history", [])
+    # Recent conversation (ring buffer in front of conversation_turns)
+    history = await conversation_history.recent(turn.character.id)
     recent_messages = [msg["content"] for msg in history[-5:] if msg["role"] == "assistant"]
     
+    # End-of-turn writes are staged here and committed in one round trip
+    turn_commit = TurnCommit()
+    
     # Typing indicator
     typing_task = asyncio.create_task(_send_typing_indicator(message))
     
+    # Streaming: placeholder message edited as narrative tokens arrive
+    stream = None
+    if settings.telegram_stream_narrative:
+        stream = NarrativeStream(message, edit_interval=settings.telegram_stream_edit_interval)
+        await stream.start(UIPrompts.NARRATIVE_PLACEHOLDER)
+    
     try:
         # Process через orchestrator with DB integration
-        final_message, updated_character, updated_game_state = await orchestrator.process_action(
+        final_message, updated_character, updated_game_state = await orchestrator.process_turn(
             user_action=user_message,
-            character=character,
-            game_state=game_state,
-            character_id=character.id,  # For memory retrieval
-            session_id=session_id,  # For memory context
+            turn=turn,
             recent_history=recent_messages,
-            user_settings=user_settings
+            turn_commit=turn_commit,
+            on_narrative_token=stream.push if stream else None,
+            deadline=deadline,
         )
+        # Results (memory included) are being persisted: a newer message no longer cancels the turn
+        mark_turn_committing()
+    except asyncio.CancelledError:
+        # Superseded by a newer message (cancel policy): nothing was persisted yet
+        if stream:
+            await stream.discard()
+        raise
     except Exception as e:
         logger.error(f"Error processing action: {e}", exc_info=True)
+        if stream:
+            await stream.discard()
         await message.answer(UIPrompts.ERROR_GENERIC)
         return
     finally:
@@ -471,14 +527,14 @@ async def handle_conversation(message: Message, state: FSMContext):
         final_message = f"{final_message}\n\n{CombatPrompts.COMBAT_END}"
     
     # Check death
-    if not updated_character.is_alive():
+    player_died = not updated_character.is_alive()
+    if player_died:
         final_message = f"{final_message}\n\n{CombatPrompts.PLAYER_DEATH}"
-        await state.clear()  # Reset game
     
-    # Save updated character to database
-    await update_character(updated_character)
+    # Stage updated character
+    turn_commit.update_character(updated_character)
     
-    # Update session stats
+    # Stage session stats
     damage_dealt = 0
     damage_taken = 0
     
@@ -486,21 +542,34 @@ async def handle_conversation(message: Message, state: FSMContext):
     enemy_attacks = updated_game_state.get("enemy_attacks", [])
     damage_taken = sum(attack.get("damage", 0) for attack in enemy_attacks)
     
-    await update_session_stats(
+    turn_commit.update_session_stats(
         session_id=session_id,
         turns_increment=1,
         damage_dealt_increment=damage_dealt,
         damage_taken_increment=damage_taken
     )
     
-    # Update history in FSM (temporary until we migrate to DB)
-    history.append({"role": "user", "content": user_message})
-    history.append({"role": "assistant", "content": final_message})
+    # Persist world state, character, session stats and memory atomically
+    # (rebased and retried if another writer saved the world state meanwhile)
+    with span("turn_commit"):
+        committed = await orchestrator.commit_turn(turn, turn_commit)
+    
+    if not committed:
+        # Nothing was persisted: do not show or remember a turn the game did not record
+        if stream:
+            await stream.discard()
+        await message.answer(UIPrompts.ERROR_TURN_NOT_SAVED)
+        return
+    
+    if player_died:
+        await state.clear()  # Reset game
     
-    if len(history) > 20:
-        history = history[-20:]
+    # Append to conversation history (written to the DB in the background)
+    await conversation_history.append(turn.character.id, user_message, final_message)
     
-    await state.update_data(history=history)
+    # Streaming: replace placeholder with final message (mechanics + narrative + status)
+    if stream and await stream.finish(final_message):
+        return
     
     # Send response with fallback for invalid Markdown
     try:
@@ -556,7 +625,6 @@ async def handle_any_message(message: Message, state: FSMContext):
             if not data.get("character"):
                 await state.update_data(
                     character=character.model_dump_for_storage(),
-                    history=[]
                 )
         
         # Forward to conversation handler
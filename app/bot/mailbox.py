@@ -0,0 +1,174 @@
+"""
+Per-user turn serialization.
+
+Each user gets a mailbox; one turn runs at a time. Messages arriving while
+a turn is in flight are handled by policy (TURN_MAILBOX_POLICY):
+
+- coalesce: queue them and run them as one combined turn afterwards
+- cancel: cancel the in-flight turn and rerun it merged with the new
+  messages (a turn that reached its commit point is never cancelled, it
+  finishes and the new messages are coalesced)
+- off: no serialization, every message runs its own turn concurrently
+
+Callers await submit() until the turn that includes their item finished,
+so update handling (and webhook backpressure) still covers the whole turn.
+"""
+import asyncio
+import logging
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, Generic, Hashable, Optional, TypeVar
+
+from app.config import settings
+from app.observability.metrics import TURN_MAILBOX
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+COALESCE = "coalesce"
+CANCEL = "cancel"
+OFF = "off"
+
+
+class _Mailbox(Generic[T]):
+    """Pending items and the running turn of one user."""
+
+    def __init__(self):
+        self.pending: list[tuple[T, asyncio.Future]] = []
+        self.current: Optional[asyncio.Task] = None
+        self.worker: Optional[asyncio.Task] = None
+        self.cancellable = False
+        self.superseded = False
+
+
+_current_mailbox: ContextVar[Optional[_Mailbox]] = ContextVar("current_mailbox", default=None)
+
+
+def mark_turn_committing():
+    """
+    Mark the running turn as past its point of no return.
+
+    Called before the turn persists its results; from then on the cancel
+    policy lets it finish. No-op outside of a mailbox turn.
+    """
+    mailbox = _current_mailbox.get()
+    if mailbox is not None:
+        mailbox.cancellable = False
+
+
+class TurnMailbox(Generic[T]):
+    """
+    Serialize turns per key, coalescing or superseding rapid-fire items.
+
+    Usage:
+        await turn_mailbox.submit(user_id, message, run_turn)
+        # run_turn(batch) receives the items of one turn, oldest first
+    """
+
+    def __init__(self, policy: str = COALESCE, max_batch: int = 5):
+        """
+        Initialize mailbox.
+
+        Args:
+            policy: coalesce, cancel or off
+            max_batch: Max items merged into one turn
+        """
+        if policy not in (COALESCE, CANCEL, OFF):
+            raise ValueError(f"Unknown turn mailbox policy: {policy}")
+        self.policy = policy
+        self.max_batch = max(1, max_batch)
+        self._mailboxes: dict[Hashable, _Mailbox[T]] = {}
+
+    def in_flight(self, key: Hashable) -> bool:
+        """True if a turn of key is running or queued."""
+        return key in self._mailboxes
+
+    async def submit(
+        self,
+        key: Hashable,
+        item: T,
+        run: Callable[[list[T]], Awaitable[Any]],
+    ) -> None:
+        """
+        Queue item for key and wait until the turn that includes it finished.
+
+        Args:
+            key: Serialization key (telegram user id)
+            item: Queued item (e.g. the Message)
+            run: Coroutine function running one turn for a batch of items
+        """
+        if self.policy == OFF:
+            await run([item])
+            return
+
+        mailbox = self._mailboxes.get(key)
+        if mailbox is None:
+            mailbox = _Mailbox()
+            self._mailboxes[key] = mailbox
+
+        done = asyncio.get_running_loop().create_future()
+        mailbox.pending.append((item, done))
+
+        if mailbox.worker is None:
+            mailbox.worker = asyncio.create_task(self._drain(key, mailbox, run))
+        else:
+            TURN_MAILBOX.inc(outcome="coalesced")
+            if self.policy == CANCEL and mailbox.cancellable and mailbox.current is not None:
+                mailbox.superseded = True
+                mailbox.current.cancel()
+
+        # Shield: a cancelled caller must not cancel the turn shared with other items
+        await asyncio.shield(done)
+
+    async def _drain(self, key: Hashable, mailbox: _Mailbox[T], run: Callable[[list[T]], Awaitable[Any]]):
+        """Run queued items batch by batch until the mailbox is empty."""
+        batch: list[tuple[T, asyncio.Future]] = []
+        try:
+            while mailbox.pending:
+                batch = mailbox.pending[:self.max_batch]
+                del mailbox.pending[:self.max_batch]
+
+                mailbox.cancellable = True
+                mailbox.superseded = False
+                token = _current_mailbox.set(mailbox)
+                try:
+                    mailbox.current = asyncio.create_task(run([item for item, _ in batch]))
+                finally:
+                    _current_mailbox.reset(token)
+
+                try:
+                    await mailbox.current
+                except asyncio.CancelledError:
+                    if not mailbox.superseded:
+                        raise
+                    # Rerun the stale turn merged with the messages that superseded it
+                    TURN_MAILBOX.inc(outcome="cancelled")
+                    logger.info(f"Turn of {key} superseded by a newer message, rerunning merged")
+                    mailbox.pending[0:0] = batch
+                    batch = []
+                    continue
+                except Exception as e:
+                    # The turn's own error handling already answered the user
+                    logger.error(f"Turn of {key} failed: {e}", exc_info=True)
+                finally:
+                    mailbox.current = None
+
+                for _, done in batch:
+                    if not done.done():
+                        done.set_result(None)
+                batch = []
+        finally:
+            # Worker cancelled (shutdown): release everyone still waiting
+            for _, done in batch + mailbox.pending:
+                if not done.done():
+                    done.cancel()
+            mailbox.pending.clear()
+            if self._mailboxes.get(key) is mailbox:
+                del self._mailboxes[key]
+
+
+# Global instance
+turn_mailbox: TurnMailbox = TurnMailbox(
+    policy=settings.turn_mailbox_policy,
+    max_batch=settings.turn_mailbox_max_batch,
+)
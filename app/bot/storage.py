@@ -0,0 +1,411 @@
+"""
+FSM storage helpers.
+
+Backends (FSM_STORAGE):
+- memory: aiogram MemoryStorage, lost on restart, one instance only
+- postgres: fsm_state table (migration 004) through the shared pool
+- redis: hash per key on any Redis-protocol server (needs the redis package)
+
+Persistent backends keep a write-through in-process cache (reads within
+FSM_CACHE_TTL seconds skip the round trip) and store data compactly: the
+chat history as [role, content] pairs in minified JSON, zlib-compressed
+once it is large.
+"""
+import asyncio
+import copy
+import json
+import logging
+import time
+import zlib
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, DefaultKeyBuilder, KeyBuilder, StateType, StorageKey
+from aiogram.fsm.storage.memory import MemoryStorage
+
+from app.observability.metrics import FSM_OPERATIONS
+
+logger = logging.getLogger(__name__)
+
+# History roles stored as one letter
+_ROLE_CODES = {"user": "u", "assistant": "a", "system": "s"}
+_ROLE_NAMES = {code: role for role, code in _ROLE_CODES.items()}
+
+# Blob format markers: plain JSON / zlib-compressed JSON
+_PLAIN = b"j"
+_COMPRESSED = b"z"
+COMPRESS_THRESHOLD = 1024
+
+
+def _compact_history(history: Any) -> Any:
+    """[{"role": ..., "content": ...}] -> [[code, content]] (other shapes unchanged)."""
+    if not isinstance(history, list):
+        return history
+    if not all(
+        isinstance(m, dict) and m.keys() == {"role", "content"} and m["role"] in _ROLE_CODES
+        for m in history
+    ):
+        return history
+    return [[_ROLE_CODES[m["role"]], m["content"]] for m in history]
+
+
+def _expand_history(history: Any) -> Any:
+    if not isinstance(history, list):
+        return history
+    if not all(isinstance(m, list) and len(m) == 2 and m[0] in _ROLE_NAMES for m in history):
+        return history
+    return [{"role": _ROLE_NAMES[code], "content": content} for code, content in history]
+
+
+def encode_fsm_data(data: Dict[str, Any]) -> Optional[bytes]:
+    """
+    Serialize FSM data for persistent backends.
+    
+    Returns:
+        Blob, or None for empty data (nothing to store)
+    """
+    if not data:
+        return None
+    payload = dict(data)
+    if "history" in payload:
+        payload["history"] = _compact_history(payload["history"])
+    raw = json.dumps(payload, ensure_ascii=False, separators=(",", ":"), default=str).encode()
+    if len(raw) >= COMPRESS_THRESHOLD:
+        return _COMPRESSED + zlib.compress(raw)
+    return _PLAIN + raw
+
+
+def decode_fsm_data(blob: Optional[bytes]) -> Dict[str, Any]:
+    """Inverse of encode_fsm_data."""
+    if not blob:
+        return {}
+    blob = bytes(blob)
+    marker, body = blob[:1], blob[1:]
+    if marker == _COMPRESSED:
+        body = zlib.decompress(body)
+    elif marker != _PLAIN:
+        raise ValueError(f"Unknown FSM data format: {marker!r}")
+    data = json.loads(body)
+    if "history" in data:
+        data["history"] = _expand_history(data["history"])
+    return data
+
+
+def _state_name(state: StateType) -> Optional[str]:
+    return state.state if isinstance(state, State) else state
+
+
+class InstrumentedStorage(BaseStorage):
+    """
+    Wrap an FSM storage and record operation latency/counts
+    (rpgate_fsm_storage_operation_duration_seconds{operation}).
+    """
+    
+    def __init__(self, storage: BaseStorage):
+        self.storage = storage
+    
+    async def _timed(self, operation: str, call):
+        started = time.perf_counter()
+        try:
+            return await call
+        finally:
+            FSM_OPERATIONS.observe(time.perf_counter() - started, operation=operation)
+    
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        await self._timed("set_state", self.storage.set_state(key, state))
+    
+    async def get_state(self, key: StorageKey) -> Optional[str]:
+        return await self._timed("get_state", self.storage.get_state(key))
+    
+    async def set_data(self, key: StorageKey, data: Dict[str, Any]) -> None:
+        await self._timed("set_data", self.storage.set_data(key, data))
+    
+    async def get_data(self, key: StorageKey) -> Dict[str, Any]:
+        return await self._timed("get_data", self.storage.get_data(key))
+    
+    async def update_data(self, key: StorageKey, data: Dict[str, Any]) -> Dict[str, Any]:
+        return await self._timed("update_data", self.storage.update_data(key, data))
+    
+    async def close(self) -> None:
+        await self.storage.close()
+
+
+class _CacheEntry:
+    """Cached state and data of one key (either may be unknown)."""
+    
+    __slots__ = ("state", "data", "state_at", "data_at")
+    
+    def __init__(self):
+        self.state: Optional[str] = None
+        self.data: Dict[str, Any] = {}
+        self.state_at: Optional[float] = None
+        self.data_at: Optional[float] = None
+
+
+class PersistentStorage(BaseStorage, ABC):
+    """
+    Base for shareable FSM backends: key building, encoding and a
+    write-through cache.
+    
+    Subclasses implement one read of both fields and one write per field.
+    Writes go to the backend first; the cache is updated only on success.
+    With several replicas a cached value may be up to cache_ttl seconds
+    stale, so keep the TTL short unless updates of a user stick to a replica.
+    """
+    
+    def __init__(
+        self,
+        key_builder: Optional[KeyBuilder] = None,
+        cache_size: int = 10000,
+        cache_ttl: float = 5.0,
+    ):
+        self.key_builder = key_builder or DefaultKeyBuilder(with_bot_id=True)
+        self.cache_size = cache_size
+        self.cache_ttl = cache_ttl
+        self._cache: OrderedDict[str, _CacheEntry] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+    
+    @abstractmethod
+    async def _load(self, key: str) -> tuple[Optional[str], Optional[bytes]]:
+        """Read (state, data blob) of key."""
+    
+    @abstractmethod
+    async def _store_state(self, key: str, state: Optional[str]) -> None:
+        """Write state (None clears it)."""
+    
+    @abstractmethod
+    async def _store_data(self, key: str, blob: Optional[bytes]) -> None:
+        """Write data blob (None clears it)."""
+    
+    def _fresh(self, cached_at: Optional[float]) -> bool:
+        if cached_at is None or self.cache_ttl <= 0:
+            return False
+        return time.monotonic() - cached_at < self.cache_ttl
+    
+    def _entry(self, key: str) -> _CacheEntry:
+        entry = self._cache.get(key)
+        if entry is None:
+            entry = _CacheEntry()
+            self._cache[key] = entry
+            while len(self._cache) > max(self.cache_size, 0):
+                self._cache.popitem(last=False)
+        else:
+            self._cache.move_to_end(key)
+        return entry
+    
+    async def _fill(self, key: str) -> _CacheEntry:
+        """Load both fields from the backend into the cache."""
+        self.misses += 1
+        state, blob = await self._load(key)
+        entry = self._entry(key)
+        now = time.monotonic()
+        entry.state, entry.state_at = state, now
+        entry.data, entry.data_at = decode_fsm_data(blob), now
+        return entry
+    
+    async def get_state(self, key: StorageKey) -> Optional[str]:
+        storage_key = self.key_builder.build(key)
+        entry = self._cache.get(storage_key)
+        if entry is not None and self._fresh(entry.state_at):
+            self.hits += 1
+            self._cache.move_to_end(storage_key)
+            return entry.state
+        return (await self._fill(storage_key)).state
+    
+    async def get_data(self, key: StorageKey) -> Dict[str, Any]:
+        storage_key = self.key_builder.build(key)
+        entry = self._cache.get(storage_key)
+        if entry is not None and self._fresh(entry.data_at):
+            self.hits += 1
+            self._cache.move_to_end(storage_key)
+        else:
+            entry = await self._fill(storage_key)
+        # Callers mutate the result (e.g. history.append) before writing it back
+        return copy.deepcopy(entry.data)
+    
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        storage_key = self.key_builder.build(key)
+        name = _state_name(state)
+        try:
+            await self._store_state(storage_key, name)
+        except BaseException:
+            self._cache.pop(storage_key, None)
+            raise
+        entry = self._entry(storage_key)
+        entry.state, entry.state_at = name, time.monotonic()
+    
+    async def set_data(self, key: StorageKey, data: Dict[str, Any]) -> None:
+        storage_key = self.key_builder.build(key)
+        try:
+            await self._store_data(storage_key, encode_fsm_data(data))
+        except BaseException:
+            self._cache.pop(storage_key, None)
+            raise
+        entry = self._entry(storage_key)
+        entry.data, entry.data_at = copy.deepcopy(data), time.monotonic()
+    
+    async def close(self) -> None:
+        self._cache.clear()
+
+
+class PostgresStorage(PersistentStorage):
+    """FSM state in the fsm_state table (app/db/migrations/004_fsm_state.sql)."""
+    
+    async def _load(self, key: str) -> tuple[Optional[str], Optional[bytes]]:
+        from app.db.supabase import db_connection
+        
+        async with db_connection() as conn:
+            row = await conn.fetchrow(
+                "SELECT state, data FROM fsm_state WHERE storage_key = $1", key
+            )
+        if row is None:
+            return None, None
+        return row["state"], row["data"]
+    
+    async def _store_state(self, key: str, state: Optional[str]) -> None:
+        from app.db.supabase import db_connection
+        
+        async with db_connection() as conn:
+            await conn.execute(
+                """
+                INSERT INTO fsm_state (storage_key, state) VALUES ($1, $2)
+                ON CONFLICT (storage_key) DO UPDATE SET state = EXCLUDED.state
+                """,
+                key, state,
+            )
+    
+    async def _store_data(self, key: str, blob: Optional[bytes]) -> None:
+        from app.db.supabase import db_connection
+        
+        async with db_connection() as conn:
+            await conn.execute(
+                """
+                INSERT INTO fsm_state (storage_key, data) VALUES ($1, $2)
+                ON CONFLICT (storage_key) DO UPDATE SET data = EXCLUDED.data
+                """,
+                key, blob,
+            )
+
+
+class RedisStorage(PersistentStorage):
+    """
+    FSM state as one hash per key (fields "state" and "data").
+    
+    Uses the hgetall/hset/hdel/aclose subset of redis.asyncio.Redis, so any
+    Redis-protocol server works, and LocalRedis can stand in for tests and
+    local runs.
+    """
+    
+    def __init__(self, redis, **kwargs):
+        """
+        Initialize storage.
+        
+        Args:
+            redis: redis.asyncio.Redis (or LocalRedis) client
+            **kwargs: PersistentStorage options
+        """
+        super().__init__(**kwargs)
+        self.redis = redis
+    
+    @classmethod
+    def from_url(cls, url: str, **kwargs) -> "RedisStorage":
+        """
+        Create storage with a redis.asyncio client.
+        
+        Raises:
+            ImportError: If the redis package is not installed
+        """
+        from redis.asyncio import Redis
+        
+        return cls(Redis.from_url(url), **kwargs)
+    
+    async def _load(self, key: str) -> tuple[Optional[str], Optional[bytes]]:
+        fields = await self.redis.hgetall(key)
+        state = fields.get(b"state")
+        return (state.decode() if state is not None else None), fields.get(b"data")
+    
+    async def _store_field(self, key: str, field: str, value: Optional[bytes]):
+        if value is None:
+            await self.redis.hdel(key, field)
+        else:
+            await self.redis.hset(key, field, value)
+    
+    async def _store_state(self, key: str, state: Optional[str]) -> None:
+        await self._store_field(key, "state", state.encode() if state is not None else None)
+    
+    async def _store_data(self, key: str, blob: Optional[bytes]) -> None:
+        await self._store_field(key, "data", blob)
+    
+    async def close(self) -> None:
+        await super().close()
+        await self.redis.aclose()
+
+
+class LocalRedis:
+    """
+    In-process stand-in for the hash commands RedisStorage uses.
+    
+    Values are bytes, as returned by redis-py without decode_responses.
+    """
+    
+    def __init__(self):
+        self._hashes: dict[str, dict[bytes, bytes]] = {}
+        self._lock = asyncio.Lock()
+    
+    @staticmethod
+    def _bytes(value) -> bytes:
+        return value if isinstance(value, bytes) else str(value).encode()
+    
+    async def hgetall(self, key: str) -> dict[bytes, bytes]:
+        return dict(self._hashes.get(key, {}))
+    
+    async def hset(self, key: str, field, value) -> int:
+        async with self._lock:
+            fields = self._hashes.setdefault(key, {})
+            new = self._bytes(field) not in fields
+            fields[self._bytes(field)] = self._bytes(value)
+            return int(new)
+    
+    async def hdel(self, key: str, *field_names) -> int:
+        async with self._lock:
+            fields = self._hashes.get(key, {})
+            removed = sum(fields.pop(self._bytes(f), None) is not None for f in field_names)
+            if not fields:
+                self._hashes.pop(key, None)
+            return removed
+    
+    async def aclose(self):
+        pass
+
+
+def create_fsm_storage() -> BaseStorage:
+    """Build the FSM storage selected by FSM_STORAGE (instrumented if metrics are on)."""
+    from app.config import settings
+    
+    options = {"cache_size": settings.fsm_cache_size, "cache_ttl": settings.fsm_cache_ttl}
+    backend = settings.fsm_storage.lower()
+    
+    if backend == "postgres":
+        storage: BaseStorage = PostgresStorage(**options)
+    elif backend == "redis":
+        if not settings.fsm_redis_url:
+            raise RuntimeError("FSM_STORAGE=redis requires FSM_REDIS_URL")
+        try:
+            storage = RedisStorage.from_url(settings.fsm_redis_url, **options)
+        except ImportError:
+            raise RuntimeError(
+                "FSM_STORAGE=redis but the redis package is not installed. "
+                "Run 'uv add redis' to enable it."
+            )
+    elif backend == "memory":
+        storage = MemoryStorage()
+    else:
+        raise RuntimeError(f"Unknown FSM_STORAGE: {settings.fsm_storage}")
+    
+    logger.info(f"FSM storage: {backend}")
+    if settings.metrics_enabled:
+        storage = InstrumentedStorage(storage)
+    return storage
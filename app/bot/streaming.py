@@ -0,0 +1,116 @@
+"""
+Progressive delivery of streamed narrative via Telegram message edits.
+"""
+import logging
+import time
+from typing import Optional
+
+from aiogram.types import Message
+
+logger = logging.getLogger(__name__)
+
+# Telegram message text limit
+MAX_MESSAGE_LENGTH = 4096
+
+# Cursor shown at the end of partial text
+STREAM_CURSOR = " ▌"
+
+
+class NarrativeStream:
+    """
+    Placeholder message that is edited as narrative tokens arrive.
+
+    Edits are throttled to one per edit_interval seconds to stay within
+    Telegram rate limits. Partial text is sent without parse_mode (it may
+    contain unbalanced Markdown); the final message is sent with Markdown.
+
+    Usage:
+        stream = NarrativeStream(message, edit_interval=1.0)
+        await stream.start(UIPrompts.NARRATIVE_PLACEHOLDER)
+        await orchestrator.process_turn(..., on_narrative_token=stream.push)
+        delivered = await stream.finish(final_message)
+    """
+
+    def __init__(self, message: Message, edit_interval: float = 1.0):
+        """
+        Initialize stream.
+
+        Args:
+            message: User message to reply to
+            edit_interval: Min seconds between edits
+        """
+        self.message = message
+        self.edit_interval = edit_interval
+        self.placeholder: Optional[Message] = None
+        self.text = ""
+        self.edits = 0
+        self._last_edit_at = 0.0
+        self._last_sent = ""
+
+    async def start(self, placeholder_text: str):
+        """Send placeholder message (failure disables streaming)."""
+        try:
+            self.placeholder = await self.message.answer(placeholder_text)
+            self._last_sent = placeholder_text
+            self._last_edit_at = time.monotonic()
+        except Exception as e:
+            logger.warning(f"Failed to send streaming placeholder: {e}")
+            self.placeholder = None
+
+    async def push(self, token: str):
+        """Append token and edit placeholder if the throttle window passed."""
+        self.text += token
+        if self.placeholder is None:
+            return
+        if time.monotonic() - self._last_edit_at < self.edit_interval:
+            return
+        await self._edit(self.text.strip() + STREAM_CURSOR, parse_mode=None)
+
+    async def finish(self, final_message: str) -> bool:
+        """
+        Replace placeholder with the final message.
+
+        Returns:
+            True if delivered by edit, False if caller should send it normally
+        """
+        if self.placeholder is None or len(final_message) > MAX_MESSAGE_LENGTH:
+            await self.discard()
+            return False
+
+        if await self._edit(final_message, parse_mode="Markdown"):
+            return True
+
+        logger.warning("Markdown edit failed for streamed message, sending as plain text")
+        if await self._edit(final_message, parse_mode=None):
+            return True
+
+        # Caller sends the reply anew; do not leave the partial text behind
+        await self.discard()
+        return False
+
+    async def discard(self):
+        """Delete placeholder (e.g. final message goes out as a new message)."""
+        if self.placeholder is None:
+            return
+        try:
+            await self.placeholder.delete()
+        except Exception as e:
+            logger.debug(f"Failed to delete streaming placeholder: {e}")
+        self.placeholder = None
+
+    async def _edit(self, text: str, parse_mode: Optional[str]) -> bool:
+        """Edit placeholder text; returns False on failure."""
+        text = text[:MAX_MESSAGE_LENGTH]
+        if text == self._last_sent and parse_mode is None:
+            return True
+        try:
+            await self.placeholder.edit_text(text, parse_mode=parse_mode)
+        except Exception as e:
+            logger.warning(f"Failed to edit streamed message: {e}")
+            return False
+        finally:
+            self._last_edit_at = time.monotonic()
+
+        self._last_sent = text
+        self.edits += 1
+        return True
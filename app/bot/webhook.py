@@ -0,0 +1,179 @@
+"""
+Webhook delivery of Telegram updates (alternative to long polling).
+
+Telegram POSTs each update to WEBHOOK_URL + WEBHOOK_PATH; any replica behind
+the load balancer can take it. The request is acknowledged immediately and
+the update is handled in a background task:
+
+- X-Telegram-Bot-Api-Secret-Token is checked against WEBHOOK_SECRET
+- at most WEBHOOK_MAX_CONCURRENCY updates run at once; once
+  WEBHOOK_MAX_PENDING are accepted but unfinished, the replica answers 503
+  and Telegram redelivers later (backpressure instead of unbounded tasks)
+- on shutdown new updates are refused with 503, /healthz turns unhealthy so
+  the load balancer drains the replica, and in-flight updates get
+  WEBHOOK_DRAIN_TIMEOUT seconds to finish
+"""
+import asyncio
+import logging
+from typing import Any, Optional
+
+from aiogram import Bot, Dispatcher
+from aiogram.webhook.aiohttp_server import SimpleRequestHandler, setup_application
+from aiohttp import web
+
+logger = logging.getLogger(__name__)
+
+
+class BoundedRequestHandler(SimpleRequestHandler):
+    """SimpleRequestHandler with a concurrency cap, backpressure and draining."""
+
+    def __init__(
+        self,
+        dispatcher: Dispatcher,
+        bot: Bot,
+        secret_token: Optional[str] = None,
+        max_concurrency: int = 64,
+        max_pending: int = 256,
+        **data: Any,
+    ):
+        """
+        Initialize handler.
+
+        Args:
+            dispatcher: Dispatcher with the bot's routers
+            bot: Bot instance
+            secret_token: Expected X-Telegram-Bot-Api-Secret-Token (None disables the check)
+            max_concurrency: Updates handled at once
+            max_pending: Accepted but unfinished updates before answering 503
+        """
+        super().__init__(
+            dispatcher=dispatcher,
+            bot=bot,
+            handle_in_background=True,
+            secret_token=secret_token,
+            **data,
+        )
+        self.max_pending = max(max_pending, max_concurrency)
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self.closing = False
+        self.rejected = 0
+
+    @property
+    def pending(self) -> int:
+        """Accepted updates not finished yet (running or waiting for a slot)."""
+        return len(self._background_feed_update_tasks)
+
+    async def _background_feed_update(self, bot: Bot, update: dict[str, Any]) -> None:
+        async with self._semaphore:
+            try:
+                await super()._background_feed_update(bot, update)
+            except Exception as e:
+                # Nobody awaits the task: log instead of "exception was never retrieved"
+                logger.error(
+                    f"Error handling update {update.get('update_id')}: {e}", exc_info=True
+                )
+
+    async def _handle_request_background(self, bot: Bot, request: web.Request) -> web.Response:
+        if self.closing or self.pending >= self.max_pending:
+            self.rejected += 1
+            logger.warning(
+                f"Webhook update rejected (closing={self.closing}, pending={self.pending})"
+            )
+            return web.Response(status=503, text="Busy")
+        return await super()._handle_request_background(bot, request)
+
+    async def drain(self, timeout: float):
+        """
+        Stop accepting updates and wait for in-flight ones.
+
+        Updates still running after timeout are cancelled.
+        """
+        self.closing = True
+        tasks = set(self._background_feed_update_tasks)
+        if not tasks:
+            return
+
+        logger.info(f"Draining {len(tasks)} in-flight webhook updates...")
+        _, unfinished = await asyncio.wait(tasks, timeout=timeout)
+        for task in unfinished:
+            task.cancel()
+        if unfinished:
+            await asyncio.gather(*unfinished, return_exceptions=True)
+            logger.warning(f"Cancelled {len(unfinished)} webhook updates after drain timeout")
+
+    async def close(self) -> None:
+        """Bot session is owned and closed by the caller."""
+
+
+class WebhookServer:
+    """aiohttp server receiving Telegram updates."""
+
+    def __init__(
+        self,
+        dispatcher: Dispatcher,
+        bot: Bot,
+        host: str = "0.0.0.0",
+        port: int = 8080,
+        path: str = "/webhook",
+        secret_token: Optional[str] = None,
+        max_concurrency: int = 64,
+        max_pending: int = 256,
+        drain_timeout: float = 30.0,
+    ):
+        self.dispatcher = dispatcher
+        self.bot = bot
+        self.host = host
+        self.port = port
+        self.path = path
+        self.drain_timeout = drain_timeout
+        self.handler = BoundedRequestHandler(
+            dispatcher,
+            bot,
+            secret_token=secret_token,
+            max_concurrency=max_concurrency,
+            max_pending=max_pending,
+        )
+        self._runner: Optional[web.AppRunner] = None
+
+    async def _handle_health(self, request: web.Request) -> web.Response:
+        # Unhealthy while draining so the load balancer stops routing here
+        if self.handler.closing:
+            return web.json_response({"status": "draining"}, status=503)
+        return web.json_response({"status": "ok", "pending": self.handler.pending})
+
+    async def start(self):
+        app = web.Application()
+        self.handler.register(app, path=self.path)
+        # Dispatcher startup/shutdown hooks, as start_polling would emit them
+        setup_application(app, self.dispatcher, bot=self.bot)
+        app.router.add_get("/healthz", self._handle_health)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        logger.info(f"Webhook server listening on http://{self.host}:{self.port}{self.path}")
+
+    async def stop(self):
+        """Drain in-flight updates, then close the listener."""
+        if self._runner is None:
+            return
+        await self.handler.drain(self.drain_timeout)
+        await self._runner.cleanup()
+        self._runner = None
+        logger.info("Webhook server stopped")
+
+
+async def register_webhook(bot: Bot, url: str, secret_token: Optional[str], allowed_updates: list[str]):
+    """
+    Point Telegram at the webhook URL.
+
+    Safe to call from every replica: setWebhook is idempotent. The webhook is
+    not deleted on shutdown, other replicas keep serving it.
+    """
+    await bot.set_webhook(
+        url=url,
+        secret_token=secret_token,
+        allowed_updates=allowed_updates,
+        drop_pending_updates=False,
+    )
+    logger.info(f"Webhook registered: {url}")
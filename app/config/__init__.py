@@ -15,12 +15,58 @@ class Settings(BaseSettings):
     # LLM settings
     site_url: str = Field(default="http://localhost:8000", alias="SITE_URL")
     llm_model: str = Field(default="x-ai/grok-beta-fast", alias="LLM_MODEL")
+    # OpenAI-compatible endpoint for chat and embeddings (e.g. a local stub for benchmarks)
+    openrouter_base_url: str = Field(default="https://openrouter.ai/api/v1", alias="OPENROUTER_BASE_URL")
     
     # Supabase settings (Sprint 3+) - Optional для backwards compatibility
     supabase_url: Optional[str] = Field(default=None, alias="SUPABASE_URL")
     supabase_key: Optional[str] = Field(default=None, alias="SUPABASE_KEY")
     supabase_db_url: Optional[str] = Field(default=None, alias="SUPABASE_DB_URL")
     
+    # LLM admission control (see app/llm/governor.py)
+    llm_max_concurrency: int = Field(default=16, alias="LLM_MAX_CONCURRENCY")
+    # Requests/sec per model, 0 disables; LLM_MODEL_RATE_LIMITS='{"x-ai/grok-4-fast": 5}'
+    llm_rate_limit: float = Field(default=0.0, alias="LLM_RATE_LIMIT")
+    llm_rate_limit_burst: float = Field(default=20.0, alias="LLM_RATE_LIMIT_BURST")
+    llm_model_rate_limits: dict[str, float] = Field(default_factory=dict, alias="LLM_MODEL_RATE_LIMITS")
+    
+    # LLM resilience: timeout, retries (429/5xx), hedging, circuit breaker
+    llm_request_timeout: float = Field(default=60.0, alias="LLM_REQUEST_TIMEOUT")
+    llm_max_retries: int = Field(default=2, alias="LLM_MAX_RETRIES")
+    llm_retry_base_delay: float = Field(default=0.5, alias="LLM_RETRY_BASE_DELAY")
+    llm_retry_max_delay: float = Field(default=8.0, alias="LLM_RETRY_MAX_DELAY")
+    llm_hedge_enabled: bool = Field(default=False, alias="LLM_HEDGE_ENABLED")
+    llm_hedge_percentile: float = Field(default=0.95, alias="LLM_HEDGE_PERCENTILE")
+    llm_hedge_min_samples: int = Field(default=20, alias="LLM_HEDGE_MIN_SAMPLES")
+    llm_breaker_failure_threshold: int = Field(default=5, alias="LLM_BREAKER_FAILURE_THRESHOLD")
+    llm_breaker_reset_timeout: float = Field(default=30.0, alias="LLM_BREAKER_RESET_TIMEOUT")
+    
+    # Per-agent model routing: {"CONFIG_NAME": [{"model": ..., "latency_budget": ...}, ...]}
+    llm_model_routes: dict[str, list[dict]] = Field(default_factory=dict, alias="LLM_MODEL_ROUTES")
+    
+    # Database connection pool
+    db_pool_min_size: int = Field(default=1, alias="DB_POOL_MIN_SIZE")
+    db_pool_max_size: int = Field(default=10, alias="DB_POOL_MAX_SIZE")
+    db_pool_max_inactive_lifetime: float = Field(
+        default=300.0,
+        alias="DB_POOL_MAX_INACTIVE_LIFETIME"
+    )
+    # Set to 0 when connecting through Supabase pooler (pgbouncer transaction mode)
+    db_statement_cache_size: int = Field(default=100, alias="DB_STATEMENT_CACHE_SIZE")
+    
+    # Read-through cache of characters, user settings, world state and active sessions
+    # (0 disables); the TTL bounds staleness if a cross-replica invalidation is missed
+    db_cache_size: int = Field(default=10000, alias="DB_CACHE_SIZE")
+    db_cache_ttl: float = Field(default=300.0, alias="DB_CACHE_TTL")
+    # LISTEN for invalidations from other replicas (migration 005, needs a session-mode connection)
+    db_cache_listen: bool = Field(default=True, alias="DB_CACHE_LISTEN")
+    
+    # Conversation history: messages kept per character, characters buffered in memory,
+    # seconds appends are collected before one batched write to conversation_turns
+    conversation_history_size: int = Field(default=20, alias="CONVERSATION_HISTORY_SIZE")
+    conversation_cache_size: int = Field(default=10000, alias="CONVERSATION_CACHE_SIZE")
+    conversation_flush_interval: float = Field(default=0.5, alias="CONVERSATION_FLUSH_INTERVAL")
+    
     # Embeddings settings (Sprint 3+)
     embedding_model: str = Field(
         default="qwen/qwen3-embedding-4b", 
@@ -31,6 +77,100 @@ class Settings(BaseSettings):
         alias="EMBEDDING_DIMENSION"
     )
     
+    # Embeddings HTTP client (shared, keep-alive)
+    embedding_http2: bool = Field(default=True, alias="EMBEDDING_HTTP2")
+    embedding_connect_timeout: float = Field(default=5.0, alias="EMBEDDING_CONNECT_TIMEOUT")
+    embedding_read_timeout: float = Field(default=30.0, alias="EMBEDDING_READ_TIMEOUT")
+    embedding_max_connections: int = Field(default=20, alias="EMBEDDING_MAX_CONNECTIONS")
+    embedding_max_keepalive_connections: int = Field(
+        default=10,
+        alias="EMBEDDING_MAX_KEEPALIVE_CONNECTIONS"
+    )
+    embedding_keepalive_expiry: float = Field(default=60.0, alias="EMBEDDING_KEEPALIVE_EXPIRY")
+    
+    # Embedding cache: in-memory LRU size + optional SQLite file for persistence
+    embedding_cache_size: int = Field(default=1024, alias="EMBEDDING_CACHE_SIZE")
+    embedding_cache_path: Optional[str] = Field(default=None, alias="EMBEDDING_CACHE_PATH")
+    
+    # Embedding micro-batching: coalesce concurrent embed_text calls (0 ms disables)
+    embedding_batch_max_wait_ms: float = Field(default=5.0, alias="EMBEDDING_BATCH_MAX_WAIT_MS")
+    embedding_batch_max_size: int = Field(default=32, alias="EMBEDDING_BATCH_MAX_SIZE")
+    
+    # Fast-path intent classifier: skip the intent LLM call for obvious actions
+    intent_fast_path_enabled: bool = Field(default=True, alias="INTENT_FAST_PATH_ENABLED")
+    intent_fast_path_threshold: float = Field(default=0.85, alias="INTENT_FAST_PATH_THRESHOLD")
+    
+    # Intent analysis cache (LLM results reused for repeated actions, 0 size disables)
+    intent_cache_size: int = Field(default=512, alias="INTENT_CACHE_SIZE")
+    intent_cache_ttl: float = Field(default=600.0, alias="INTENT_CACHE_TTL")
+    
+    # Per-turn latency budget in seconds (0 disables); stages degrade when it runs out
+    turn_deadline: float = Field(default=25.0, alias="TURN_DEADLINE")
+    turn_memory_timeout: float = Field(default=3.0, alias="TURN_MEMORY_TIMEOUT")
+    turn_intent_timeout: float = Field(default=5.0, alias="TURN_INTENT_TIMEOUT")
+    turn_combat_state_timeout: float = Field(default=8.0, alias="TURN_COMBAT_STATE_TIMEOUT")
+    
+    # Per-user turn serialization: "coalesce" merges messages sent during a turn into the next one,
+    # "cancel" restarts the in-flight turn merged with them, "off" runs every message concurrently
+    turn_mailbox_policy: str = Field(default="coalesce", alias="TURN_MAILBOX_POLICY")
+    turn_mailbox_max_batch: int = Field(default=5, alias="TURN_MAILBOX_MAX_BATCH")
+    
+    # Retries of a turn commit that lost a world state version race (merged and rewritten)
+    world_state_commit_retries: int = Field(default=2, alias="WORLD_STATE_COMMIT_RETRIES")
+    
+    # Narrative + combat state in one LLM call instead of two (A/B per deployment)
+    narrative_single_call: bool = Field(default=False, alias="NARRATIVE_SINGLE_CALL")
+    
+    # Stream narrative to Telegram by editing a placeholder message
+    telegram_stream_narrative: bool = Field(default=True, alias="TELEGRAM_STREAM_NARRATIVE")
+    # Min seconds between edits of one message (Telegram rate limits)
+    telegram_stream_edit_interval: float = Field(default=1.0, alias="TELEGRAM_STREAM_EDIT_INTERVAL")
+    
+    # Background episodic memory writes (off the reply critical path)
+    memory_queue_enabled: bool = Field(default=True, alias="MEMORY_QUEUE_ENABLED")
+    memory_queue_max_size: int = Field(default=1000, alias="MEMORY_QUEUE_MAX_SIZE")
+    memory_queue_workers: int = Field(default=2, alias="MEMORY_QUEUE_WORKERS")
+    memory_queue_batch_size: int = Field(default=16, alias="MEMORY_QUEUE_BATCH_SIZE")
+    memory_queue_max_retries: int = Field(default=3, alias="MEMORY_QUEUE_MAX_RETRIES")
+    memory_queue_retry_delay: float = Field(default=0.5, alias="MEMORY_QUEUE_RETRY_DELAY")
+    memory_queue_drain_timeout: float = Field(default=10.0, alias="MEMORY_QUEUE_DRAIN_TIMEOUT")
+    
+    # Per-turn tracing: one JSON log line per turn (app.trace logger), optional OpenTelemetry export
+    trace_enabled: bool = Field(default=True, alias="TRACE_ENABLED")
+    # Only log traces of turns slower than this (0 logs every turn)
+    trace_log_min_duration_ms: float = Field(default=0.0, alias="TRACE_LOG_MIN_DURATION_MS")
+    # Requires opentelemetry-sdk with a configured TracerProvider
+    trace_otel_enabled: bool = Field(default=False, alias="TRACE_OTEL_ENABLED")
+    
+    # Embedded Prometheus metrics endpoint (GET /metrics)
+    metrics_enabled: bool = Field(default=False, alias="METRICS_ENABLED")
+    metrics_host: str = Field(default="0.0.0.0", alias="METRICS_HOST")
+    metrics_port: int = Field(default=9100, alias="METRICS_PORT")
+    
+    # Update delivery: "polling" (single instance) or "webhook" (replicas behind a load balancer)
+    bot_mode: str = Field(default="polling", alias="BOT_MODE")
+    # Public HTTPS base URL Telegram posts to (WEBHOOK_URL + WEBHOOK_PATH)
+    webhook_url: Optional[str] = Field(default=None, alias="WEBHOOK_URL")
+    webhook_path: str = Field(default="/webhook", alias="WEBHOOK_PATH")
+    webhook_host: str = Field(default="0.0.0.0", alias="WEBHOOK_HOST")
+    webhook_port: int = Field(default=8080, alias="WEBHOOK_PORT")
+    # Checked against X-Telegram-Bot-Api-Secret-Token (A-Z, a-z, 0-9, _ and -)
+    webhook_secret: Optional[str] = Field(default=None, alias="WEBHOOK_SECRET")
+    # Call setWebhook on startup (disable if the URL is registered out of band)
+    webhook_register: bool = Field(default=True, alias="WEBHOOK_REGISTER")
+    # Updates handled at once; beyond WEBHOOK_MAX_PENDING the replica answers 503 and Telegram redelivers
+    webhook_max_concurrency: int = Field(default=64, alias="WEBHOOK_MAX_CONCURRENCY")
+    webhook_max_pending: int = Field(default=256, alias="WEBHOOK_MAX_PENDING")
+    # Seconds to let in-flight updates finish on shutdown
+    webhook_drain_timeout: float = Field(default=30.0, alias="WEBHOOK_DRAIN_TIMEOUT")
+    
+    # FSM storage: "memory", "postgres" (fsm_state table) or "redis" (FSM_REDIS_URL)
+    fsm_storage: str = Field(default="memory", alias="FSM_STORAGE")
+    fsm_redis_url: Optional[str] = Field(default=None, alias="FSM_REDIS_URL")
+    # Write-through cache of persistent backends; keep the TTL short when replicas share users
+    fsm_cache_size: int = Field(default=10000, alias="FSM_CACHE_SIZE")
+    fsm_cache_ttl: float = Field(default=5.0, alias="FSM_CACHE_TTL")
+    
     class Config:
         env_file = ".env"
         case_sensitive = False
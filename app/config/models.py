@@ -1,7 +1,20 @@
 """Model configuration for all agents."""
 
-from typing import Literal
+import logging
+from typing import Literal, Optional
 from pydantic import BaseModel, Field
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class ModelCandidate(BaseModel):
+    """Model option for routing (see ModelConfig.candidates)."""
+    
+    model: str = Field(..., description="Model identifier")
+    latency_budget: Optional[float] = Field(default=None, gt=0, description="Target median latency (s); slower models are deprioritized")
+    timeout: Optional[float] = Field(default=None, gt=0, description="Per-attempt timeout (s) before failing over to the next candidate")
+    cost_per_1k_tokens: Optional[float] = Field(default=None, ge=0, description="Price in USD per 1k tokens")
 
 
 class ModelConfig(BaseModel):
@@ -14,6 +27,34 @@ class ModelConfig(BaseModel):
     frequency_penalty: float = Field(default=0.0, ge=-2.0, le=2.0, description="Frequency penalty")
     presence_penalty: float = Field(default=0.0, ge=-2.0, le=2.0, description="Presence penalty")
     response_format: Literal["text", "json"] = Field(default="text", description="Response format")
+    candidates: list[ModelCandidate] = Field(default_factory=list, description="Ordered routing candidates (empty = only `model`)")
+    max_cost_per_1k_tokens: Optional[float] = Field(default=None, ge=0, description="Skip candidates priced above this")
+    
+    def candidate_models(self) -> list[ModelCandidate]:
+        """
+        Ordered candidates for routing (falls back to `model` alone).
+        
+        Candidates priced above max_cost_per_1k_tokens are left out; if
+        every priced candidate is over budget, the cheapest one is kept.
+        """
+        if not self.candidates:
+            return [ModelCandidate(model=self.model)]
+        if self.max_cost_per_1k_tokens is None:
+            return list(self.candidates)
+        
+        affordable = [
+            candidate for candidate in self.candidates
+            if candidate.cost_per_1k_tokens is None
+            or candidate.cost_per_1k_tokens <= self.max_cost_per_1k_tokens
+        ]
+        if affordable:
+            return affordable
+        cheapest = min(self.candidates, key=lambda candidate: candidate.cost_per_1k_tokens)
+        logger.warning(
+            f"All candidates exceed the cost budget of {self.max_cost_per_1k_tokens}/1k tokens, "
+            f"using the cheapest: {cheapest.model}"
+        )
+        return [cheapest]
 
 
 class AgentModelConfigs:
@@ -35,6 +76,14 @@ class AgentModelConfigs:
         response_format="json"  # For structured JSON output
     )
     
+    # Narrative Director Combat State: Structured output, low temperature
+    NARRATIVE_COMBAT_STATE = ModelConfig(
+        model="x-ai/grok-4-fast",
+        temperature=0.3,
+        max_tokens=250,
+        response_format="json"
+    )
+    
     # Narrative Director: Creative, high quality
     NARRATIVE_DIRECTOR = ModelConfig(
         model="x-ai/grok-4-fast",  # Quality model for narrative
@@ -70,5 +119,20 @@ class AgentModelConfigs:
     )
 
 
+def apply_model_routes(configs: AgentModelConfigs, routes: dict[str, list[dict]]):
+    """
+    Override candidates from settings (LLM_MODEL_ROUTES), e.g.
+    {"RULES_ARBITER_INTENT": [{"model": "mistralai/mistral-nemo", "latency_budget": 1.0},
+                              {"model": "x-ai/grok-4-fast"}]}
+    """
+    for name, candidates in routes.items():
+        config = getattr(configs, name, None)
+        if not isinstance(config, ModelConfig):
+            logger.warning(f"Unknown model config in LLM_MODEL_ROUTES: {name}")
+            continue
+        config.candidates = [ModelCandidate(**candidate) for candidate in candidates]
+
+
 # Export for convenience
 AGENT_CONFIGS = AgentModelConfigs()
+apply_model_routes(AGENT_CONFIGS, settings.llm_model_routes)
@@ -120,6 +120,23 @@ COMBAT_STATE: {"in_combat": false, "enemies": [], "combat_ended": true, "enemy_a
 - НЕ забывай закрывающие скобки
 - Используй double quotes ("), НЕ single quotes (')
 - После COMBAT_STATE: сразу идёт JSON, без переносов строки внутри"""
+    
+    # Single-call mode (NARRATIVE_SINGLE_CALL): narrative + combat state in one JSON
+    SINGLE_CALL_USER = BasePromptTemplate("""Действие игрока: "{user_action}"
+
+Результат механики: {mechanics_context}
+{hints_text}
+{combat_context}
+
+Сделай две вещи в ОДНОМ ответе:
+1. Определи состояние боя после действия игрока по правилам ниже.
+2. Опиши действие ярко и захватывающе (2-4 предложения). Если враги контратакуют (enemy_attacks не пуст) — ОПИШИ контратаку в нарративе (1-2 предложения).
+
+ПРАВИЛА СОСТОЯНИЯ БОЯ:
+{combat_rules}
+
+Верни ТОЛЬКО JSON такого вида, без комментариев:
+{{"narrative": "текст описания", "combat_state": {{"in_combat": true, "enemies": ["враг"], "combat_ended": false, "enemy_attacks": [{{"attacker": "враг", "damage": 8}}]}}}}""")
 
 
 class ResponseSynthesizerPrompts:
@@ -212,6 +229,10 @@ class UIPrompts:
     ERROR_GENERIC = "❌ Произошла ошибка. Попробуй ещё раз или используй /start для перезапуска."
     ERROR_NO_CHARACTER = "❌ У тебя ещё нет персонажа. Используй /start чтобы создать его."
     ERROR_LLM_TIMEOUT = "⏱️ Ответ занимает слишком много времени. Попробуй переформулировать действие."
+    ERROR_TURN_NOT_SAVED = "⚠️ Не удалось сохранить ход, мир остался прежним. Попробуй ещё раз."
+    
+    # Placeholder shown while the narrative is streaming
+    NARRATIVE_PLACEHOLDER = "🎲 Мастер обдумывает ход..."
 
     # Full reset flow (complete purge of previous character history)
     FULL_RESET_WARNING = (
@@ -86,6 +86,21 @@ COMBAT_STATE_SCHEMA = {
 }
 
 
+
+# Narrative Director single-call mode: narrative + combat state together
+NARRATIVE_TURN_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "narrative": {
+            "type": "string",
+            "description": "Vivid description of the action in Russian (2-4 sentences)"
+        },
+        "combat_state": COMBAT_STATE_SCHEMA
+    },
+    "required": ["narrative", "combat_state"],
+    "additionalProperties": False
+}
+
 # World State Update Schema (Sprint 3)
 WORLD_STATE_SCHEMA = {
     "type": "object",
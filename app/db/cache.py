@@ -0,0 +1,269 @@
+"""
+Read-through cache for the rows every turn reads.
+
+Characters and user settings (by telegram_user_id), world state with its
+version and the active session id (by character_id) change rarely compared
+to how often they are read. Each replica keeps them in bounded LRU caches:
+
+- reads go through the cache (get_or_load)
+- local writes update it once the DB write succeeded (write-through)
+- writes by other replicas are announced by triggers (migration 005) on the
+  rpgate_cache channel; CacheInvalidationListener drops those entries
+- a TTL bounds staleness if a notification is missed
+
+Values are copied on the way in and out, so callers may mutate what they get.
+"""
+import asyncio
+import copy
+import json
+import logging
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Generic, Hashable, Optional, TypeVar
+from uuid import UUID
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+V = TypeVar("V")
+
+INVALIDATION_CHANNEL = "rpgate_cache"
+
+# application_name of this replica's connections: the listener skips
+# notifications about its own writes, the cache already has them
+REPLICA_NAME = f"rpgate-{uuid.uuid4().hex[:12]}"
+
+
+class EntityCache(Generic[V]):
+    """
+    Bounded LRU cache with TTL.
+
+    Usage:
+        character = await character_cache.get_or_load(telegram_user_id, load)
+        character_cache.set(telegram_user_id, character)  # after a write
+    """
+
+    def __init__(self, name: str, max_size: int = 10000, ttl: float = 300.0):
+        """
+        Initialize cache.
+
+        Args:
+            name: Cache name (table it mirrors, used in notifications and metrics)
+            max_size: Max entries (0 disables caching)
+            ttl: Seconds an entry is served (0 disables caching)
+        """
+        self.name = name
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: "OrderedDict[Hashable, tuple[float, V]]" = OrderedDict()
+        # Bumped on every invalidation; loads that raced one are not cached
+        self.epoch = 0
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_size > 0 and self.ttl > 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable) -> Optional[V]:
+        """Return a copy of the cached value, or None on miss."""
+        entry = self._entries.get(key)
+        if entry is None or time.monotonic() - entry[0] >= self.ttl:
+            self._entries.pop(key, None)
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return copy.deepcopy(entry[1])
+
+    def set(self, key: Hashable, value: V, epoch: Optional[int] = None):
+        """
+        Store value, evicting least recently used entries.
+
+        Args:
+            key: Cache key
+            value: Value to store (copied)
+            epoch: Epoch read before loading value; skipped if an
+                invalidation happened since (value may be stale)
+        """
+        if not self.enabled or (epoch is not None and epoch != self.epoch):
+            return
+        self._entries[key] = (time.monotonic(), copy.deepcopy(value))
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, key: Hashable):
+        """Drop key."""
+        self.epoch += 1
+        self._entries.pop(key, None)
+
+    def invalidate_where(self, predicate: Callable[[V], bool]):
+        """Drop every entry whose value matches predicate."""
+        self.epoch += 1
+        for key in [key for key, (_, value) in self._entries.items() if predicate(value)]:
+            del self._entries[key]
+
+    def clear(self):
+        """Drop all entries."""
+        self.epoch += 1
+        self._entries.clear()
+
+    async def get_or_load(
+        self,
+        key: Hashable,
+        load: Callable[[], Awaitable[Optional[V]]],
+    ) -> Optional[V]:
+        """
+        Return cached value or load, cache and return it.
+
+        None results (not found, errors) are not cached.
+        """
+        value = self.get(key)
+        if value is not None:
+            return value
+        epoch = self.epoch
+        value = await load()
+        if value is not None:
+            self.set(key, value, epoch=epoch)
+        return value
+
+    def stats(self) -> dict[str, int]:
+        """Hit/miss counters and current size."""
+        return {"hits": self.hits, "misses": self.misses, "size": len(self._entries)}
+
+
+def _cache(name: str) -> EntityCache:
+    return EntityCache(name, max_size=settings.db_cache_size, ttl=settings.db_cache_ttl)
+
+
+# Global instances, named after the table whose notifications invalidate them
+character_cache: EntityCache = _cache("characters")  # telegram_user_id -> CharacterSheet
+user_settings_cache: EntityCache = _cache("user_settings")  # telegram_user_id -> dict
+world_state_cache: EntityCache = _cache("world_state")  # character_id -> (state, version)
+session_cache: EntityCache = _cache("game_sessions")  # character_id -> active session id
+
+# Notification key column type per table (see migration 005)
+_CACHES: dict[str, tuple[Any, Callable[[str], Hashable]]] = {
+    "characters": (character_cache, int),
+    "user_settings": (user_settings_cache, int),
+    "world_state": (world_state_cache, UUID),
+    "game_sessions": (session_cache, UUID),
+}
+
+
+def register_cache(table: str, cache: Any, key_type: Callable[[str], Hashable]):
+    """
+    Invalidate another cache from notifications about table.
+
+    cache needs invalidate(key), clear() and stats() like EntityCache.
+    """
+    _CACHES[table] = (cache, key_type)
+
+
+def clear_caches():
+    """Drop every cached row."""
+    for cache, _ in _CACHES.values():
+        cache.clear()
+
+
+def cache_stats() -> dict[str, dict[str, int]]:
+    """Stats of every cache by name."""
+    return {name: cache.stats() for name, (cache, _) in _CACHES.items()}
+
+
+def invalidate_character(character_id: UUID):
+    """Drop a character and the rows cached under its id (e.g. after deletion)."""
+    character_cache.invalidate_where(lambda character: character.id == character_id)
+    world_state_cache.invalidate(character_id)
+    session_cache.invalidate(character_id)
+
+
+class CacheInvalidationListener:
+    """
+    Applies invalidations announced by other replicas.
+
+    Holds one dedicated connection that LISTENs on the invalidation channel
+    (LISTEN needs a session, not the transaction pooler) and reconnects if it
+    drops. Everything cached is cleared whenever the subscription (re)starts,
+    since notifications sent while it was down are lost.
+    """
+
+    def __init__(self, channel: str = INVALIDATION_CHANNEL, reconnect_delay: float = 5.0):
+        """
+        Initialize listener.
+
+        Args:
+            channel: Notification channel
+            reconnect_delay: Seconds between reconnect attempts
+        """
+        self.channel = channel
+        self.reconnect_delay = reconnect_delay
+        self.received = 0
+        self._task: Optional[asyncio.Task] = None
+
+    def handle(self, payload: str):
+        """Apply one notification payload ({"table", "key", "origin"})."""
+        try:
+            message: dict[str, Any] = json.loads(payload)
+            if message.get("origin") == REPLICA_NAME:
+                return
+            cache, key_type = _CACHES[message["table"]]
+            cache.invalidate(key_type(message["key"]))
+            self.received += 1
+        except Exception as e:
+            logger.warning(f"Ignoring cache invalidation {payload!r}: {e}")
+
+    async def start(self):
+        """Start listening in the background."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop listening."""
+        if self._task is None:
+            return
+        task, self._task = self._task, None
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+
+    async def _run(self):
+        import asyncpg
+
+        while True:
+            conn = None
+            try:
+                conn = await asyncpg.connect(
+                    settings.supabase_db_url,
+                    server_settings={"application_name": f"{REPLICA_NAME}-listener"},
+                )
+                lost = asyncio.Event()
+                conn.add_termination_listener(lambda _conn: lost.set())
+                await conn.add_listener(
+                    self.channel, lambda _conn, _pid, _channel, payload: self.handle(payload)
+                )
+                clear_caches()
+                logger.info(f"Listening for cache invalidations on {self.channel}")
+                await lost.wait()
+                logger.warning("Cache invalidation listener disconnected")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Cache invalidation listener failed: {e}")
+            finally:
+                if conn is not None and not conn.is_closed():
+                    await conn.close()
+            clear_caches()
+            await asyncio.sleep(self.reconnect_delay)
+
+
+# Global instance
+cache_listener = CacheInvalidationListener()
@@ -0,0 +1,106 @@
+"""Append-only storage for conversation history (conversation_turns table)."""
+import logging
+from typing import List, Optional
+from uuid import UUID
+
+from app.db.models import ConversationTurnDB
+from app.db.supabase import db_connection
+
+logger = logging.getLogger(__name__)
+
+
+async def append_conversation_turns(turns: List[ConversationTurnDB]) -> int:
+    """
+    Insert several messages in one statement.
+
+    Messages of characters that are not in the database (FSM fallback) are
+    skipped instead of failing the whole batch. Errors are raised so the
+    caller can retry.
+
+    Args:
+        turns: Messages to append
+
+    Returns:
+        Number of rows inserted
+    """
+    if not turns:
+        return 0
+
+    async with db_connection() as conn:
+        rows = await conn.fetchval(
+            """
+            WITH inserted AS (
+                INSERT INTO conversation_turns (character_id, role, content, created_at)
+                SELECT t.character_id, t.role, t.content, t.created_at
+                FROM unnest($1::uuid[], $2::text[], $3::text[], $4::timestamptz[])
+                    AS t(character_id, role, content, created_at)
+                WHERE EXISTS (SELECT 1 FROM characters c WHERE c.id = t.character_id)
+                RETURNING 1
+            )
+            SELECT count(*) FROM inserted
+            """,
+            [turn.character_id for turn in turns],
+            [turn.role for turn in turns],
+            [turn.content for turn in turns],
+            [turn.created_at for turn in turns],
+        )
+
+    logger.debug(f"Appended {rows} conversation messages")
+    return rows
+
+
+async def get_recent_conversation_turns(
+    character_id: UUID,
+    limit: int = 20
+) -> Optional[List[ConversationTurnDB]]:
+    """
+    Load the latest messages of a character.
+
+    Args:
+        character_id: Character UUID
+        limit: Max messages
+
+    Returns:
+        Messages oldest first, or None if the query failed
+    """
+    async with db_connection() as conn:
+        try:
+            rows = await conn.fetch(
+                """
+                SELECT character_id, role, content, created_at
+                FROM conversation_turns
+                WHERE character_id = $1
+                ORDER BY created_at DESC, id DESC
+                LIMIT $2
+                """,
+                character_id,
+                limit,
+            )
+            return [ConversationTurnDB(**dict(row)) for row in reversed(rows)]
+
+        except Exception as e:
+            logger.error(f"Error loading conversation history: {e}", exc_info=True)
+            return None
+
+
+async def delete_conversation_turns(character_id: UUID) -> bool:
+    """
+    Delete the whole conversation of a character (new adventure).
+
+    Args:
+        character_id: Character UUID
+
+    Returns:
+        True if successful, False otherwise
+    """
+    async with db_connection() as conn:
+        try:
+            await conn.execute(
+                "DELETE FROM conversation_turns WHERE character_id = $1",
+                character_id,
+            )
+            return True
+
+        except Exception as e:
+            logger.error(f"Error deleting conversation history: {e}", exc_info=True)
+            return False
@@ -0,0 +1,17 @@
+-- Persistent FSM storage (FSM_STORAGE=postgres)
+-- One row per aiogram storage key; shared by all bot replicas and kept across restarts
+
+CREATE TABLE IF NOT EXISTS fsm_state (
+    storage_key TEXT PRIMARY KEY,
+    state TEXT,
+    -- Compact encoding from app/bot/storage.py (minified JSON, zlib when large)
+    data BYTEA,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
+-- Reuse existing timestamp update trigger function
+CREATE TRIGGER update_fsm_state_updated_at
+    BEFORE UPDATE ON fsm_state
+    FOR EACH ROW
+    EXECUTE FUNCTION update_updated_at_column();
@@ -0,0 +1,45 @@
+-- Cross-replica cache invalidation (app/db/cache.py)
+-- Every change to a cached row is announced on the rpgate_cache channel.
+-- Payload: {"table": ..., "key": <cache key column>, "origin": <application_name>}
+-- Replicas skip notifications about their own writes by origin.
+
+CREATE OR REPLACE FUNCTION notify_cache_invalidation()
+RETURNS TRIGGER AS $$
+DECLARE
+    changed RECORD;
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        changed := OLD;
+    ELSE
+        changed := NEW;
+    END IF;
+
+    PERFORM pg_notify('rpgate_cache', json_build_object(
+        'table', TG_TABLE_NAME,
+        'key', to_jsonb(changed) ->> TG_ARGV[0],
+        'origin', current_setting('application_name', true)
+    )::text);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER characters_cache_invalidation
+    AFTER INSERT OR UPDATE OR DELETE ON characters
+    FOR EACH ROW
+    EXECUTE FUNCTION notify_cache_invalidation('telegram_user_id');
+
+CREATE TRIGGER user_settings_cache_invalidation
+    AFTER INSERT OR UPDATE OR DELETE ON user_settings
+    FOR EACH ROW
+    EXECUTE FUNCTION notify_cache_invalidation('telegram_user_id');
+
+CREATE TRIGGER world_state_cache_invalidation
+    AFTER INSERT OR UPDATE OR DELETE ON world_state
+    FOR EACH ROW
+    EXECUTE FUNCTION notify_cache_invalidation('character_id');
+
+-- Only session start/end matter (turn stats updates are not cached)
+CREATE TRIGGER game_sessions_cache_invalidation
+    AFTER INSERT OR UPDATE OF ended_at OR DELETE ON game_sessions
+    FOR EACH ROW
+    EXECUTE FUNCTION notify_cache_invalidation('character_id');
@@ -0,0 +1,19 @@
+-- Conversation history (app/memory/conversation.py)
+-- Append-only; the bot reads the latest messages of a character through a ring buffer
+
+CREATE TABLE IF NOT EXISTS conversation_turns (
+    id BIGSERIAL PRIMARY KEY,
+    character_id UUID NOT NULL REFERENCES characters(id) ON DELETE CASCADE,
+    role TEXT NOT NULL CHECK (role IN ('user', 'assistant')),
+    content TEXT NOT NULL,
+    created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_conversation_turns_character_created
+    ON conversation_turns (character_id, created_at);
+
+-- Appends by other replicas drop this replica's buffer (migration 005)
+CREATE TRIGGER conversation_turns_cache_invalidation
+    AFTER INSERT OR DELETE ON conversation_turns
+    FOR EACH ROW
+    EXECUTE FUNCTION notify_cache_invalidation('character_id');
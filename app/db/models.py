@@ -4,6 +4,8 @@ from typing import Optional, List
 from uuid import UUID
 from datetime import datetime
 
+from app.game.character import CharacterSheet
+
 
 class CharacterDB(BaseModel):
     """Character model для database."""
@@ -42,6 +44,25 @@ class EpisodicMemoryDB(BaseModel):
     created_at: datetime
 
 
+class EpisodicMemoryCreate(BaseModel):
+    """Pending episodic memory write (embedding generated on insert)."""
+    character_id: UUID
+    session_id: Optional[UUID] = None
+    content: str
+    memory_type: str = "event"
+    importance_score: int = Field(default=5, ge=0, le=10)
+    entities: List[str] = Field(default_factory=list)
+    location: Optional[str] = None
+
+
+class ConversationTurnDB(BaseModel):
+    """One message of the conversation (conversation_turns row)."""
+    character_id: UUID
+    role: str  # "user" or "assistant"
+    content: str
+    created_at: datetime
+
+
 class SemanticMemoryDB(BaseModel):
     """Semantic memory (world lore) model."""
     id: UUID
@@ -69,3 +90,12 @@ class UserSettingsDB(BaseModel):
     combat_enabled: bool = True
     created_at: datetime
     updated_at: datetime
+
+
+class TurnContext(BaseModel):
+    """Everything handle_conversation needs before running the agents."""
+    character: CharacterSheet
+    session_id: UUID
+    user_settings: dict  # {"telegram_user_id": int, "combat_enabled": bool}
+    game_state: dict
+    world_state_version: int = 0  # 0 = no world_state row yet
@@ -1,10 +1,15 @@
 """Supabase client for database operations."""
-from typing import Optional
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Optional
 import logging
 import asyncpg
+from app.observability.tracing import DB, current_trace, span
 
 logger = logging.getLogger(__name__)
 
+# Process-wide connection pool (created at bot startup via init_db_pool)
+_pool: Optional[asyncpg.Pool] = None
+
 
 async def get_db_connection() -> asyncpg.Connection:
     """
@@ -19,18 +24,157 @@ async def get_db_connection() -> asyncpg.Connection:
         Exception: If connection fails
     """
     from app.config import settings
+    from app.db.cache import REPLICA_NAME
     
     if not settings.supabase_db_url:
         raise ValueError("SUPABASE_DB_URL not configured in .env")
     
     try:
-        conn = await asyncpg.connect(settings.supabase_db_url)
+        conn = await asyncpg.connect(
+            settings.supabase_db_url,
+            statement_cache_size=settings.db_statement_cache_size,
+            server_settings={"application_name": REPLICA_NAME},
+        )
         return conn
     except Exception as e:
         logger.error(f"Failed to connect to database: {e}")
         raise
 
 
+async def init_db_pool() -> Optional[asyncpg.Pool]:
+    """
+    Create the shared asyncpg connection pool.
+    
+    Called once at bot startup. Safe to call repeatedly - returns the
+    existing pool if already initialized.
+    
+    Returns:
+        asyncpg.Pool instance, or None if SUPABASE_DB_URL is not configured
+    """
+    global _pool
+    from app.config import settings
+    from app.db.cache import REPLICA_NAME
+    
+    if _pool is not None:
+        return _pool
+    
+    if not settings.supabase_db_url:
+        logger.warning("SUPABASE_DB_URL not configured - database pool disabled")
+        return None
+    
+    _pool = await asyncpg.create_pool(
+        settings.supabase_db_url,
+        min_size=settings.db_pool_min_size,
+        max_size=settings.db_pool_max_size,
+        max_inactive_connection_lifetime=settings.db_pool_max_inactive_lifetime,
+        statement_cache_size=settings.db_statement_cache_size,
+        # Lets cache invalidation triggers tag this replica's writes
+        server_settings={"application_name": REPLICA_NAME},
+    )
+    logger.info(
+        f"Database pool initialized (min={settings.db_pool_min_size}, "
+        f"max={settings.db_pool_max_size})"
+    )
+    return _pool
+
+
+async def close_db_pool() -> None:
+    """Close the shared connection pool (called on bot shutdown)."""
+    global _pool
+    
+    if _pool is None:
+        return
+    
+    pool, _pool = _pool, None
+    await pool.close()
+    logger.info("Database pool closed")
+
+
+def get_db_pool() -> Optional[asyncpg.Pool]:
+    """Return the shared pool, or None if it was not initialized."""
+    return _pool
+
+
+def _statement_label(query: str) -> str:
+    """Short single-line form of a query for span attributes."""
+    return " ".join(query.split())[:120]
+
+
+class TracedConnection:
+    """
+    asyncpg connection proxy recording a span per query.
+    
+    Query methods are timed; everything else (transaction(), etc.)
+    is forwarded to the wrapped connection unchanged.
+    """
+    
+    def __init__(self, conn: asyncpg.Connection):
+        self._conn = conn
+    
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._conn, name)
+    
+    async def execute(self, query: str, *args, **kwargs):
+        with span("db.execute", kind=DB, statement=_statement_label(query)):
+            return await self._conn.execute(query, *args, **kwargs)
+    
+    async def executemany(self, command: str, args, **kwargs):
+        with span("db.executemany", kind=DB, statement=_statement_label(command)):
+            return await self._conn.executemany(command, args, **kwargs)
+    
+    async def fetch(self, query: str, *args, **kwargs):
+        with span("db.fetch", kind=DB, statement=_statement_label(query)) as db_span:
+            rows = await self._conn.fetch(query, *args, **kwargs)
+            db_span.set(rows=len(rows))
+            return rows
+    
+    async def fetchrow(self, query: str, *args, **kwargs):
+        with span("db.fetchrow", kind=DB, statement=_statement_label(query)):
+            return await self._conn.fetchrow(query, *args, **kwargs)
+    
+    async def fetchval(self, query: str, *args, **kwargs):
+        with span("db.fetchval", kind=DB, statement=_statement_label(query)):
+            return await self._conn.fetchval(query, *args, **kwargs)
+
+
+def _maybe_traced(conn: asyncpg.Connection):
+    """Wrap conn in TracedConnection only while a turn is being traced."""
+    if current_trace.get() is None:
+        return conn
+    return TracedConnection(conn)
+
+
+@asynccontextmanager
+async def db_connection() -> AsyncIterator[asyncpg.Connection]:
+    """
+    Acquire a database connection for the duration of an ``async with`` block.
+    
+    Uses the shared pool when it is initialized; otherwise falls back to a
+    one-off connection (scripts, tests) that is closed on exit. Inside a
+    trace, queries are recorded as spans (see TracedConnection).
+    
+    Usage:
+        async with db_connection() as conn:
+            row = await conn.fetchrow("SELECT 1")
+    """
+    if _pool is not None:
+        with span("db.acquire", kind=DB):
+            conn_ctx = _pool.acquire()
+            conn = await conn_ctx.__aenter__()
+        try:
+            yield _maybe_traced(conn)
+        finally:
+            await conn_ctx.__aexit__(None, None, None)
+        return
+    
+    with span("db.connect", kind=DB):
+        conn = await get_db_connection()
+    try:
+        yield _maybe_traced(conn)
+    finally:
+        await conn.close()
+
+
 class SupabaseClient:
     """Wrapper для Supabase client."""
     
@@ -0,0 +1,318 @@
+"""Unit of work for end-of-turn persistence.
+
+Collects the writes a turn produces (world state, character, session stats,
+episodic memories) and commits them as a single statement: one round trip,
+all-or-nothing.
+
+World state saves can be compare-and-swap against the version the turn read.
+If another writer got there first, nothing is applied and the commit reports
+a conflict (see AgentOrchestrator.commit_turn for the retry).
+"""
+import logging
+import json
+from datetime import datetime
+from typing import Any, List, Optional
+from uuid import UUID
+
+from app.game.character import CharacterSheet
+from app.db.cache import character_cache, world_state_cache
+from app.db.characters import character_sheet_json
+from app.db.models import EpisodicMemoryCreate
+from app.db.supabase import db_connection
+
+logger = logging.getLogger(__name__)
+
+
+class TurnCommit:
+    """
+    Unit of work for one turn.
+
+    Usage:
+        turn_commit = TurnCommit()
+        turn_commit.save_world_state(character_id, state)
+        turn_commit.update_character(character)
+        turn_commit.update_session_stats(session_id, turns_increment=1)
+        await turn_commit.commit()
+
+    Each write is a data-modifying CTE of one statement, so Postgres applies
+    them atomically in a single round trip.
+    """
+
+    def __init__(self):
+        self._world_state: Optional[tuple[UUID, dict, Optional[int]]] = None
+        self._character: Optional[CharacterSheet] = None
+        self._session_stats: Optional[dict[str, Any]] = None
+        self._memories: List[dict[str, Any]] = []
+        # Handed to the background writer only after the turn commits
+        self.queued_memories: List[EpisodicMemoryCreate] = []
+        self.committed = False
+        self.conflict = False
+        self.world_state_version: Optional[int] = None
+
+    def save_world_state(
+        self,
+        character_id: UUID,
+        state_data: dict,
+        expected_version: Optional[int] = None
+    ):
+        """
+        Stage world state write (last call wins).
+
+        Args:
+            character_id: Character UUID
+            state_data: Game state dict to save
+            expected_version: Version the state was loaded at (0 = no row yet).
+                The write and every other staged write only apply if the row
+                is still at this version. None upserts unconditionally.
+        """
+        self._world_state = (character_id, dict(state_data), expected_version)
+
+    @property
+    def world_state(self) -> Optional[dict]:
+        """Staged world state, if any."""
+        return self._world_state[1] if self._world_state is not None else None
+
+    def update_character(self, character: CharacterSheet):
+        """Stage character update (last call wins)."""
+        self._character = character
+
+    def update_session_stats(
+        self,
+        session_id: UUID,
+        turns_increment: int = 0,
+        damage_dealt_increment: int = 0,
+        damage_taken_increment: int = 0
+    ):
+        """Stage incremental session stats update (increments accumulate)."""
+        if self._session_stats and self._session_stats["session_id"] == session_id:
+            self._session_stats["turns_increment"] += turns_increment
+            self._session_stats["damage_dealt_increment"] += damage_dealt_increment
+            self._session_stats["damage_taken_increment"] += damage_taken_increment
+            return
+
+        self._session_stats = {
+            "session_id": session_id,
+            "turns_increment": turns_increment,
+            "damage_dealt_increment": damage_dealt_increment,
+            "damage_taken_increment": damage_taken_increment,
+        }
+
+    def add_memory(
+        self,
+        character_id: UUID,
+        content: str,
+        embedding: List[float],
+        session_id: Optional[UUID] = None,
+        memory_type: str = "event",
+        importance_score: int = 5,
+        entities: Optional[List[str]] = None,
+        location: Optional[str] = None,
+    ):
+        """Stage episodic memory insert (embedding must be precomputed)."""
+        self._memories.append({
+            "character_id": character_id,
+            "session_id": session_id,
+            "content": content,
+            # PostgreSQL halfvec format string
+            "embedding": "[" + ",".join(str(x) for x in embedding) + "]",
+            "memory_type": memory_type,
+            "importance_score": importance_score,
+            "entities": entities or [],
+            "location": location,
+        })
+
+    def queue_memory(self, memory: EpisodicMemoryCreate):
+        """
+        Defer a background memory write until the turn has committed.
+
+        Not part of the statement; AgentOrchestrator.commit_turn enqueues
+        these once the commit succeeded, so a turn that lost a world state
+        conflict leaves no memory behind.
+        """
+        self.queued_memories.append(memory)
+
+    @property
+    def is_empty(self) -> bool:
+        """True if nothing is staged."""
+        return (
+            self._world_state is None
+            and self._character is None
+            and self._session_stats is None
+            and not self._memories
+        )
+
+    def build_statement(self) -> tuple[str, list]:
+        """
+        Build single multi-CTE statement for all staged writes.
+
+        Returns:
+            (sql, params)
+        """
+        ctes: List[str] = []
+        counts: List[str] = []
+        params: list = []
+
+        def param(value) -> str:
+            params.append(value)
+            return f"${len(params)}"
+
+        # With compare-and-swap every other write is gated on the world state
+        # write, so a lost race applies nothing.
+        guard = ""
+
+        if self._world_state is not None:
+            character_id, state_data, expected_version = self._world_state
+            cid, state = param(character_id), param(json.dumps(state_data))
+            if expected_version is None:
+                write = f"""INSERT INTO world_state (character_id, state_data, version)
+                    VALUES ({cid}, {state}::jsonb, 1)
+                    ON CONFLICT (character_id)
+                    DO UPDATE SET
+                        state_data = {state}::jsonb,
+                        version = world_state.version + 1,
+                        updated_at = NOW()"""
+            elif expected_version == 0:
+                write = f"""INSERT INTO world_state (character_id, state_data, version)
+                    VALUES ({cid}, {state}::jsonb, 1)
+                    ON CONFLICT (character_id) DO NOTHING"""
+            else:
+                write = f"""UPDATE world_state
+                    SET state_data = {state}::jsonb,
+                        version = version + 1,
+                        updated_at = NOW()
+                    WHERE character_id = {cid} AND version = {param(expected_version)}"""
+            if expected_version is not None:
+                guard = " AND EXISTS (SELECT 1 FROM world_state_upsert)"
+            ctes.append(
+                f"""world_state_upsert AS (
+                    {write}
+                    RETURNING version
+                )"""
+            )
+            counts.append("(SELECT count(*) FROM world_state_upsert) AS world_state_rows")
+            counts.append("(SELECT max(version) FROM world_state_upsert) AS world_state_version")
+
+        if self._character is not None:
+            character = self._character
+            ctes.append(
+                f"""character_update AS (
+                    UPDATE characters
+                    SET name = {param(character.name)},
+                        character_sheet = {param(character_sheet_json(character))}::jsonb,
+                        last_session_at = {param(datetime.now())}
+                    WHERE id = {param(character.id)}{guard}
+                    RETURNING 1
+                )"""
+            )
+            counts.append("(SELECT count(*) FROM character_update) AS character_rows")
+
+        if self._session_stats is not None:
+            stats = self._session_stats
+            ctes.append(
+                f"""session_stats_update AS (
+                    UPDATE game_sessions
+                    SET
+                        turns_count = turns_count + {param(stats["turns_increment"])},
+                        total_damage_dealt = total_damage_dealt + {param(stats["damage_dealt_increment"])},
+                        total_damage_taken = total_damage_taken + {param(stats["damage_taken_increment"])}
+                    WHERE id = {param(stats["session_id"])}{guard}
+                    RETURNING 1
+                )"""
+            )
+            counts.append("(SELECT count(*) FROM session_stats_update) AS session_rows")
+
+        for i, memory in enumerate(self._memories):
+            values = (
+                f"""{param(memory["character_id"])}, {param(memory["session_id"])},
+                            {param(memory["content"])}, {param(memory["embedding"])},
+                            {param(memory["memory_type"])}, {param(memory["importance_score"])},
+                            {param(memory["entities"])}, {param(memory["location"])}"""
+            )
+            # VALUES cannot take a WHERE clause, INSERT ... SELECT can
+            if guard:
+                source = f"""SELECT {values}
+                    WHERE EXISTS (SELECT 1 FROM world_state_upsert)"""
+            else:
+                source = f"VALUES ({values})"
+            ctes.append(
+                f"""memory_insert_{i} AS (
+                    INSERT INTO episodic_memories
+                    (character_id, session_id, content, embedding, memory_type,
+                     importance_score, entities, location)
+                    {source}
+                    RETURNING 1
+                )"""
+            )
+            counts.append(f"(SELECT count(*) FROM memory_insert_{i}) AS memory_rows_{i}")
+
+        sql = "WITH " + ",\n".join(ctes) + "\nSELECT " + ",\n       ".join(counts)
+        return sql, params
+
+    def _write_through(self, row):
+        """Update the read-through caches with what was just committed."""
+        if self._world_state is not None:
+            character_id, state_data, _ = self._world_state
+            if self.world_state_version is not None:
+                world_state_cache.set(character_id, (state_data, self.world_state_version))
+            else:
+                world_state_cache.invalidate(character_id)
+        if self._character is not None:
+            if row is not None and row.get("character_rows") == 0:
+                character_cache.invalidate(self._character.telegram_user_id)
+            else:
+                character_cache.set(self._character.telegram_user_id, self._character)
+
+    async def commit(self) -> bool:
+        """
+        Write all staged changes in one atomic statement.
+
+        On a world state version conflict nothing is written, conflict is set
+        and False is returned; restage with the current version and commit
+        again (see AgentOrchestrator.commit_turn).
+
+        Returns:
+            True if committed (or nothing to commit), False on failure or conflict
+        """
+        self.conflict = False
+        if self.is_empty:
+            self.committed = True
+            return True
+
+        sql, params = self.build_statement()
+
+        try:
+            async with db_connection() as conn:
+                row = await conn.fetchrow(sql, *params)
+
+            if row is not None and self._world_state is not None:
+                if self._world_state[2] is not None and row.get("world_state_rows") == 0:
+                    self.conflict = True
+                    world_state_cache.invalidate(self._world_state[0])
+                    logger.warning(
+                        f"World state of character {self._world_state[0]} changed since "
+                        f"version {self._world_state[2]}, turn not committed"
+                    )
+                    return False
+                self.world_state_version = row.get("world_state_version")
+
+            if row is not None:
+                if self._character is not None and row.get("character_rows") == 0:
+                    logger.warning(f"Character {self._character.id} not found for update")
+                if self._session_stats is not None and row.get("session_rows") == 0:
+                    logger.warning(
+                        f"Session {self._session_stats['session_id']} not found for stats update"
+                    )
+
+            self._write_through(row)
+            self.committed = True
+            logger.info(
+                f"Turn committed: world_state={self._world_state is not None}, "
+                f"character={self._character is not None}, "
+                f"session_stats={self._session_stats is not None}, "
+                f"memories={len(self._memories)}"
+            )
+            return True
+
+        except Exception as e:
+            logger.error(f"Failed to commit turn: {e}", exc_info=True)
+            return False
@@ -0,0 +1,198 @@
+"""Single round-trip loader for per-turn context (character, settings, session, world state).
+
+Served from the read-through caches (app/db/cache.py) when all four parts
+are cached, so a typical turn does no reads at all.
+"""
+import logging
+import json
+from typing import Optional
+
+from app.game.character import CharacterSheet
+from app.db.models import TurnContext
+from app.db.cache import character_cache, session_cache, user_settings_cache, world_state_cache
+from app.db.characters import character_from_row
+from app.db.sessions import get_or_create_session
+from app.db.supabase import db_connection
+from app.db.user_settings import (
+    get_user_settings_by_telegram_id,
+    create_or_update_user_settings,
+)
+
+logger = logging.getLogger(__name__)
+
+
+# One statement: loads character, reuses or creates the active session,
+# reads or creates default user settings and joins the world state.
+TURN_CONTEXT_QUERY = """
+    WITH ch AS (
+        SELECT id, telegram_user_id, name, character_sheet
+        FROM characters
+        WHERE telegram_user_id = $1
+    ),
+    active_session AS (
+        SELECT gs.id
+        FROM game_sessions gs
+        JOIN ch ON gs.character_id = ch.id
+        WHERE gs.ended_at IS NULL
+        ORDER BY gs.started_at DESC
+        LIMIT 1
+    ),
+    new_session AS (
+        INSERT INTO game_sessions (character_id, started_at, turns_count)
+        SELECT ch.id, NOW(), 0
+        FROM ch
+        WHERE NOT EXISTS (SELECT 1 FROM active_session)
+        RETURNING id
+    ),
+    existing_settings AS (
+        SELECT combat_enabled
+        FROM user_settings
+        WHERE telegram_user_id = $1
+    ),
+    new_settings AS (
+        INSERT INTO user_settings (telegram_user_id, combat_enabled)
+        SELECT $1, TRUE
+        FROM ch
+        WHERE NOT EXISTS (SELECT 1 FROM existing_settings)
+        ON CONFLICT (telegram_user_id) DO NOTHING
+        RETURNING combat_enabled
+    )
+    SELECT
+        ch.id, ch.telegram_user_id, ch.name, ch.character_sheet,
+        COALESCE(
+            (SELECT id FROM active_session),
+            (SELECT id FROM new_session)
+        ) AS session_id,
+        COALESCE(
+            (SELECT combat_enabled FROM existing_settings),
+            (SELECT combat_enabled FROM new_settings),
+            TRUE
+        ) AS combat_enabled,
+        ws.state_data,
+        COALESCE(ws.version, 0) AS world_state_version
+    FROM ch
+    LEFT JOIN world_state ws ON ws.character_id = ch.id
+"""
+
+
+def _cached_turn_context(telegram_user_id: int) -> Optional[TurnContext]:
+    """Build TurnContext from the caches, or None if any part is missing."""
+    character = character_cache.get(telegram_user_id)
+    if character is None:
+        return None
+    user_settings = user_settings_cache.get(telegram_user_id)
+    world_state = world_state_cache.get(character.id)
+    session_id = session_cache.get(character.id)
+    if user_settings is None or world_state is None or session_id is None:
+        return None
+    
+    game_state, version = world_state
+    return TurnContext(
+        character=character,
+        session_id=session_id,
+        user_settings=user_settings,
+        game_state=game_state,
+        world_state_version=version,
+    )
+
+
+async def load_turn_context(telegram_user_id: int) -> Optional[TurnContext]:
+    """
+    Load character, user settings, active session and world state in one round trip.
+    
+    Creates the session and default settings rows if they are missing.
+    Cached parts are reused; the query only runs if one of them is missing.
+    
+    Args:
+        telegram_user_id: User's Telegram ID
+        
+    Returns:
+        TurnContext or None if character not found (or query failed)
+    """
+    cached = _cached_turn_context(telegram_user_id)
+    if cached is not None:
+        return cached
+    caches = (character_cache, user_settings_cache, world_state_cache, session_cache)
+    epochs = [cache.epoch for cache in caches]
+    
+    async with db_connection() as conn:
+        try:
+            row = await conn.fetchrow(TURN_CONTEXT_QUERY, telegram_user_id)
+            
+            if not row:
+                logger.info(f"No character found for telegram_user_id={telegram_user_id}")
+                return None
+            
+            character = character_from_row(row)
+            
+            # asyncpg may return JSONB as string, parse it
+            state_data = row["state_data"]
+            if isinstance(state_data, str):
+                state_data = json.loads(state_data)
+            
+            if state_data:
+                game_state = dict(state_data)
+            else:
+                from app.agents.world_state import default_game_state
+                game_state = default_game_state()
+            
+            logger.info(
+                f"Loaded turn context for {character.name} "
+                f"(session={row['session_id']})"
+            )
+            turn = TurnContext(
+                character=character,
+                session_id=row["session_id"],
+                user_settings={
+                    "telegram_user_id": telegram_user_id,
+                    "combat_enabled": row["combat_enabled"],
+                },
+                game_state=game_state,
+                world_state_version=row["world_state_version"],
+            )
+            
+            values = (
+                (telegram_user_id, turn.character),
+                (telegram_user_id, turn.user_settings),
+                (character.id, (turn.game_state, turn.world_state_version)),
+                (character.id, turn.session_id),
+            )
+            for cache, epoch, (key, value) in zip(caches, epochs, values):
+                cache.set(key, value, epoch=epoch)
+            return turn
+        
+        except Exception as e:
+            logger.error(f"Error loading turn context: {e}", exc_info=True)
+            return None
+
+
+async def load_turn_context_for_character(character: CharacterSheet) -> TurnContext:
+    """
+    Build TurnContext for a character that is not in the database (FSM fallback).
+    
+    Uses the per-table helpers sequentially; only hit on the rare fallback path.
+    
+    Args:
+        character: In-memory CharacterSheet
+        
+    Returns:
+        TurnContext instance
+    """
+    from app.agents.world_state import world_state_agent
+    
+    user_settings = await get_user_settings_by_telegram_id(character.telegram_user_id)
+    if user_settings is None:
+        user_settings = await create_or_update_user_settings(
+            character.telegram_user_id, combat_enabled=True
+        )
+    
+    session_id = await get_or_create_session(character.id)
+    game_state, version = await world_state_agent.load_world_state_versioned(character.id)
+    
+    return TurnContext(
+        character=character,
+        session_id=session_id,
+        user_settings=user_settings,
+        game_state=game_state,
+        world_state_version=version,
+    )
@@ -0,0 +1,159 @@
+"""Bounded TTL cache for intent analysis results.
+
+Players repeat near-identical actions ("бью ещё раз", "атакую"), so the
+LLM intent for (normalized action, combat context) is reused for a while
+instead of asking again.
+"""
+
+import re
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Callable, Optional
+
+from pydantic import BaseModel
+
+
+def normalize_action(text: str) -> str:
+    """Normalize action text (case, ё, punctuation, whitespace)."""
+    text = unicodedata.normalize("NFC", text).lower().replace("ё", "е")
+    text = re.sub(r"[^\w\s]", " ", text)
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def make_intent_key(user_action: str, game_state: dict) -> tuple:
+    """
+    Build cache key from the inputs of the intent prompt.
+
+    The prompt sees the action, combat flag, enemies and location, so all
+    of them are part of the key (enemies as a set - order does not matter).
+    """
+    enemies = frozenset(enemy.lower() for enemy in game_state.get("enemies", []) or [])
+    return (
+        normalize_action(user_action),
+        bool(game_state.get("in_combat")),
+        enemies,
+        game_state.get("location", "unknown"),
+    )
+
+
+class IntentCacheEntry(BaseModel):
+    """Cached intent with per-entry stats."""
+    intent: dict
+    action: str
+    created_at: float
+    hits: int = 0
+    last_hit_at: Optional[float] = None
+
+
+class IntentCache:
+    """
+    LRU cache with TTL for intent dicts.
+
+    Usage:
+        key = make_intent_key(user_action, game_state)
+        intent = intent_cache.get(key)
+        if intent is None:
+            intent = await analyze(...)
+            intent_cache.put(key, intent)
+    """
+
+    def __init__(self, max_entries: int = 512, ttl_seconds: float = 600.0):
+        """
+        Initialize cache.
+
+        Args:
+            max_entries: Max cached intents (0 disables cache)
+            ttl_seconds: Entry lifetime
+        """
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[tuple, IntentCacheEntry]" = OrderedDict()
+
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evicted = 0
+
+    def get(self, key: tuple) -> Optional[dict]:
+        """
+        Look up intent.
+
+        Returns:
+            Copy of cached intent or None on miss/expiry
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        now = time.monotonic()
+        if now - entry.created_at > self.ttl_seconds:
+            del self._entries[key]
+            self.expired += 1
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        entry.hits += 1
+        entry.last_hit_at = now
+        self.hits += 1
+        return dict(entry.intent)
+
+    def put(self, key: tuple, intent: dict):
+        """Store intent, evicting least recently used entries."""
+        if self.max_entries <= 0:
+            return
+        self._entries[key] = IntentCacheEntry(
+            intent=dict(intent),
+            created_at=time.monotonic(),
+            action=key[0],
+        )
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evicted += 1
+
+    def invalidate(self, predicate: Optional[Callable[[tuple], bool]] = None) -> int:
+        """
+        Drop entries matching predicate (all entries if None).
+
+        Returns:
+            Number of entries removed
+        """
+        if predicate is None:
+            removed = len(self._entries)
+            self._entries.clear()
+            return removed
+
+        keys = [key for key in self._entries if predicate(key)]
+        for key in keys:
+            del self._entries[key]
+        return len(keys)
+
+    def invalidate_action(self, user_action: str) -> int:
+        """Drop every cached intent for this action text (any context)."""
+        action = normalize_action(user_action)
+        return self.invalidate(lambda key: key[0] == action)
+
+    def stats(self, top: int = 5) -> dict:
+        """Return hit/miss counters and the most reused entries."""
+        total = self.hits + self.misses
+        top_entries = sorted(self._entries.values(), key=lambda e: e.hits, reverse=True)[:top]
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "expired": self.expired,
+            "evicted": self.evicted,
+            "entries": len(self._entries),
+            "top_entries": [
+                {
+                    "action": entry.action,
+                    "action_type": entry.intent.get("action_type"),
+                    "hits": entry.hits,
+                    "age": time.monotonic() - entry.created_at,
+                }
+                for entry in top_entries
+            ],
+        }
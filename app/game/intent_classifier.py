@@ -0,0 +1,219 @@
+"""Deterministic fast-path intent classifier.
+
+Classifies obvious player actions ("атакую орка мечом", "иду в таверну")
+with compiled stem tables and returns an INTENT_ANALYSIS_SCHEMA-shaped
+intent plus a confidence score. RulesArbiterAgent skips the LLM call when
+confidence is above threshold and falls back to the LLM otherwise.
+"""
+
+import re
+from typing import Optional
+
+# Stems are matched at word start (Russian inflections vary at the end)
+ATTACK_STEMS = [
+    "атак", "бью", "бить", "удар", "напада", "напасть", "нападу", "рублю",
+    "рубить", "рубану", "колю", "заколо", "пронза", "стреля", "выстрел",
+    "убива", "убить", "режу", "замахива", "мечом", "топором", "кинжалом",
+    "булавой", "луком",
+]
+MOVEMENT_STEMS = [
+    "иду", "идти", "идём", "идем", "пойду", "пойти", "пойдём", "направля",
+    "бегу", "убега", "отступа", "подхож", "подойти", "захож", "зайти",
+    "вхож", "войти", "выхож", "выйти", "возвраща", "поднима", "спуска",
+    "двигаюсь", "перемеща", "еду", "плыву", "следую",
+]
+DIALOGUE_STEMS = [
+    "говор", "спрашива", "спросить", "спрошу", "отвеча", "кричу", "шепчу",
+    "приветству", "здорова", "обраща", "скажу", "сказать", "рассказыва",
+    "прошу", "болта", "торгу",
+]
+SPELL_STEMS = ["заклина", "колду", "закля", "магию", "магией"]
+
+# Skill check stems -> ability used by RulesEngine.resolve_skill_check
+SKILL_STEMS = {
+    "взлам": "dexterity",
+    "краду": "dexterity",
+    "крадусь": "dexterity",
+    "пряч": "dexterity",
+    "спрята": "dexterity",
+    "лезу": "strength",
+    "залеза": "strength",
+    "карабка": "strength",
+    "прыга": "strength",
+    "перепрыг": "strength",
+    "убежда": "charisma",
+    "убедить": "charisma",
+    "обманыва": "charisma",
+    "обмануть": "charisma",
+    "запугива": "charisma",
+}
+
+# Words that make the action conditional or compound (let the LLM decide)
+HEDGE_STEMS = ["если", "может", "или", "либо", "пока", "чтобы"]
+
+PREPOSITIONS = {"в", "во", "на", "к", "ко", "с", "со", "за", "под", "по", "до", "из", "от"}
+
+
+def _compile(stems: list[str]) -> re.Pattern:
+    return re.compile(r"\b(?:" + "|".join(re.escape(stem) for stem in stems) + r")\w*")
+
+
+ACTION_PATTERNS = {
+    "attack": _compile(ATTACK_STEMS),
+    "movement": _compile(MOVEMENT_STEMS),
+    "dialogue": _compile(DIALOGUE_STEMS),
+    "spell": _compile(SPELL_STEMS),
+    "skill_check": _compile(list(SKILL_STEMS)),
+}
+HEDGE_PATTERN = _compile(HEDGE_STEMS)
+WORD_PATTERN = re.compile(r"\w+")
+# Direct speech: «...», "...", — ...
+SPEECH_PATTERN = re.compile(r"^\s*[«\"—–-]")
+
+
+class IntentClassifier:
+    """
+    Confidence-scored keyword classifier for player actions.
+
+    Usage:
+        intent, confidence = classifier.classify("атакую орка", game_state)
+        if intent and confidence >= threshold: ...
+    """
+
+    def __init__(self):
+        # Stats
+        self.attempts = 0
+        self.hits = 0
+        self.hits_by_type: dict[str, int] = {}
+
+    def classify(self, user_action: str, game_state: dict) -> tuple[Optional[dict], float]:
+        """
+        Classify action without LLM.
+
+        Args:
+            user_action: Player's action text
+            game_state: {"in_combat": bool, "enemies": list, ...}
+
+        Returns:
+            (intent, confidence) - intent is None when no rule matched
+        """
+        text = user_action.lower().strip()
+        words = WORD_PATTERN.findall(text)
+        if not words:
+            return None, 0.0
+
+        matches: dict[str, re.Match] = {}
+        for action_type, pattern in ACTION_PATTERNS.items():
+            match = pattern.search(text)
+            if match:
+                matches[action_type] = match
+
+        if SPEECH_PATTERN.match(user_action) and "dialogue" not in matches:
+            matches["dialogue"] = None
+
+        if not matches:
+            return None, 0.0
+
+        if len(matches) > 1:
+            # Compound action ("подхожу и бью") - ambiguous
+            action_type = next(iter(matches))
+            return self._build_intent(action_type, matches[action_type], text, game_state), 0.4
+
+        action_type, match = next(iter(matches.items()))
+        confidence = self._confidence(action_type, text, words, game_state)
+        return self._build_intent(action_type, match, text, game_state), confidence
+
+    def record(self, action_type: Optional[str], hit: bool):
+        """Record whether the fast path answered (for hit rate)."""
+        self.attempts += 1
+        if hit and action_type:
+            self.hits += 1
+            self.hits_by_type[action_type] = self.hits_by_type.get(action_type, 0) + 1
+
+    def stats(self) -> dict:
+        """Return fast-path hit counters."""
+        return {
+            "attempts": self.attempts,
+            "hits": self.hits,
+            "hit_rate": self.hits / self.attempts if self.attempts else 0.0,
+            "hits_by_type": dict(self.hits_by_type),
+        }
+
+    def _confidence(self, action_type: str, text: str, words: list[str], game_state: dict) -> float:
+        """Score a single-type match."""
+        confidence = {
+            "attack": 0.95,
+            "movement": 0.9,
+            "dialogue": 0.9,
+            "skill_check": 0.88,
+            # Spell effect (damage/heal/utility) is unknown - LLM decides
+            "spell": 0.6,
+        }[action_type]
+
+        # Long descriptions usually carry details the LLM should weigh
+        if len(words) > 15:
+            confidence -= 0.3
+        elif len(words) > 8:
+            confidence -= 0.1
+
+        if "?" in text or HEDGE_PATTERN.search(text):
+            confidence -= 0.2
+
+        # In combat most actions need rolls; only attacks are obvious
+        if game_state.get("in_combat") and action_type in ("movement", "dialogue"):
+            confidence -= 0.15
+
+        return max(0.0, min(1.0, confidence))
+
+    def _build_intent(
+        self,
+        action_type: str,
+        match: Optional[re.Match],
+        text: str,
+        game_state: dict
+    ) -> dict:
+        """Build INTENT_ANALYSIS_SCHEMA-shaped intent."""
+        keyword = match.group(0) if match else "прямая речь"
+        intent = {
+            "action_type": action_type,
+            "requires_roll": False,
+            "roll_type": None,
+            "skill": None,
+            "target": None,
+            "difficulty": None,
+            "reasoning": f"Быстрая классификация по ключевому слову «{keyword}»",
+        }
+
+        if action_type == "attack":
+            intent["requires_roll"] = True
+            intent["roll_type"] = "attack_roll"
+            intent["target"] = self._find_enemy(text, game_state) or self._word_after(text, match)
+        elif action_type == "skill_check":
+            intent["requires_roll"] = True
+            intent["roll_type"] = "skill_check"
+            intent["skill"] = next(
+                (ability for stem, ability in SKILL_STEMS.items() if keyword.startswith(stem)),
+                "dexterity",
+            )
+            intent["difficulty"] = "medium"
+        elif action_type == "movement":
+            intent["target"] = self._word_after(text, match)
+
+        return intent
+
+    def _find_enemy(self, text: str, game_state: dict) -> Optional[str]:
+        """Return known enemy mentioned in text (matched by stem)."""
+        for enemy in game_state.get("enemies", []):
+            stem = enemy.lower()[:4]
+            if stem and stem in text:
+                return enemy
+        return None
+
+    def _word_after(self, text: str, match: Optional[re.Match]) -> Optional[str]:
+        """First non-preposition word after the matched keyword."""
+        if match is None:
+            return None
+        for word in WORD_PATTERN.findall(text[match.end():]):
+            if word not in PREPOSITIONS:
+                return word
+        return None
@@ -1,10 +1,24 @@
 """
 OpenRouter client для работы с Grok-4-fast через OpenAI-совместимый API.
 """
+import asyncio
 import logging
-from typing import Optional
-from openai import AsyncOpenAI
+import time
+from contextlib import AsyncExitStack
+from typing import AsyncIterator, Optional
+from openai import AsyncOpenAI, APIConnectionError, APIStatusError
 from app.config import settings
+from app.config.models import ModelCandidate
+from app.llm.governor import LLMGovernor
+from app.observability.tracing import LLM, begin_span, current_span, end_span, span
+from app.llm.resilience import (
+    CircuitBreaker,
+    LatencyWindow,
+    LLMError,
+    LLMUnavailableError,
+    backoff_delay,
+    parse_retry_after,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -15,13 +29,27 @@ class LLMClient:
     def __init__(self):
         """Initialize OpenRouter client with Grok configuration."""
         self.client = AsyncOpenAI(
-            base_url="https://openrouter.ai/api/v1",
+            base_url=settings.openrouter_base_url,
             api_key=settings.openrouter_api_key,
+            timeout=settings.llm_request_timeout,
+            max_retries=0,  # Retries are handled in _create_with_retries
         )
         self.model = settings.llm_model
         self.extra_headers = {
             "HTTP-Referer": settings.site_url,
         }
+        # Admission control: global cap, per-model rate, per-user fairness
+        self.governor = LLMGovernor(
+            max_concurrency=settings.llm_max_concurrency,
+            default_rate=settings.llm_rate_limit,
+            burst=settings.llm_rate_limit_burst,
+            model_rates=settings.llm_model_rate_limits,
+        )
+        # Per-model health: rolling latency (for hedging) and circuit breakers
+        self.latencies: dict[str, LatencyWindow] = {}
+        self.breakers: dict[str, CircuitBreaker] = {}
+        self.hedged_requests = 0
+        self.failovers = 0
     
     async def get_completion(
         self,
@@ -33,10 +61,16 @@ class LLMClient:
         frequency_penalty: float = 0.0,
         presence_penalty: float = 0.0,
         response_format: Optional[dict] = None,
+        raise_on_error: bool = False,
+        candidates: Optional[list[ModelCandidate]] = None,
     ) -> str:
         """
         Получить completion от LLM.
         
+        Retries 429/5xx/connection errors with jittered backoff (honoring
+        Retry-After), optionally hedges slow requests and fails fast while
+        the model's circuit breaker is open.
+        
         Args:
             messages: List of message dicts с ролями 'system', 'user', 'assistant'
             model: Model to use (overrides default if provided)
@@ -46,38 +80,420 @@ class LLMClient:
             frequency_penalty: Frequency penalty (-2.0 to 2.0)
             presence_penalty: Presence penalty (-2.0 to 2.0)
             response_format: Response format config, e.g. {"type": "json_object"}
+            raise_on_error: Raise LLMError instead of returning an error text,
+                so the caller can choose its own fallback
+            candidates: Routing candidates (ModelConfig.candidate_models());
+                the fastest healthy one is tried first, the rest on failure.
+                Takes precedence over model
             
         Returns:
             Generated text response
+            
+        Raises:
+            LLMError: If raise_on_error and the request failed
         """
+        params = {
+            "model": model or self.model,
+            "messages": messages,
+            "temperature": temperature,
+            "max_tokens": max_tokens,
+            "top_p": top_p,
+            "frequency_penalty": frequency_penalty,
+            "presence_penalty": presence_penalty,
+            "extra_headers": self.extra_headers,
+        }
+        
+        # Add response_format if specified
+        if response_format:
+            params["response_format"] = response_format
+        
         try:
-            params = {
-                "model": model or self.model,
-                "messages": messages,
-                "temperature": temperature,
-                "max_tokens": max_tokens,
-                "top_p": top_p,
-                "frequency_penalty": frequency_penalty,
-                "presence_penalty": presence_penalty,
-                "extra_headers": self.extra_headers,
-            }
-            
-            # Add response_format if specified
-            if response_format:
-                params["response_format"] = response_format
-            
-            response = await self.client.chat.completions.create(**params)
+            with span("llm.completion", kind=LLM, model=params["model"]) as llm_span:
+                if candidates:
+                    response = await self._complete_with_failover(params, candidates)
+                else:
+                    response = await self._create_with_retries(params)
+                llm_span.set(**usage_attributes(response))
             return response.choices[0].message.content
         
         except Exception as e:
+            if raise_on_error:
+                if isinstance(e, LLMError):
+                    raise
+                raise LLMError(str(e), model=params["model"]) from e
+            
             logger.error(f"LLM API Error: {e}", exc_info=True)
             
             # Обработка rate limits от OpenRouter
-            if "rate_limit" in str(e).lower() or "429" in str(e):
+            if (isinstance(e, LLMError) and e.is_rate_limit) or "429" in str(e):
                 return "⏳ I'm getting too many requests right now. Please wait a moment and try again."
             
             # Обработка других ошибок API
             return "❌ Sorry, I encountered an error processing your request. Please try again later."
+    
+    async def stream_completion(
+        self,
+        messages: list[dict[str, str]],
+        model: Optional[str] = None,
+        temperature: float = 0.7,
+        max_tokens: int = 500,
+        top_p: float = 1.0,
+        frequency_penalty: float = 0.0,
+        presence_penalty: float = 0.0,
+        candidates: Optional[list[ModelCandidate]] = None,
+    ) -> AsyncIterator[str]:
+        """
+        Stream completion от LLM token by token.
+        
+        Unlike get_completion, errors are raised (not returned as text),
+        so callers can fall back after a partial stream. Opening the stream
+        is retried like get_completion and fails over to the next candidate;
+        a stream broken midway is not.
+        
+        Args:
+            messages: List of message dicts с ролями 'system', 'user', 'assistant'
+            model: Model to use (overrides default if provided)
+            temperature: Sampling temperature (0-2)
+            max_tokens: Maximum tokens to generate
+            top_p: Nucleus sampling parameter
+            frequency_penalty: Frequency penalty (-2.0 to 2.0)
+            presence_penalty: Presence penalty (-2.0 to 2.0)
+            candidates: Routing candidates (see get_completion)
+            
+        Yields:
+            Text deltas as they arrive
+            
+        Raises:
+            LLMError: If API call fails
+        """
+        params = {
+            "model": model or self.model,
+            "messages": messages,
+            "temperature": temperature,
+            "max_tokens": max_tokens,
+            "top_p": top_p,
+            "frequency_penalty": frequency_penalty,
+            "presence_penalty": presence_penalty,
+            "extra_headers": self.extra_headers,
+            "stream": True,
+        }
+        
+        candidates = candidates or [ModelCandidate(model=params["model"])]
+        
+        # Not span(): a context variable set in an async generator leaks into the consumer
+        llm_span = begin_span("llm.stream", kind=LLM, model=params["model"])
+        error: Optional[BaseException] = None
+        chunks = 0
+        started = time.monotonic()
+        
+        try:
+            # The slot of the candidate that opened the stream is held until it ends
+            async with AsyncExitStack() as stack:
+                stream = await self._open_stream_with_failover(params, candidates, stack)
+                llm_span.set(model=params["model"])
+                async for chunk in stream:
+                    if not chunk.choices:
+                        continue
+                    delta = chunk.choices[0].delta.content
+                    if delta:
+                        if chunks == 0:
+                            llm_span.set(first_token_ms=round((time.monotonic() - started) * 1000, 1))
+                        chunks += 1
+                        yield delta
+        except LLMError as e:
+            error = e
+            raise
+        except Exception as e:
+            error = e
+            logger.error(f"LLM streaming error: {e}", exc_info=True)
+            raise LLMError(str(e), model=params["model"]) from e
+        finally:
+            llm_span.set(chunks=chunks)
+            end_span(llm_span, error)
+    
+    def breaker(self, model: str) -> CircuitBreaker:
+        """Circuit breaker for model (created on first use)."""
+        breaker = self.breakers.get(model)
+        if breaker is None:
+            breaker = self.breakers[model] = CircuitBreaker(
+                failure_threshold=settings.llm_breaker_failure_threshold,
+                reset_timeout=settings.llm_breaker_reset_timeout,
+                trial_timeout=settings.llm_request_timeout,
+            )
+        return breaker
+    
+    def latency(self, model: str) -> LatencyWindow:
+        """Rolling latency window for model (created on first use)."""
+        window = self.latencies.get(model)
+        if window is None:
+            window = self.latencies[model] = LatencyWindow()
+        return window
+    
+    def route(self, candidates: list[ModelCandidate]) -> list[ModelCandidate]:
+        """
+        Order candidates for a request.
+        
+        Healthy candidates (breaker not open) that meet their latency budget
+        come first, fastest rolling median first; candidates without samples
+        keep their configured order and are tried before slower known ones
+        so they get measured. Over-budget candidates follow, open-circuit
+        ones go last (their breaker still gets a trial after reset_timeout).
+        
+        Args:
+            candidates: Candidates in configured order
+            
+        Returns:
+            Candidates in the order they should be tried
+        """
+        def rank(indexed: tuple[int, ModelCandidate]) -> tuple:
+            index, candidate = indexed
+            if self.breaker(candidate.model).is_open:
+                return (2, 0.0, index)
+            median = self.latency(candidate.model).percentile(0.5)
+            if median is None:
+                return (0, 0.0, index)
+            if candidate.latency_budget is not None and median > candidate.latency_budget:
+                return (1, median, index)
+            return (0, median, index)
+        
+        return [candidate for _, candidate in sorted(enumerate(candidates), key=rank)]
+    
+    async def _complete_with_failover(self, params: dict, candidates: list[ModelCandidate]):
+        """
+        Try routed candidates in turn until one answers.
+        
+        Only the last candidate gets the full retry budget; earlier ones
+        fail over on their first error or timeout instead of backing off.
+        
+        Raises:
+            LLMError: Error of the last candidate tried
+        """
+        ordered = self.route(candidates)
+        error: Optional[LLMError] = None
+        
+        for position, candidate in enumerate(ordered):
+            attempt_params = {**params, "model": candidate.model}
+            is_last = position == len(ordered) - 1
+            try:
+                response = await self._create_with_timeout(
+                    attempt_params,
+                    timeout=candidate.timeout,
+                    max_retries=None if is_last else 0,
+                )
+                current_span().set(model=candidate.model, failovers=position)
+                return response
+            except LLMError as e:
+                error = e
+                if not is_last:
+                    self.failovers += 1
+                    logger.warning(
+                        f"LLM {candidate.model} failed ({e}), failing over to "
+                        f"{ordered[position + 1].model}"
+                    )
+        
+        raise error
+    
+    async def _open_stream_with_failover(
+        self,
+        params: dict,
+        candidates: list[ModelCandidate],
+        stack: AsyncExitStack,
+    ):
+        """
+        Open a stream on the first routed candidate that accepts it.
+        
+        Each attempt takes a governor slot for its own model; the slot of
+        the attempt that opened the stream is pushed onto stack, the others
+        are released as soon as they fail.
+        """
+        ordered = self.route(candidates)
+        
+        for position, candidate in enumerate(ordered):
+            params["model"] = candidate.model
+            is_last = position == len(ordered) - 1
+            try:
+                return await self._create_with_timeout(
+                    params,
+                    timeout=candidate.timeout,
+                    hedge=False,
+                    max_retries=None if is_last else 0,
+                    hold=stack,
+                )
+            except LLMError as e:
+                if is_last:
+                    raise
+                self.failovers += 1
+                logger.warning(
+                    f"LLM stream {candidate.model} failed ({e}), failing over to "
+                    f"{ordered[position + 1].model}"
+                )
+    
+    async def _create_with_timeout(
+        self,
+        params: dict,
+        timeout: Optional[float] = None,
+        hedge: bool = True,
+        max_retries: Optional[int] = None,
+        hold: Optional[AsyncExitStack] = None,
+    ):
+        """_create_with_retries bounded by a per-candidate timeout."""
+        request = self._create_with_retries(params, hedge=hedge, max_retries=max_retries, hold=hold)
+        if timeout is None:
+            return await request
+        try:
+            return await asyncio.wait_for(request, timeout=timeout)
+        except asyncio.TimeoutError:
+            model = params["model"]
+            self.breaker(model).record_failure()
+            raise LLMError(f"{model} timed out after {timeout:.1f}s", model=model, retryable=True)
+    
+    async def _create_with_retries(
+        self,
+        params: dict,
+        hedge: bool = True,
+        max_retries: Optional[int] = None,
+        hold: Optional[AsyncExitStack] = None,
+    ):
+        """
+        Call chat.completions.create with retries and circuit breaker.
+        
+        Each attempt takes its own governor slot, released before backing
+        off so a retry wait does not block other users' calls.
+        
+        Args:
+            params: Request parameters
+            hedge: Allow hedging (if enabled in settings)
+            max_retries: Override settings.llm_max_retries
+            hold: Keep the successful attempt's slot on this stack instead
+                of releasing it on return (streams hold it until closed)
+        
+        Raises:
+            LLMUnavailableError: If circuit is open for the model
+            LLMError: If the request failed (non-retryable or out of retries)
+        """
+        model = params["model"]
+        breaker = self.breaker(model)
+        if max_retries is None:
+            max_retries = settings.llm_max_retries
+        
+        for attempt in range(max_retries + 1):
+            async with AsyncExitStack() as admission:
+                await admission.enter_async_context(self.governor.slot(model))
+                if not breaker.allow_request():
+                    raise LLMUnavailableError(
+                        f"Circuit open for {model}", model=model, retryable=False
+                    )
+                
+                started = time.monotonic()
+                try:
+                    if hedge and settings.llm_hedge_enabled:
+                        response = await self._hedged_create(params)
+                    else:
+                        response = await self.client.chat.completions.create(**params)
+                except APIStatusError as e:
+                    status = e.status_code
+                    retryable = status == 429 or status >= 500
+                    retry_after = parse_retry_after(e.response.headers.get("retry-after"))
+                    # Rate limits mean "slow down", not "provider down"
+                    if status >= 500:
+                        breaker.record_failure()
+                    else:
+                        breaker.record_success()
+                    error = LLMError(str(e), model=model, status_code=status, retryable=retryable)
+                except APIConnectionError as e:  # includes timeouts
+                    breaker.record_failure()
+                    retry_after = None
+                    error = LLMError(str(e), model=model, retryable=True)
+                except Exception:
+                    breaker.record_failure()
+                    raise
+                except BaseException:
+                    # Cancelled (turn deadline, superseded turn): says nothing
+                    # about the model, but a half-open trial must not stay taken
+                    breaker.release_trial()
+                    raise
+                else:
+                    breaker.record_success()
+                    self.latency(model).add(time.monotonic() - started)
+                    if hold is not None:
+                        hold.push_async_exit(admission.pop_all())
+                    return response
+            
+            if not error.retryable or attempt >= max_retries:
+                raise error
+            
+            delay = backoff_delay(
+                attempt,
+                base=settings.llm_retry_base_delay,
+                cap=settings.llm_retry_max_delay,
+                retry_after=retry_after,
+            )
+            logger.warning(
+                f"LLM request to {model} failed (attempt {attempt + 1}/{max_retries + 1}, "
+                f"status={error.status_code}), retrying in {delay:.2f}s"
+            )
+            await asyncio.sleep(delay)
+        
+        raise LLMError(f"Out of retries for {model}", model=model)  # pragma: no cover
+    
+    async def _hedged_create(self, params: dict):
+        """
+        Send request; if it is slower than the model's latency percentile,
+        send a duplicate and take whichever answers first.
+        """
+        window = self.latency(params["model"])
+        threshold = None
+        if len(window) >= settings.llm_hedge_min_samples:
+            threshold = window.percentile(settings.llm_hedge_percentile)
+        
+        primary = asyncio.create_task(self.client.chat.completions.create(**params))
+        tasks = {primary}
+        
+        # Whatever still runs when we return or are cancelled is abandoned
+        try:
+            if threshold is None:
+                return await primary
+            
+            done, _ = await asyncio.wait(tasks, timeout=threshold)
+            if done:
+                return primary.result()
+            
+            # The duplicate needs its own slot and rate token; never queue for one
+            if not self.governor.try_acquire(params["model"]):
+                logger.debug(f"No free LLM slot to hedge {params['model']}, waiting for primary")
+                return await primary
+            
+            self.hedged_requests += 1
+            logger.info(f"Hedging LLM request to {params['model']} after {threshold:.2f}s")
+            hedge = asyncio.create_task(self.client.chat.completions.create(**params))
+            # Released when the hedge ends, even if cancelled before it starts
+            hedge.add_done_callback(lambda _: self.governor.release())
+            tasks.add(hedge)
+            pending = set(tasks)
+            error: Optional[BaseException] = None
+            
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+
+def usage_attributes(response) -> dict:
+    """Token usage of a completion response as span attributes."""
+    usage = getattr(response, "usage", None)
+    attributes = {}
+    for field in ("prompt_tokens", "completion_tokens"):
+        value = getattr(usage, field, None)
+        if isinstance(value, int):
+            attributes[field] = value
+    return attributes
 
 
 # Singleton instance
@@ -0,0 +1,252 @@
+"""
+Admission control for LLM requests.
+
+- global cap on in-flight requests
+- token-bucket rate limit per model
+- per-user fair queuing (round robin between users waiting for a slot)
+
+The user for a request is taken from a context variable set by the bot
+handler (set_llm_user), so agents do not need to pass it through.
+"""
+import asyncio
+import logging
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import AsyncIterator, Deque, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# User on whose behalf LLM calls in the current task are made
+current_llm_user: ContextVar[Optional[str]] = ContextVar("current_llm_user", default=None)
+
+ANONYMOUS_USER = "anonymous"
+
+
+def set_llm_user(user_id) -> None:
+    """Attribute LLM calls of the current task (and its subtasks) to a user."""
+    current_llm_user.set(str(user_id) if user_id is not None else None)
+
+
+class TokenBucket:
+    """Async token bucket: rate tokens/sec, up to burst tokens stored."""
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = max(1.0, burst)
+        self._tokens = self.burst
+        self._updated_at = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated_at) * self.rate)
+        self._updated_at = now
+
+    async def acquire(self) -> float:
+        """
+        Take one token, waiting if the bucket is empty.
+
+        Returns:
+            Seconds waited
+        """
+        waited = 0.0
+        async with self._lock:
+            self._refill()
+            if self._tokens < 1.0:
+                delay = (1.0 - self._tokens) / self.rate
+                await asyncio.sleep(delay)
+                waited = delay
+                self._refill()
+            self._tokens -= 1.0
+        return waited
+
+    def try_acquire(self) -> bool:
+        """Take one token if one is available now (never waits)."""
+        if self._lock.locked():
+            return False
+        self._refill()
+        if self._tokens < 1.0:
+            return False
+        self._tokens -= 1.0
+        return True
+
+
+class LLMGovernor:
+    """
+    Global concurrency cap + per-model rate limit + per-user fair queuing.
+
+    Usage:
+        async with governor.slot(model):
+            response = await client.chat.completions.create(...)
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = 16,
+        default_rate: float = 0.0,
+        burst: float = 20.0,
+        model_rates: Optional[Dict[str, float]] = None,
+    ):
+        """
+        Initialize governor.
+
+        Args:
+            max_concurrency: Max in-flight LLM requests (all users, all models)
+            default_rate: Requests/sec per model (0 disables rate limiting)
+            burst: Token bucket capacity
+            model_rates: Per-model overrides of default_rate
+        """
+        self.max_concurrency = max(1, max_concurrency)
+        self.default_rate = default_rate
+        self.burst = burst
+        self.model_rates = model_rates or {}
+
+        self._in_flight = 0
+        # user -> waiters; dict order is the round-robin order
+        self._waiting: "OrderedDict[str, Deque[asyncio.Future]]" = OrderedDict()
+        self._buckets: Dict[str, TokenBucket] = {}
+
+        # Metrics
+        self.admitted = 0
+        self.queued = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.rate_limited_wait = 0.0
+        self._recent_waits: Deque[float] = deque(maxlen=500)
+
+    @property
+    def in_flight(self) -> int:
+        """Requests currently holding a slot."""
+        return self._in_flight
+
+    @property
+    def queue_depth(self) -> int:
+        """Requests waiting for a slot."""
+        return sum(len(waiters) for waiters in self._waiting.values())
+
+    def _bucket(self, model: str) -> Optional[TokenBucket]:
+        rate = self.model_rates.get(model, self.default_rate)
+        if rate <= 0:
+            return None
+        bucket = self._buckets.get(model)
+        if bucket is None:
+            bucket = self._buckets[model] = TokenBucket(rate, self.burst)
+        return bucket
+
+    @asynccontextmanager
+    async def slot(self, model: str, user: Optional[str] = None) -> AsyncIterator[None]:
+        """
+        Hold one admission slot for an LLM request.
+
+        Args:
+            model: Model the request goes to (rate limit key)
+            user: Fairness key (defaults to current_llm_user)
+        """
+        user = user or current_llm_user.get() or ANONYMOUS_USER
+        started = time.monotonic()
+
+        await self._acquire(user)
+        try:
+            bucket = self._bucket(model)
+            if bucket is not None:
+                self.rate_limited_wait += await bucket.acquire()
+            self._record_wait(time.monotonic() - started)
+            yield
+        finally:
+            self._release()
+
+    def try_acquire(self, model: str) -> bool:
+        """
+        Take a slot and a rate token for model only if both are free now.
+
+        For optional extra requests (hedges) that should not queue or jump
+        the fair queue. Pair a True result with release().
+        """
+        if self._in_flight >= self.max_concurrency or self._waiting:
+            return False
+        bucket = self._bucket(model)
+        if bucket is not None and not bucket.try_acquire():
+            return False
+        self._in_flight += 1
+        self._record_wait(0.0)
+        return True
+
+    def release(self):
+        """Free a slot taken with try_acquire()."""
+        self._release()
+
+    async def _acquire(self, user: str):
+        """Take a slot now, or queue behind other users round-robin."""
+        if self._in_flight < self.max_concurrency and not self._waiting:
+            self._in_flight += 1
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        self._waiting.setdefault(user, deque()).append(future)
+        self.queued += 1
+
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # Slot was granted just before cancellation - give it back
+                self._release()
+            else:
+                self._remove_waiter(user, future)
+            raise
+
+    def _remove_waiter(self, user: str, future: asyncio.Future):
+        waiters = self._waiting.get(user)
+        if waiters is None:
+            return
+        try:
+            waiters.remove(future)
+        except ValueError:
+            pass
+        if not waiters:
+            del self._waiting[user]
+
+    def _release(self):
+        """Free a slot and hand it to the next user in round-robin order."""
+        self._in_flight -= 1
+        while self._waiting and self._in_flight < self.max_concurrency:
+            user, waiters = next(iter(self._waiting.items()))
+            future = waiters.popleft()
+            # Rotate: this user goes to the back of the line
+            del self._waiting[user]
+            if waiters:
+                self._waiting[user] = waiters
+            if future.done():
+                continue
+            self._in_flight += 1
+            future.set_result(None)
+
+    def _record_wait(self, wait: float):
+        self.admitted += 1
+        self.total_wait += wait
+        self.max_wait = max(self.max_wait, wait)
+        self._recent_waits.append(wait)
+
+    def stats(self) -> dict:
+        """Return admission and queue-wait metrics."""
+        waits = sorted(self._recent_waits)
+
+        def percentile(p: float) -> float:
+            if not waits:
+                return 0.0
+            return waits[min(len(waits) - 1, int(p * len(waits)))]
+
+        return {
+            "in_flight": self._in_flight,
+            "queue_depth": self.queue_depth,
+            "waiting_users": len(self._waiting),
+            "admitted": self.admitted,
+            "queued": self.queued,
+            "avg_wait": self.total_wait / self.admitted if self.admitted else 0.0,
+            "p50_wait": percentile(0.5),
+            "p95_wait": percentile(0.95),
+            "max_wait": self.max_wait,
+            "rate_limited_wait": self.rate_limited_wait,
+        }
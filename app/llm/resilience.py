@@ -0,0 +1,167 @@
+"""
+Resilience primitives for LLM calls: errors, backoff, latency window,
+circuit breaker.
+"""
+import logging
+import random
+import time
+from collections import deque
+from typing import Deque, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class LLMError(Exception):
+    """LLM request failed (after retries)."""
+
+    def __init__(
+        self,
+        message: str,
+        model: Optional[str] = None,
+        status_code: Optional[int] = None,
+        retryable: bool = False,
+    ):
+        super().__init__(message)
+        self.model = model
+        self.status_code = status_code
+        self.retryable = retryable
+
+    @property
+    def is_rate_limit(self) -> bool:
+        return self.status_code == 429
+
+
+class LLMUnavailableError(LLMError):
+    """Circuit breaker is open for the model - request not attempted."""
+
+
+def backoff_delay(
+    attempt: int,
+    base: float = 0.5,
+    cap: float = 8.0,
+    retry_after: Optional[float] = None,
+) -> float:
+    """
+    Delay before retry number attempt+1 (jittered exponential backoff).
+
+    Uses "equal jitter": half of the exponential step is fixed, half random.
+    Retry-After from the server is honored as a lower bound (capped).
+
+    Args:
+        attempt: Zero-based attempt that just failed
+        base: First step in seconds
+        cap: Max delay in seconds
+        retry_after: Server-provided Retry-After seconds, if any
+    """
+    step = min(cap, base * (2 ** attempt))
+    delay = step / 2 + random.uniform(0, step / 2)
+    if retry_after is not None:
+        delay = max(delay, min(retry_after, cap))
+    return delay
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Parse Retry-After header (seconds form only)."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        return None
+
+
+class LatencyWindow:
+    """Rolling window of recent request latencies for one model."""
+
+    def __init__(self, size: int = 100):
+        self._samples: Deque[float] = deque(maxlen=size)
+
+    def add(self, latency: float):
+        self._samples.append(latency)
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def percentile(self, p: float) -> Optional[float]:
+        """Latency at percentile p (0..1), None if no samples."""
+        if not self._samples:
+            return None
+        ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(p * len(ordered)))]
+
+
+class CircuitBreaker:
+    """
+    Per-model circuit breaker.
+
+    closed -> open after failure_threshold consecutive failures;
+    open -> half_open after reset_timeout (one trial request);
+    half_open -> closed on success, back to open on failure.
+
+    A trial that reports no outcome within trial_timeout (lost by a caller
+    that never called release_trial) no longer blocks the next one.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(
+        self,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30.0,
+        trial_timeout: Optional[float] = None,
+    ):
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_timeout = reset_timeout
+        self.trial_timeout = reset_timeout if trial_timeout is None else trial_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._trial_in_flight = False
+        self._trial_started = 0.0
+
+    @property
+    def is_open(self) -> bool:
+        """True while requests are refused (open and reset_timeout not elapsed)."""
+        return (
+            self.state == self.OPEN
+            and time.monotonic() - self.opened_at < self.reset_timeout
+        )
+    
+    def allow_request(self) -> bool:
+        """True if a request may be sent now."""
+        if self.state == self.CLOSED:
+            return True
+        if self.state == self.OPEN:
+            if time.monotonic() - self.opened_at < self.reset_timeout:
+                return False
+            self.state = self.HALF_OPEN
+            self._trial_in_flight = False
+        # Half-open: let exactly one trial request through
+        now = time.monotonic()
+        if self._trial_in_flight and now - self._trial_started < self.trial_timeout:
+            return False
+        self._trial_in_flight = True
+        self._trial_started = now
+        return True
+
+    def release_trial(self):
+        """Give up the trial without an outcome (request cancelled)."""
+        self._trial_in_flight = False
+
+    def record_success(self):
+        if self.state != self.CLOSED:
+            logger.info("LLM circuit closed")
+        self.state = self.CLOSED
+        self.failures = 0
+        self._trial_in_flight = False
+
+    def record_failure(self):
+        self.failures += 1
+        self._trial_in_flight = False
+        if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            if self.state != self.OPEN:
+                logger.warning(f"LLM circuit opened after {self.failures} failures")
+            self.state = self.OPEN
+            self.opened_at = time.monotonic()
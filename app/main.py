@@ -3,12 +3,21 @@ Entry point для Telegram бота.
 """
 import asyncio
 import logging
+import signal
 from aiogram import Bot, Dispatcher
-from aiogram.fsm.storage.memory import MemoryStorage
 
 from app.config import settings
 from app.bot.handlers import router
 from app.bot.states import ConversationState
+from app.db.supabase import init_db_pool, close_db_pool
+from app.db.cache import cache_listener
+from app.memory.embeddings import embeddings_service
+from app.memory.write_queue import memory_write_queue
+from app.memory.conversation import conversation_history
+from app.observability.tracing import configure_tracing
+from app.observability.metrics import MetricsServer, register_default_collectors
+from app.bot.storage import create_fsm_storage
+from app.bot.webhook import WebhookServer, register_webhook
 
 
 # Configure logging
@@ -19,6 +28,59 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
+async def run_webhook(bot: Bot, dp: Dispatcher):
+    """
+    Serve updates over webhook until SIGINT/SIGTERM, then drain and stop.
+    """
+    if settings.webhook_register and not settings.webhook_url:
+        raise RuntimeError("BOT_MODE=webhook requires WEBHOOK_URL (or WEBHOOK_REGISTER=false)")
+    if not settings.webhook_secret:
+        logger.warning("WEBHOOK_SECRET is not set: webhook requests are not authenticated")
+    
+    server = WebhookServer(
+        dp,
+        bot,
+        host=settings.webhook_host,
+        port=settings.webhook_port,
+        path=settings.webhook_path,
+        secret_token=settings.webhook_secret,
+        max_concurrency=settings.webhook_max_concurrency,
+        max_pending=settings.webhook_max_pending,
+        drain_timeout=settings.webhook_drain_timeout,
+    )
+    
+    if settings.metrics_enabled:
+        from app.observability.metrics import metrics
+        
+        metrics.register_collector(
+            "rpgate_webhook_pending_updates",
+            "Webhook updates accepted but not finished",
+            lambda: [({}, server.handler.pending)],
+        )
+    
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop.set)
+        except NotImplementedError:  # Windows
+            pass
+    
+    await server.start()
+    try:
+        if settings.webhook_register:
+            await register_webhook(
+                bot,
+                settings.webhook_url.rstrip("/") + settings.webhook_path,
+                settings.webhook_secret,
+                dp.resolve_used_update_types(),
+            )
+        await stop.wait()
+        logger.info("Shutdown signal received, draining webhook updates...")
+    finally:
+        await server.stop()
+
+
 async def async_main():
     """
     Async main function для запуска бота.
@@ -26,22 +88,59 @@ async def async_main():
     # Initialize Bot instance
     bot = Bot(token=settings.telegram_bot_token)
     
-    # Initialize Dispatcher with FSM storage
-    storage = MemoryStorage()
+    # Initialize Dispatcher with FSM storage (memory, Postgres or Redis)
+    storage = create_fsm_storage()
     dp = Dispatcher(storage=storage)
     
     # Register router with handlers
     dp.include_router(router)
     
-    logger.info("Starting bot...")
+    # Per-turn trace export (JSON log line, optional OpenTelemetry, metrics)
+    configure_tracing()
+    
+    # Optional Prometheus endpoint
+    metrics_server = None
+    if settings.metrics_enabled:
+        register_default_collectors()
+        metrics_server = MetricsServer(settings.metrics_host, settings.metrics_port)
+        await metrics_server.start()
+    
+    # Shared DB connection pool for all app/db modules
+    await init_db_pool()
+    
+    # Drop cached rows that other replicas changed
+    if settings.db_cache_listen and settings.supabase_db_url and settings.db_cache_size > 0:
+        await cache_listener.start()
+    
+    # Background writer for episodic memories
+    if settings.memory_queue_enabled:
+        await memory_write_queue.start()
+    
+    # Batched appends of conversation history
+    await conversation_history.start()
+    
+    logger.info(f"Starting bot ({settings.bot_mode})...")
     
     try:
-        # Start polling
-        await dp.start_polling(
-            bot,
-            allowed_updates=dp.resolve_used_update_types()
-        )
+        if settings.bot_mode == "webhook":
+            # Several replicas behind a load balancer share the traffic
+            await run_webhook(bot, dp)
+        else:
+            # Start polling
+            await dp.start_polling(
+                bot,
+                allowed_updates=dp.resolve_used_update_types()
+            )
     finally:
+        # Drain pending memory writes while DB pool and HTTP client are still open
+        await memory_write_queue.stop(timeout=settings.memory_queue_drain_timeout)
+        await conversation_history.stop()
+        await embeddings_service.aclose()
+        await storage.close()
+        await cache_listener.stop()
+        await close_db_pool()
+        if metrics_server is not None:
+            await metrics_server.stop()
         await bot.session.close()
 
 
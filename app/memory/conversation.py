@@ -0,0 +1,291 @@
+"""Recent conversation history per character.
+
+A fixed-size deque per active character sits in front of the append-only
+conversation_turns table:
+
+- reading the history of an active character needs no query
+- appending a turn is O(1): the buffer is updated and the messages are
+  queued; a background task writes everything queued in one statement
+- the table keeps history across restarts and is the source when a buffer
+  is cold (restart, eviction, or invalidated because another replica
+  appended for the character)
+"""
+import asyncio
+import logging
+from collections import OrderedDict, deque
+from datetime import datetime, timezone
+from typing import Deque, List, Optional
+from uuid import UUID
+
+from app.config import settings
+from app.db.cache import register_cache
+from app.db.conversation_turns import (
+    append_conversation_turns,
+    delete_conversation_turns,
+    get_recent_conversation_turns,
+)
+from app.db.models import ConversationTurnDB
+
+logger = logging.getLogger(__name__)
+
+
+class ConversationHistory:
+    """
+    Ring buffers of recent messages with batched appends.
+
+    Usage:
+        await conversation_history.start()
+        history = await conversation_history.recent(character_id)
+        await conversation_history.append(character_id, user_message, reply)
+        await conversation_history.stop()  # flushes queued appends
+    """
+
+    def __init__(
+        self,
+        max_messages: int = 20,
+        max_characters: int = 10000,
+        flush_interval: float = 0.5,
+        batch_size: int = 200,
+        max_retries: int = 3,
+        retry_delay: float = 0.5,
+    ):
+        """
+        Initialize history (the background writer starts in start()).
+
+        Args:
+            max_messages: Messages kept per character
+            max_characters: Buffers kept in memory (least recently used evicted)
+            flush_interval: Seconds appends are collected before a write
+            batch_size: Max messages per write
+            max_retries: Retries per write before the batch is dropped
+            retry_delay: Base delay between retries (doubles each attempt)
+        """
+        self.max_messages = max(1, max_messages)
+        self.max_characters = max_characters
+        self.flush_interval = flush_interval
+        self.batch_size = max(1, batch_size)
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+
+        self._buffers: "OrderedDict[UUID, Deque[ConversationTurnDB]]" = OrderedDict()
+        self._pending: List[ConversationTurnDB] = []
+        self._in_flight: List[ConversationTurnDB] = []
+        self._flush_lock = asyncio.Lock()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        # Bumped on invalidation; loads that raced one are not kept
+        self._epoch = 0
+
+        # Stats
+        self.hits = 0
+        self.misses = 0
+        self.written = 0
+        self.failed = 0
+        self.batches = 0
+
+    @property
+    def running(self) -> bool:
+        """True if the background writer is running."""
+        return self._task is not None
+
+    @property
+    def depth(self) -> int:
+        """Messages waiting to be written."""
+        return len(self._pending)
+
+    async def start(self):
+        """Start the background writer."""
+        if self.running:
+            return
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._writer(), name="conversation-writer")
+        logger.info(f"Conversation history writer started (flush every {self.flush_interval}s)")
+
+    async def stop(self, timeout: float = 10.0):
+        """
+        Stop the writer and write everything still queued.
+
+        Args:
+            timeout: Max seconds to wait for the final write
+        """
+        if self._task is None:
+            return
+        task, self._task = self._task, None
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        try:
+            await asyncio.wait_for(self.flush(), timeout=timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"Conversation flush timed out, {self.depth} messages dropped")
+        logger.info(f"Conversation history writer stopped: {self.stats()}")
+
+    async def recent(self, character_id: UUID) -> List[dict]:
+        """
+        Latest messages of a character, oldest first.
+
+        Returns:
+            [{"role": "user" | "assistant", "content": str}, ...]
+        """
+        buffer = self._buffers.get(character_id)
+        if buffer is not None:
+            self._buffers.move_to_end(character_id)
+            self.hits += 1
+        else:
+            self.misses += 1
+            buffer = await self._load(character_id)
+        return [{"role": turn.role, "content": turn.content} for turn in buffer]
+
+    async def append(self, character_id: UUID, user_message: str, reply: str):
+        """
+        Append one exchange (player message and reply).
+
+        Queued for the background writer; written inline if it is not running.
+        """
+        now = datetime.now(timezone.utc)
+        turns = [
+            ConversationTurnDB(
+                character_id=character_id, role=role, content=content, created_at=now
+            )
+            for role, content in (("user", user_message), ("assistant", reply))
+        ]
+
+        buffer = self._buffers.get(character_id)
+        if buffer is not None:
+            buffer.extend(turns)
+
+        self._pending.extend(turns)
+        if self.running:
+            self._wakeup.set()
+        else:
+            await self.flush()
+
+    async def reset(self, character_id: UUID):
+        """Forget the conversation of a character (new adventure)."""
+        async with self._flush_lock:
+            self._pending = [turn for turn in self._pending if turn.character_id != character_id]
+            # A load already in flight must not remember pre-reset rows
+            self._epoch += 1
+            self._remember(character_id, deque(maxlen=self.max_messages))
+            try:
+                deleted = await delete_conversation_turns(character_id)
+            except Exception as e:  # connection errors are raised, query errors return False
+                logger.error(f"Failed to delete conversation history: {e}")
+                deleted = False
+            if not deleted:
+                # Rows are still stored; reload them rather than pretend they are gone
+                logger.error(f"Conversation history of {character_id} was not reset")
+                self._buffers.pop(character_id, None)
+
+    async def flush(self):
+        """Write queued messages now, batch_size per statement."""
+        async with self._flush_lock:
+            while self._pending:
+                batch = self._in_flight = self._pending[:self.batch_size]
+                del self._pending[:self.batch_size]
+                try:
+                    await self._write_batch(batch)
+                except asyncio.CancelledError:
+                    # Writer stopped mid-write: stop() writes it again
+                    self._pending[0:0] = batch
+                    raise
+                finally:
+                    self._in_flight = []
+
+    def invalidate(self, character_id: UUID):
+        """Drop the buffer of a character (appended to by another replica)."""
+        self._epoch += 1
+        self._buffers.pop(character_id, None)
+
+    def clear(self):
+        """Drop all buffers (queued appends are kept)."""
+        self._epoch += 1
+        self._buffers.clear()
+
+    def stats(self) -> dict:
+        """Buffer hits/misses and write counters."""
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "size": len(self._buffers),
+            "depth": self.depth,
+            "written": self.written,
+            "failed": self.failed,
+            "batches": self.batches,
+        }
+
+    def _remember(self, character_id: UUID, buffer: Deque[ConversationTurnDB]):
+        if self.max_characters <= 0:
+            return
+        self._buffers[character_id] = buffer
+        self._buffers.move_to_end(character_id)
+        while len(self._buffers) > self.max_characters:
+            self._buffers.popitem(last=False)
+
+    async def _load(self, character_id: UUID) -> Deque[ConversationTurnDB]:
+        """Fill a cold buffer from the table plus appends not written yet."""
+        epoch = self._epoch
+        try:
+            stored = await get_recent_conversation_turns(character_id, self.max_messages)
+        except Exception as e:
+            logger.error(f"Failed to load conversation history: {e}")
+            stored = None
+
+        # Queued or in-flight appends are newer than anything stored
+        last = stored[-1].created_at if stored else None
+        unsent = [
+            turn for turn in self._in_flight + self._pending
+            if turn.character_id == character_id and (last is None or turn.created_at > last)
+        ]
+        buffer = deque((stored or []) + unsent, maxlen=self.max_messages)
+
+        # Keep it only if it is complete and nothing invalidated it meanwhile
+        if stored is not None and epoch == self._epoch:
+            self._remember(character_id, buffer)
+        return buffer
+
+    async def _writer(self):
+        """Collect appends for flush_interval seconds, then write them."""
+        while True:
+            await self._wakeup.wait()
+            await asyncio.sleep(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                await self.flush()
+            except Exception as e:  # pragma: no cover - _write_batch handles errors
+                logger.error(f"Conversation writer error: {e}", exc_info=True)
+
+    async def _write_batch(self, batch: List[ConversationTurnDB]):
+        """Write batch with retries; drop it after max_retries failures."""
+        self.batches += 1
+        for attempt in range(self.max_retries + 1):
+            try:
+                await append_conversation_turns(batch)
+                self.written += len(batch)
+                return
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                if attempt >= self.max_retries or not self.running:
+                    self.failed += len(batch)
+                    logger.error(
+                        f"Dropping {len(batch)} conversation messages after "
+                        f"{attempt + 1} attempts: {e}"
+                    )
+                    return
+                delay = self.retry_delay * (2 ** attempt)
+                logger.warning(
+                    f"Conversation write failed (attempt {attempt + 1}), "
+                    f"retrying in {delay:.1f}s: {e}"
+                )
+                await asyncio.sleep(delay)
+
+
+# Global instance
+conversation_history = ConversationHistory(
+    max_messages=settings.conversation_history_size,
+    max_characters=settings.conversation_cache_size,
+    flush_interval=settings.conversation_flush_interval,
+)
+
+# Appends by other replicas invalidate buffers (migration 006)
+register_cache("conversation_turns", conversation_history, UUID)
@@ -0,0 +1,147 @@
+"""Micro-batcher that coalesces concurrent single-text embedding requests.
+
+Concurrent embed_text() calls arriving within a short window are sent as one
+batch request. Each caller awaits its own future; identical in-flight texts
+share one slot in the batch.
+"""
+import asyncio
+import logging
+from typing import Awaitable, Callable, Dict, List, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+
+BatchFn = Callable[[List[str]], Awaitable[List[List[float]]]]
+KeyFn = Callable[[str], str]
+
+
+class EmbeddingBatcher:
+    """
+    Collect texts for up to max_wait_ms or max_batch_size items, then flush.
+
+    Usage:
+        batcher = EmbeddingBatcher(service._fetch_batch, key_fn=service._cache_key)
+        vector = await batcher.submit("атакую гоблина")
+    """
+
+    def __init__(
+        self,
+        batch_fn: BatchFn,
+        key_fn: KeyFn,
+        max_batch_size: int = 32,
+        max_wait_ms: float = 5.0,
+    ):
+        """
+        Initialize batcher.
+
+        Args:
+            batch_fn: Coroutine embedding a list of texts (same order in result)
+            key_fn: Dedup key for a text (identical keys share one request slot)
+            max_batch_size: Flush as soon as this many distinct texts are pending
+            max_wait_ms: Max time the first pending text waits before flush
+        """
+        self.batch_fn = batch_fn
+        self.key_fn = key_fn
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max_wait_ms / 1000.0
+
+        self._pending: Dict[str, tuple[str, asyncio.Future]] = {}
+        self._flush_task: Optional[asyncio.Task] = None
+        # The loop only keeps weak references to tasks; flushes must not be collected
+        self._tasks: Set[asyncio.Task] = set()
+
+        # Stats
+        self.batches_sent = 0
+        self.texts_sent = 0
+        self.requests = 0
+        self.deduplicated = 0
+
+    async def submit(self, text: str) -> List[float]:
+        """
+        Queue text for the next batch and wait for its vector.
+
+        Raises:
+            Exception: If the batch request fails
+        """
+        self.requests += 1
+        key = self.key_fn(text)
+
+        entry = self._pending.get(key)
+        if entry is not None:
+            self.deduplicated += 1
+            return await asyncio.shield(entry[1])
+
+        future = asyncio.get_running_loop().create_future()
+        self._pending[key] = (text, future)
+
+        if len(self._pending) >= self.max_batch_size:
+            self._flush_now()
+        elif self._flush_task is None:
+            self._flush_task = self._spawn(self._flush_after_wait())
+
+        return await asyncio.shield(future)
+
+    async def _flush_after_wait(self):
+        """Flush once the wait window closes."""
+        try:
+            await asyncio.sleep(self.max_wait)
+        except asyncio.CancelledError:
+            return
+        self._flush_task = None
+        await self._flush(self._take_pending())
+
+    def _flush_now(self):
+        """Flush immediately (batch is full)."""
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            self._flush_task = None
+        self._spawn(self._flush(self._take_pending()))
+
+    def _spawn(self, coro) -> asyncio.Task:
+        """Start a background task and keep it referenced until it is done."""
+        task = asyncio.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    def _take_pending(self) -> Dict[str, tuple[str, asyncio.Future]]:
+        pending, self._pending = self._pending, {}
+        return pending
+
+    async def _flush(self, pending: Dict[str, tuple[str, asyncio.Future]]):
+        """Send one batch request and resolve all waiting futures."""
+        if not pending:
+            return
+
+        entries = list(pending.values())
+        texts = [text for text, _ in entries]
+        self.batches_sent += 1
+        self.texts_sent += len(texts)
+
+        try:
+            vectors = await self.batch_fn(texts)
+            if len(vectors) != len(texts):
+                raise ValueError(
+                    f"Batch returned {len(vectors)} embeddings for {len(texts)} texts"
+                )
+        except Exception as e:
+            logger.error(f"Embedding batch of {len(texts)} failed: {e}")
+            for _, future in entries:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        logger.debug(f"Embedding batch flushed: {len(texts)} texts")
+        for (_, future), vector in zip(entries, vectors):
+            if not future.done():
+                future.set_result(vector)
+
+    def stats(self) -> dict:
+        """Return batching counters."""
+        return {
+            "requests": self.requests,
+            "batches_sent": self.batches_sent,
+            "texts_sent": self.texts_sent,
+            "deduplicated": self.deduplicated,
+            "avg_batch_size": self.texts_sent / self.batches_sent if self.batches_sent else 0.0,
+        }
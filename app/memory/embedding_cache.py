@@ -0,0 +1,177 @@
+"""Content-addressed cache for embedding vectors.
+
+Two tiers:
+- in-memory LRU (bounded number of entries)
+- optional persistent SQLite file
+
+Vectors are stored as fp16 bytes in both tiers. The DB column is
+halfvec(2560) anyway, so no precision is lost compared to what we persist.
+"""
+import asyncio
+import hashlib
+import logging
+import re
+import sqlite3
+import struct
+import threading
+import unicodedata
+from collections import OrderedDict
+from typing import List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_text(text: str) -> str:
+    """Normalize text for cache keys (unicode NFC, case, whitespace)."""
+    text = unicodedata.normalize("NFC", text)
+    return re.sub(r"\s+", " ", text).strip().lower()
+
+
+def make_cache_key(model: str, dimension: int, text: str) -> str:
+    """Build content-addressed key from (model, dimension, normalized text hash)."""
+    digest = hashlib.sha256(normalize_text(text).encode("utf-8")).hexdigest()
+    return f"{model}:{dimension}:{digest}"
+
+
+def pack_vector(vector: List[float]) -> bytes:
+    """Pack vector as little-endian fp16."""
+    return struct.pack(f"<{len(vector)}e", *vector)
+
+
+def unpack_vector(data: bytes) -> List[float]:
+    """Unpack little-endian fp16 bytes to list of floats."""
+    return list(struct.unpack(f"<{len(data) // 2}e", data))
+
+
+class EmbeddingCache:
+    """
+    LRU cache of embeddings with optional SQLite persistence.
+
+    Stats (hits/misses) are exposed via stats().
+    """
+
+    def __init__(self, max_entries: int = 1024, path: Optional[str] = None):
+        """
+        Initialize cache.
+
+        Args:
+            max_entries: Max vectors kept in memory (0 disables memory tier)
+            path: SQLite file for persistent tier (None disables it)
+        """
+        self.max_entries = max_entries
+        self.path = path
+        self._memory: "OrderedDict[str, bytes]" = OrderedDict()
+        self._db: Optional[sqlite3.Connection] = None
+        self._db_lock = threading.Lock()
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        if path:
+            self._open_db(path)
+
+    def _open_db(self, path: str):
+        """Open (or create) persistent tier."""
+        try:
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB NOT NULL)"
+            )
+            self._db.commit()
+            logger.info(f"Embedding cache persistent tier: {path}")
+        except Exception as e:
+            logger.error(f"Failed to open embedding cache at {path}: {e}")
+            self._db = None
+
+    def _remember(self, key: str, data: bytes):
+        """Put into memory tier, evicting least recently used entries."""
+        if self.max_entries <= 0:
+            return
+        self._memory[key] = data
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def _disk_get(self, key: str) -> Optional[bytes]:
+        with self._db_lock:
+            row = self._db.execute(
+                "SELECT vector FROM embeddings WHERE key = ?", (key,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def _disk_put(self, key: str, data: bytes):
+        with self._db_lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)", (key, data)
+            )
+            self._db.commit()
+
+    async def get(self, key: str) -> Optional[List[float]]:
+        """
+        Look up vector by key.
+
+        Returns:
+            Vector or None on miss
+        """
+        data = self._memory.get(key)
+        if data is not None:
+            self._memory.move_to_end(key)
+            self.memory_hits += 1
+            return unpack_vector(data)
+
+        if self._db is not None:
+            try:
+                data = await asyncio.to_thread(self._disk_get, key)
+            except Exception as e:
+                logger.warning(f"Embedding cache disk read failed: {e}")
+                data = None
+
+            if data is not None:
+                self._remember(key, data)
+                self.disk_hits += 1
+                return unpack_vector(data)
+
+        self.misses += 1
+        return None
+
+    async def put(self, key: str, vector: List[float]):
+        """Store vector in all enabled tiers."""
+        try:
+            data = pack_vector(vector)
+        except (OverflowError, struct.error) as e:
+            logger.warning(f"Embedding not cacheable as fp16: {e}")
+            return
+
+        self._remember(key, data)
+
+        if self._db is not None:
+            try:
+                await asyncio.to_thread(self._disk_put, key, data)
+            except Exception as e:
+                logger.warning(f"Embedding cache disk write failed: {e}")
+
+    def stats(self) -> dict:
+        """Return hit/miss counters."""
+        hits = self.memory_hits + self.disk_hits
+        total = hits + self.misses
+        return {
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": hits / total if total else 0.0,
+            "memory_entries": len(self._memory),
+        }
+
+    def clear(self):
+        """Drop memory tier and reset counters (persistent tier is kept)."""
+        self._memory.clear()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def close(self):
+        """Close persistent tier."""
+        if self._db is not None:
+            self._db.close()
+            self._db = None
@@ -1,12 +1,24 @@
 """Embeddings service для vector search using OpenRouter."""
-from typing import List
+from typing import Any, List, Optional
 import httpx
 from app.config import settings
+from app.memory.embedding_cache import EmbeddingCache, make_cache_key
+from app.memory.embedding_batcher import EmbeddingBatcher
+from app.observability.tracing import EMBEDDING, span
 import logging
 
 logger = logging.getLogger(__name__)
 
 
+def _http2_available() -> bool:
+    """HTTP/2 needs the optional 'h2' package (pip install 'httpx[http2]')."""
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
 class EmbeddingsService:
     """Service для генерации embeddings через OpenRouter API."""
     
@@ -14,7 +26,87 @@ class EmbeddingsService:
         self.model = settings.embedding_model
         self.dimension = settings.embedding_dimension
         self.api_key = settings.openrouter_api_key
-        self.base_url = "https://openrouter.ai/api/v1"
+        self.base_url = settings.openrouter_base_url
+        self._client: Optional[httpx.AsyncClient] = None
+        self.cache = EmbeddingCache(
+            max_entries=settings.embedding_cache_size,
+            path=settings.embedding_cache_path,
+        )
+        self.batcher: Optional[EmbeddingBatcher] = None
+        if settings.embedding_batch_max_wait_ms > 0:
+            self.batcher = EmbeddingBatcher(
+                self._fetch_batch,
+                key_fn=self._cache_key,
+                max_batch_size=settings.embedding_batch_max_size,
+                max_wait_ms=settings.embedding_batch_max_wait_ms,
+            )
+    
+    def _cache_key(self, text: str) -> str:
+        """Cache key for text under current model/dimension."""
+        return make_cache_key(self.model, self.dimension, text)
+    
+    def _get_client(self) -> httpx.AsyncClient:
+        """
+        Get long-lived HTTP client (created lazily, reused across calls).
+        
+        Keeps connections to OpenRouter alive so each embedding call
+        skips the TCP+TLS handshake.
+        """
+        if self._client is None or self._client.is_closed:
+            http2 = settings.embedding_http2 and _http2_available()
+            if settings.embedding_http2 and not http2:
+                logger.warning(
+                    "HTTP/2 requested for embeddings but 'h2' is not installed. "
+                    "Falling back to HTTP/1.1 keep-alive."
+                )
+            
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                http2=http2,
+                limits=httpx.Limits(
+                    max_connections=settings.embedding_max_connections,
+                    max_keepalive_connections=settings.embedding_max_keepalive_connections,
+                    keepalive_expiry=settings.embedding_keepalive_expiry,
+                ),
+                timeout=httpx.Timeout(
+                    settings.embedding_read_timeout,
+                    connect=settings.embedding_connect_timeout,
+                ),
+                headers={
+                    "Authorization": f"Bearer {self.api_key}",
+                    "HTTP-Referer": settings.site_url,
+                    "Content-Type": "application/json",
+                },
+            )
+        return self._client
+    
+    async def aclose(self):
+        """Close HTTP client and cache (called on bot shutdown)."""
+        if self._client is not None and not self._client.is_closed:
+            await self._client.aclose()
+            logger.info("Embeddings HTTP client closed")
+        self._client = None
+        self.cache.close()
+    
+    async def _request_embeddings(self, input_data: Any, read_timeout: float) -> dict:
+        """POST to /embeddings using the shared client and return parsed JSON."""
+        inputs = len(input_data) if isinstance(input_data, list) else 1
+        with span("embedding.request", kind=EMBEDDING, model=self.model, inputs=inputs):
+            response = await self._get_client().post(
+                "/embeddings",
+                json={
+                    "model": self.model,
+                    "input": input_data,
+                    "dimensions": self.dimension,  # Request specific dimension
+                },
+                timeout=httpx.Timeout(
+                    read_timeout,
+                    connect=settings.embedding_connect_timeout,
+                ),
+            )
+            
+            response.raise_for_status()
+            return response.json()
     
     async def embed_text(self, text: str) -> List[float]:
         """
@@ -29,45 +121,46 @@ class EmbeddingsService:
         Raises:
             Exception: If API call fails
         """
+        cache_key = self._cache_key(text)
+        cached = await self.cache.get(cache_key)
+        if cached is not None:
+            logger.debug(f"Embedding cache hit for text: {text[:50]}...")
+            return cached
+        
+        if self.batcher is not None:
+            # Coalesce with concurrent requests into one batch call
+            try:
+                embedding = await self.batcher.submit(text)
+            except Exception as e:
+                logger.error(f"Failed to generate embedding: {e}")
+                raise
+            
+            await self.cache.put(cache_key, embedding)
+            return embedding
+        
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    f"{self.base_url}/embeddings",
-                    headers={
-                        "Authorization": f"Bearer {self.api_key}",
-                        "HTTP-Referer": settings.site_url,
-                        "Content-Type": "application/json",
-                    },
-                    json={
-                        "model": self.model,
-                        "input": text,
-                        "dimensions": self.dimension,  # Request specific dimension
-                    },
-                    timeout=30.0,
+            data = await self._request_embeddings(text, settings.embedding_read_timeout)
+            
+            embedding = data["data"][0]["embedding"]
+            
+            # Ensure all elements are float (API sometimes returns int for zeros)
+            embedding = [float(x) for x in embedding]
+            
+            # Validate dimension (should match exactly now with qwen-4b)
+            if len(embedding) != self.dimension:
+                logger.warning(
+                    f"Expected {self.dimension} dimensions, got {len(embedding)}. "
+                    f"This may indicate model configuration mismatch."
                 )
-                
-                response.raise_for_status()
-                data = response.json()
-                
-                embedding = data["data"][0]["embedding"]
-                
-                # Ensure all elements are float (API sometimes returns int for zeros)
-                embedding = [float(x) for x in embedding]
-                
-                # Validate dimension (should match exactly now with qwen-4b)
-                if len(embedding) != self.dimension:
-                    logger.warning(
-                        f"Expected {self.dimension} dimensions, got {len(embedding)}. "
-                        f"This may indicate model configuration mismatch."
-                    )
-                    # Only adjust if really necessary
-                    if abs(len(embedding) - self.dimension) > 10:
-                        embedding = self._adjust_dimension(embedding)
-                
-                logger.debug(f"Generated embedding for text: {text[:50]}...")
-                
-                return embedding
-                
+                # Only adjust if really necessary
+                if abs(len(embedding) - self.dimension) > 10:
+                    embedding = self._adjust_dimension(embedding)
+            
+            logger.debug(f"Generated embedding for text: {text[:50]}...")
+            
+            await self.cache.put(cache_key, embedding)
+            return embedding
+            
         except Exception as e:
             logger.error(f"Failed to generate embedding: {e}")
             raise
@@ -88,50 +181,68 @@ class EmbeddingsService:
         if not texts:
             return []
         
+        # Serve cached vectors, request only the misses
+        cache_keys = [self._cache_key(text) for text in texts]
+        results: List[Optional[List[float]]] = [
+            await self.cache.get(key) for key in cache_keys
+        ]
+        missing = [i for i, vector in enumerate(results) if vector is None]
+        
+        if not missing:
+            logger.debug(f"Embedding cache served whole batch of {len(texts)}")
+            return results  # type: ignore[return-value]
+        
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    f"{self.base_url}/embeddings",
-                    headers={
-                        "Authorization": f"Bearer {self.api_key}",
-                        "HTTP-Referer": settings.site_url,
-                        "Content-Type": "application/json",
-                    },
-                    json={
-                        "model": self.model,
-                        "input": texts,
-                        "dimensions": self.dimension,  # Request specific dimension
-                    },
-                    timeout=60.0,
-                )
-                
-                response.raise_for_status()
-                data = response.json()
-                
-                embeddings = [item["embedding"] for item in data["data"]]
-                
-                # Ensure all elements are float (API sometimes returns int for zeros)
-                embeddings = [[float(x) for x in emb] for emb in embeddings]
-                
-                # Validate dimensions (should match now)
-                for i, embedding in enumerate(embeddings):
-                    if len(embedding) != self.dimension:
-                        logger.warning(
-                            f"Embedding {i}: expected {self.dimension} dimensions, "
-                            f"got {len(embedding)}."
-                        )
-                        # Only adjust if significantly different
-                        if abs(len(embedding) - self.dimension) > 10:
-                            embeddings[i] = self._adjust_dimension(embedding)
-                
-                logger.info(f"Generated {len(embeddings)} embeddings in batch")
-                
-                return embeddings
-                
+            embeddings = await self._fetch_batch([texts[i] for i in missing])
+            
+            logger.info(
+                f"Generated {len(embeddings)} embeddings in batch "
+                f"({len(texts) - len(missing)} from cache)"
+            )
+            
+            for i, embedding in zip(missing, embeddings):
+                results[i] = embedding
+                await self.cache.put(cache_keys[i], embedding)
+            
+            return results  # type: ignore[return-value]
+            
         except Exception as e:
             logger.error(f"Failed to generate batch embeddings: {e}")
             raise
     
+    async def _fetch_batch(self, texts: List[str]) -> List[List[float]]:
+        """
+        Request embeddings for texts from the API (no cache).
+        
+        Used by embed_batch and by the micro-batcher.
+        
+        Returns:
+            Embedding vectors in the same order as texts
+        """
+        # Batches get twice the read timeout
+        data = await self._request_embeddings(texts, settings.embedding_read_timeout * 2)
+        
+        items = data["data"]
+        if all("index" in item for item in items):
+            items = sorted(items, key=lambda item: item["index"])
+        embeddings = [item["embedding"] for item in items]
+        
+        # Ensure all elements are float (API sometimes returns int for zeros)
+        embeddings = [[float(x) for x in emb] for emb in embeddings]
+        
+        # Validate dimensions (should match now)
+        for i, embedding in enumerate(embeddings):
+            if len(embedding) != self.dimension:
+                logger.warning(
+                    f"Embedding {i}: expected {self.dimension} dimensions, "
+                    f"got {len(embedding)}."
+                )
+                # Only adjust if significantly different
+                if abs(len(embedding) - self.dimension) > 10:
+                    embeddings[i] = self._adjust_dimension(embedding)
+        
+        return embeddings
+    
     def _adjust_dimension(self, embedding: List[float]) -> List[float]:
         """
         Adjust embedding dimension to match configured dimension.
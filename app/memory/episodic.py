@@ -6,14 +6,17 @@ for semantic search and retrieval.
 """
 
 import logging
-from typing import List, Optional
+from typing import List, Optional, TYPE_CHECKING
 from uuid import UUID
 import asyncpg
 
-from app.db.supabase import get_db_connection
-from app.db.models import EpisodicMemoryDB
+from app.db.supabase import db_connection
+from app.db.models import EpisodicMemoryDB, EpisodicMemoryCreate
 from app.memory.embeddings import embeddings_service
 
+if TYPE_CHECKING:
+    from app.db.turn_commit import TurnCommit
+
 logger = logging.getLogger(__name__)
 
 
@@ -58,8 +61,7 @@ class EpisodicMemoryManager:
             embedding_str = "[" + ",".join(str(x) for x in embedding) + "]"
             
             # Insert into database
-            conn = await get_db_connection()
-            try:
+            async with db_connection() as conn:
                 query = """
                     INSERT INTO episodic_memories 
                     (character_id, session_id, content, embedding, memory_type, 
@@ -96,14 +98,109 @@ class EpisodicMemoryManager:
                     
                     logger.info(f"Created memory {memory.id} for character {character_id}")
                     return memory
-                    
-            finally:
-                await conn.close()
                 
         except Exception as e:
             logger.error(f"Error creating memory: {e}", exc_info=True)
             return None
     
+    async def stage_memory(
+        self,
+        turn_commit: "TurnCommit",
+        character_id: UUID,
+        content: str,
+        session_id: Optional[UUID] = None,
+        memory_type: str = "event",
+        importance_score: int = 5,
+        entities: Optional[List[str]] = None,
+        location: Optional[str] = None,
+    ) -> bool:
+        """
+        Generate embedding and stage memory insert into a TurnCommit.
+        
+        The row is written when the turn commits, together with the other
+        end-of-turn writes.
+        
+        Returns:
+            True if staged, False if embedding generation failed
+        """
+        try:
+            logger.info(f"Generating embedding for memory: {content[:50]}...")
+            embedding = await embeddings_service.embed_text(content)
+            
+            if not embedding:
+                logger.error("Failed to generate embedding for memory")
+                return False
+            
+            turn_commit.add_memory(
+                character_id=character_id,
+                content=content,
+                embedding=embedding,
+                session_id=session_id,
+                memory_type=memory_type,
+                importance_score=importance_score,
+                entities=entities,
+                location=location,
+            )
+            return True
+            
+        except Exception as e:
+            logger.error(f"Error staging memory: {e}", exc_info=True)
+            return False
+    
+    async def create_memories_batch(self, memories: List[EpisodicMemoryCreate]) -> int:
+        """
+        Create several memories with one embeddings call and one insert batch.
+        
+        Used by the background write queue. Unlike create_memory, errors are
+        raised so the caller can retry.
+        
+        Args:
+            memories: Pending memory writes
+            
+        Returns:
+            Number of rows inserted
+            
+        Raises:
+            Exception: If embedding generation or insert fails
+        """
+        if not memories:
+            return 0
+        
+        embeddings = await embeddings_service.embed_batch([m.content for m in memories])
+        if len(embeddings) != len(memories):
+            raise ValueError(
+                f"Got {len(embeddings)} embeddings for {len(memories)} memories"
+            )
+        
+        rows = [
+            (
+                memory.character_id,
+                memory.session_id,
+                memory.content,
+                # PostgreSQL halfvec format string
+                "[" + ",".join(str(x) for x in embedding) + "]",
+                memory.memory_type,
+                memory.importance_score,
+                memory.entities,
+                memory.location,
+            )
+            for memory, embedding in zip(memories, embeddings)
+        ]
+        
+        async with db_connection() as conn:
+            await conn.executemany(
+                """
+                INSERT INTO episodic_memories 
+                (character_id, session_id, content, embedding, memory_type, 
+                 importance_score, entities, location)
+                VALUES ($1, $2, $3, $4, $5, $6, $7, $8)
+                """,
+                rows,
+            )
+        
+        logger.info(f"Created {len(rows)} memories in batch")
+        return len(rows)
+    
     async def search_memories(
         self,
         character_id: UUID,
@@ -140,8 +237,7 @@ class EpisodicMemoryManager:
             query_embedding_str = "[" + ",".join(str(x) for x in query_embedding) + "]"
             
             # Build query with filters
-            conn = await get_db_connection()
-            try:
+            async with db_connection() as conn:
                 sql_parts = [
                     """
                     SELECT 
@@ -199,9 +295,6 @@ class EpisodicMemoryManager:
                 logger.info(f"Found {len(results)} relevant memories")
                 return results
                 
-            finally:
-                await conn.close()
-                
         except Exception as e:
             logger.error(f"Error searching memories: {e}", exc_info=True)
             return []
@@ -224,8 +317,7 @@ class EpisodicMemoryManager:
             List of recent memories, newest first
         """
         try:
-            conn = await get_db_connection()
-            try:
+            async with db_connection() as conn:
                 if session_id:
                     query = """
                         SELECT id, character_id, session_id, content, memory_type,
@@ -265,9 +357,6 @@ class EpisodicMemoryManager:
                 logger.info(f"Retrieved {len(memories)} recent memories")
                 return memories
                 
-            finally:
-                await conn.close()
-                
         except Exception as e:
             logger.error(f"Error getting recent memories: {e}", exc_info=True)
             return []
@@ -275,8 +364,7 @@ class EpisodicMemoryManager:
     async def get_memory_by_id(self, memory_id: UUID) -> Optional[EpisodicMemoryDB]:
         """Get specific memory by ID."""
         try:
-            conn = await get_db_connection()
-            try:
+            async with db_connection() as conn:
                 query = """
                     SELECT id, character_id, session_id, content, memory_type,
                            importance_score, entities, location, created_at
@@ -299,9 +387,6 @@ class EpisodicMemoryManager:
                     )
                 return None
                 
-            finally:
-                await conn.close()
-                
         except Exception as e:
             logger.error(f"Error getting memory: {e}", exc_info=True)
             return None
@@ -0,0 +1,193 @@
+"""Background queue for episodic memory writes.
+
+Saving a memory needs an embeddings API call and an INSERT, and nothing in
+the reply depends on it. The orchestrator enqueues the write and returns;
+worker tasks pick up writes in batches (one embeddings call + one insert
+batch), retry failures with backoff and drain the queue on shutdown.
+"""
+import asyncio
+import logging
+from typing import List, Optional
+
+from app.config import settings
+from app.db.models import EpisodicMemoryCreate
+from app.memory.episodic import episodic_memory_manager
+
+logger = logging.getLogger(__name__)
+
+
+class MemoryWriteQueue:
+    """
+    Bounded asyncio queue with worker tasks for episodic memory writes.
+
+    Usage:
+        await memory_write_queue.start()
+        memory_write_queue.enqueue(EpisodicMemoryCreate(...))
+        await memory_write_queue.stop()  # drains pending writes
+    """
+
+    def __init__(
+        self,
+        max_size: int = 1000,
+        workers: int = 2,
+        batch_size: int = 16,
+        max_retries: int = 3,
+        retry_delay: float = 0.5,
+    ):
+        """
+        Initialize queue (workers start in start()).
+
+        Args:
+            max_size: Max pending writes; enqueue() refuses when full
+            workers: Number of worker tasks
+            batch_size: Max writes per batch
+            max_retries: Retries per batch before it is dropped
+            retry_delay: Base delay between retries (doubles each attempt)
+        """
+        self.max_size = max_size
+        self.workers = max(1, workers)
+        self.batch_size = max(1, batch_size)
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+
+        # Stats
+        self.enqueued = 0
+        self.written = 0
+        self.failed = 0
+        self.rejected = 0
+        self.retries = 0
+        self.batches = 0
+
+    @property
+    def running(self) -> bool:
+        """True if workers are accepting writes."""
+        return self._queue is not None and bool(self._tasks)
+
+    @property
+    def depth(self) -> int:
+        """Number of writes waiting in the queue (backlog metric)."""
+        return self._queue.qsize() if self._queue is not None else 0
+
+    async def start(self):
+        """Create queue and start worker tasks."""
+        if self.running:
+            return
+        self._queue = asyncio.Queue(maxsize=self.max_size)
+        self._tasks = [
+            asyncio.create_task(self._worker(i), name=f"memory-writer-{i}")
+            for i in range(self.workers)
+        ]
+        logger.info(f"Memory write queue started: {self.workers} workers, max_size={self.max_size}")
+
+    def enqueue(self, memory: EpisodicMemoryCreate) -> bool:
+        """
+        Queue memory write without waiting.
+
+        Returns:
+            True if queued, False if queue is not running or full
+            (caller should write synchronously instead)
+        """
+        if not self.running:
+            return False
+        try:
+            self._queue.put_nowait(memory)
+        except asyncio.QueueFull:
+            self.rejected += 1
+            logger.warning(f"Memory write queue full ({self.max_size}), writing inline")
+            return False
+        self.enqueued += 1
+        return True
+
+    async def stop(self, timeout: float = 10.0):
+        """
+        Drain pending writes (up to timeout seconds) and stop workers.
+
+        Args:
+            timeout: Max seconds to wait for the backlog to be written
+        """
+        if self._queue is None:
+            return
+
+        pending = self.depth
+        if pending:
+            logger.info(f"Draining memory write queue: {pending} pending")
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout=timeout)
+        except asyncio.TimeoutError:
+            logger.warning(
+                f"Memory write queue drain timed out, {self.depth} writes dropped"
+            )
+
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._queue = None
+        logger.info(f"Memory write queue stopped: {self.stats()}")
+
+    async def _worker(self, worker_id: int):
+        """Take up to batch_size writes at a time and persist them."""
+        queue = self._queue
+        while True:
+            batch = [await queue.get()]
+            while len(batch) < self.batch_size and not queue.empty():
+                batch.append(queue.get_nowait())
+
+            try:
+                await self._write_batch(batch)
+            except Exception as e:  # pragma: no cover - _write_batch handles errors
+                logger.error(f"Memory writer {worker_id} error: {e}", exc_info=True)
+            finally:
+                for _ in batch:
+                    queue.task_done()
+
+    async def _write_batch(self, batch: List[EpisodicMemoryCreate]):
+        """Write batch with retries; drop it after max_retries failures."""
+        self.batches += 1
+        for attempt in range(self.max_retries + 1):
+            try:
+                written = await episodic_memory_manager.create_memories_batch(batch)
+                self.written += written
+                return
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                if attempt >= self.max_retries:
+                    self.failed += len(batch)
+                    logger.error(
+                        f"Dropping {len(batch)} memory writes after "
+                        f"{attempt + 1} attempts: {e}"
+                    )
+                    return
+                self.retries += 1
+                delay = self.retry_delay * (2 ** attempt)
+                logger.warning(
+                    f"Memory batch write failed (attempt {attempt + 1}), "
+                    f"retrying in {delay:.1f}s: {e}"
+                )
+                await asyncio.sleep(delay)
+
+    def stats(self) -> dict:
+        """Return queue counters and current depth."""
+        return {
+            "depth": self.depth,
+            "enqueued": self.enqueued,
+            "written": self.written,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "retries": self.retries,
+            "batches": self.batches,
+        }
+
+
+# Global instance
+memory_write_queue = MemoryWriteQueue(
+    max_size=settings.memory_queue_max_size,
+    workers=settings.memory_queue_workers,
+    batch_size=settings.memory_queue_batch_size,
+    max_retries=settings.memory_queue_max_retries,
+    retry_delay=settings.memory_queue_retry_delay,
+)
@@ -0,0 +1 @@
+"""Observability: per-turn tracing."""
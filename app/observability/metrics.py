@@ -0,0 +1,404 @@
+"""
+Prometheus-style metrics.
+
+Small in-process registry (counters, gauges, histograms with labels)
+rendered in the Prometheus text exposition format, plus an optional
+aiohttp server exposing it on /metrics (METRICS_ENABLED).
+
+Turn, stage, LLM and DB timings are derived from finished turn traces
+(MetricsTraceExporter), so they need no extra instrumentation. Pool and
+queue sizes are read at scrape time by collectors.
+"""
+import logging
+import math
+from typing import Callable, Iterable, Optional
+
+from app.observability.tracing import DB, LLM, STAGE, TurnTrace
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0)
+
+# (labels, value) pairs produced by a collector for one metric
+Sample = tuple[dict[str, str], float]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(str(value))}"' for key, value in labels.items()) + "}"
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    type_name = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+
+    def _key(self, labels: dict) -> tuple:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _labels(self, key: tuple) -> dict[str, str]:
+        return dict(zip(self.labelnames, key))
+
+    def header(self) -> list[str]:
+        return [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.type_name}",
+        ]
+
+
+class Counter(_Metric):
+    """Monotonic counter."""
+
+    type_name = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: dict[tuple, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels):
+        if amount < 0:
+            raise ValueError("Counter can only increase")
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def render(self) -> list[str]:
+        return self.header() + [
+            f"{self.name}{_format_labels(self._labels(key))} {_format_value(value)}"
+            for key, value in sorted(self._values.items())
+        ]
+
+
+class Gauge(Counter):
+    """Value that can go up and down."""
+
+    type_name = "gauge"
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels):
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels):
+        self._values[self._key(labels)] = value
+
+
+class Histogram(_Metric):
+    """Cumulative-bucket histogram."""
+
+    type_name = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Iterable[str] = (),
+        buckets: Iterable[float] = LATENCY_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # key -> (bucket counts, sum, count)
+        self._series: dict[tuple, tuple[list[int], float, int]] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        counts, total, count = self._series.get(key) or ([0] * len(self.buckets), 0.0, 0)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                counts[i] += 1
+        self._series[key] = (counts, total + value, count + 1)
+
+    def count(self, **labels) -> int:
+        series = self._series.get(self._key(labels))
+        return series[2] if series else 0
+
+    def render(self) -> list[str]:
+        lines = self.header()
+        for key, (counts, total, count) in sorted(self._series.items()):
+            labels = self._labels(key)
+            for bound, bucket_count in zip(self.buckets, counts):
+                lines.append(
+                    f"{self.name}_bucket{_format_labels({**labels, 'le': _format_value(bound)})} {bucket_count}"
+                )
+            lines.append(f"{self.name}_bucket{_format_labels({**labels, 'le': '+Inf'})} {count}")
+            lines.append(f"{self.name}_sum{_format_labels(labels)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(labels)} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    """Named metrics plus scrape-time collectors."""
+
+    def __init__(self):
+        self._metrics: dict[str, _Metric] = {}
+        self._collectors: list[tuple[str, str, str, Callable[[], list[Sample]]]] = []
+
+    def _register(self, metric):
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Iterable[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Iterable[str] = ()) -> Gauge:
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Iterable[str] = (),
+        buckets: Iterable[float] = LATENCY_BUCKETS,
+    ) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def register_collector(
+        self,
+        name: str,
+        documentation: str,
+        collect: Callable[[], list[Sample]],
+        type_name: str = "gauge",
+    ):
+        """
+        Register a metric whose samples are read at scrape time.
+
+        Args:
+            name: Metric name
+            documentation: HELP text
+            collect: Returns [(labels, value), ...]; errors skip the metric
+            type_name: "gauge" or "counter"
+        """
+        self._collectors.append((name, documentation, type_name, collect))
+
+    def render(self) -> str:
+        """Prometheus text exposition (version 0.0.4)."""
+        lines: list[str] = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        for name, documentation, type_name, collect in self._collectors:
+            try:
+                samples = collect()
+            except Exception as e:
+                logger.warning(f"Metrics collector {name} failed: {e}")
+                continue
+            lines.append(f"# HELP {name} {documentation}")
+            lines.append(f"# TYPE {name} {type_name}")
+            lines.extend(
+                f"{name}{_format_labels(labels)} {_format_value(value)}"
+                for labels, value in samples
+            )
+        return "\n".join(lines) + "\n"
+
+
+# Global registry and application metrics
+metrics = MetricsRegistry()
+
+TURN_DURATION = metrics.histogram(
+    "rpgate_turn_duration_seconds", "End-to-end turn latency"
+)
+TURN_STAGE_DURATION = metrics.histogram(
+    "rpgate_turn_stage_duration_seconds", "Turn latency by stage", ["stage"]
+)
+TURN_STAGE_ERRORS = metrics.counter(
+    "rpgate_turn_stage_errors_total", "Stages that raised", ["stage"]
+)
+TURN_DEGRADED = metrics.counter(
+    "rpgate_turn_degraded_total", "Stages degraded by the turn deadline", ["stage"]
+)
+LLM_REQUEST_DURATION = metrics.histogram(
+    "rpgate_llm_request_duration_seconds", "LLM call latency", ["agent", "model"]
+)
+LLM_TOKENS = metrics.counter(
+    "rpgate_llm_tokens_total", "LLM tokens", ["agent", "model", "type"]
+)
+LLM_ERRORS = metrics.counter(
+    "rpgate_llm_errors_total", "Failed LLM calls", ["agent", "model"]
+)
+DB_QUERY_DURATION = metrics.histogram(
+    "rpgate_db_query_duration_seconds", "Database operation latency", ["operation"]
+)
+FSM_OPERATIONS = metrics.histogram(
+    "rpgate_fsm_storage_operation_duration_seconds", "FSM storage operations", ["operation"]
+)
+TURN_MAILBOX = metrics.counter(
+    "rpgate_turn_mailbox_messages_total",
+    "Messages merged into another turn (coalesced) or turns superseded (cancelled)",
+    ["outcome"],
+)
+FALLBACKS = metrics.counter(
+    "rpgate_fallbacks_total",
+    "Fallback paths taken (json_repair, intent_keyword, combat_state, narrative, memory)",
+    ["kind"],
+)
+
+
+def record_fallback(kind: str):
+    """Count a fallback path (no-op cost when nobody scrapes)."""
+    FALLBACKS.inc(kind=kind)
+
+
+class MetricsTraceExporter:
+    """Turn finished traces into latency/token/error metrics."""
+
+    def export(self, trace: TurnTrace):
+        if trace.duration_ms is not None:
+            TURN_DURATION.observe(trace.duration_ms / 1000)
+        for stage in trace.attributes.get("degraded", []):
+            TURN_DEGRADED.inc(stage=stage)
+
+        by_id = {span.span_id: span for span in trace.spans}
+
+        def stage_of(span) -> str:
+            # Top-level ancestor names the orchestrator stage (agent)
+            while span.parent_id is not None and span.parent_id in by_id:
+                span = by_id[span.parent_id]
+            return span.name if span.kind == STAGE else "other"
+
+        for span in trace.spans:
+            if span.duration_ms is None:
+                continue
+            seconds = span.duration_ms / 1000
+
+            if span.kind == STAGE and span.parent_id is None:
+                TURN_STAGE_DURATION.observe(seconds, stage=span.name)
+                if span.status == "error":
+                    TURN_STAGE_ERRORS.inc(stage=span.name)
+            elif span.kind == LLM:
+                agent = stage_of(span)
+                model = str(span.attributes.get("model", "unknown"))
+                LLM_REQUEST_DURATION.observe(seconds, agent=agent, model=model)
+                if span.status == "error":
+                    LLM_ERRORS.inc(agent=agent, model=model)
+                for token_type in ("prompt", "completion"):
+                    tokens = span.attributes.get(f"{token_type}_tokens")
+                    if tokens:
+                        LLM_TOKENS.inc(tokens, agent=agent, model=model, type=token_type)
+            elif span.kind == DB:
+                DB_QUERY_DURATION.observe(seconds, operation=span.name)
+
+
+_default_collectors_registered = False
+
+
+def register_default_collectors():
+    """Scrape-time gauges for pools, queues and caches (called once at startup)."""
+    global _default_collectors_registered
+    if _default_collectors_registered:
+        return
+    _default_collectors_registered = True
+    
+    from app.db.cache import cache_stats
+    from app.db.supabase import get_db_pool
+    from app.llm.client import llm_client
+    from app.memory.embeddings import embeddings_service
+    from app.memory.write_queue import memory_write_queue
+
+    def db_pool() -> list[Sample]:
+        pool = get_db_pool()
+        if pool is None:
+            return []
+        size = pool.get_size()
+        idle = pool.get_idle_size()
+        return [
+            ({"state": "in_use"}, size - idle),
+            ({"state": "idle"}, idle),
+            ({"state": "max"}, pool.get_max_size()),
+        ]
+
+    def embedding_cache() -> list[Sample]:
+        stats = embeddings_service.cache.stats()
+        return [
+            ({"result": "memory_hit"}, stats["memory_hits"]),
+            ({"result": "disk_hit"}, stats["disk_hits"]),
+            ({"result": "miss"}, stats["misses"]),
+        ]
+
+    def db_cache() -> list[Sample]:
+        samples = []
+        for name, stats in cache_stats().items():
+            samples.append(({"cache": name, "result": "hit"}, stats["hits"]))
+            samples.append(({"cache": name, "result": "miss"}, stats["misses"]))
+        return samples
+
+    def llm_governor() -> list[Sample]:
+        stats = llm_client.governor.stats()
+        return [
+            ({"state": "in_flight"}, stats["in_flight"]),
+            ({"state": "queued"}, stats["queue_depth"]),
+        ]
+
+    def memory_queue() -> list[Sample]:
+        return [({}, memory_write_queue.depth)]
+
+    metrics.register_collector("rpgate_db_pool_connections", "DB pool connections", db_pool)
+    metrics.register_collector(
+        "rpgate_embedding_cache_requests_total", "Embedding cache lookups", embedding_cache,
+        type_name="counter",
+    )
+    metrics.register_collector(
+        "rpgate_db_cache_requests_total", "Row cache lookups", db_cache,
+        type_name="counter",
+    )
+    metrics.register_collector("rpgate_llm_requests", "LLM requests admitted/waiting", llm_governor)
+    metrics.register_collector("rpgate_memory_queue_depth", "Pending episodic memory writes", memory_queue)
+
+
+class MetricsServer:
+    """Embedded HTTP server exposing GET /metrics."""
+
+    def __init__(self, host: str = "0.0.0.0", port: int = 9100, registry: Optional[MetricsRegistry] = None):
+        self.host = host
+        self.port = port
+        self.registry = registry or metrics
+        self._runner = None
+
+    async def _handle_metrics(self, request):
+        from aiohttp import web
+
+        return web.Response(
+            text=self.registry.render(),
+            content_type="text/plain",
+            charset="utf-8",
+            headers={"X-Content-Type-Options": "nosniff"},
+        )
+
+    async def start(self):
+        from aiohttp import web
+
+        app = web.Application()
+        app.router.add_get("/metrics", self._handle_metrics)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        logger.info(f"Metrics server listening on http://{self.host}:{self.port}/metrics")
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+            logger.info("Metrics server stopped")
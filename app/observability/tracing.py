@@ -0,0 +1,359 @@
+"""
+Per-turn tracing.
+
+A turn is wrapped in start_trace(); everything awaited inside it (orchestrator
+stages, LLM calls, DB queries, embedding requests) records spans into the
+same TurnTrace through context variables, including tasks started with
+asyncio.gather. When the turn ends the trace is handed to exporters: one
+structured JSON log line by default, OpenTelemetry and Prometheus metrics
+(app/observability/metrics.py) optionally.
+
+Outside of a trace, span() is a no-op, so library code can be instrumented
+unconditionally.
+"""
+import json
+import logging
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Awaitable, Iterator, Optional, TypeVar
+
+from pydantic import BaseModel, Field
+
+logger = logging.getLogger(__name__)
+# Dedicated logger so trace lines can be routed/filtered separately
+trace_logger = logging.getLogger("app.trace")
+
+T = TypeVar("T")
+
+# Span kinds
+STAGE = "stage"
+LLM = "llm"
+DB = "db"
+EMBEDDING = "embedding"
+
+_SCALARS = (str, int, float, bool)
+
+
+def _clean_attributes(attributes: dict[str, Any]) -> dict[str, Any]:
+    """Keep JSON/OTel-safe values: scalars and lists of scalars."""
+    cleaned = {}
+    for key, value in attributes.items():
+        if isinstance(value, _SCALARS):
+            cleaned[key] = value
+        elif isinstance(value, (list, tuple)) and all(isinstance(v, _SCALARS) for v in value):
+            cleaned[key] = list(value)
+    return cleaned
+
+
+class Span(BaseModel):
+    """Timed operation inside a turn."""
+
+    span_id: int
+    parent_id: Optional[int] = None
+    name: str
+    kind: str = STAGE
+    start_ms: float = Field(..., description="Offset from trace start")
+    duration_ms: Optional[float] = None
+    status: str = "ok"
+    error: Optional[str] = None
+    attributes: dict[str, Any] = Field(default_factory=dict)
+
+    def set(self, **attributes: Any):
+        """Attach attributes (non-scalar values are dropped)."""
+        self.attributes.update(_clean_attributes(attributes))
+
+
+class _NoopSpan:
+    """Returned by span() outside of a trace."""
+
+    def set(self, **attributes: Any):
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+class TurnTrace:
+    """Spans of one turn plus turn-level attributes."""
+
+    def __init__(self, name: str = "turn", **attributes: Any):
+        self.trace_id = uuid.uuid4().hex
+        self.name = name
+        self.attributes = _clean_attributes(attributes)
+        self.started_at_ns = time.time_ns()
+        self._started = time.perf_counter()
+        self.duration_ms: Optional[float] = None
+        self.spans: list[Span] = []
+
+    def offset_ms(self) -> float:
+        """Milliseconds since trace start."""
+        return (time.perf_counter() - self._started) * 1000
+
+    def start_span(self, name: str, kind: str, parent: Optional[Span], attributes: dict) -> Span:
+        span = Span(
+            span_id=len(self.spans) + 1,
+            parent_id=parent.span_id if parent else None,
+            name=name,
+            kind=kind,
+            start_ms=self.offset_ms(),
+            attributes=_clean_attributes(attributes),
+        )
+        self.spans.append(span)
+        return span
+
+    def finish(self):
+        if self.duration_ms is None:
+            self.duration_ms = self.offset_ms()
+
+    def totals_by_kind(self) -> dict[str, float]:
+        """Summed span time per kind (llm/db/embedding; stages: top level only)."""
+        totals: dict[str, float] = {}
+        for span in self.spans:
+            if span.duration_ms is None or (span.kind == STAGE and span.parent_id is not None):
+                continue
+            totals[span.kind] = totals.get(span.kind, 0.0) + span.duration_ms
+        return {kind: round(total, 1) for kind, total in totals.items()}
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "trace_id": self.trace_id,
+            "name": self.name,
+            "duration_ms": round(self.duration_ms, 1) if self.duration_ms is not None else None,
+            "attributes": self.attributes,
+            "totals_ms": self.totals_by_kind(),
+            "spans": [
+                {
+                    **span.model_dump(exclude_none=True, exclude={"start_ms", "duration_ms"}),
+                    "start_ms": round(span.start_ms, 1),
+                    "duration_ms": round(span.duration_ms, 1) if span.duration_ms is not None else None,
+                }
+                for span in self.spans
+            ],
+        }
+
+
+current_trace: ContextVar[Optional[TurnTrace]] = ContextVar("current_trace", default=None)
+_current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+
+class LogTraceExporter:
+    """Write each trace as one JSON line to the app.trace logger."""
+
+    def __init__(self, min_duration_ms: float = 0.0):
+        self.min_duration_ms = min_duration_ms
+
+    def export(self, trace: TurnTrace):
+        if (trace.duration_ms or 0.0) < self.min_duration_ms:
+            return
+        trace_logger.info(json.dumps(trace.to_dict(), ensure_ascii=False))
+
+
+class OpenTelemetryExporter:
+    """
+    Replay finished traces as OpenTelemetry spans.
+
+    Uses the globally configured TracerProvider (opentelemetry-sdk plus an
+    exporter such as OTLP, configured via the standard OTEL_* variables).
+
+    Raises:
+        ImportError: If opentelemetry is not installed
+    """
+
+    def __init__(self, instrumentation_name: str = "rpgate"):
+        from opentelemetry import trace as otel_trace
+
+        self._otel_trace = otel_trace
+        self._tracer = otel_trace.get_tracer(instrumentation_name)
+
+    def export(self, trace: TurnTrace):
+        otel_trace = self._otel_trace
+
+        def to_ns(offset_ms: float) -> int:
+            return trace.started_at_ns + int(offset_ms * 1_000_000)
+
+        root = self._tracer.start_span(
+            trace.name,
+            start_time=trace.started_at_ns,
+            attributes={**trace.attributes, "trace.id": trace.trace_id},
+        )
+        started = {}
+
+        # Parents always start before their children
+        for span in sorted(trace.spans, key=lambda s: s.start_ms):
+            parent = started.get(span.parent_id, root)
+            otel_span = self._tracer.start_span(
+                span.name,
+                context=otel_trace.set_span_in_context(parent),
+                start_time=to_ns(span.start_ms),
+                attributes={**span.attributes, "span.kind": span.kind},
+            )
+            if span.status == "error":
+                otel_span.set_status(otel_trace.Status(otel_trace.StatusCode.ERROR, span.error))
+            started[span.span_id] = otel_span
+
+        for span in trace.spans:
+            end_ms = span.start_ms + (span.duration_ms or 0.0)
+            started[span.span_id].end(end_time=to_ns(end_ms))
+        root.end(end_time=to_ns(trace.duration_ms or 0.0))
+
+
+class Tracer:
+    """Exporter registry."""
+
+    def __init__(self):
+        self.exporters: list = []
+        self.enabled = True
+
+    def add_exporter(self, exporter):
+        self.exporters.append(exporter)
+
+    def export(self, trace: TurnTrace):
+        for exporter in self.exporters:
+            try:
+                exporter.export(trace)
+            except Exception as e:
+                logger.error(f"Trace exporter {type(exporter).__name__} failed: {e}")
+
+
+def configure_tracing():
+    """Set up exporters from settings (called once at startup)."""
+    from app.config import settings
+
+    tracer.exporters.clear()
+    # Metrics are derived from traces, so they keep tracing on
+    tracer.enabled = settings.trace_enabled or settings.metrics_enabled
+
+    if settings.metrics_enabled:
+        from app.observability.metrics import MetricsTraceExporter
+
+        tracer.add_exporter(MetricsTraceExporter())
+
+    if not settings.trace_enabled:
+        return
+
+    tracer.add_exporter(LogTraceExporter(min_duration_ms=settings.trace_log_min_duration_ms))
+
+    if settings.trace_otel_enabled:
+        try:
+            tracer.add_exporter(OpenTelemetryExporter())
+            logger.info("OpenTelemetry trace export enabled")
+        except ImportError:
+            logger.warning(
+                "TRACE_OTEL_ENABLED is set but opentelemetry is not installed. "
+                "Run 'uv add opentelemetry-sdk' to enable it."
+            )
+
+
+@contextmanager
+def start_trace(name: str = "turn", **attributes: Any) -> Iterator[Optional[TurnTrace]]:
+    """
+    Collect spans of the enclosed block into a trace and export it on exit.
+
+    Nested calls reuse the active trace. Yields None when tracing is disabled.
+
+    Usage:
+        with start_trace("turn", user_id=telegram_user_id):
+            ...
+    """
+    active = current_trace.get()
+    if active is not None or not tracer.enabled:
+        yield active
+        return
+
+    trace = TurnTrace(name, **attributes)
+    trace_token = current_trace.set(trace)
+    span_token = _current_span.set(None)
+    try:
+        yield trace
+    except BaseException as e:
+        trace.attributes["error"] = type(e).__name__
+        raise
+    finally:
+        trace.finish()
+        _current_span.reset(span_token)
+        current_trace.reset(trace_token)
+        tracer.export(trace)
+
+
+def begin_span(name: str, kind: str = STAGE, **attributes: Any):
+    """
+    Start a span without making it the parent of later spans.
+
+    For code that cannot use the span() context manager, e.g. async
+    generators (a context variable set inside one leaks into the consumer).
+    Close it with end_span().
+    """
+    trace = current_trace.get()
+    if trace is None:
+        return NOOP_SPAN
+    return trace.start_span(name, kind, _current_span.get(), attributes)
+
+
+def end_span(span, error: Optional[BaseException] = None):
+    """Finish a span returned by begin_span()."""
+    if not isinstance(span, Span):
+        return
+    trace = current_trace.get()
+    if trace is not None:
+        span.duration_ms = trace.offset_ms() - span.start_ms
+    if error is not None:
+        span.status = "error"
+        span.error = f"{type(error).__name__}: {error}"[:200]
+
+
+@contextmanager
+def span(name: str, kind: str = STAGE, **attributes: Any) -> Iterator[Any]:
+    """
+    Time the enclosed block as a span of the current trace.
+
+    Spans opened inside the block (same task or tasks it starts) become its
+    children. Errors are recorded and re-raised.
+
+    Usage:
+        with span("llm.completion", kind=LLM, model=model) as s:
+            response = ...
+            s.set(completion_tokens=...)
+    """
+    trace = current_trace.get()
+    if trace is None:
+        yield NOOP_SPAN
+        return
+
+    current = trace.start_span(name, kind, _current_span.get(), attributes)
+    token = _current_span.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        end_span(current, e)
+        raise
+    else:
+        end_span(current)
+    finally:
+        _current_span.reset(token)
+
+
+def current_span():
+    """Innermost open span (no-op span outside of a trace)."""
+    if current_trace.get() is None:
+        return NOOP_SPAN
+    return _current_span.get() or NOOP_SPAN
+
+
+def set_trace_attributes(**attributes: Any):
+    """Attach turn-level attributes to the current trace (if any)."""
+    trace = current_trace.get()
+    if trace is not None:
+        trace.attributes.update(_clean_attributes(attributes))
+
+
+async def traced(name: str, awaitable: Awaitable[T], kind: str = STAGE, **attributes: Any) -> T:
+    """Await inside a span (for stages passed to asyncio.gather)."""
+    with span(name, kind, **attributes):
+        return await awaitable
+
+
+# Global instance (exporters are configured in configure_tracing)
+tracer = Tracer()
+tracer.add_exporter(LogTraceExporter())
@@ -0,0 +1,7 @@
+"""
+Offline benchmark harness.
+
+Drives the turn pipeline with simulated players against a local
+OpenAI-compatible stub and an in-memory database. See
+docs/guides/BENCHMARKS.md.
+"""
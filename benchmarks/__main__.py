@@ -0,0 +1,60 @@
+"""
+Run the offline benchmark.
+
+Usage:
+    uv run python -m benchmarks --players 20 --turns 5
+    uv run python -m benchmarks --mode handler --latency-scale 0.1 --json
+"""
+import argparse
+import asyncio
+import logging
+import os
+
+# Settings are read at import time; the stub needs no real credentials
+os.environ.setdefault("TELEGRAM_BOT_TOKEN", "benchmark")
+os.environ.setdefault("OPENROUTER_API_KEY", "benchmark")
+
+from benchmarks.load import HANDLER, ORCHESTRATOR, LoadConfig, run_benchmark  # noqa: E402
+from benchmarks.stub_server import StubConfig  # noqa: E402
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Offline turn latency/throughput benchmark")
+    parser.add_argument("--players", type=int, default=10, help="Simulated players")
+    parser.add_argument("--turns", type=int, default=5, help="Turns per player")
+    parser.add_argument("--mode", choices=[ORCHESTRATOR, HANDLER], default=ORCHESTRATOR)
+    parser.add_argument("--think-time", type=float, default=0.0, help="Mean pause between turns, s")
+    parser.add_argument("--ramp-up", type=float, default=0.0, help="Seconds over which players join")
+    parser.add_argument("--db-latency", type=float, default=0.002, help="Fake DB round trip, s")
+    parser.add_argument(
+        "--latency-scale", type=float, default=1.0,
+        help="Multiply the stub's default LLM/embedding latencies",
+    )
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of stub requests answered 503")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    parser.add_argument("--log-level", default="WARNING")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    logging.basicConfig(level=args.log_level.upper())
+
+    config = LoadConfig(
+        players=args.players,
+        turns=args.turns,
+        mode=args.mode,
+        think_time=args.think_time,
+        ramp_up=args.ramp_up,
+        db_latency=args.db_latency,
+        seed=args.seed,
+    )
+    stub_config = StubConfig.scaled(args.latency_scale, error_rate=args.error_rate, seed=args.seed)
+
+    report = asyncio.run(run_benchmark(config, stub_config))
+    print(report.model_dump_json(indent=2) if args.json else report.format())
+
+
+if __name__ == "__main__":
+    main()
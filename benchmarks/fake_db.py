@@ -0,0 +1,293 @@
+"""
+In-memory stand-in for app/db during benchmarks.
+
+Replaces the persistence entry points the turn path uses (turn context load,
+TurnCommit, episodic memory and conversation history reads/writes, world
+state load/save) with dict-backed versions. World state versions are
+tracked, so compare-and-swap saves conflict like they would in Postgres. Vector search embeds queries
+through the real embeddings service (so the stub embeddings endpoint and the
+embedding cache stay on the path) and ranks memories by cosine similarity.
+
+An optional per-call latency stands in for the database round trip.
+"""
+import asyncio
+import logging
+import math
+from contextlib import ExitStack, contextmanager
+from datetime import datetime
+from typing import Iterator, List, Optional
+from unittest.mock import patch
+from uuid import UUID, uuid4
+
+from app.db.models import ConversationTurnDB, EpisodicMemoryCreate, EpisodicMemoryDB, TurnContext
+from app.game.character import CharacterSheet
+
+logger = logging.getLogger(__name__)
+
+
+def _cosine(a: List[float], b: List[float]) -> float:
+    dot = sum(x * y for x, y in zip(a, b))
+    norm = math.sqrt(sum(x * x for x in a)) * math.sqrt(sum(y * y for y in b))
+    return dot / norm if norm else 0.0
+
+
+class FakeDatabase:
+    """Characters, sessions, world state and memories kept in dicts."""
+
+    def __init__(self, latency: float = 0.0):
+        """
+        Initialize fake database.
+
+        Args:
+            latency: Seconds slept per simulated round trip
+        """
+        self.latency = latency
+        self.characters: dict[int, CharacterSheet] = {}
+        self.sessions: dict[int, UUID] = {}
+        self.session_stats: dict[UUID, dict[str, int]] = {}
+        self.world_states: dict[UUID, dict] = {}
+        self.world_state_versions: dict[UUID, int] = {}
+        self.combat_enabled: dict[int, bool] = {}
+        self.memories: dict[UUID, list[tuple[EpisodicMemoryDB, List[float]]]] = {}
+        self.conversations: dict[UUID, list[ConversationTurnDB]] = {}
+        self.round_trips = 0
+        self.commits = 0
+        self.conflicts = 0
+
+    async def _round_trip(self):
+        self.round_trips += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+    def add_character(self, telegram_user_id: int, name: str, **fields) -> CharacterSheet:
+        """Create a character with an active session and default world state."""
+        from app.agents.world_state import default_game_state
+
+        character = CharacterSheet(telegram_user_id=telegram_user_id, name=name, **fields)
+        self.characters[telegram_user_id] = character
+        self.sessions[telegram_user_id] = uuid4()
+        self.combat_enabled[telegram_user_id] = True
+        self.world_states[character.id] = default_game_state()
+        return character
+
+    # --- app.db.turn_context ---
+
+    async def load_turn_context(self, telegram_user_id: int) -> Optional[TurnContext]:
+        await self._round_trip()
+        character = self.characters.get(telegram_user_id)
+        if character is None:
+            return None
+        return TurnContext(
+            character=character.model_copy(deep=True),
+            session_id=self.sessions[telegram_user_id],
+            user_settings={
+                "telegram_user_id": telegram_user_id,
+                "combat_enabled": self.combat_enabled[telegram_user_id],
+            },
+            game_state=dict(self.world_states[character.id]),
+            world_state_version=self.world_state_versions.get(character.id, 0),
+        )
+
+    # --- app.db.turn_commit.TurnCommit ---
+
+    def _save_versioned(
+        self, character_id: UUID, state_data: dict, expected_version: Optional[int]
+    ) -> bool:
+        version = self.world_state_versions.get(character_id, 0)
+        if expected_version is not None and expected_version != version:
+            self.conflicts += 1
+            return False
+        self.world_states[character_id] = dict(state_data)
+        self.world_state_versions[character_id] = version + 1
+        return True
+
+    def _commit(self, turn_commit) -> bool:
+        turn_commit.conflict = False
+        if turn_commit._world_state is not None:
+            character_id, state_data, expected_version = turn_commit._world_state
+            if not self._save_versioned(character_id, state_data, expected_version):
+                turn_commit.conflict = True
+                return False
+            turn_commit.world_state_version = self.world_state_versions[character_id]
+
+        if turn_commit._character is not None:
+            character = turn_commit._character
+            self.characters[character.telegram_user_id] = character.model_copy(deep=True)
+
+        if turn_commit._session_stats is not None:
+            stats = turn_commit._session_stats
+            totals = self.session_stats.setdefault(
+                stats["session_id"], {"turns": 0, "damage_dealt": 0, "damage_taken": 0}
+            )
+            totals["turns"] += stats["turns_increment"]
+            totals["damage_dealt"] += stats["damage_dealt_increment"]
+            totals["damage_taken"] += stats["damage_taken_increment"]
+
+        for memory in turn_commit._memories:
+            embedding = [float(x) for x in memory["embedding"].strip("[]").split(",")]
+            self._store_memory(
+                EpisodicMemoryCreate(**{k: v for k, v in memory.items() if k != "embedding"}),
+                embedding,
+            )
+
+        self.commits += 1
+        turn_commit.committed = True
+        return True
+
+    def _make_commit(self):
+        database = self
+
+        async def commit(turn_commit) -> bool:
+            if turn_commit.is_empty:
+                turn_commit.committed = True
+                return True
+            await database._round_trip()
+            return database._commit(turn_commit)
+
+        return commit
+
+    # --- app.memory.episodic.EpisodicMemoryManager ---
+
+    def _store_memory(self, memory: EpisodicMemoryCreate, embedding: List[float]) -> EpisodicMemoryDB:
+        stored = EpisodicMemoryDB(id=uuid4(), created_at=datetime.now(), **memory.model_dump())
+        self.memories.setdefault(memory.character_id, []).append((stored, embedding))
+        return stored
+
+    async def search_memories(
+        self,
+        character_id: UUID,
+        query: str,
+        limit: int = 5,
+        similarity_threshold: float = 0.5,
+        memory_types: Optional[List[str]] = None,
+        min_importance: int = 0,
+    ) -> List[tuple[EpisodicMemoryDB, float]]:
+        from app.memory.embeddings import embeddings_service
+
+        query_embedding = await embeddings_service.embed_text(query)
+        await self._round_trip()
+
+        results = []
+        for memory, embedding in self.memories.get(character_id, []):
+            if memory_types and memory.memory_type not in memory_types:
+                continue
+            if memory.importance_score < min_importance:
+                continue
+            similarity = _cosine(query_embedding, embedding)
+            if similarity >= similarity_threshold:
+                results.append((memory, similarity))
+
+        results.sort(key=lambda r: (r[1], r[0].importance_score), reverse=True)
+        return results[:limit]
+
+    async def get_recent_memories(
+        self,
+        character_id: UUID,
+        limit: int = 10,
+        session_id: Optional[UUID] = None,
+    ) -> List[EpisodicMemoryDB]:
+        await self._round_trip()
+        memories = [
+            memory for memory, _ in self.memories.get(character_id, [])
+            if session_id is None or memory.session_id == session_id
+        ]
+        return list(reversed(memories))[:limit]
+
+    async def create_memory(self, **fields) -> Optional[EpisodicMemoryDB]:
+        from app.memory.embeddings import embeddings_service
+
+        memory = EpisodicMemoryCreate(**fields)
+        embedding = await embeddings_service.embed_text(memory.content)
+        await self._round_trip()
+        return self._store_memory(memory, embedding)
+
+    async def create_memories_batch(self, memories: List[EpisodicMemoryCreate]) -> int:
+        from app.memory.embeddings import embeddings_service
+
+        if not memories:
+            return 0
+        embeddings = await embeddings_service.embed_batch([m.content for m in memories])
+        await self._round_trip()
+        for memory, embedding in zip(memories, embeddings):
+            self._store_memory(memory, embedding)
+        return len(memories)
+
+    # --- app.agents.world_state.WorldStateAgent ---
+
+    def _make_save_world_state(self):
+        database = self
+
+        async def save_world_state(
+            agent, character_id: UUID, state_data: dict, expected_version: Optional[int] = None
+        ) -> bool:
+            await database._round_trip()
+            return database._save_versioned(character_id, state_data, expected_version)
+
+        return save_world_state
+
+    def _make_load_world_state(self):
+        database = self
+
+        async def load_world_state_versioned(agent, character_id: UUID) -> tuple[dict, int]:
+            from app.agents.world_state import default_game_state
+
+            await database._round_trip()
+            state = database.world_states.get(character_id)
+            return (
+                dict(state) if state is not None else default_game_state(),
+                database.world_state_versions.get(character_id, 0),
+            )
+
+        return load_world_state_versioned
+
+    # --- app.db.conversation_turns ---
+
+    async def append_conversation_turns(self, turns: List[ConversationTurnDB]) -> int:
+        await self._round_trip()
+        for turn in turns:
+            self.conversations.setdefault(turn.character_id, []).append(turn)
+        return len(turns)
+
+    async def get_recent_conversation_turns(
+        self, character_id: UUID, limit: int = 20
+    ) -> Optional[List[ConversationTurnDB]]:
+        await self._round_trip()
+        return list(self.conversations.get(character_id, [])[-limit:])
+
+    async def delete_conversation_turns(self, character_id: UUID) -> bool:
+        await self._round_trip()
+        self.conversations.pop(character_id, None)
+        return True
+
+    @contextmanager
+    def install(self) -> Iterator["FakeDatabase"]:
+        """Patch the app's persistence entry points for the enclosed block."""
+        from app.agents.world_state import WorldStateAgent
+        from app.db.turn_commit import TurnCommit
+        from app.memory.episodic import episodic_memory_manager
+
+        with ExitStack() as stack:
+            stack.enter_context(patch("app.bot.handlers.load_turn_context", self.load_turn_context))
+            stack.enter_context(patch.object(TurnCommit, "commit", self._make_commit()))
+            stack.enter_context(
+                patch.object(WorldStateAgent, "_save_world_state", self._make_save_world_state())
+            )
+            stack.enter_context(
+                patch.object(
+                    WorldStateAgent, "load_world_state_versioned", self._make_load_world_state()
+                )
+            )
+            for name in (
+                "search_memories",
+                "get_recent_memories",
+                "create_memory",
+                "create_memories_batch",
+            ):
+                stack.enter_context(patch.object(episodic_memory_manager, name, getattr(self, name)))
+            for name in (
+                "append_conversation_turns",
+                "get_recent_conversation_turns",
+                "delete_conversation_turns",
+            ):
+                stack.enter_context(patch(f"app.memory.conversation.{name}", getattr(self, name)))
+            yield self
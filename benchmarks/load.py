@@ -0,0 +1,354 @@
+"""
+Load generator: N simulated players running turns against the real pipeline.
+
+Two entry points are exercised:
+- "orchestrator": load_turn_context -> orchestrator.process_turn -> TurnCommit
+- "handler": the aiogram conversation handler with a real FSMContext over
+  MemoryStorage and a fake Message (streaming edits included)
+
+LLM and embedding calls go to StubLLMServer over HTTP, persistence to
+FakeDatabase, so everything between (agents, governor, retries, caches,
+JSON parsing, deadlines) runs as in production.
+"""
+import asyncio
+import logging
+import math
+import random
+import time
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+from pydantic import BaseModel, Field
+
+from benchmarks.fake_db import FakeDatabase
+from benchmarks.stub_server import StubConfig, StubLLMServer
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_ACTIONS = [
+    "Осматриваю комнату",
+    "Иду к барной стойке и заказываю эль",
+    "Спрашиваю трактирщика о слухах",
+    "Атакую гоблина мечом",
+    "Пытаюсь взломать замок на сундуке",
+    "Выхожу на улицу и иду к рынку",
+]
+
+ORCHESTRATOR = "orchestrator"
+HANDLER = "handler"
+
+
+class LoadConfig(BaseModel):
+    """Shape of the simulated load."""
+
+    players: int = Field(default=10, ge=1)
+    turns: int = Field(default=5, ge=1, description="Turns per player")
+    mode: str = Field(default=ORCHESTRATOR, pattern=f"^({ORCHESTRATOR}|{HANDLER})$")
+    think_time: float = Field(default=0.0, ge=0, description="Mean pause between a player's turns")
+    ramp_up: float = Field(default=0.0, ge=0, description="Seconds over which players join")
+    db_latency: float = Field(default=0.0, ge=0, description="Seconds per fake DB round trip")
+    actions: list[str] = Field(default_factory=lambda: list(DEFAULT_ACTIONS))
+    seed: Optional[int] = None
+
+
+class BenchmarkReport(BaseModel):
+    """Turn latency distribution and throughput of one run."""
+
+    mode: str
+    players: int
+    turns: int
+    errors: int
+    duration_s: float
+    turns_per_s: float
+    p50_ms: float
+    p95_ms: float
+    p99_ms: float
+    mean_ms: float
+    max_ms: float
+    # Mean time per top-level stage / span kind across traced turns
+    stage_mean_ms: dict[str, float] = Field(default_factory=dict)
+    kind_mean_ms: dict[str, float] = Field(default_factory=dict)
+    degraded_turns: int = 0
+    stub_requests: dict[str, int] = Field(default_factory=dict)
+    db_round_trips: int = 0
+
+    def format(self) -> str:
+        """Human-readable summary."""
+        lines = [
+            f"mode={self.mode} players={self.players} turns={self.turns} errors={self.errors}",
+            f"duration={self.duration_s:.2f}s throughput={self.turns_per_s:.2f} turns/s",
+            f"latency ms: p50={self.p50_ms:.0f} p95={self.p95_ms:.0f} p99={self.p99_ms:.0f} "
+            f"mean={self.mean_ms:.0f} max={self.max_ms:.0f}",
+        ]
+        if self.stage_mean_ms:
+            stages = " ".join(f"{name}={ms:.0f}" for name, ms in sorted(self.stage_mean_ms.items()))
+            lines.append(f"stage mean ms: {stages}")
+        if self.kind_mean_ms:
+            kinds = " ".join(f"{kind}={ms:.0f}" for kind, ms in sorted(self.kind_mean_ms.items()))
+            lines.append(f"span kind mean ms: {kinds}")
+        lines.append(
+            f"degraded turns={self.degraded_turns} db round trips={self.db_round_trips} "
+            f"stub requests={self.stub_requests}"
+        )
+        return "\n".join(lines)
+
+
+def percentile(samples: list[float], p: float) -> float:
+    """Nearest-rank percentile (p in 0..1); 0.0 for no samples."""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, math.ceil(p * len(ordered)) - 1))
+    return ordered[index]
+
+
+class TraceCollector:
+    """Tracer exporter that aggregates stage and span-kind timings."""
+
+    def __init__(self):
+        self.traces = 0
+        self.degraded = 0
+        self.stages: dict[str, float] = {}
+        self.kinds: dict[str, float] = {}
+
+    def export(self, trace):
+        from app.observability.tracing import STAGE
+
+        self.traces += 1
+        if trace.attributes.get("degraded"):
+            self.degraded += 1
+        for span in trace.spans:
+            if span.kind == STAGE and span.parent_id is None and span.duration_ms is not None:
+                self.stages[span.name] = self.stages.get(span.name, 0.0) + span.duration_ms
+        for kind, total in trace.totals_by_kind().items():
+            self.kinds[kind] = self.kinds.get(kind, 0.0) + total
+
+    def means(self, totals: dict[str, float]) -> dict[str, float]:
+        return {name: round(total / self.traces, 1) for name, total in totals.items()} if self.traces else {}
+
+
+class FakeMessage:
+    """Enough of aiogram's Message for the conversation handler."""
+
+    class _User:
+        def __init__(self, user_id: int):
+            self.id = user_id
+
+    class _Chat:
+        def __init__(self, chat_id: int):
+            self.id = chat_id
+
+    class _Sent:
+        def __init__(self, owner: "FakeMessage", text: str):
+            self.owner = owner
+            self.text = text
+
+        async def edit_text(self, text: str, **kwargs):
+            self.owner.edits += 1
+            self.text = text
+            return self
+
+        async def delete(self):
+            return True
+
+    def __init__(self, user_id: int, text: str):
+        self.text = text
+        self.from_user = self._User(user_id)
+        self.chat = self._Chat(user_id)
+        self.bot = None  # no typing indicator
+        self.answers: list[str] = []
+        self.edits = 0
+
+    async def answer(self, text: str, **kwargs):
+        self.answers.append(text)
+        return self._Sent(self, text)
+
+
+@contextmanager
+def stub_clients(base_url: str) -> Iterator[None]:
+    """Point the LLM and embeddings clients at base_url for the enclosed block."""
+    from openai import AsyncOpenAI
+
+    from app.config import settings
+    from app.llm.client import llm_client
+    from app.memory.embedding_cache import EmbeddingCache
+    from app.memory.embeddings import embeddings_service
+
+    saved = (llm_client.client, embeddings_service.base_url, embeddings_service._client, embeddings_service.cache)
+    llm_client.client = AsyncOpenAI(
+        base_url=base_url,
+        api_key="stub",
+        timeout=settings.llm_request_timeout,
+        max_retries=0,
+    )
+    embeddings_service.base_url = base_url
+    embeddings_service._client = None
+    # In-memory cache only: keep the persistent tier out of measurements
+    embeddings_service.cache = EmbeddingCache(max_entries=settings.embedding_cache_size)
+    try:
+        yield
+    finally:
+        (
+            llm_client.client,
+            embeddings_service.base_url,
+            embeddings_service._client,
+            embeddings_service.cache,
+        ) = saved
+
+
+@contextmanager
+def collect_traces() -> Iterator[TraceCollector]:
+    """Enable tracing with only the collector attached."""
+    from app.observability.tracing import tracer
+
+    saved = (list(tracer.exporters), tracer.enabled)
+    collector = TraceCollector()
+    tracer.exporters[:] = [collector]
+    tracer.enabled = True
+    try:
+        yield collector
+    finally:
+        tracer.exporters[:], tracer.enabled = saved
+
+
+class LoadGenerator:
+    """Runs simulated players and records per-turn latency."""
+
+    def __init__(self, config: LoadConfig, database: FakeDatabase):
+        self.config = config
+        self.database = database
+        self.rng = random.Random(config.seed)
+        self.latencies: list[float] = []
+        self.errors = 0
+
+    async def _orchestrator_turn(self, user_id: int, action: str, history: list[str]):
+        from app.agents.deadline import TurnDeadline
+        from app.bot.handlers import orchestrator
+        from app.config import settings
+        from app.db.turn_commit import TurnCommit
+        from app.llm.governor import set_llm_user
+        from app.observability.tracing import start_trace
+
+        with start_trace("turn", user_id=user_id):
+            set_llm_user(user_id)
+            deadline = TurnDeadline(settings.turn_deadline)
+            turn = await self.database.load_turn_context(user_id)
+            turn_commit = TurnCommit()
+            final_message, character, _ = await orchestrator.process_turn(
+                user_action=action,
+                turn=turn,
+                recent_history=history[-5:],
+                turn_commit=turn_commit,
+                deadline=deadline,
+            )
+            turn_commit.update_character(character)
+            turn_commit.update_session_stats(turn.session_id, turns_increment=1)
+            if not await orchestrator.commit_turn(turn, turn_commit):
+                raise RuntimeError("turn not committed")
+
+        history.append(final_message)
+
+    async def _handler_turn(self, user_id: int, action: str, state):
+        from app.bot.handlers import handle_conversation
+        from app.config.prompts import UIPrompts
+
+        message = FakeMessage(user_id, action)
+        await handle_conversation(message, state)
+        if not message.answers:
+            raise RuntimeError("handler sent no reply")
+        if message.answers[-1] in (UIPrompts.ERROR_GENERIC, UIPrompts.ERROR_TURN_NOT_SAVED):
+            raise RuntimeError(message.answers[-1])
+
+    async def _player(self, index: int, start_delay: float):
+        from aiogram.fsm.context import FSMContext
+        from aiogram.fsm.storage.base import StorageKey
+
+        from app.bot.states import ConversationState
+
+        user_id = 100_000 + index
+        self.database.add_character(user_id, f"Игрок {index}")
+
+        state = FSMContext(
+            storage=self.storage,
+            key=StorageKey(bot_id=0, chat_id=user_id, user_id=user_id),
+        )
+        await state.set_state(ConversationState.in_conversation)
+        history: list[str] = []
+
+        await asyncio.sleep(start_delay)
+        for turn in range(self.config.turns):
+            action = self.config.actions[(index + turn) % len(self.config.actions)]
+            started = time.perf_counter()
+            try:
+                if self.config.mode == HANDLER:
+                    await self._handler_turn(user_id, action, state)
+                else:
+                    await self._orchestrator_turn(user_id, action, history)
+                self.latencies.append((time.perf_counter() - started) * 1000)
+            except Exception as e:
+                self.errors += 1
+                logger.warning(f"Player {index} turn {turn} failed: {e}")
+
+            if self.config.think_time:
+                await asyncio.sleep(self.rng.expovariate(1 / self.config.think_time))
+
+    async def run(self) -> float:
+        """Run all players; returns wall-clock seconds."""
+        from aiogram.fsm.storage.memory import MemoryStorage
+
+        self.storage = MemoryStorage()
+        step = self.config.ramp_up / self.config.players
+        started = time.perf_counter()
+        await asyncio.gather(*(
+            self._player(i, i * step) for i in range(self.config.players)
+        ))
+        return time.perf_counter() - started
+
+
+async def run_benchmark(
+    config: LoadConfig,
+    stub_config: Optional[StubConfig] = None,
+) -> BenchmarkReport:
+    """
+    Start the stub server, run the load and build the report.
+
+    Args:
+        config: Load shape
+        stub_config: Stub latency/error profile (defaults to StubConfig())
+
+    Returns:
+        BenchmarkReport
+    """
+    server = StubLLMServer(stub_config)
+    await server.start()
+    database = FakeDatabase(latency=config.db_latency)
+    generator = LoadGenerator(config, database)
+
+    try:
+        with stub_clients(server.base_url), database.install(), collect_traces() as collector:
+            duration = await generator.run()
+            from app.memory.embeddings import embeddings_service
+
+            await embeddings_service.aclose()
+    finally:
+        await server.stop()
+
+    latencies = generator.latencies
+    return BenchmarkReport(
+        mode=config.mode,
+        players=config.players,
+        turns=len(latencies),
+        errors=generator.errors,
+        duration_s=round(duration, 3),
+        turns_per_s=round(len(latencies) / duration, 3) if duration else 0.0,
+        p50_ms=round(percentile(latencies, 0.50), 1),
+        p95_ms=round(percentile(latencies, 0.95), 1),
+        p99_ms=round(percentile(latencies, 0.99), 1),
+        mean_ms=round(sum(latencies) / len(latencies), 1) if latencies else 0.0,
+        max_ms=round(max(latencies), 1) if latencies else 0.0,
+        stage_mean_ms=collector.means(collector.stages),
+        kind_mean_ms=collector.means(collector.kinds),
+        degraded_turns=collector.degraded,
+        stub_requests=dict(server.requests),
+        db_round_trips=database.round_trips,
+    )
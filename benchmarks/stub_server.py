@@ -0,0 +1,265 @@
+"""
+Local OpenAI-compatible stub for benchmarks.
+
+Serves /v1/chat/completions (plain and streamed) and /v1/embeddings with
+canned responses and configurable latency, so the full turn pipeline can
+run without OpenRouter.
+
+Request kinds are told apart the way the agents build them:
+- intent analysis: JSON mode + Rules Analyzer system prompt
+- combat state: JSON mode + combat system prompt
+- single-call narrative: JSON mode + "narrative" key in the requested schema
+- narrative: plain text (optionally streamed)
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import math
+import random
+import re
+import time
+import uuid
+from typing import Optional
+
+from aiohttp import web
+from pydantic import BaseModel, Field
+
+logger = logging.getLogger(__name__)
+
+INTENT = "intent"
+COMBAT_STATE = "combat_state"
+SINGLE_CALL = "single_call"
+NARRATIVE = "narrative"
+
+NARRATIVE_TEXT = (
+    "Ты делаешь шаг вперёд, и факелы на стенах вспыхивают ярче. "
+    "Тени отступают, открывая старую каменную кладку, покрытую рунами. "
+    "Где-то вдалеке слышится приглушённый рык."
+)
+INTENT_RESPONSES = {
+    "attack": {
+        "action_type": "attack", "requires_roll": True, "roll_type": "attack_roll",
+        "skill": None, "target": "гоблин", "difficulty": "medium", "reasoning": "stub",
+    },
+    "other": {
+        "action_type": "other", "requires_roll": False, "roll_type": None,
+        "skill": None, "target": None, "difficulty": None, "reasoning": "stub",
+    },
+}
+COMBAT_STATE_RESPONSES = {
+    "attack": {
+        "in_combat": True, "enemies": ["гоблин"], "combat_ended": False, "enemy_attacks": [],
+    },
+    "other": {
+        "in_combat": False, "enemies": [], "combat_ended": False, "enemy_attacks": [],
+    },
+}
+ATTACK_STEMS = ("атак", "бью", "удар")
+# Every agent prompt quotes the player's action this way
+ACTION_PATTERN = re.compile(r'Действие игрока: "(.*?)"', re.DOTALL)
+
+
+class LatencyProfile(BaseModel):
+    """Log-normal latency: median seconds and spread (sigma of ln)."""
+
+    median: float = Field(default=0.5, ge=0)
+    sigma: float = Field(default=0.3, ge=0)
+
+    def sample(self, rng: random.Random) -> float:
+        if self.median <= 0:
+            return 0.0
+        return self.median * math.exp(rng.gauss(0, self.sigma))
+
+
+class StubConfig(BaseModel):
+    """Latency per request kind and stub behavior."""
+
+    intent: LatencyProfile = Field(default_factory=lambda: LatencyProfile(median=0.4))
+    combat_state: LatencyProfile = Field(default_factory=lambda: LatencyProfile(median=0.6))
+    narrative: LatencyProfile = Field(default_factory=lambda: LatencyProfile(median=1.5))
+    single_call: LatencyProfile = Field(default_factory=lambda: LatencyProfile(median=1.8))
+    embedding: LatencyProfile = Field(default_factory=lambda: LatencyProfile(median=0.15))
+    # Share of the latency spent before the first streamed token
+    first_token_share: float = Field(default=0.3, ge=0, le=1)
+    error_rate: float = Field(default=0.0, ge=0, le=1)
+    seed: Optional[int] = None
+
+    @classmethod
+    def scaled(cls, factor: float, **overrides) -> "StubConfig":
+        """Default profile with all medians multiplied by factor."""
+        config = cls(**overrides)
+        for kind in (INTENT, COMBAT_STATE, NARRATIVE, SINGLE_CALL, "embedding"):
+            profile: LatencyProfile = getattr(config, kind)
+            profile.median *= factor
+        return config
+
+
+def classify_request(body: dict) -> str:
+    """Tell which agent call a chat completion request is."""
+    messages = body.get("messages", [])
+    system = next((m["content"] for m in messages if m.get("role") == "system"), "")
+    user = messages[-1]["content"] if messages else ""
+
+    if (body.get("response_format") or {}).get("type") != "json_object":
+        return NARRATIVE
+    if "Rules Analyzer" in system:
+        return INTENT
+    if '"narrative"' in user:
+        return SINGLE_CALL
+    return COMBAT_STATE
+
+
+def fake_embedding(text, dimension: int) -> list[float]:
+    """Deterministic unit vector derived from text."""
+    seed = int.from_bytes(hashlib.sha256(str(text).encode()).digest()[:8], "big")
+    rng = random.Random(seed)
+    vector = [rng.gauss(0, 1) for _ in range(dimension)]
+    norm = math.sqrt(sum(x * x for x in vector)) or 1.0
+    return [x / norm for x in vector]
+
+
+class StubLLMServer:
+    """aiohttp server implementing the OpenAI endpoints the bot uses."""
+
+    def __init__(self, config: Optional[StubConfig] = None, host: str = "127.0.0.1", port: int = 0):
+        self.config = config or StubConfig()
+        self.host = host
+        self.port = port
+        self.rng = random.Random(self.config.seed)
+        self.requests: dict[str, int] = {}
+        self.errors = 0
+        self._runner: Optional[web.AppRunner] = None
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.host}:{self.port}/v1"
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_post("/v1/chat/completions", self._chat_completions)
+        app.router.add_post("/v1/embeddings", self._embeddings)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        # Resolve the port when 0 (ephemeral) was requested
+        self.port = site._server.sockets[0].getsockname()[1]
+        logger.info(f"Stub LLM server on {self.base_url}")
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    def _count(self, kind: str):
+        self.requests[kind] = self.requests.get(kind, 0) + 1
+
+    def _maybe_fail(self) -> Optional[web.Response]:
+        if self.config.error_rate and self.rng.random() < self.config.error_rate:
+            self.errors += 1
+            return web.json_response({"error": {"message": "stub overloaded"}}, status=503)
+        return None
+
+    def _content(self, kind: str, body: dict) -> str:
+        prompt = body["messages"][-1]["content"] if body.get("messages") else ""
+        match = ACTION_PATTERN.search(prompt)
+        action = match.group(1).lower() if match else ""
+        key = "attack" if any(stem in action for stem in ATTACK_STEMS) else "other"
+
+        if kind == INTENT:
+            return json.dumps(INTENT_RESPONSES[key], ensure_ascii=False)
+        if kind == COMBAT_STATE:
+            return json.dumps(COMBAT_STATE_RESPONSES[key], ensure_ascii=False)
+        if kind == SINGLE_CALL:
+            return json.dumps(
+                {"narrative": NARRATIVE_TEXT, "combat_state": COMBAT_STATE_RESPONSES[key]},
+                ensure_ascii=False,
+            )
+        return NARRATIVE_TEXT
+
+    def _completion(self, body: dict, content: str) -> dict:
+        prompt_tokens = sum(len(m.get("content", "")) for m in body.get("messages", [])) // 4
+        return {
+            "id": f"chatcmpl-{uuid.uuid4().hex[:12]}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "stub"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop",
+            }],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": len(content) // 4,
+                "total_tokens": prompt_tokens + len(content) // 4,
+            },
+        }
+
+    async def _chat_completions(self, request: web.Request) -> web.StreamResponse:
+        body = await request.json()
+        kind = classify_request(body)
+        self._count(kind)
+        latency = getattr(self.config, kind).sample(self.rng)
+
+        failure = self._maybe_fail()
+        if failure is not None:
+            await asyncio.sleep(latency * self.config.first_token_share)
+            return failure
+
+        content = self._content(kind, body)
+        if not body.get("stream"):
+            await asyncio.sleep(latency)
+            return web.json_response(self._completion(body, content))
+
+        return await self._stream(request, body, content, latency)
+
+    async def _stream(self, request: web.Request, body: dict, content: str, latency: float):
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+        await response.prepare(request)
+
+        words = content.split(" ")
+        first_token = latency * self.config.first_token_share
+        per_chunk = (latency - first_token) / max(1, len(words))
+        await asyncio.sleep(first_token)
+
+        for i, word in enumerate(words):
+            chunk = {
+                "id": "chatcmpl-stub",
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": body.get("model", "stub"),
+                "choices": [{
+                    "index": 0,
+                    "delta": {"content": word if i == 0 else " " + word},
+                    "finish_reason": None,
+                }],
+            }
+            await response.write(f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n".encode())
+            if per_chunk:
+                await asyncio.sleep(per_chunk)
+
+        await response.write(b"data: [DONE]\n\n")
+        await response.write_eof()
+        return response
+
+    async def _embeddings(self, request: web.Request) -> web.Response:
+        body = await request.json()
+        self._count("embedding")
+        await asyncio.sleep(self.config.embedding.sample(self.rng))
+
+        failure = self._maybe_fail()
+        if failure is not None:
+            return failure
+
+        inputs = body["input"] if isinstance(body["input"], list) else [body["input"]]
+        dimension = body.get("dimensions") or 256
+        return web.json_response({
+            "object": "list",
+            "model": body.get("model", "stub"),
+            "data": [
+                {"object": "embedding", "index": i, "embedding": fake_embedding(text, dimension)}
+                for i, text in enumerate(inputs)
+            ],
+        })
@@ -0,0 +1,13 @@
+"""Shared test fixtures."""
+
+import pytest
+
+from app.db.cache import clear_caches
+
+
+@pytest.fixture(autouse=True)
+def _clear_row_caches():
+    """Rows cached by one test must not leak into the next (app/db/cache.py)."""
+    clear_caches()
+    yield
+    clear_caches()
@@ -0,0 +1,72 @@
+"""Tests for the offline benchmark harness (stub LLM server, fake DB, load generator)."""
+
+import pytest
+
+from benchmarks.load import HANDLER, ORCHESTRATOR, LoadConfig, percentile, run_benchmark
+from benchmarks.stub_server import (
+    COMBAT_STATE,
+    INTENT,
+    NARRATIVE,
+    SINGLE_CALL,
+    StubConfig,
+    classify_request,
+    fake_embedding,
+)
+
+
+def fast_stub() -> StubConfig:
+    return StubConfig.scaled(0.01, seed=1)
+
+
+def test_classify_request():
+    """Test stub tells agent calls apart like the agents build them."""
+    json_mode = {"type": "json_object"}
+
+    assert classify_request({
+        "messages": [{"role": "system", "content": "Ты — Rules Analyzer"}, {"role": "user", "content": "x"}],
+        "response_format": json_mode,
+    }) == INTENT
+    assert classify_request({
+        "messages": [{"role": "user", "content": 'Верни {"narrative": "...", "combat_state": {}}'}],
+        "response_format": json_mode,
+    }) == SINGLE_CALL
+    assert classify_request({
+        "messages": [{"role": "user", "content": "Верни ТОЛЬКО JSON"}],
+        "response_format": json_mode,
+    }) == COMBAT_STATE
+    assert classify_request({"messages": [{"role": "user", "content": "Опиши"}]}) == NARRATIVE
+
+
+def test_fake_embedding_deterministic_unit_vector():
+    """Test stub embeddings are stable per text and normalized."""
+    a = fake_embedding("таверна", 16)
+
+    assert a == fake_embedding("таверна", 16)
+    assert a != fake_embedding("рынок", 16)
+    assert sum(x * x for x in a) == pytest.approx(1.0)
+
+
+def test_percentile_nearest_rank():
+    """Test nearest-rank percentile."""
+    samples = [float(i) for i in range(1, 101)]
+
+    assert percentile(samples, 0.5) == 50.0
+    assert percentile(samples, 0.99) == 99.0
+    assert percentile([], 0.5) == 0.0
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("mode", [ORCHESTRATOR, HANDLER])
+async def test_benchmark_end_to_end(mode):
+    """Test a tiny run completes every turn through the stub and fake DB."""
+    config = LoadConfig(players=2, turns=2, mode=mode, seed=1)
+
+    report = await run_benchmark(config, fast_stub())
+
+    assert report.errors == 0
+    assert report.turns == 4
+    assert report.turns_per_s > 0
+    assert report.p50_ms <= report.p95_ms <= report.p99_ms <= report.max_ms
+    assert report.stub_requests.get(NARRATIVE) == 4
+    assert "narrative" in report.stage_mean_ms
+    assert report.db_round_trips > 0
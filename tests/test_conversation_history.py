@@ -0,0 +1,189 @@
+"""Tests for conversation history ring buffers and batched appends."""
+
+import asyncio
+import pytest
+from datetime import datetime, timedelta, timezone
+from unittest.mock import AsyncMock, patch
+from uuid import uuid4
+
+from app.db.conversation_turns import append_conversation_turns
+from app.db.models import ConversationTurnDB
+from app.memory.conversation import ConversationHistory
+
+
+def _stored(character_id, *contents):
+    start = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    return [
+        ConversationTurnDB(
+            character_id=character_id,
+            role="user" if i % 2 == 0 else "assistant",
+            content=content,
+            created_at=start + timedelta(seconds=i),
+        )
+        for i, content in enumerate(contents)
+    ]
+
+
+@pytest.mark.asyncio
+async def test_cold_buffer_loads_once():
+    """First read loads from the table; later reads and appends stay in memory."""
+    character_id = uuid4()
+    history = ConversationHistory(max_messages=4)
+    load = AsyncMock(return_value=_stored(character_id, "a", "b"))
+
+    with patch("app.memory.conversation.get_recent_conversation_turns", new=load), \
+         patch("app.memory.conversation.append_conversation_turns", new=AsyncMock()):
+        await history.recent(character_id)
+        await history.append(character_id, "c", "d")
+        await history.append(character_id, "e", "f")
+        messages = await history.recent(character_id)
+
+    load.assert_awaited_once_with(character_id, 4)
+    assert [m["content"] for m in messages] == ["c", "d", "e", "f"]
+    assert messages[-1]["role"] == "assistant"
+
+
+@pytest.mark.asyncio
+async def test_appends_are_batched():
+    """Appends from several users within the flush interval become one write."""
+    history = ConversationHistory(flush_interval=0.01)
+    append = AsyncMock()
+
+    with patch("app.memory.conversation.append_conversation_turns", new=append):
+        await history.start()
+        for _ in range(3):
+            await history.append(uuid4(), "Иду на север", "Вы входите в лес")
+        await asyncio.sleep(0.05)
+        await history.stop()
+
+    append.assert_awaited_once()
+    assert len(append.await_args.args[0]) == 6
+    assert history.written == 6
+
+
+@pytest.mark.asyncio
+async def test_stop_writes_queued_appends():
+    """Shutdown flushes what the writer has not written yet."""
+    history = ConversationHistory(flush_interval=60)
+    append = AsyncMock()
+
+    with patch("app.memory.conversation.append_conversation_turns", new=append):
+        await history.start()
+        await history.append(uuid4(), "a", "b")
+        await history.stop()
+
+    append.assert_awaited_once()
+    assert history.depth == 0
+
+
+@pytest.mark.asyncio
+async def test_cold_load_includes_unwritten_appends():
+    """A buffer reloaded before the writer ran still has the latest exchange."""
+    character_id = uuid4()
+    history = ConversationHistory(flush_interval=60)
+    stored = _stored(character_id, "a", "b")
+
+    with patch("app.memory.conversation.get_recent_conversation_turns",
+               new=AsyncMock(return_value=stored)), \
+         patch("app.memory.conversation.append_conversation_turns", new=AsyncMock()):
+        await history.start()
+        await history.append(character_id, "c", "d")
+        history.invalidate(character_id)
+        messages = await history.recent(character_id)
+        await history.stop()
+
+    assert [m["content"] for m in messages] == ["a", "b", "c", "d"]
+
+
+@pytest.mark.asyncio
+async def test_failed_load_is_not_cached():
+    """A query error yields empty history now but is retried next turn."""
+    character_id = uuid4()
+    history = ConversationHistory()
+    load = AsyncMock(side_effect=[None, _stored(character_id, "a", "b")])
+
+    with patch("app.memory.conversation.get_recent_conversation_turns", new=load):
+        assert await history.recent(character_id) == []
+        assert len(await history.recent(character_id)) == 2
+
+
+@pytest.mark.asyncio
+async def test_reset_drops_buffer_queue_and_rows():
+    """New adventure starts with an empty conversation."""
+    character_id = uuid4()
+    history = ConversationHistory(flush_interval=60)
+    delete = AsyncMock(return_value=True)
+    append = AsyncMock()
+
+    with patch("app.memory.conversation.delete_conversation_turns", new=delete), \
+         patch("app.memory.conversation.append_conversation_turns", new=append):
+        await history.start()
+        await history.append(character_id, "a", "b")
+        await history.reset(character_id)
+        messages = await history.recent(character_id)
+        await history.stop()
+
+    delete.assert_awaited_once_with(character_id)
+    append.assert_not_awaited()
+    assert messages == []
+    assert history.depth == 0
+
+
+@pytest.mark.asyncio
+async def test_reset_wins_over_load_in_flight():
+    """Rows read before a reset are not cached after it."""
+    character_id = uuid4()
+    history = ConversationHistory()
+    loaded = asyncio.Event()
+    proceed = asyncio.Event()
+
+    async def slow_load(*args):
+        loaded.set()
+        await proceed.wait()
+        return _stored(character_id, "a", "b")
+
+    with patch("app.memory.conversation.get_recent_conversation_turns", new=slow_load), \
+         patch("app.memory.conversation.delete_conversation_turns", new=AsyncMock(return_value=True)):
+        stale = asyncio.create_task(history.recent(character_id))
+        await loaded.wait()
+        await history.reset(character_id)
+        proceed.set()
+        await stale
+        messages = await history.recent(character_id)
+
+    assert messages == []
+
+
+@pytest.mark.asyncio
+async def test_failed_reset_reloads_stored_rows():
+    """If the rows could not be deleted, the cache does not claim they are gone."""
+    character_id = uuid4()
+    history = ConversationHistory()
+    load = AsyncMock(return_value=_stored(character_id, "a", "b"))
+
+    with patch("app.memory.conversation.get_recent_conversation_turns", new=load), \
+         patch("app.memory.conversation.delete_conversation_turns", new=AsyncMock(return_value=False)):
+        await history.recent(character_id)
+        await history.reset(character_id)
+        messages = await history.recent(character_id)
+
+    assert [m["content"] for m in messages] == ["a", "b"]
+    assert load.await_count == 2
+
+
+@pytest.mark.asyncio
+async def test_append_statement_skips_unknown_characters():
+    """One INSERT ... SELECT over arrays, filtered to existing characters."""
+    conn = AsyncMock()
+    conn.fetchval = AsyncMock(return_value=2)
+    turns = _stored(uuid4(), "a", "b")
+
+    with patch("app.db.supabase.get_db_connection", return_value=conn):
+        inserted = await append_conversation_turns(turns)
+
+    sql, character_ids, roles, contents, created = conn.fetchval.await_args.args
+    assert "unnest" in sql
+    assert "EXISTS (SELECT 1 FROM characters" in sql
+    assert roles == ["user", "assistant"]
+    assert contents == ["a", "b"]
+    assert inserted == 2
@@ -0,0 +1,168 @@
+"""Tests for the read-through row cache."""
+
+import asyncio
+import json
+import pytest
+from unittest.mock import AsyncMock, patch
+from uuid import uuid4
+
+from app.db.cache import (
+    REPLICA_NAME,
+    CacheInvalidationListener,
+    EntityCache,
+    character_cache,
+    user_settings_cache,
+    world_state_cache,
+)
+from app.db.characters import get_character_by_telegram_id, update_character
+from app.db.turn_commit import TurnCommit
+from app.db.turn_context import load_turn_context
+from app.db.user_settings import get_user_settings_by_telegram_id, update_combat_enabled
+from app.game.character import CharacterSheet
+
+
+def _turn_row(character_id, version=1):
+    return {
+        "id": character_id,
+        "telegram_user_id": 4242,
+        "name": "Hero",
+        "character_sheet": json.dumps({"hp": 20, "max_hp": 25}),
+        "session_id": uuid4(),
+        "combat_enabled": True,
+        "state_data": json.dumps({"in_combat": False, "enemies": []}),
+        "world_state_version": version,
+    }
+
+
+def test_lru_eviction_and_copies():
+    """Oldest entry is evicted and cached values are not shared with callers."""
+    cache = EntityCache("test", max_size=2, ttl=60)
+    cache.set(1, {"a": [1]})
+    cache.set(2, {"b": 2})
+    cache.get(1)
+    cache.set(3, {"c": 3})
+
+    assert cache.get(2) is None
+    value = cache.get(1)
+    value["a"].append(2)
+    assert cache.get(1) == {"a": [1]}
+
+
+def test_ttl_expiry():
+    """Entries older than the TTL are misses."""
+    cache = EntityCache("test", max_size=10, ttl=60)
+    cache.set("k", 1)
+
+    with patch("app.db.cache.time.monotonic", return_value=10**9):
+        assert cache.get("k") is None
+
+
+@pytest.mark.asyncio
+async def test_load_racing_invalidation_is_not_cached():
+    """A value loaded while an invalidation arrived may be stale and is not stored."""
+    cache = EntityCache("test", max_size=10, ttl=60)
+
+    async def load():
+        cache.invalidate("k")
+        return "stale"
+
+    assert await cache.get_or_load("k", load) == "stale"
+    assert cache.get("k") is None
+
+
+@pytest.mark.asyncio
+async def test_character_read_through_and_write_through():
+    """Second read hits the cache; an update is visible without reading."""
+    character = CharacterSheet(telegram_user_id=7, name="Hero")
+    conn = AsyncMock()
+    conn.fetchrow = AsyncMock(return_value={
+        "id": character.id,
+        "telegram_user_id": 7,
+        "name": "Hero",
+        "character_sheet": json.dumps({"hp": 20}),
+    })
+    conn.execute = AsyncMock(return_value="UPDATE 1")
+
+    with patch("app.db.supabase.get_db_connection", return_value=conn):
+        await get_character_by_telegram_id(7)
+        await get_character_by_telegram_id(7)
+        character.name = "Renamed"
+        await update_character(character)
+        cached = await get_character_by_telegram_id(7)
+
+    conn.fetchrow.assert_awaited_once()
+    assert cached.name == "Renamed"
+
+
+@pytest.mark.asyncio
+async def test_user_settings_write_through():
+    """Combat toggle updates the cached settings."""
+    conn = AsyncMock()
+    conn.fetchrow = AsyncMock(return_value={"telegram_user_id": 7, "combat_enabled": True})
+    conn.execute = AsyncMock(return_value="UPDATE 1")
+
+    with patch("app.db.supabase.get_db_connection", return_value=conn):
+        await get_user_settings_by_telegram_id(7)
+        await update_combat_enabled(7, False)
+        settings = await get_user_settings_by_telegram_id(7)
+
+    conn.fetchrow.assert_awaited_once()
+    assert settings["combat_enabled"] is False
+
+
+@pytest.mark.asyncio
+async def test_second_turn_needs_no_reads():
+    """After one turn is loaded and committed, the next turn context comes from cache."""
+    character_id = uuid4()
+    conn = AsyncMock()
+    conn.fetchrow = AsyncMock(return_value=_turn_row(character_id))
+
+    with patch("app.db.supabase.get_db_connection", return_value=conn):
+        turn = await load_turn_context(4242)
+
+        turn_commit = TurnCommit()
+        turn_commit.save_world_state(character_id, {"in_combat": True}, turn.world_state_version)
+        conn.fetchrow = AsyncMock(return_value={"world_state_rows": 1, "world_state_version": 2})
+        await turn_commit.commit()
+
+        conn.fetchrow.reset_mock()
+        next_turn = await load_turn_context(4242)
+
+    conn.fetchrow.assert_not_awaited()
+    assert next_turn.game_state == {"in_combat": True}
+    assert next_turn.world_state_version == 2
+    assert next_turn.session_id == turn.session_id
+
+
+def test_listener_applies_foreign_invalidations_only():
+    """Notifications from other replicas drop entries; our own are ignored."""
+    listener = CacheInvalidationListener()
+    character_id = uuid4()
+    user_settings_cache.set(7, {"combat_enabled": True})
+    world_state_cache.set(character_id, ({}, 1))
+
+    listener.handle(json.dumps({"table": "user_settings", "key": "7", "origin": REPLICA_NAME}))
+    listener.handle(json.dumps({"table": "world_state", "key": str(character_id), "origin": "other"}))
+    listener.handle("not json")
+
+    assert user_settings_cache.get(7) is not None
+    assert world_state_cache.get(character_id) is None
+    assert listener.received == 1
+
+
+@pytest.mark.asyncio
+async def test_listener_clears_caches_on_subscribe():
+    """Entries cached while not subscribed may have missed notifications."""
+    character_cache.set(7, CharacterSheet(telegram_user_id=7, name="Hero"))
+    conn = AsyncMock()
+    conn.add_termination_listener = lambda callback: None
+    conn.is_closed = lambda: False
+    listener = CacheInvalidationListener()
+
+    with patch("asyncpg.connect", new=AsyncMock(return_value=conn)):
+        await listener.start()
+        await asyncio.sleep(0.01)
+        await listener.stop()
+
+    conn.add_listener.assert_awaited_once()
+    assert character_cache.get(7) is None
@@ -0,0 +1,95 @@
+"""Tests for shared database connection pool."""
+
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from app.db import supabase
+from app.db.supabase import db_connection, init_db_pool, close_db_pool, get_db_pool
+
+
+class _FakeAcquire:
+    """Async context manager returned by pool.acquire()."""
+    
+    def __init__(self, conn):
+        self.conn = conn
+    
+    async def __aenter__(self):
+        return self.conn
+    
+    async def __aexit__(self, exc_type, exc, tb):
+        return False
+
+
+@pytest.fixture
+def fake_pool():
+    """Install a fake pool for the duration of a test."""
+    conn = AsyncMock()
+    pool = MagicMock()
+    pool.acquire = MagicMock(return_value=_FakeAcquire(conn))
+    pool.close = AsyncMock()
+    
+    with patch.object(supabase, "_pool", pool):
+        yield pool, conn
+
+
+@pytest.mark.asyncio
+async def test_db_connection_uses_pool(fake_pool):
+    """Connections are acquired from the pool when it is initialized."""
+    pool, conn = fake_pool
+    
+    with patch("app.db.supabase.get_db_connection") as mock_connect:
+        async with db_connection() as acquired:
+            assert acquired is conn
+    
+    pool.acquire.assert_called_once()
+    mock_connect.assert_not_called()
+    conn.close.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_db_connection_fallback_without_pool():
+    """Without a pool, a one-off connection is opened and closed."""
+    conn = AsyncMock()
+    
+    with patch.object(supabase, "_pool", None), \
+         patch("app.db.supabase.get_db_connection", return_value=conn):
+        async with db_connection() as acquired:
+            assert acquired is conn
+    
+    conn.close.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_init_db_pool_without_url():
+    """Pool is not created when SUPABASE_DB_URL is missing."""
+    with patch.object(supabase, "_pool", None), \
+         patch("app.config.settings.supabase_db_url", None), \
+         patch("asyncpg.create_pool") as mock_create:
+        pool = await init_db_pool()
+    
+    assert pool is None
+    mock_create.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_init_db_pool_uses_settings():
+    """Pool is created once with configured limits."""
+    created = MagicMock()
+    created.close = AsyncMock()
+    
+    with patch.object(supabase, "_pool", None), \
+         patch("app.config.settings.supabase_db_url", "postgresql://test"), \
+         patch("app.config.settings.db_pool_max_size", 7), \
+         patch("asyncpg.create_pool", new=AsyncMock(return_value=created)) as mock_create:
+        first = await init_db_pool()
+        second = await init_db_pool()
+        
+        assert first is created
+        assert second is created
+        assert get_db_pool() is created
+        mock_create.assert_awaited_once()
+        assert mock_create.call_args.kwargs["max_size"] == 7
+        
+        await close_db_pool()
+        created.close.assert_awaited_once()
+        assert get_db_pool() is None
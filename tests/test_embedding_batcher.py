@@ -0,0 +1,137 @@
+"""Tests for embedding micro-batcher."""
+
+import asyncio
+import pytest
+
+from app.memory.embedding_batcher import EmbeddingBatcher
+
+
+def _make_batcher(calls, **kwargs):
+    async def batch_fn(texts):
+        calls.append(list(texts))
+        await asyncio.sleep(0)
+        return [[float(len(text))] for text in texts]
+    
+    return EmbeddingBatcher(batch_fn, key_fn=lambda text: text.strip().lower(), **kwargs)
+
+
+@pytest.mark.asyncio
+async def test_concurrent_requests_coalesced():
+    """Concurrent submits within the window become one batch call."""
+    calls = []
+    batcher = _make_batcher(calls, max_wait_ms=20)
+    
+    results = await asyncio.gather(
+        batcher.submit("a"),
+        batcher.submit("bb"),
+        batcher.submit("ccc"),
+    )
+    
+    assert calls == [["a", "bb", "ccc"]]
+    assert results == [[1.0], [2.0], [3.0]]
+    assert batcher.stats()["batches_sent"] == 1
+
+
+@pytest.mark.asyncio
+async def test_identical_texts_deduplicated():
+    """Identical in-flight texts share one slot."""
+    calls = []
+    batcher = _make_batcher(calls, max_wait_ms=20)
+    
+    results = await asyncio.gather(
+        batcher.submit("атакую"),
+        batcher.submit(" Атакую "),
+        batcher.submit("иду"),
+    )
+    
+    assert calls == [["атакую", "иду"]]
+    assert results[0] == results[1]
+    assert batcher.stats()["deduplicated"] == 1
+
+
+@pytest.mark.asyncio
+async def test_flush_when_batch_full():
+    """Batch is sent immediately once max_batch_size is reached."""
+    calls = []
+    batcher = _make_batcher(calls, max_batch_size=2, max_wait_ms=10_000)
+    
+    results = await asyncio.wait_for(
+        asyncio.gather(batcher.submit("a"), batcher.submit("bb")),
+        timeout=1.0,
+    )
+    
+    assert calls == [["a", "bb"]]
+    assert results == [[1.0], [2.0]]
+
+
+@pytest.mark.asyncio
+async def test_batch_failure_propagates_to_all_callers():
+    """Every waiting caller gets the batch error."""
+    async def failing(texts):
+        raise RuntimeError("API down")
+    
+    batcher = EmbeddingBatcher(failing, key_fn=lambda text: text, max_wait_ms=5)
+    
+    results = await asyncio.gather(
+        batcher.submit("a"),
+        batcher.submit("b"),
+        return_exceptions=True,
+    )
+    
+    assert all(isinstance(r, RuntimeError) for r in results)
+
+
+@pytest.mark.asyncio
+async def test_embeddings_service_coalesces_concurrent_embed_text():
+    """Concurrent embed_text calls reach the API as one batch request."""
+    import json
+    import httpx
+    from app.memory.embedding_cache import EmbeddingCache
+    from app.memory.embeddings import EmbeddingsService
+    
+    requests = []
+    
+    def handler(request: httpx.Request) -> httpx.Response:
+        inputs = json.loads(request.content)["input"]
+        requests.append(inputs)
+        data = [{"index": i, "embedding": [float(i)] * 2560} for i in range(len(inputs))]
+        return httpx.Response(200, json={"data": data})
+    
+    service = EmbeddingsService()
+    service.cache = EmbeddingCache(max_entries=100)
+    service.batcher = EmbeddingBatcher(
+        service._fetch_batch, key_fn=service._cache_key, max_wait_ms=20
+    )
+    service._client = httpx.AsyncClient(
+        base_url=service.base_url,
+        transport=httpx.MockTransport(handler),
+    )
+    
+    vectors = await asyncio.gather(
+        service.embed_text("атакую орка"),
+        service.embed_text("иду в таверну"),
+    )
+    
+    assert requests == [["атакую орка", "иду в таверну"]]
+    assert vectors[0][0] == 0.0 and vectors[1][0] == 1.0
+    await service.aclose()
+
+
+@pytest.mark.asyncio
+async def test_flush_tasks_are_referenced_until_done():
+    """In-flight flushes are held by the batcher, not only by the loop."""
+    release = asyncio.Event()
+    
+    async def batch_fn(texts):
+        await release.wait()
+        return [[1.0] for _ in texts]
+    
+    batcher = EmbeddingBatcher(batch_fn, key_fn=str, max_batch_size=2)
+    waiters = asyncio.gather(batcher.submit("a"), batcher.submit("b"))
+    for _ in range(3):
+        await asyncio.sleep(0)
+    
+    assert len(batcher._tasks) == 1
+    release.set()
+    assert await waiters == [[1.0], [1.0]]
+    assert not batcher._tasks
@@ -0,0 +1,108 @@
+"""Tests for embedding cache."""
+
+import httpx
+import pytest
+
+from app.memory.embedding_cache import EmbeddingCache, make_cache_key, normalize_text
+from app.memory.embeddings import EmbeddingsService
+
+
+def test_cache_key_normalizes_text():
+    """Whitespace and case differences map to the same key."""
+    assert normalize_text("  Атакую   ГОБЛИНА ") == "атакую гоблина"
+    assert make_cache_key("m", 8, "Атакую гоблина") == make_cache_key("m", 8, " атакую  гоблина")
+    assert make_cache_key("m", 8, "x") != make_cache_key("m", 16, "x")
+    assert make_cache_key("m1", 8, "x") != make_cache_key("m2", 8, "x")
+
+
+@pytest.mark.asyncio
+async def test_memory_tier_lru_eviction():
+    """Least recently used entries are evicted first."""
+    cache = EmbeddingCache(max_entries=2)
+    await cache.put("a", [0.5, 0.25])
+    await cache.put("b", [1.0, 0.0])
+    
+    assert await cache.get("a") == [0.5, 0.25]  # "a" becomes most recent
+    await cache.put("c", [0.0, 1.0])
+    
+    assert await cache.get("b") is None
+    assert await cache.get("a") is not None
+    assert await cache.get("c") == [0.0, 1.0]
+    
+    stats = cache.stats()
+    assert stats["memory_hits"] == 3
+    assert stats["misses"] == 1
+    assert stats["memory_entries"] == 2
+
+
+@pytest.mark.asyncio
+async def test_disk_tier_survives_restart(tmp_path):
+    """Persistent tier serves vectors to a fresh cache instance."""
+    path = str(tmp_path / "embeddings.sqlite")
+    
+    cache = EmbeddingCache(max_entries=10, path=path)
+    await cache.put("key", [0.125, -0.5, 0.75])
+    cache.close()
+    
+    restarted = EmbeddingCache(max_entries=10, path=path)
+    assert await restarted.get("key") == [0.125, -0.5, 0.75]
+    assert restarted.stats()["disk_hits"] == 1
+    
+    # Second lookup is served from memory
+    await restarted.get("key")
+    assert restarted.stats()["memory_hits"] == 1
+    restarted.close()
+
+
+def _service_with_transport(handler) -> EmbeddingsService:
+    service = EmbeddingsService()
+    service.cache = EmbeddingCache(max_entries=100)
+    service._client = httpx.AsyncClient(
+        base_url=service.base_url,
+        transport=httpx.MockTransport(handler),
+    )
+    return service
+
+
+@pytest.mark.asyncio
+async def test_embed_text_served_from_cache():
+    """Repeated text does not hit the API again."""
+    calls = []
+    
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request)
+        return httpx.Response(200, json={"data": [{"embedding": [0.5] * 2560}]})
+    
+    service = _service_with_transport(handler)
+    
+    first = await service.embed_text("атакую гоблина")
+    second = await service.embed_text("Атакую  гоблина")
+    
+    assert len(calls) == 1
+    assert first == second
+    assert service.cache.stats()["memory_hits"] == 1
+    await service.aclose()
+
+
+@pytest.mark.asyncio
+async def test_embed_batch_requests_only_misses():
+    """Batch sends only uncached texts and preserves order."""
+    import json
+    
+    requested = []
+    
+    def handler(request: httpx.Request) -> httpx.Response:
+        inputs = json.loads(request.content)["input"]
+        requested.append(inputs)
+        data = [{"embedding": [float(len(text) % 7)] * 2560} for text in inputs]
+        return httpx.Response(200, json={"data": data})
+    
+    service = _service_with_transport(handler)
+    
+    await service.embed_text("иду в таверну")
+    vectors = await service.embed_batch(["иду в таверну", "атакую орка", "говорю с барменом"])
+    
+    assert requested[-1] == ["атакую орка", "говорю с барменом"]
+    assert len(vectors) == 3
+    assert vectors[1][0] == float(len("атакую орка") % 7)
+    await service.aclose()
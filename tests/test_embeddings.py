@@ -55,3 +55,50 @@ async def test_dimension_adjustment():
     adjusted = embeddings_service._adjust_dimension(exact_vector)
     assert len(adjusted) == 2560
     assert adjusted == exact_vector
+
+
+@pytest.mark.asyncio
+async def test_http_client_is_reused():
+    """Service keeps one long-lived HTTP client across calls."""
+    from app.memory.embeddings import EmbeddingsService
+    
+    service = EmbeddingsService()
+    client = service._get_client()
+    
+    assert service._get_client() is client
+    
+    await service.aclose()
+    assert client.is_closed
+    
+    # New client is created lazily after close
+    new_client = service._get_client()
+    assert new_client is not client
+    await service.aclose()
+
+
+@pytest.mark.asyncio
+async def test_embed_text_uses_shared_client():
+    """embed_text posts through the shared client without opening a new one."""
+    import httpx
+    from app.memory.embeddings import EmbeddingsService
+    
+    calls = []
+    
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request)
+        return httpx.Response(200, json={"data": [{"embedding": [0] * 2560}]})
+    
+    service = EmbeddingsService()
+    service._client = httpx.AsyncClient(
+        base_url=service.base_url,
+        transport=httpx.MockTransport(handler),
+    )
+    
+    first = await service.embed_text("атакую гоблина")
+    second = await service.embed_text("иду в таверну")
+    
+    assert len(calls) == 2
+    assert calls[0].url.path.endswith("/embeddings")
+    assert len(first) == 2560 and all(isinstance(x, float) for x in first)
+    assert len(second) == 2560
+    await service.aclose()
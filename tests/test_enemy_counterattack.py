@@ -33,7 +33,9 @@ async def test_enemy_counterattack_shown_in_message():
     }
     
     # Mock LLM responses to ensure enemy counterattack
-    with patch("app.llm.client.llm_client.get_completion") as mock_llm:
+    # Intent comes from the mocked LLM call, not the fast-path classifier
+    with patch("app.llm.client.llm_client.get_completion") as mock_llm, \
+         patch("app.agents.rules_arbiter.settings.intent_fast_path_enabled", False):
         # Configure mock to return different responses for each call
         mock_responses = [
             # Call 1: Intent analysis (Rules Arbiter)
@@ -127,7 +129,9 @@ async def test_no_counterattack_when_not_in_combat():
     }
     
     # Mock LLM for non-combat action
-    with patch("app.llm.client.llm_client.get_completion") as mock_llm:
+    # Intent comes from the mocked LLM call, not the fast-path classifier
+    with patch("app.llm.client.llm_client.get_completion") as mock_llm, \
+         patch("app.agents.rules_arbiter.settings.intent_fast_path_enabled", False):
         mock_responses = [
             # Intent: movement (no combat)
             """{
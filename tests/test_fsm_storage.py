@@ -0,0 +1,154 @@
+"""Tests for persistent FSM storage backends."""
+
+import json
+import pytest
+from unittest.mock import AsyncMock, patch
+
+from aiogram.fsm.storage.base import StorageKey
+
+from app.bot.states import ConversationState
+from app.bot.storage import (
+    LocalRedis,
+    PostgresStorage,
+    RedisStorage,
+    decode_fsm_data,
+    encode_fsm_data,
+)
+
+KEY = StorageKey(bot_id=1, chat_id=42, user_id=42)
+
+
+def _history(turns: int) -> list[dict]:
+    history = []
+    for i in range(turns):
+        history.append({"role": "user", "content": f"Действие {i}"})
+        history.append({"role": "assistant", "content": f"Ответ мастера {i} " * 20})
+    return history
+
+
+def test_encode_roundtrip_compacts_history():
+    """History is stored as [role, content] pairs and restored as dicts."""
+    data = {"character": {"name": "Hero", "hp": 20}, "history": _history(1)}
+
+    blob = encode_fsm_data(data)
+
+    assert b'["u","' in blob
+    assert decode_fsm_data(blob) == data
+
+
+def test_encode_compresses_large_data():
+    """Large payloads are zlib-compressed and much smaller than plain JSON."""
+    data = {"history": _history(10)}
+
+    blob = encode_fsm_data(data)
+
+    assert blob[:1] == b"z"
+    assert len(blob) < len(json.dumps(data).encode()) / 4
+    assert decode_fsm_data(blob) == data
+
+
+def test_encode_keeps_unknown_history_shape():
+    """Messages with extra fields are stored as-is."""
+    data = {"history": [{"role": "user", "content": "x", "ts": 1}]}
+
+    assert decode_fsm_data(encode_fsm_data(data)) == data
+    assert encode_fsm_data({}) is None
+    assert decode_fsm_data(None) == {}
+
+
+@pytest.mark.asyncio
+async def test_redis_storage_state_and_data():
+    """State and data survive a new storage instance (restart / other replica)."""
+    redis = LocalRedis()
+    storage = RedisStorage(redis)
+
+    await storage.set_state(KEY, ConversationState.in_conversation)
+    await storage.update_data(KEY, {"history": _history(1)})
+
+    restarted = RedisStorage(redis)
+    assert await restarted.get_state(KEY) == ConversationState.in_conversation.state
+    assert await restarted.get_data(KEY) == {"history": _history(1)}
+
+    await restarted.set_state(KEY, None)
+    await restarted.set_data(KEY, {})
+    assert await redis.hgetall(restarted.key_builder.build(KEY)) == {}
+
+
+@pytest.mark.asyncio
+async def test_cache_serves_reads_within_ttl():
+    """State and data are loaded in one read, then served from the cache."""
+    redis = LocalRedis()
+    await RedisStorage(redis).set_data(KEY, {"a": 1})
+    redis.hgetall = AsyncMock(wraps=redis.hgetall)
+    storage = RedisStorage(redis, cache_ttl=60)
+
+    await storage.get_state(KEY)
+    await storage.get_data(KEY)
+    await storage.update_data(KEY, {"b": 2})
+
+    assert redis.hgetall.await_count == 1
+    assert await storage.get_data(KEY) == {"a": 1, "b": 2}
+    assert storage.hits == 3
+
+
+@pytest.mark.asyncio
+async def test_cache_disabled_reads_backend():
+    """With TTL 0 every read sees writes made by other replicas."""
+    redis = LocalRedis()
+    replica_a = RedisStorage(redis, cache_ttl=0)
+    replica_b = RedisStorage(redis, cache_ttl=0)
+
+    await replica_a.get_data(KEY)
+    await replica_b.set_data(KEY, {"turn": 2})
+
+    assert await replica_a.get_data(KEY) == {"turn": 2}
+
+
+@pytest.mark.asyncio
+async def test_get_data_returns_copy():
+    """Mutating returned data does not change the cached value."""
+    storage = RedisStorage(LocalRedis())
+    await storage.set_data(KEY, {"history": []})
+
+    data = await storage.get_data(KEY)
+    data["history"].append({"role": "user", "content": "x"})
+
+    assert await storage.get_data(KEY) == {"history": []}
+
+
+@pytest.mark.asyncio
+async def test_failed_write_invalidates_cache():
+    """A failed backend write raises and drops the cached entry."""
+    redis = LocalRedis()
+    storage = RedisStorage(redis, cache_ttl=60)
+    await storage.set_data(KEY, {"turn": 1})
+    redis.hset = AsyncMock(side_effect=ConnectionError("down"))
+
+    with pytest.raises(ConnectionError):
+        await storage.set_data(KEY, {"turn": 2})
+
+    assert storage.key_builder.build(KEY) not in storage._cache
+    assert await storage.get_data(KEY) == {"turn": 1}
+
+
+@pytest.mark.asyncio
+async def test_postgres_storage_queries():
+    """Postgres backend upserts one column per write and reads both in one query."""
+    conn = AsyncMock()
+    blob = encode_fsm_data({"history": _history(1)})
+    conn.fetchrow = AsyncMock(return_value={"state": "ConversationState:in_conversation", "data": blob})
+    storage = PostgresStorage()
+
+    with patch("app.db.supabase.get_db_connection", return_value=conn):
+        await storage.set_data(KEY, {"history": _history(1)})
+        storage._cache.clear()
+        state = await storage.get_state(KEY)
+        data = await storage.get_data(KEY)
+
+    sql, storage_key, written = conn.execute.await_args.args
+    assert "INSERT INTO fsm_state (storage_key, data)" in sql
+    assert storage_key == "fsm:1:42:42"
+    assert written == blob
+    conn.fetchrow.assert_awaited_once()
+    assert state == "ConversationState:in_conversation"
+    assert data == {"history": _history(1)}
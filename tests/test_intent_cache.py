@@ -0,0 +1,115 @@
+"""Tests for intent analysis cache."""
+
+import pytest
+from unittest.mock import AsyncMock, patch
+
+from app.agents.rules_arbiter import RulesArbiterAgent
+from app.game.character import CharacterSheet
+from app.game.intent_cache import IntentCache, make_intent_key, normalize_action
+
+INTENT = {"action_type": "skill_check", "requires_roll": True, "roll_type": "skill_check",
+          "skill": "wisdom", "target": None, "difficulty": "medium", "reasoning": "Осмотр"}
+
+
+def test_normalize_action():
+    """Test that case, ё, punctuation and spaces are normalized."""
+    assert normalize_action("  Бью  ЕЩЁ раз!!! ") == "бью еще раз"
+
+
+def test_key_ignores_enemy_order_but_not_combat_state():
+    """Test key composition from combat context."""
+    a = make_intent_key("Бью", {"in_combat": True, "enemies": ["волк", "гоблин"], "location": "лес"})
+    b = make_intent_key("бью", {"in_combat": True, "enemies": ["гоблин", "волк"], "location": "лес"})
+    c = make_intent_key("бью", {"in_combat": False, "enemies": [], "location": "лес"})
+
+    assert a == b
+    assert a != c
+
+
+def test_get_returns_copy_and_counts_hits():
+    """Test hit/miss counters and per-entry stats."""
+    cache = IntentCache()
+    key = make_intent_key("осматриваю алтарь", {})
+
+    assert cache.get(key) is None
+    cache.put(key, INTENT)
+    intent = cache.get(key)
+    intent["skill"] = "changed"
+
+    assert cache.get(key)["skill"] == "wisdom"
+    stats = cache.stats()
+    assert stats["hits"] == 2
+    assert stats["misses"] == 1
+    assert stats["top_entries"][0]["hits"] == 2
+    assert stats["top_entries"][0]["action"] == "осматриваю алтарь"
+
+
+def test_ttl_expiry():
+    """Test that expired entries are dropped."""
+    cache = IntentCache(ttl_seconds=10)
+    key = make_intent_key("осматриваю алтарь", {})
+
+    with patch("app.game.intent_cache.time.monotonic", return_value=100.0):
+        cache.put(key, INTENT)
+    with patch("app.game.intent_cache.time.monotonic", return_value=111.0):
+        assert cache.get(key) is None
+
+    assert cache.stats()["expired"] == 1
+
+
+def test_lru_bound():
+    """Test that least recently used entry is evicted."""
+    cache = IntentCache(max_entries=2)
+    keys = [make_intent_key(f"действие {i}", {}) for i in range(3)]
+
+    cache.put(keys[0], INTENT)
+    cache.put(keys[1], INTENT)
+    cache.get(keys[0])
+    cache.put(keys[2], INTENT)
+
+    assert cache.get(keys[1]) is None
+    assert cache.get(keys[0]) is not None
+    assert cache.stats()["evicted"] == 1
+
+
+def test_invalidate_action():
+    """Test invalidation of all contexts for one action."""
+    cache = IntentCache()
+    cache.put(make_intent_key("осматриваю алтарь", {"in_combat": False}), INTENT)
+    cache.put(make_intent_key("осматриваю алтарь", {"in_combat": True}), INTENT)
+    cache.put(make_intent_key("осматриваю стену", {}), INTENT)
+
+    assert cache.invalidate_action("Осматриваю алтарь!") == 2
+    assert cache.stats()["entries"] == 1
+    assert cache.invalidate() == 1
+
+
+@pytest.mark.asyncio
+async def test_rules_arbiter_reuses_cached_intent():
+    """Test that repeated action skips the LLM call."""
+    agent = RulesArbiterAgent()
+    character = CharacterSheet(telegram_user_id=1, name="Тест")
+    game_state = {"in_combat": False, "location": "храм"}
+    response = '{"action_type": "skill_check", "requires_roll": true, "roll_type": "skill_check", "skill": "wisdom", "reasoning": "Осмотр"}'
+
+    with patch("app.agents.rules_arbiter.llm_client.get_completion",
+               AsyncMock(return_value=response)) as mock_llm:
+        first = await agent._analyze_intent("Осматриваю алтарь", character, game_state)
+        second = await agent._analyze_intent("осматриваю  алтарь.", character, game_state)
+
+    mock_llm.assert_awaited_once()
+    assert first == second
+
+
+@pytest.mark.asyncio
+async def test_rules_arbiter_does_not_cache_fallback():
+    """Test that keyword fallback after a bad LLM answer is not cached."""
+    agent = RulesArbiterAgent()
+    character = CharacterSheet(telegram_user_id=1, name="Тест")
+
+    with patch("app.agents.rules_arbiter.llm_client.get_completion",
+               AsyncMock(return_value="❌ Sorry")) as mock_llm:
+        await agent._analyze_intent("осматриваю алтарь", character, {})
+        await agent._analyze_intent("осматриваю алтарь", character, {})
+
+    assert mock_llm.await_count == 2
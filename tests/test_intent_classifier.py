@@ -0,0 +1,137 @@
+"""Tests for fast-path intent classifier."""
+
+import pytest
+from unittest.mock import AsyncMock, patch
+
+from app.agents.rules_arbiter import RulesArbiterAgent
+from app.config.schemas import INTENT_ANALYSIS_SCHEMA
+from app.game.character import CharacterSheet
+from app.game.intent_classifier import IntentClassifier
+
+THRESHOLD = 0.85
+
+
+@pytest.fixture
+def classifier():
+    return IntentClassifier()
+
+
+def assert_schema_shape(intent: dict):
+    """Intent has exactly the INTENT_ANALYSIS_SCHEMA keys and valid enums."""
+    assert set(intent) == set(INTENT_ANALYSIS_SCHEMA["properties"])
+    props = INTENT_ANALYSIS_SCHEMA["properties"]
+    assert intent["action_type"] in props["action_type"]["enum"]
+    assert intent["roll_type"] in props["roll_type"]["enum"]
+    assert intent["difficulty"] in props["difficulty"]["enum"]
+
+
+def test_obvious_attack(classifier):
+    """Test that a plain attack is classified confidently."""
+    intent, confidence = classifier.classify("атакую орка мечом", {"in_combat": False})
+
+    assert confidence >= THRESHOLD
+    assert intent["action_type"] == "attack"
+    assert intent["requires_roll"] is True
+    assert intent["roll_type"] == "attack_roll"
+    assert intent["target"] == "орка"
+    assert_schema_shape(intent)
+
+
+def test_attack_target_uses_known_enemy(classifier):
+    """Test that attack target is resolved to enemy from game state."""
+    intent, _ = classifier.classify("бью гоблина", {"in_combat": True, "enemies": ["гоблин"]})
+
+    assert intent["target"] == "гоблин"
+
+
+def test_obvious_movement(classifier):
+    """Test that simple movement needs no roll."""
+    intent, confidence = classifier.classify("иду в таверну", {"in_combat": False})
+
+    assert confidence >= THRESHOLD
+    assert intent["action_type"] == "movement"
+    assert intent["requires_roll"] is False
+    assert intent["target"] == "таверну"
+    assert_schema_shape(intent)
+
+
+def test_skill_check_maps_ability(classifier):
+    """Test that skill stems map to abilities used by RulesEngine."""
+    intent, confidence = classifier.classify("взламываю замок", {})
+
+    assert confidence >= THRESHOLD
+    assert intent["action_type"] == "skill_check"
+    assert intent["skill"] == "dexterity"
+    assert intent["difficulty"] == "medium"
+    assert_schema_shape(intent)
+
+
+def test_direct_speech_is_dialogue(classifier):
+    """Test that quoted speech is classified as dialogue."""
+    intent, confidence = classifier.classify("«Добрый вечер, хозяин!»", {})
+
+    assert confidence >= THRESHOLD
+    assert intent["action_type"] == "dialogue"
+
+
+@pytest.mark.parametrize("action,game_state", [
+    ("подхожу к орку и бью его", {}),  # compound
+    ("если дверь заперта, взламываю замок", {}),  # conditional
+    ("отступаю назад", {"in_combat": True}),  # movement in combat
+    ("читаю заклинание", {}),  # spell effect unknown
+])
+def test_ambiguous_actions_go_to_llm(classifier, action, game_state):
+    """Test that ambiguous actions stay below threshold."""
+    _, confidence = classifier.classify(action, game_state)
+
+    assert confidence < THRESHOLD
+
+
+def test_unknown_action(classifier):
+    """Test that unmatched actions return no intent."""
+    intent, confidence = classifier.classify("размышляю о смысле жизни", {})
+
+    assert intent is None
+    assert confidence == 0.0
+
+
+def test_hit_rate_stats(classifier):
+    """Test hit rate reporting."""
+    classifier.record("attack", hit=True)
+    classifier.record(None, hit=False)
+
+    stats = classifier.stats()
+    assert stats["attempts"] == 2
+    assert stats["hits"] == 1
+    assert stats["hit_rate"] == 0.5
+    assert stats["hits_by_type"] == {"attack": 1}
+
+
+@pytest.mark.asyncio
+async def test_rules_arbiter_skips_llm_on_fast_path():
+    """Test that confident fast-path result skips the LLM call."""
+    agent = RulesArbiterAgent()
+    character = CharacterSheet(telegram_user_id=1, name="Тест")
+
+    with patch("app.agents.rules_arbiter.llm_client.get_completion", AsyncMock()) as mock_llm:
+        intent = await agent._analyze_intent("атакую орка мечом", character, {"in_combat": False})
+
+    mock_llm.assert_not_awaited()
+    assert intent["action_type"] == "attack"
+    assert agent.intent_classifier.stats()["hits"] == 1
+
+
+@pytest.mark.asyncio
+async def test_rules_arbiter_uses_llm_on_miss():
+    """Test that low-confidence actions still go to the LLM."""
+    agent = RulesArbiterAgent()
+    character = CharacterSheet(telegram_user_id=1, name="Тест")
+    response = '{"action_type": "other", "requires_roll": false, "reasoning": "Размышление"}'
+
+    with patch("app.agents.rules_arbiter.llm_client.get_completion",
+               AsyncMock(return_value=response)) as mock_llm:
+        intent = await agent._analyze_intent("размышляю о смысле жизни", character, {})
+
+    mock_llm.assert_awaited_once()
+    assert intent["action_type"] == "other"
+    assert agent.intent_classifier.stats()["hit_rate"] == 0.0
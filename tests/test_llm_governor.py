@@ -0,0 +1,228 @@
+"""Tests for LLM admission control."""
+
+import asyncio
+
+import httpx
+import pytest
+from openai import APIConnectionError
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from app.llm.client import LLMClient
+from app.llm.governor import LLMGovernor, TokenBucket, current_llm_user, set_llm_user
+
+
+@pytest.mark.asyncio
+async def test_concurrency_cap():
+    """Test that no more than max_concurrency requests run at once."""
+    governor = LLMGovernor(max_concurrency=2)
+    running = 0
+    peak = 0
+
+    async def request():
+        nonlocal running, peak
+        async with governor.slot("m", user="u"):
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.01)
+            running -= 1
+
+    await asyncio.gather(*(request() for _ in range(6)))
+
+    assert peak == 2
+    assert governor.in_flight == 0
+    assert governor.stats()["admitted"] == 6
+    assert governor.stats()["queued"] == 4
+
+
+@pytest.mark.asyncio
+async def test_fair_queuing_round_robin():
+    """Test that a burst from one user does not starve another."""
+    governor = LLMGovernor(max_concurrency=1)
+    order = []
+    release = asyncio.Event()
+
+    async def blocker():
+        async with governor.slot("m", user="blocker"):
+            await release.wait()
+
+    async def request(user, i):
+        async with governor.slot("m", user=user):
+            order.append(f"{user}{i}")
+
+    blocker_task = asyncio.create_task(blocker())
+    await asyncio.sleep(0)
+
+    # User "a" floods the queue before user "b" sends one request
+    tasks = [asyncio.create_task(request("a", i)) for i in range(3)]
+    await asyncio.sleep(0)
+    tasks.append(asyncio.create_task(request("b", 0)))
+    await asyncio.sleep(0)
+
+    release.set()
+    await asyncio.gather(blocker_task, *tasks)
+
+    assert order == ["a0", "b0", "a1", "a2"]
+
+
+@pytest.mark.asyncio
+async def test_cancelled_waiter_does_not_leak_slot():
+    """Test that cancelling a queued request keeps slot accounting right."""
+    governor = LLMGovernor(max_concurrency=1)
+    release = asyncio.Event()
+
+    async def holder():
+        async with governor.slot("m", user="a"):
+            await release.wait()
+
+    async def waiter():
+        async with governor.slot("m", user="b"):
+            pass
+
+    holder_task = asyncio.create_task(holder())
+    await asyncio.sleep(0)
+    waiter_task = asyncio.create_task(waiter())
+    await asyncio.sleep(0)
+    assert governor.queue_depth == 1
+
+    waiter_task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await waiter_task
+    assert governor.queue_depth == 0
+
+    release.set()
+    await holder_task
+    assert governor.in_flight == 0
+
+
+@pytest.mark.asyncio
+async def test_token_bucket_waits_when_empty():
+    """Test that the bucket delays requests beyond the burst."""
+    bucket = TokenBucket(rate=100.0, burst=1)
+
+    assert await bucket.acquire() == 0.0
+    waited = await bucket.acquire()
+
+    assert waited > 0
+
+
+@pytest.mark.asyncio
+async def test_set_llm_user_is_task_local():
+    """Test that user attribution does not leak between tasks."""
+    async def handler(user_id):
+        set_llm_user(user_id)
+        await asyncio.sleep(0)
+        return current_llm_user.get()
+
+    results = await asyncio.gather(handler(1), handler(2))
+
+    assert results == ["1", "2"]
+    assert current_llm_user.get() is None
+
+
+@pytest.mark.asyncio
+async def test_llm_client_goes_through_governor():
+    """Test that get_completion holds a governor slot."""
+    client = LLMClient()
+    response = MagicMock()
+    response.choices = [MagicMock()]
+    response.choices[0].message.content = "ok"
+
+    async def create(**kwargs):
+        assert client.governor.in_flight == 1
+        return response
+
+    with patch.object(client.client.chat.completions, "create", AsyncMock(side_effect=create)):
+        result = await client.get_completion([{"role": "user", "content": "x"}])
+
+    assert result == "ok"
+    assert client.governor.in_flight == 0
+    assert client.governor.stats()["admitted"] == 1
+
+
+@pytest.mark.asyncio
+async def test_retry_backoff_releases_slot():
+    """Test that a request backing off before a retry does not hold its slot."""
+    client = LLMClient()
+    client.governor = LLMGovernor(max_concurrency=1)
+    request = httpx.Request("POST", "https://openrouter.ai/api/v1/chat/completions")
+    response = MagicMock()
+    response.choices = [MagicMock()]
+    response.choices[0].message.content = "ok"
+    create = AsyncMock(side_effect=[APIConnectionError(request=request), response])
+    in_flight_during_backoff = []
+
+    async def sleep(delay):
+        in_flight_during_backoff.append(client.governor.in_flight)
+
+    with patch.object(client.client.chat.completions, "create", create), \
+         patch("app.llm.client.asyncio.sleep", AsyncMock(side_effect=sleep)):
+        result = await client.get_completion([{"role": "user", "content": "x"}])
+
+    assert result == "ok"
+    assert in_flight_during_backoff == [0]
+    assert client.governor.stats()["admitted"] == 2
+    assert client.governor.in_flight == 0
+
+
+@pytest.mark.asyncio
+async def test_hedge_takes_own_slot():
+    """Test that a hedged duplicate counts against the concurrency limit."""
+    client = LLMClient()
+    client.governor = LLMGovernor(max_concurrency=2)
+    for _ in range(20):
+        client.latency(client.model).add(0.01)
+    response = MagicMock()
+    response.choices = [MagicMock()]
+    response.choices[0].message.content = "fast"
+    calls = []
+
+    async def create(**kwargs):
+        calls.append(client.governor.in_flight)
+        if len(calls) == 1:
+            await asyncio.sleep(1.0)
+        return response
+
+    with patch.object(client.client.chat.completions, "create", AsyncMock(side_effect=create)), \
+         patch("app.llm.client.settings.llm_hedge_enabled", True):
+        result = await client.get_completion([{"role": "user", "content": "x"}])
+    await asyncio.sleep(0)
+
+    assert result == "fast"
+    assert calls == [1, 2]
+    assert client.hedged_requests == 1
+    assert client.governor.in_flight == 0
+
+
+@pytest.mark.asyncio
+async def test_hedge_skipped_without_free_slot():
+    """Test that no duplicate is sent when the governor is at capacity."""
+    client = LLMClient()
+    client.governor = LLMGovernor(max_concurrency=1)
+    for _ in range(20):
+        client.latency(client.model).add(0.01)
+    response = MagicMock()
+    response.choices = [MagicMock()]
+    response.choices[0].message.content = "slow"
+
+    async def slow_create(**kwargs):
+        await asyncio.sleep(0.05)
+        return response
+
+    create = AsyncMock(side_effect=slow_create)
+
+    with patch.object(client.client.chat.completions, "create", create), \
+         patch("app.llm.client.settings.llm_hedge_enabled", True):
+        result = await client.get_completion([{"role": "user", "content": "x"}])
+
+    assert result == "slow"
+    assert create.await_count == 1
+    assert client.hedged_requests == 0
+    assert client.governor.in_flight == 0
+
+
+def test_token_bucket_try_acquire_never_waits():
+    """Test that try_acquire takes a token only when one is available."""
+    bucket = TokenBucket(rate=0.001, burst=1)
+
+    assert bucket.try_acquire()
+    assert not bucket.try_acquire()
@@ -0,0 +1,244 @@
+"""Tests for LLM retries, hedging and circuit breaker."""
+
+import asyncio
+
+import httpx
+import pytest
+from openai import BadRequestError, InternalServerError, RateLimitError
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from app.llm.client import LLMClient
+from app.llm.resilience import (
+    CircuitBreaker,
+    LLMError,
+    LLMUnavailableError,
+    backoff_delay,
+    parse_retry_after,
+)
+
+MESSAGES = [{"role": "user", "content": "x"}]
+
+
+def status_error(cls, status, headers=None):
+    request = httpx.Request("POST", "https://openrouter.ai/api/v1/chat/completions")
+    response = httpx.Response(status, headers=headers or {}, request=request)
+    return cls(f"HTTP {status}", response=response, body=None)
+
+
+def ok_response(text="ok"):
+    response = MagicMock()
+    response.choices = [MagicMock()]
+    response.choices[0].message.content = text
+    return response
+
+
+def test_backoff_delay_bounds():
+    """Test jittered exponential backoff stays within [step/2, step] and cap."""
+    for attempt in range(6):
+        step = min(8.0, 0.5 * 2 ** attempt)
+        delay = backoff_delay(attempt, base=0.5, cap=8.0)
+        assert step / 2 <= delay <= step
+
+
+def test_backoff_honors_retry_after():
+    """Test that Retry-After is a lower bound (capped)."""
+    assert backoff_delay(0, base=0.5, cap=8.0, retry_after=3.0) >= 3.0
+    assert backoff_delay(0, base=0.5, cap=8.0, retry_after=100.0) <= 8.0
+    assert parse_retry_after("2") == 2.0
+    assert parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT") is None
+
+
+def test_circuit_breaker_transitions():
+    """Test closed -> open -> half_open -> closed."""
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=10)
+
+    with patch("app.llm.resilience.time.monotonic", return_value=0.0):
+        breaker.record_failure()
+        assert breaker.allow_request()
+        breaker.record_failure()
+        assert breaker.state == CircuitBreaker.OPEN
+        assert not breaker.allow_request()
+
+    with patch("app.llm.resilience.time.monotonic", return_value=11.0):
+        assert breaker.allow_request()  # trial request
+        assert breaker.state == CircuitBreaker.HALF_OPEN
+        assert not breaker.allow_request()  # only one trial at a time
+        breaker.record_success()
+
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_circuit_breaker_lost_trial_expires():
+    """Test that a trial with no outcome stops blocking after trial_timeout."""
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10, trial_timeout=5)
+
+    with patch("app.llm.resilience.time.monotonic", return_value=0.0):
+        breaker.record_failure()
+
+    with patch("app.llm.resilience.time.monotonic", return_value=11.0):
+        assert breaker.allow_request()
+        assert not breaker.allow_request()
+
+    with patch("app.llm.resilience.time.monotonic", return_value=17.0):
+        assert breaker.allow_request()
+
+
+@pytest.mark.asyncio
+async def test_cancelled_trial_releases_breaker():
+    """Test that a half-open trial cancelled by a deadline lets the next call through."""
+    client = LLMClient()
+    breaker = client.breaker(client.model)
+    breaker.state = CircuitBreaker.OPEN
+    breaker.opened_at = -breaker.reset_timeout
+
+    async def hang(**kwargs):
+        await asyncio.sleep(1.0)
+
+    with patch.object(client.client.chat.completions, "create", AsyncMock(side_effect=hang)):
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(client.get_completion(MESSAGES, raise_on_error=True), 0.05)
+
+    create = AsyncMock(return_value=ok_response("снова работает"))
+    with patch.object(client.client.chat.completions, "create", create):
+        result = await client.get_completion(MESSAGES, raise_on_error=True)
+
+    assert result == "снова работает"
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+@pytest.mark.asyncio
+async def test_retries_rate_limit_with_retry_after():
+    """Test that 429 is retried and Retry-After is honored."""
+    client = LLMClient()
+    create = AsyncMock(side_effect=[
+        status_error(RateLimitError, 429, {"retry-after": "1.5"}),
+        ok_response("готово"),
+    ])
+
+    with patch.object(client.client.chat.completions, "create", create), \
+         patch("app.llm.client.asyncio.sleep", AsyncMock()) as sleep:
+        result = await client.get_completion(MESSAGES, raise_on_error=True)
+
+    assert result == "готово"
+    assert create.await_count == 2
+    assert sleep.await_args.args[0] >= 1.5
+
+
+@pytest.mark.asyncio
+async def test_client_error_not_retried():
+    """Test that 4xx (other than 429) fails immediately."""
+    client = LLMClient()
+    create = AsyncMock(side_effect=status_error(BadRequestError, 400))
+
+    with patch.object(client.client.chat.completions, "create", create):
+        with pytest.raises(LLMError) as exc_info:
+            await client.get_completion(MESSAGES, raise_on_error=True)
+
+    assert create.await_count == 1
+    assert exc_info.value.status_code == 400
+    assert not exc_info.value.retryable
+
+
+@pytest.mark.asyncio
+async def test_error_text_kept_for_legacy_callers():
+    """Test that get_completion still returns error text by default."""
+    client = LLMClient()
+    create = AsyncMock(side_effect=status_error(RateLimitError, 429))
+
+    with patch.object(client.client.chat.completions, "create", create), \
+         patch("app.llm.client.asyncio.sleep", AsyncMock()):
+        result = await client.get_completion(MESSAGES)
+
+    assert result.startswith("⏳")
+
+
+@pytest.mark.asyncio
+async def test_circuit_breaker_fails_fast():
+    """Test that an open breaker skips the provider call."""
+    client = LLMClient()
+    create = AsyncMock(side_effect=status_error(InternalServerError, 503))
+
+    with patch.object(client.client.chat.completions, "create", create), \
+         patch("app.llm.client.asyncio.sleep", AsyncMock()), \
+         patch("app.llm.client.settings.llm_breaker_failure_threshold", 2), \
+         patch("app.llm.client.settings.llm_max_retries", 5):
+        with pytest.raises(LLMUnavailableError):
+            await client.get_completion(MESSAGES, raise_on_error=True)
+
+    # Two failures open the circuit; third attempt is refused locally
+    assert create.await_count == 2
+
+
+@pytest.mark.asyncio
+async def test_hedged_request_returns_faster_duplicate():
+    """Test that a slow request is hedged and the fast duplicate wins."""
+    client = LLMClient()
+    for _ in range(20):
+        client.latency(client.model).add(0.01)
+
+    calls = 0
+
+    async def create(**kwargs):
+        nonlocal calls
+        calls += 1
+        if calls == 1:
+            await asyncio.sleep(1.0)
+            return ok_response("slow")
+        return ok_response("fast")
+
+    with patch.object(client.client.chat.completions, "create", AsyncMock(side_effect=create)), \
+         patch("app.llm.client.settings.llm_hedge_enabled", True):
+        result = await client.get_completion(MESSAGES, raise_on_error=True)
+
+    assert result == "fast"
+    assert client.hedged_requests == 1
+
+
+@pytest.mark.asyncio
+async def test_cancelled_hedged_request_cancels_primary():
+    """Test that cancelling the caller while waiting to hedge stops the request."""
+    client = LLMClient()
+    for _ in range(20):
+        client.latency(client.model).add(10.0)
+
+    started = asyncio.Event()
+    cancelled = asyncio.Event()
+
+    async def create(**kwargs):
+        started.set()
+        try:
+            await asyncio.sleep(60)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    with patch.object(client.client.chat.completions, "create", AsyncMock(side_effect=create)), \
+         patch("app.llm.client.settings.llm_hedge_enabled", True):
+        call = asyncio.create_task(client.get_completion(MESSAGES, raise_on_error=True))
+        await started.wait()
+        call.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await call
+        await asyncio.wait_for(cancelled.wait(), 1.0)
+
+
+@pytest.mark.asyncio
+async def test_narrative_director_falls_back_on_llm_error():
+    """Test that an LLM error yields the fallback narrative, not error text."""
+    from app.agents.narrative_director import NarrativeDirectorAgent
+
+    agent = NarrativeDirectorAgent()
+    context = {
+        "user_action": "осматриваюсь",
+        "mechanics_result": {"action_type": "other"},
+        "game_state": {"in_combat": False, "enemies": []},
+        "success": True,
+    }
+
+    with patch("app.agents.narrative_director.settings.narrative_single_call", False), \
+         patch("app.agents.narrative_director.llm_client.get_completion",
+               AsyncMock(side_effect=LLMError("down"))):
+        output = await agent.execute(context)
+
+    assert output["narrative"].startswith("Ты осматриваюсь")
+    assert "Sorry" not in output["narrative"]
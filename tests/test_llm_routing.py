@@ -0,0 +1,163 @@
+"""Tests for multi-model routing and failover."""
+
+import asyncio
+from types import SimpleNamespace
+
+import httpx
+import pytest
+from openai import InternalServerError
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from app.config.models import AgentModelConfigs, ModelCandidate, ModelConfig, apply_model_routes
+from app.llm.client import LLMClient
+from app.llm.resilience import LLMError
+
+MESSAGES = [{"role": "user", "content": "x"}]
+
+
+def ok_response(text="ok"):
+    response = MagicMock()
+    response.choices = [MagicMock()]
+    response.choices[0].message.content = text
+    return response
+
+
+def server_error():
+    request = httpx.Request("POST", "https://openrouter.ai/api/v1/chat/completions")
+    response = httpx.Response(503, request=request)
+    return InternalServerError("HTTP 503", response=response, body=None)
+
+
+def test_route_prefers_fastest_healthy_candidate():
+    """Test ordering by rolling median, budget and breaker state."""
+    client = LLMClient()
+    candidates = [
+        ModelCandidate(model="slow", latency_budget=1.0),
+        ModelCandidate(model="fast"),
+        ModelCandidate(model="broken"),
+        ModelCandidate(model="new"),
+    ]
+    for _ in range(5):
+        client.latency("slow").add(2.0)
+        client.latency("fast").add(0.3)
+        client.latency("broken").add(0.1)
+    client.breaker("broken").state = "open"
+    client.breaker("broken").opened_at = float("inf")
+
+    ordered = [c.model for c in client.route(candidates)]
+
+    assert ordered == ["new", "fast", "slow", "broken"]
+
+
+def test_cost_budget_drops_expensive_candidates():
+    """Test that candidates priced above the budget are not routed to."""
+    config = ModelConfig(
+        model="default",
+        max_cost_per_1k_tokens=0.5,
+        candidates=[
+            ModelCandidate(model="premium", cost_per_1k_tokens=2.0),
+            ModelCandidate(model="cheap", cost_per_1k_tokens=0.1),
+            ModelCandidate(model="unpriced"),
+        ],
+    )
+
+    assert [c.model for c in config.candidate_models()] == ["cheap", "unpriced"]
+
+    config.max_cost_per_1k_tokens = 0.01
+    config.candidates = config.candidates[:2]
+    assert [c.model for c in config.candidate_models()] == ["cheap"]
+
+
+@pytest.mark.asyncio
+async def test_failover_on_server_error():
+    """Test that a failing candidate hands the request to the next one."""
+    client = LLMClient()
+    candidates = [ModelCandidate(model="primary"), ModelCandidate(model="backup")]
+
+    async def create(**kwargs):
+        if kwargs["model"] == "primary":
+            raise server_error()
+        return ok_response("backup answer")
+
+    with patch.object(client.client.chat.completions, "create", AsyncMock(side_effect=create)) as mock:
+        result = await client.get_completion(MESSAGES, raise_on_error=True, candidates=candidates)
+
+    assert result == "backup answer"
+    # Non-last candidate is not retried
+    assert [call.kwargs["model"] for call in mock.await_args_list] == ["primary", "backup"]
+    assert client.failovers == 1
+
+
+@pytest.mark.asyncio
+async def test_failover_on_candidate_timeout():
+    """Test that a candidate exceeding its timeout is abandoned."""
+    client = LLMClient()
+    candidates = [ModelCandidate(model="hanging", timeout=0.05), ModelCandidate(model="backup")]
+
+    async def create(**kwargs):
+        if kwargs["model"] == "hanging":
+            await asyncio.sleep(1.0)
+        return ok_response(kwargs["model"])
+
+    with patch.object(client.client.chat.completions, "create", AsyncMock(side_effect=create)):
+        result = await client.get_completion(MESSAGES, raise_on_error=True, candidates=candidates)
+
+    assert result == "backup"
+    assert client.breaker("hanging").failures == 1
+
+
+@pytest.mark.asyncio
+async def test_stream_failover_takes_slot_per_candidate():
+    """Test that a streamed fallback is throttled under its own model."""
+    client = LLMClient()
+    candidates = [ModelCandidate(model="hanging", timeout=0.05), ModelCandidate(model="backup")]
+    slot = client.governor.slot
+    slots = []
+
+    def record_slot(model, *args, **kwargs):
+        slots.append(model)
+        return slot(model, *args, **kwargs)
+
+    async def chunks():
+        yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content="ok"))])
+
+    async def create(**kwargs):
+        if kwargs["model"] == "hanging":
+            await asyncio.sleep(1.0)
+        return chunks()
+
+    with patch.object(client.client.chat.completions, "create", AsyncMock(side_effect=create)), \
+         patch.object(client.governor, "slot", side_effect=record_slot):
+        tokens = [token async for token in client.stream_completion(MESSAGES, candidates=candidates)]
+
+    assert tokens == ["ok"]
+    assert slots == ["hanging", "backup"]
+    assert client.governor.in_flight == 0
+
+
+@pytest.mark.asyncio
+async def test_all_candidates_failing_raises():
+    """Test that the last candidate's error is raised."""
+    client = LLMClient()
+    candidates = [ModelCandidate(model="a"), ModelCandidate(model="b")]
+
+    with patch.object(client.client.chat.completions, "create",
+                      AsyncMock(side_effect=server_error())), \
+         patch("app.llm.client.asyncio.sleep", AsyncMock()), \
+         patch("app.llm.client.settings.llm_max_retries", 1):
+        with pytest.raises(LLMError) as exc_info:
+            await client.get_completion(MESSAGES, raise_on_error=True, candidates=candidates)
+
+    assert exc_info.value.model == "b"
+
+
+def test_apply_model_routes_overrides_candidates():
+    """Test LLM_MODEL_ROUTES parsing into ModelConfig candidates."""
+    configs = AgentModelConfigs()
+    apply_model_routes(configs, {
+        "RULES_ARBITER_INTENT": [{"model": "cheap", "latency_budget": 1.0}, {"model": "x-ai/grok-4-fast"}],
+        "UNKNOWN": [{"model": "ignored"}],
+    })
+
+    assert [c.model for c in configs.RULES_ARBITER_INTENT.candidate_models()] == ["cheap", "x-ai/grok-4-fast"]
+    assert [c.model for c in configs.NARRATIVE_DIRECTOR.candidate_models()] == ["x-ai/grok-4-fast"]
@@ -0,0 +1,164 @@
+"""Tests for background episodic memory write queue."""
+
+import asyncio
+from uuid import uuid4
+
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from app.db.models import EpisodicMemoryCreate
+from app.memory.write_queue import MemoryWriteQueue
+
+
+def make_memory(content: str = "Атакую гоблина → Гоблин повержен") -> EpisodicMemoryCreate:
+    return EpisodicMemoryCreate(character_id=uuid4(), session_id=uuid4(), content=content)
+
+
+@pytest.mark.asyncio
+async def test_enqueue_refused_when_not_running():
+    """Caller falls back to inline write when workers are not started."""
+    queue = MemoryWriteQueue()
+    assert queue.enqueue(make_memory()) is False
+    assert queue.depth == 0
+
+
+@pytest.mark.asyncio
+async def test_writes_are_batched_and_drained_on_stop():
+    """Pending writes go out in batches and stop() waits for them."""
+    queue = MemoryWriteQueue(workers=1, batch_size=10)
+    create_batch = AsyncMock(side_effect=lambda batch: len(batch))
+
+    with patch("app.memory.write_queue.episodic_memory_manager.create_memories_batch", create_batch):
+        await queue.start()
+        for i in range(5):
+            assert queue.enqueue(make_memory(f"событие {i}"))
+        await queue.stop(timeout=1.0)
+
+    assert queue.written == 5
+    assert queue.depth == 0
+    # All five were queued before the worker ran, so one batch suffices
+    assert create_batch.await_count == 1
+    assert len(create_batch.await_args.args[0]) == 5
+    assert not queue.running
+
+
+@pytest.mark.asyncio
+async def test_failed_batch_is_retried():
+    """Transient failure is retried with backoff."""
+    queue = MemoryWriteQueue(workers=1, max_retries=2, retry_delay=0.001)
+    create_batch = AsyncMock(side_effect=[RuntimeError("db down"), 1])
+
+    with patch("app.memory.write_queue.episodic_memory_manager.create_memories_batch", create_batch):
+        await queue.start()
+        queue.enqueue(make_memory())
+        await queue.stop(timeout=1.0)
+
+    assert create_batch.await_count == 2
+    assert queue.retries == 1
+    assert queue.written == 1
+    assert queue.failed == 0
+
+
+@pytest.mark.asyncio
+async def test_batch_dropped_after_max_retries():
+    """Persistent failure is counted and does not block the queue."""
+    queue = MemoryWriteQueue(workers=1, max_retries=1, retry_delay=0.001)
+    create_batch = AsyncMock(side_effect=RuntimeError("db down"))
+
+    with patch("app.memory.write_queue.episodic_memory_manager.create_memories_batch", create_batch):
+        await queue.start()
+        queue.enqueue(make_memory())
+        await queue.stop(timeout=1.0)
+
+    assert create_batch.await_count == 2
+    assert queue.failed == 1
+    assert queue.written == 0
+
+
+@pytest.mark.asyncio
+async def test_full_queue_rejects_write():
+    """Bounded queue refuses writes instead of growing without limit."""
+    queue = MemoryWriteQueue(max_size=1, workers=1)
+    release = asyncio.Event()
+
+    async def blocked(batch):
+        await release.wait()
+        return len(batch)
+
+    with patch("app.memory.write_queue.episodic_memory_manager.create_memories_batch",
+               AsyncMock(side_effect=blocked)):
+        await queue.start()
+        assert queue.enqueue(make_memory())
+        await asyncio.sleep(0)  # worker takes the first write
+        assert queue.enqueue(make_memory())
+        assert queue.enqueue(make_memory()) is False
+        assert queue.rejected == 1
+        assert queue.depth == 1
+
+        release.set()
+        await queue.stop(timeout=1.0)
+
+    assert queue.written == 2
+
+
+@pytest.mark.asyncio
+async def test_batch_with_missing_embeddings_is_not_written():
+    """A short embeddings response fails the batch instead of dropping memories."""
+    from app.memory.episodic import episodic_memory_manager
+
+    conn = AsyncMock()
+    with patch("app.memory.episodic.embeddings_service.embed_batch",
+               AsyncMock(return_value=[[0.1, 0.2]])), \
+         patch("app.db.supabase.get_db_connection", return_value=conn):
+        with pytest.raises(ValueError):
+            await episodic_memory_manager.create_memories_batch([make_memory("a"), make_memory("b")])
+
+    conn.executemany.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_orchestrator_enqueues_memory():
+    """_save_memory hands the write to the queue instead of embedding inline."""
+    from app.agents.orchestrator import AgentOrchestrator
+
+    orchestrator = AgentOrchestrator()
+
+    with patch("app.agents.orchestrator.memory_write_queue.enqueue", return_value=True) as enqueue, \
+         patch("app.agents.orchestrator.episodic_memory_manager.create_memory", AsyncMock()) as create:
+        await orchestrator._save_memory(
+            character_id=uuid4(),
+            session_id=uuid4(),
+            user_action="Говорю с трактирщиком",
+            assistant_response="Трактирщик отвечает...",
+            mechanics_result={},
+            game_state={"location": "таверна"},
+        )
+
+    enqueue.assert_called_once()
+    memory = enqueue.call_args.args[0]
+    assert memory.location == "таверна"
+    create.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_orchestrator_defers_memory_of_staged_turn():
+    """With a turn commit, the write waits for commit_turn instead of the queue."""
+    from app.agents.orchestrator import AgentOrchestrator
+    from app.db.turn_commit import TurnCommit
+
+    orchestrator = AgentOrchestrator()
+    turn_commit = TurnCommit()
+
+    with patch("app.agents.orchestrator.memory_write_queue", MagicMock(running=True)) as queue:
+        await orchestrator._save_memory(
+            character_id=uuid4(),
+            session_id=uuid4(),
+            user_action="Открываю сундук",
+            assistant_response="Внутри золото...",
+            mechanics_result={},
+            game_state={},
+            turn_commit=turn_commit,
+        )
+
+    queue.enqueue.assert_not_called()
+    assert len(turn_commit.queued_memories) == 1
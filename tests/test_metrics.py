@@ -0,0 +1,119 @@
+"""Tests for Prometheus-style metrics."""
+
+import pytest
+from aiogram.fsm.storage.base import StorageKey
+from aiogram.fsm.storage.memory import MemoryStorage
+
+from app.agents.narrative_director import NarrativeDirectorAgent
+from app.agents.rules_arbiter import RulesArbiterAgent
+from app.bot.storage import InstrumentedStorage
+from app.observability.metrics import (
+    FALLBACKS,
+    FSM_OPERATIONS,
+    LLM_REQUEST_DURATION,
+    LLM_TOKENS,
+    TURN_DEGRADED,
+    TURN_STAGE_DURATION,
+    MetricsRegistry,
+    MetricsServer,
+    MetricsTraceExporter,
+)
+from app.observability.tracing import LLM, TurnTrace
+
+
+def test_render_counter_and_histogram():
+    """Test text exposition format."""
+    registry = MetricsRegistry()
+    counter = registry.counter("test_events_total", "Events", ["kind"])
+    histogram = registry.histogram("test_latency_seconds", "Latency", buckets=(0.1, 1.0))
+    registry.register_collector("test_depth", "Depth", lambda: [({}, 3)])
+
+    counter.inc(kind='a"b')
+    counter.inc(2, kind='a"b')
+    histogram.observe(0.05)
+    histogram.observe(0.5)
+
+    text = registry.render()
+
+    assert "# TYPE test_events_total counter" in text
+    assert 'test_events_total{kind="a\\"b"} 3' in text
+    assert 'test_latency_seconds_bucket{le="0.1"} 1' in text
+    assert 'test_latency_seconds_bucket{le="1"} 2' in text
+    assert 'test_latency_seconds_bucket{le="+Inf"} 2' in text
+    assert "test_latency_seconds_count 2" in text
+    assert "test_depth 3" in text
+
+
+def test_labels_are_validated():
+    """Test that a wrong label set is rejected."""
+    registry = MetricsRegistry()
+    counter = registry.counter("test_total", "Test", ["kind"])
+
+    with pytest.raises(ValueError):
+        counter.inc(other="x")
+    with pytest.raises(ValueError):
+        counter.inc(-1, kind="x")
+
+
+def test_trace_exporter_derives_stage_and_llm_metrics():
+    """Test stage latency, per-agent LLM latency/tokens and degraded stages."""
+    trace = TurnTrace("turn", degraded=["memory"])
+    stage = trace.start_span("metrics_test_stage", "stage", None, {})
+    call = trace.start_span("llm.completion", LLM, stage, {
+        "model": "metrics-test-model", "prompt_tokens": 100, "completion_tokens": 20,
+    })
+    stage.duration_ms = 300.0
+    call.duration_ms = 250.0
+    trace.duration_ms = 400.0
+
+    before = TURN_DEGRADED.value(stage="memory")
+    MetricsTraceExporter().export(trace)
+
+    assert TURN_STAGE_DURATION.count(stage="metrics_test_stage") == 1
+    assert LLM_REQUEST_DURATION.count(agent="metrics_test_stage", model="metrics-test-model") == 1
+    assert LLM_TOKENS.value(agent="metrics_test_stage", model="metrics-test-model", type="prompt") == 100
+    assert TURN_DEGRADED.value(stage="memory") == before + 1
+
+
+def test_fallbacks_are_counted():
+    """Test JSON repair and keyword-intent fallback counters."""
+    agent = NarrativeDirectorAgent()
+    json_repair = FALLBACKS.value(kind="json_repair")
+    keyword = FALLBACKS.value(kind="intent_keyword")
+
+    assert agent._parse_single_call_response('{"narrative": "Тихо.", "combat_state": {"in_combat": false}}')
+    assert FALLBACKS.value(kind="json_repair") == json_repair
+
+    assert agent._parse_single_call_response("{'narrative': 'Тихо.', 'combat_state': {'in_combat': false}}")
+    RulesArbiterAgent()._fallback_keyword_detection("атакую орка")
+
+    assert FALLBACKS.value(kind="json_repair") == json_repair + 1
+    assert FALLBACKS.value(kind="intent_keyword") == keyword + 1
+
+
+@pytest.mark.asyncio
+async def test_instrumented_storage_records_operations():
+    """Test that FSM operations are delegated and timed."""
+    storage = InstrumentedStorage(MemoryStorage())
+    key = StorageKey(bot_id=1, chat_id=2, user_id=3)
+    before = FSM_OPERATIONS.count(operation="update_data")
+
+    await storage.set_state(key, "in_conversation")
+    await storage.update_data(key, {"history": []})
+
+    assert await storage.get_state(key) == "in_conversation"
+    assert await storage.get_data(key) == {"history": []}
+    assert FSM_OPERATIONS.count(operation="update_data") == before + 1
+
+
+@pytest.mark.asyncio
+async def test_metrics_endpoint_serves_registry():
+    """Test /metrics response."""
+    registry = MetricsRegistry()
+    registry.counter("test_up_total", "Up").inc()
+    server = MetricsServer(registry=registry)
+
+    response = await server._handle_metrics(None)
+
+    assert response.content_type == "text/plain"
+    assert "test_up_total 1" in response.text
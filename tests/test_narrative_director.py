@@ -114,3 +114,88 @@ def test_build_mechanics_context_skill_check(narrative_director):
     assert "perception" in result
     assert "14" in result
     assert "УСПЕХ" in result
+
+
+def test_parse_single_call_response_json(narrative_director):
+    """Test parsing structured single-call response."""
+    response = (
+        '{"narrative": "Ты рассекаешь воздух клинком, волк рычит и кусает в ответ.", '
+        '"combat_state": {"in_combat": true, "enemies": ["волк"], "combat_ended": false, '
+        '"enemy_attacks": [{"attacker": "волк", "damage": 7}]}}'
+    )
+    
+    narrative, combat_state = narrative_director._parse_single_call_response(response)
+    
+    assert narrative.startswith("Ты рассекаешь")
+    assert combat_state["enemies"] == ["волк"]
+    assert combat_state["enemy_attacks"][0]["damage"] == 7
+
+
+def test_parse_single_call_response_combat_state_fallback(narrative_director):
+    """Test fallback to COMBAT_STATE parsing when model ignores JSON mode."""
+    response = """Ты наносишь удар, гоблин падает.
+
+COMBAT_STATE: {"in_combat": false, "enemies": [], "combat_ended": true}"""
+    
+    narrative, combat_state = narrative_director._parse_single_call_response(response)
+    
+    assert "COMBAT_STATE" not in narrative
+    assert combat_state["combat_ended"] is True
+
+
+def test_parse_single_call_response_unusable(narrative_director):
+    """Test that responses without combat state are rejected."""
+    assert narrative_director._parse_single_call_response("❌ Sorry, error") is None
+    assert narrative_director._parse_single_call_response("") is None
+
+
+@pytest.mark.asyncio
+async def test_single_call_mode_uses_one_llm_call(narrative_director):
+    """Test that single-call mode makes one LLM request."""
+    from unittest.mock import AsyncMock, patch
+    
+    response = (
+        '{"narrative": "Ты осматриваешь пустую таверну.", '
+        '"combat_state": {"in_combat": false, "enemies": [], "combat_ended": false, "enemy_attacks": []}}'
+    )
+    context = {
+        "user_action": "Осматриваюсь",
+        "mechanics_result": {"action_type": "other"},
+        "game_state": {"in_combat": False, "enemies": []},
+        "success": True,
+    }
+    
+    with patch("app.agents.narrative_director.settings.narrative_single_call", True), \
+         patch("app.agents.narrative_director.llm_client.get_completion",
+               AsyncMock(return_value=response)) as mock_llm:
+        output = await narrative_director.execute(context)
+    
+    assert mock_llm.await_count == 1
+    assert mock_llm.await_args.kwargs["response_format"] == {"type": "json_object"}
+    assert output["narrative"] == "Ты осматриваешь пустую таверну."
+    assert output["game_state_updates"]["in_combat"] is False
+
+
+@pytest.mark.asyncio
+async def test_single_call_mode_falls_back_to_two_calls(narrative_director):
+    """Test fallback to two-call flow when single-call response is unusable."""
+    from unittest.mock import AsyncMock, patch
+    
+    context = {
+        "user_action": "Осматриваюсь",
+        "mechanics_result": {"action_type": "other"},
+        "game_state": {"in_combat": False, "enemies": []},
+        "success": True,
+    }
+    
+    with patch("app.agents.narrative_director.settings.narrative_single_call", True), \
+         patch("app.agents.narrative_director.llm_client.get_completion",
+               AsyncMock(side_effect=[
+                   "не JSON",
+                   '{"in_combat": false, "enemies": [], "combat_ended": false, "enemy_attacks": []}',
+                   "Ты осматриваешься.",
+               ])) as mock_llm:
+        output = await narrative_director.execute(context)
+    
+    assert mock_llm.await_count == 3
+    assert output["narrative"] == "Ты осматриваешься."
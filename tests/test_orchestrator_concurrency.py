@@ -0,0 +1,101 @@
+"""Tests for concurrent stage execution in AgentOrchestrator."""
+
+import asyncio
+from uuid import uuid4
+
+import pytest
+from unittest.mock import AsyncMock, patch
+
+from app.agents.orchestrator import AgentOrchestrator
+from app.game.character import CharacterSheet
+
+
+def create_test_character() -> CharacterSheet:
+    """Create test character."""
+    return CharacterSheet(
+        id=uuid4(),
+        telegram_user_id=12345,
+        name="Test Hero",
+        hp=20,
+        max_hp=20,
+    )
+
+
+RULES_OUTPUT = {
+    "mechanics_result": {},
+    "intent": {"action_type": "dialogue"},
+    "narrative_hints": [],
+    "success": True,
+    "action_type": "dialogue",
+}
+
+
+@pytest.mark.asyncio
+async def test_memory_and_rules_run_concurrently():
+    """Memory retrieval and rules analysis overlap instead of running back to back."""
+    orchestrator = AgentOrchestrator()
+    character = create_test_character()
+    events = []
+
+    async def slow_memory(context):
+        events.append("memory_start")
+        await asyncio.sleep(0.05)
+        events.append("memory_end")
+        return {"memory_summary": "Вы помните таверну.", "total_found": 1}
+
+    async def slow_rules(context):
+        events.append("rules_start")
+        await asyncio.sleep(0.05)
+        events.append("rules_end")
+        return RULES_OUTPUT
+
+    narrative = AsyncMock(return_value={"narrative": "Текст", "game_state_updates": {}})
+
+    with patch.object(orchestrator.memory_manager, "execute", side_effect=slow_memory), \
+         patch.object(orchestrator.rules_arbiter, "execute", side_effect=slow_rules), \
+         patch.object(orchestrator.narrative_director, "execute", narrative), \
+         patch.object(orchestrator, "_save_memory", AsyncMock()), \
+         patch.object(orchestrator.world_state, "_save_world_state", AsyncMock(return_value=True)):
+        await orchestrator.process_action(
+            user_action="Осматриваюсь",
+            character=character,
+            game_state={"in_combat": False},
+            character_id=character.id,
+            session_id=uuid4(),
+        )
+
+    # Both stages started before either finished
+    assert events.index("rules_start") < events.index("memory_end")
+    assert events.index("memory_start") < events.index("rules_end")
+
+    # Narrative received memory summary after both stages completed
+    narrative_context = narrative.call_args.args[0]
+    assert narrative_context["memory_context"] == "Вы помните таверну."
+
+
+@pytest.mark.asyncio
+async def test_memory_failure_does_not_cancel_rules():
+    """A failing memory lookup degrades to a placeholder; rules still complete."""
+    orchestrator = AgentOrchestrator()
+    character = create_test_character()
+
+    narrative = AsyncMock(return_value={"narrative": "Текст", "game_state_updates": {}})
+    rules = AsyncMock(return_value=RULES_OUTPUT)
+
+    with patch.object(orchestrator.memory_manager, "execute",
+                      AsyncMock(side_effect=RuntimeError("db down"))), \
+         patch.object(orchestrator.rules_arbiter, "execute", rules), \
+         patch.object(orchestrator.narrative_director, "execute", narrative), \
+         patch.object(orchestrator, "_save_memory", AsyncMock()), \
+         patch.object(orchestrator.world_state, "_save_world_state", AsyncMock(return_value=True)):
+        message, _, _ = await orchestrator.process_action(
+            user_action="Осматриваюсь",
+            character=character,
+            game_state={"in_combat": False},
+            character_id=character.id,
+            session_id=uuid4(),
+        )
+
+    rules.assert_awaited_once()
+    assert narrative.call_args.args[0]["memory_context"] == "💭 Память недоступна."
+    assert "Текст" in message
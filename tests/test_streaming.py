@@ -0,0 +1,155 @@
+"""Tests for streamed narrative delivery."""
+
+import pytest
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from app.agents.narrative_director import NarrativeDirectorAgent
+from app.bot.streaming import NarrativeStream, STREAM_CURSOR
+from app.llm.client import LLMClient
+from app.llm.resilience import LLMError
+
+
+def make_chunk(content):
+    """Build OpenAI-like streaming chunk."""
+    return SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=content))])
+
+
+async def fake_stream(chunks):
+    for chunk in chunks:
+        yield chunk
+
+
+@pytest.mark.asyncio
+async def test_llm_stream_completion_yields_deltas():
+    """Test that stream_completion yields non-empty content deltas."""
+    client = LLMClient()
+    chunks = [make_chunk("Ты "), make_chunk(None), make_chunk("входишь."), SimpleNamespace(choices=[])]
+
+    with patch.object(client.client.chat.completions, "create",
+                      AsyncMock(return_value=fake_stream(chunks))) as create:
+        tokens = [token async for token in client.stream_completion([{"role": "user", "content": "x"}])]
+
+    assert tokens == ["Ты ", "входишь."]
+    assert create.await_args.kwargs["stream"] is True
+
+
+@pytest.mark.asyncio
+async def test_llm_stream_completion_raises_on_error():
+    """Test that streaming errors propagate to the caller as LLMError."""
+    client = LLMClient()
+
+    with patch.object(client.client.chat.completions, "create",
+                      AsyncMock(side_effect=RuntimeError("boom"))):
+        with pytest.raises(LLMError):
+            async for _ in client.stream_completion([{"role": "user", "content": "x"}]):
+                pass
+
+
+@pytest.mark.asyncio
+async def test_narrative_director_forwards_tokens():
+    """Test that narrative tokens are forwarded to on_token callback."""
+    agent = NarrativeDirectorAgent()
+    received = []
+
+    async def on_token(token):
+        received.append(token)
+
+    async def fake_stream_completion(**kwargs):
+        for token in ["Ты ", "осматриваешь ", "таверну."]:
+            yield token
+
+    context = {
+        "user_action": "Осматриваюсь",
+        "mechanics_result": {"action_type": "other"},
+        "game_state": {"in_combat": False, "enemies": []},
+        "success": True,
+        "on_token": on_token,
+    }
+
+    with patch("app.agents.narrative_director.settings.narrative_single_call", False), \
+         patch("app.agents.narrative_director.llm_client.get_completion",
+               AsyncMock(return_value='{"in_combat": false, "enemies": [], "combat_ended": false}')), \
+         patch("app.agents.narrative_director.llm_client.stream_completion",
+               side_effect=fake_stream_completion):
+        output = await agent.execute(context)
+
+    assert received == ["Ты ", "осматриваешь ", "таверну."]
+    assert output["narrative"] == "Ты осматриваешь таверну."
+
+
+def make_message():
+    """Telegram message mock whose answer() returns an editable placeholder."""
+    placeholder = MagicMock()
+    placeholder.edit_text = AsyncMock()
+    placeholder.delete = AsyncMock()
+    message = MagicMock()
+    message.answer = AsyncMock(return_value=placeholder)
+    return message, placeholder
+
+
+@pytest.mark.asyncio
+async def test_narrative_stream_throttles_edits():
+    """Test that tokens inside the throttle window do not trigger edits."""
+    message, placeholder = make_message()
+    stream = NarrativeStream(message, edit_interval=60.0)
+    await stream.start("...")
+
+    await stream.push("Ты ")
+    await stream.push("идёшь.")
+
+    placeholder.edit_text.assert_not_awaited()
+    assert stream.text == "Ты идёшь."
+
+
+@pytest.mark.asyncio
+async def test_narrative_stream_edits_partial_and_final():
+    """Test partial edits (plain text) and final edit (Markdown)."""
+    message, placeholder = make_message()
+    stream = NarrativeStream(message, edit_interval=0.0)
+    await stream.start("...")
+
+    await stream.push("Ты идёшь.")
+    placeholder.edit_text.assert_awaited_with("Ты идёшь." + STREAM_CURSOR, parse_mode=None)
+
+    delivered = await stream.finish("**Итог**\n\nТы идёшь.")
+    assert delivered is True
+    placeholder.edit_text.assert_awaited_with("**Итог**\n\nТы идёшь.", parse_mode="Markdown")
+
+
+@pytest.mark.asyncio
+async def test_narrative_stream_finish_falls_back_to_plain_text():
+    """Test that a Markdown error on the final edit retries without parse_mode."""
+    message, placeholder = make_message()
+    placeholder.edit_text = AsyncMock(side_effect=[Exception("can't parse entities"), None])
+    stream = NarrativeStream(message, edit_interval=60.0)
+    await stream.start("...")
+
+    assert await stream.finish("*broken") is True
+    assert placeholder.edit_text.await_args.kwargs["parse_mode"] is None
+
+
+@pytest.mark.asyncio
+async def test_narrative_stream_finish_discards_placeholder_if_edits_fail():
+    """Test that the partial message is deleted when the final edit cannot be made."""
+    message, placeholder = make_message()
+    placeholder.edit_text = AsyncMock(side_effect=Exception("message can't be edited"))
+    stream = NarrativeStream(message, edit_interval=60.0)
+    await stream.start("...")
+
+    assert await stream.finish("Итог") is False
+    assert placeholder.edit_text.await_count == 2
+    placeholder.delete.assert_awaited_once()
+    assert stream.placeholder is None
+
+
+@pytest.mark.asyncio
+async def test_narrative_stream_without_placeholder():
+    """Test that caller sends normally when placeholder could not be sent."""
+    message = MagicMock()
+    message.answer = AsyncMock(side_effect=Exception("network"))
+    stream = NarrativeStream(message)
+    await stream.start("...")
+
+    await stream.push("token")
+    assert await stream.finish("final") is False
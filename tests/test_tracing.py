@@ -0,0 +1,196 @@
+"""Tests for per-turn tracing."""
+
+import asyncio
+import json
+import logging
+from uuid import uuid4
+
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from app.agents.orchestrator import AgentOrchestrator
+from app.db.supabase import TracedConnection
+from app.game.character import CharacterSheet
+from app.llm.client import LLMClient
+from app.observability.tracing import (
+    LLM,
+    NOOP_SPAN,
+    LogTraceExporter,
+    TurnTrace,
+    current_trace,
+    span,
+    start_trace,
+    traced,
+    tracer,
+)
+
+
+@pytest.fixture
+def exported():
+    """Capture exported traces instead of logging them."""
+    traces = []
+    exporter = MagicMock()
+    exporter.export = traces.append
+    with patch.object(tracer, "exporters", [exporter]), patch.object(tracer, "enabled", True):
+        yield traces
+
+
+def test_span_outside_trace_is_noop():
+    """Test that instrumented code works without an active trace."""
+    with span("narrative") as s:
+        s.set(model="x")
+    assert s is NOOP_SPAN
+    assert current_trace.get() is None
+
+
+@pytest.mark.asyncio
+async def test_spans_nest_across_gather(exported):
+    """Test parent links for nested spans and gathered stages."""
+    async def stage(name):
+        with span(f"{name}.inner", kind=LLM):
+            await asyncio.sleep(0)
+
+    with start_trace("turn", user_id=1):
+        await asyncio.gather(traced("memory", stage("memory")), traced("rules", stage("rules")))
+        with start_trace("nested"):  # reuses the active trace
+            with span("narrative"):
+                pass
+
+    assert len(exported) == 1
+    trace = exported[0]
+    by_name = {s.name: s for s in trace.spans}
+    assert by_name["memory.inner"].parent_id == by_name["memory"].span_id
+    assert by_name["rules.inner"].parent_id == by_name["rules"].span_id
+    assert by_name["narrative"].parent_id is None
+    assert all(s.duration_ms is not None for s in trace.spans)
+    assert trace.attributes == {"user_id": 1}
+
+
+def test_span_records_error(exported):
+    """Test that exceptions mark the span and propagate."""
+    with pytest.raises(ValueError):
+        with start_trace():
+            with span("world_state"):
+                raise ValueError("boom")
+
+    trace = exported[0]
+    assert trace.spans[0].status == "error"
+    assert "boom" in trace.spans[0].error
+    assert trace.attributes["error"] == "ValueError"
+
+
+def test_log_exporter_writes_json_line(caplog):
+    """Test the structured log line."""
+    trace = TurnTrace("turn", user_id=7)
+    llm_span = trace.start_span("llm.completion", LLM, None, {"model": "m", "bad": object()})
+    llm_span.duration_ms = 12.34
+    trace.duration_ms = 20.0
+
+    with caplog.at_level(logging.INFO, logger="app.trace"):
+        LogTraceExporter().export(trace)
+        LogTraceExporter(min_duration_ms=100).export(trace)
+
+    records = [r for r in caplog.records if r.name == "app.trace"]
+    assert len(records) == 1
+    data = json.loads(records[0].getMessage())
+    assert data["attributes"] == {"user_id": 7}
+    assert data["totals_ms"] == {"llm": 12.3}
+    assert data["spans"][0]["attributes"] == {"model": "m"}
+
+
+@pytest.mark.asyncio
+async def test_llm_span_records_model_and_tokens(exported):
+    """Test LLM span attributes from the completion usage."""
+    client = LLMClient()
+    response = MagicMock()
+    response.choices = [MagicMock()]
+    response.choices[0].message.content = "ok"
+    response.usage.prompt_tokens = 120
+    response.usage.completion_tokens = 30
+
+    with patch.object(client.client.chat.completions, "create", AsyncMock(return_value=response)):
+        with start_trace():
+            await client.get_completion([{"role": "user", "content": "x"}], model="m")
+
+    llm_span = exported[0].spans[0]
+    assert llm_span.kind == "llm"
+    assert llm_span.attributes == {"model": "m", "prompt_tokens": 120, "completion_tokens": 30}
+
+
+@pytest.mark.asyncio
+async def test_traced_connection_records_queries(exported):
+    """Test DB spans and passthrough of other attributes."""
+    conn = MagicMock()
+    conn.fetch = AsyncMock(return_value=[1, 2])
+    conn.transaction = MagicMock(return_value="tx")
+    traced_conn = TracedConnection(conn)
+
+    with start_trace():
+        rows = await traced_conn.fetch("SELECT *\n  FROM characters WHERE id = $1", 1)
+        assert traced_conn.transaction() == "tx"
+
+    assert rows == [1, 2]
+    db_span = exported[0].spans[0]
+    assert db_span.kind == "db"
+    assert db_span.attributes == {"statement": "SELECT * FROM characters WHERE id = $1", "rows": 2}
+
+
+@pytest.mark.asyncio
+async def test_orchestrator_records_stage_spans(exported):
+    """Test one span per orchestrator stage."""
+    orchestrator = AgentOrchestrator()
+    character = CharacterSheet(id=uuid4(), telegram_user_id=1, name="Hero", hp=20, max_hp=20)
+    rules_output = {
+        "mechanics_result": {},
+        "intent": {"action_type": "dialogue"},
+        "narrative_hints": [],
+        "success": True,
+        "action_type": "dialogue",
+    }
+
+    with patch.object(orchestrator.memory_manager, "execute",
+                      AsyncMock(return_value={"memory_summary": "", "total_found": 0})), \
+         patch.object(orchestrator.rules_arbiter, "execute", AsyncMock(return_value=rules_output)), \
+         patch.object(orchestrator.narrative_director, "execute",
+                      AsyncMock(return_value={"narrative": "Текст", "game_state_updates": {}})), \
+         patch.object(orchestrator, "_save_memory", AsyncMock()), \
+         patch.object(orchestrator.world_state, "_save_world_state", AsyncMock(return_value=True)):
+        with start_trace():
+            await orchestrator.process_action(
+                user_action="Привет",
+                character=character,
+                game_state={"in_combat": False},
+                character_id=character.id,
+                session_id=uuid4(),
+            )
+
+    trace = exported[0]
+    assert [s.name for s in trace.spans] == [
+        "memory", "rules", "narrative", "world_state", "synthesizer", "save_memory"
+    ]
+    assert trace.attributes["action_type"] == "dialogue"
+
+
+def test_opentelemetry_exporter_replays_spans():
+    """Test OTel export when opentelemetry-sdk is installed."""
+    pytest.importorskip("opentelemetry.sdk")
+    from opentelemetry.sdk.trace import TracerProvider
+    from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+    from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+    from app.observability.tracing import OpenTelemetryExporter
+
+    memory = InMemorySpanExporter()
+    provider = TracerProvider()
+    provider.add_span_processor(SimpleSpanProcessor(memory))
+
+    exporter = OpenTelemetryExporter()
+    exporter._tracer = provider.get_tracer("test")
+    trace = TurnTrace("turn")
+    stage = trace.start_span("narrative", "stage", None, {})
+    child = trace.start_span("llm.completion", LLM, stage, {"model": "m"})
+    stage.duration_ms = child.duration_ms = 1.0
+    trace.duration_ms = 2.0
+    exporter.export(trace)
+
+    names = {s.name: s for s in memory.get_finished_spans()}
+    assert names["llm.completion"].parent.span_id == names["narrative"].context.span_id
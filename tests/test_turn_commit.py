@@ -0,0 +1,111 @@
+"""Tests for end-of-turn unit of work."""
+
+import json
+import pytest
+from unittest.mock import AsyncMock, patch
+from uuid import uuid4
+
+from app.agents.world_state import WorldStateAgent
+from app.db.turn_commit import TurnCommit
+from app.game.character import CharacterSheet
+
+
+@pytest.fixture
+def character():
+    return CharacterSheet(telegram_user_id=777, name="Hero", hp=15, max_hp=25)
+
+
+def test_empty_commit_has_nothing_staged():
+    """Fresh unit of work is empty."""
+    assert TurnCommit().is_empty
+
+
+def test_build_statement_contains_all_writes(character):
+    """All staged writes end up in a single statement."""
+    session_id = uuid4()
+    turn_commit = TurnCommit()
+    turn_commit.save_world_state(character.id, {"in_combat": True, "enemies": ["гоблин"]})
+    turn_commit.update_character(character)
+    turn_commit.update_session_stats(session_id, turns_increment=1, damage_taken_increment=6)
+    turn_commit.add_memory(
+        character_id=character.id,
+        content="Атакую гоблина → попадание",
+        embedding=[0.1, 0.2],
+        session_id=session_id,
+        memory_type="combat",
+    )
+    
+    sql, params = turn_commit.build_statement()
+    
+    assert sql.startswith("WITH ")
+    assert "INSERT INTO world_state" in sql
+    assert "UPDATE characters" in sql
+    assert "UPDATE game_sessions" in sql
+    assert "INSERT INTO episodic_memories" in sql
+    assert json.dumps({"in_combat": True, "enemies": ["гоблин"]}) in params
+    assert "[0.1,0.2]" in params
+    assert session_id in params
+
+
+def test_session_stats_accumulate():
+    """Increments for the same session are summed."""
+    session_id = uuid4()
+    turn_commit = TurnCommit()
+    turn_commit.update_session_stats(session_id, turns_increment=1, damage_taken_increment=3)
+    turn_commit.update_session_stats(session_id, turns_increment=1, damage_taken_increment=4)
+    
+    sql, params = turn_commit.build_statement()
+    
+    assert params[:3] == [2, 0, 7]
+
+
+@pytest.mark.asyncio
+async def test_commit_single_round_trip(character):
+    """Commit executes exactly one statement."""
+    conn = AsyncMock()
+    conn.fetchrow = AsyncMock(return_value={"character_rows": 1})
+    turn_commit = TurnCommit()
+    turn_commit.update_character(character)
+    turn_commit.save_world_state(character.id, {"in_combat": False})
+    
+    with patch("app.db.supabase.get_db_connection", return_value=conn):
+        result = await turn_commit.commit()
+    
+    assert result is True
+    assert turn_commit.committed is True
+    conn.fetchrow.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_commit_failure_returns_false(character):
+    """Failed commit is reported, nothing is marked committed."""
+    conn = AsyncMock()
+    conn.fetchrow = AsyncMock(side_effect=Exception("DB error"))
+    turn_commit = TurnCommit()
+    turn_commit.update_character(character)
+    
+    with patch("app.db.supabase.get_db_connection", return_value=conn):
+        result = await turn_commit.commit()
+    
+    assert result is False
+    assert turn_commit.committed is False
+
+
+@pytest.mark.asyncio
+async def test_world_state_agent_stages_into_turn_commit():
+    """WorldStateAgent stages its save instead of writing when given a TurnCommit."""
+    agent = WorldStateAgent()
+    turn_commit = TurnCommit()
+    
+    with patch.object(agent, "_save_world_state", new=AsyncMock()) as mock_save:
+        result = await agent.execute({
+            "character_id": uuid4(),
+            "game_state": {"in_combat": False, "enemies": []},
+            "mechanics_result": {},
+            "action_type": "other",
+            "turn_commit": turn_commit,
+        })
+    
+    mock_save.assert_not_called()
+    assert result["persisted"] is True
+    assert not turn_commit.is_empty
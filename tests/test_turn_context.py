@@ -0,0 +1,96 @@
+"""Tests for single round-trip turn context loader."""
+
+import json
+import pytest
+from unittest.mock import AsyncMock, patch
+from uuid import uuid4
+
+from app.db.models import TurnContext
+from app.db.turn_context import load_turn_context, load_turn_context_for_character
+from app.game.character import CharacterSheet
+
+
+def _row(state_data=None, combat_enabled=True, version=0):
+    """Build a fake turn context row."""
+    return {
+        "id": uuid4(),
+        "telegram_user_id": 4242,
+        "name": "Hero",
+        "character_sheet": json.dumps({"strength": 16, "hp": 20, "max_hp": 25}),
+        "session_id": uuid4(),
+        "combat_enabled": combat_enabled,
+        "state_data": state_data,
+        "world_state_version": version,
+    }
+
+
+@pytest.mark.asyncio
+async def test_load_turn_context_single_query():
+    """All turn data comes from one fetchrow call."""
+    row = _row(
+        state_data=json.dumps({"in_combat": True, "enemies": ["орк"]}),
+        combat_enabled=False,
+        version=4,
+    )
+    conn = AsyncMock()
+    conn.fetchrow = AsyncMock(return_value=row)
+    
+    with patch("app.db.supabase.get_db_connection", return_value=conn):
+        turn = await load_turn_context(4242)
+    
+    conn.fetchrow.assert_awaited_once()
+    assert isinstance(turn, TurnContext)
+    assert turn.character.id == row["id"]
+    assert turn.character.strength == 16
+    assert turn.session_id == row["session_id"]
+    assert turn.user_settings == {"telegram_user_id": 4242, "combat_enabled": False}
+    assert turn.game_state == {"in_combat": True, "enemies": ["орк"]}
+    assert turn.world_state_version == 4
+
+
+@pytest.mark.asyncio
+async def test_load_turn_context_default_world_state():
+    """Missing world_state row yields default game state."""
+    conn = AsyncMock()
+    conn.fetchrow = AsyncMock(return_value=_row(state_data=None))
+    
+    with patch("app.db.supabase.get_db_connection", return_value=conn):
+        turn = await load_turn_context(4242)
+    
+    assert turn.game_state["in_combat"] is False
+    assert turn.game_state["enemies"] == []
+    assert "location" in turn.game_state
+    assert turn.world_state_version == 0
+
+
+@pytest.mark.asyncio
+async def test_load_turn_context_no_character():
+    """Returns None when character is not in DB."""
+    conn = AsyncMock()
+    conn.fetchrow = AsyncMock(return_value=None)
+    
+    with patch("app.db.supabase.get_db_connection", return_value=conn):
+        turn = await load_turn_context(4242)
+    
+    assert turn is None
+
+
+@pytest.mark.asyncio
+async def test_load_turn_context_for_character_fallback():
+    """FSM fallback path builds the bundle from per-table helpers."""
+    character = CharacterSheet(telegram_user_id=4242, name="Hero")
+    session_id = uuid4()
+    
+    with patch("app.db.turn_context.get_user_settings_by_telegram_id", new=AsyncMock(return_value=None)), \
+         patch("app.db.turn_context.create_or_update_user_settings",
+               new=AsyncMock(return_value={"telegram_user_id": 4242, "combat_enabled": True})), \
+         patch("app.db.turn_context.get_or_create_session", new=AsyncMock(return_value=session_id)), \
+         patch("app.agents.world_state.world_state_agent.load_world_state_versioned",
+               new=AsyncMock(return_value=({"in_combat": False, "enemies": []}, 3))):
+        turn = await load_turn_context_for_character(character)
+    
+    assert turn.character is character
+    assert turn.session_id == session_id
+    assert turn.user_settings["combat_enabled"] is True
+    assert turn.game_state["in_combat"] is False
+    assert turn.world_state_version == 3
@@ -0,0 +1,152 @@
+"""Tests for per-turn deadline propagation and stage degradation."""
+
+import asyncio
+from uuid import uuid4
+
+import pytest
+from unittest.mock import AsyncMock, patch
+
+from app.agents.deadline import TurnDeadline, within_deadline
+from app.agents.narrative_director import NarrativeDirectorAgent
+from app.agents.orchestrator import AgentOrchestrator
+from app.agents.rules_arbiter import RulesArbiterAgent
+from app.game.character import CharacterSheet
+
+
+def create_test_character() -> CharacterSheet:
+    """Create test character."""
+    return CharacterSheet(
+        id=uuid4(),
+        telegram_user_id=12345,
+        name="Test Hero",
+        hp=20,
+        max_hp=20,
+    )
+
+
+async def hang(*args, **kwargs):
+    await asyncio.sleep(10)
+
+
+def test_timeout_is_min_of_remaining_and_cap():
+    """Test stage timeout computation."""
+    assert TurnDeadline(None).timeout() is None
+    assert TurnDeadline(None).timeout(3.0) == 3.0
+
+    deadline = TurnDeadline(10.0)
+    assert deadline.timeout(3.0) == 3.0
+    assert 9.0 < deadline.timeout() <= 10.0
+
+    with patch("app.agents.deadline.time.monotonic", return_value=deadline.started_at + 9.5):
+        assert deadline.timeout(3.0) == pytest.approx(0.5)
+        assert not deadline.expired
+
+
+@pytest.mark.asyncio
+async def test_within_deadline_records_degraded_stage():
+    """Test that a timed-out stage raises TimeoutError and is recorded."""
+    deadline = TurnDeadline(5.0)
+
+    with pytest.raises(asyncio.TimeoutError):
+        await within_deadline(deadline, "memory", hang(), cap=0.01)
+
+    assert deadline.degraded == ["memory"]
+
+
+@pytest.mark.asyncio
+async def test_within_deadline_skips_call_when_budget_spent():
+    """Test that no call is started once the budget is gone."""
+    deadline = TurnDeadline(1.0)
+    call = AsyncMock()
+
+    with patch("app.agents.deadline.time.monotonic", return_value=deadline.started_at + 2.0):
+        with pytest.raises(asyncio.TimeoutError):
+            await within_deadline(deadline, "narrative", call())
+
+    assert deadline.degraded == ["narrative"]
+
+
+@pytest.mark.asyncio
+async def test_intent_timeout_uses_keyword_detection():
+    """Test that a slow intent LLM call degrades to keyword detection."""
+    agent = RulesArbiterAgent()
+    deadline = TurnDeadline(5.0)
+
+    with patch("app.agents.rules_arbiter.settings.intent_fast_path_enabled", False), \
+         patch("app.agents.rules_arbiter.settings.turn_intent_timeout", 0.01), \
+         patch("app.agents.rules_arbiter.llm_client.get_completion", side_effect=hang):
+        intent = await agent._analyze_intent(
+            "размышляю о смысле жизни", create_test_character(), {}, deadline
+        )
+
+    assert intent["reasoning"] == "Fallback keyword detection"
+    assert deadline.degraded == ["intent"]
+
+
+@pytest.mark.asyncio
+async def test_narrative_timeout_uses_fallback_narrative():
+    """Test that a slow narrative call yields the fallback narrative."""
+    agent = NarrativeDirectorAgent()
+    deadline = TurnDeadline(0.05)
+    context = {
+        "user_action": "осматриваюсь",
+        "mechanics_result": {"action_type": "other"},
+        "game_state": {"in_combat": False, "enemies": []},
+        "success": True,
+        "deadline": deadline,
+    }
+
+    with patch("app.agents.narrative_director.settings.narrative_single_call", False), \
+         patch("app.agents.narrative_director.llm_client.get_completion", side_effect=hang):
+        output = await agent.execute(context)
+
+    assert output["narrative"] == "Ты осматриваюсь. Успех!"
+    assert "in_combat" in output["game_state_updates"]
+    assert deadline.degraded == ["combat_state", "narrative"]
+
+
+@pytest.mark.asyncio
+async def test_orchestrator_skips_slow_memory():
+    """Test that slow memory retrieval is skipped and recorded on the deadline."""
+    orchestrator = AgentOrchestrator()
+    character = create_test_character()
+    deadline = TurnDeadline(5.0)
+
+    rules_output = {
+        "mechanics_result": {},
+        "intent": {"action_type": "dialogue"},
+        "narrative_hints": [],
+        "success": True,
+        "action_type": "dialogue",
+    }
+    narrative = AsyncMock(return_value={"narrative": "Текст", "game_state_updates": {}})
+
+    with patch("app.agents.orchestrator.settings.turn_memory_timeout", 0.01), \
+         patch.object(orchestrator.memory_manager, "execute", side_effect=hang), \
+         patch.object(orchestrator.rules_arbiter, "execute", AsyncMock(return_value=rules_output)), \
+         patch.object(orchestrator.narrative_director, "execute", narrative), \
+         patch.object(orchestrator, "_save_memory", AsyncMock()), \
+         patch.object(orchestrator.world_state, "_save_world_state", AsyncMock(return_value=True)):
+        _, _, game_state = await orchestrator.process_action(
+            user_action="Осматриваюсь",
+            character=character,
+            game_state={"in_combat": False},
+            character_id=character.id,
+            session_id=uuid4(),
+            deadline=deadline,
+        )
+        # Without a caller deadline the degraded stages are still reported
+        _, _, default_game_state = await orchestrator.process_action(
+            user_action="Осматриваюсь",
+            character=character,
+            game_state={"in_combat": False},
+            character_id=character.id,
+            session_id=uuid4(),
+        )
+
+    narrative_context = narrative.call_args_list[0].args[0]
+    assert narrative_context["memory_context"] == ""
+    assert narrative_context["deadline"] is deadline
+    assert deadline.degraded == ["memory"]
+    assert game_state["degraded_stages"] == ["memory"]
+    assert default_game_state["degraded_stages"] == ["memory"]
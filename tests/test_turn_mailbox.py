@@ -0,0 +1,173 @@
+"""Tests for per-user turn serialization."""
+
+import asyncio
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from app.bot.mailbox import CANCEL, COALESCE, OFF, TurnMailbox, mark_turn_committing
+
+
+class Recorder:
+    """Turn runner that records batches and blocks until released."""
+
+    def __init__(self):
+        self.batches: list[list[str]] = []
+        self.started = asyncio.Event()
+        self.release = asyncio.Event()
+        self.running = 0
+        self.peak = 0
+        self.cancelled: list[list[str]] = []
+        self.commit_first = False
+
+    async def __call__(self, batch: list[str]):
+        self.running += 1
+        self.peak = max(self.peak, self.running)
+        try:
+            self.started.set()
+            if self.commit_first:
+                mark_turn_committing()
+            await self.release.wait()
+            self.batches.append(batch)
+        except asyncio.CancelledError:
+            self.cancelled.append(batch)
+            raise
+        finally:
+            self.running -= 1
+
+
+async def _wait_started(recorder: Recorder):
+    await asyncio.wait_for(recorder.started.wait(), timeout=1)
+    recorder.started.clear()
+
+
+@pytest.mark.asyncio
+async def test_coalesce_merges_messages_sent_during_turn():
+    """Messages arriving mid-turn run afterwards as one combined turn."""
+    mailbox = TurnMailbox(policy=COALESCE)
+    recorder = Recorder()
+
+    first = asyncio.create_task(mailbox.submit(1, "a", recorder))
+    await _wait_started(recorder)
+    rest = [asyncio.create_task(mailbox.submit(1, text, recorder)) for text in ("b", "c")]
+    await asyncio.sleep(0)
+    recorder.release.set()
+    await asyncio.wait_for(asyncio.gather(first, *rest), timeout=1)
+
+    assert recorder.batches == [["a"], ["b", "c"]]
+    assert recorder.peak == 1
+    assert not mailbox.in_flight(1)
+
+
+@pytest.mark.asyncio
+async def test_max_batch_splits_turns():
+    """No more than max_batch messages are merged into one turn."""
+    mailbox = TurnMailbox(policy=COALESCE, max_batch=2)
+    recorder = Recorder()
+
+    first = asyncio.create_task(mailbox.submit(1, "a", recorder))
+    await _wait_started(recorder)
+    rest = [asyncio.create_task(mailbox.submit(1, text, recorder)) for text in ("b", "c", "d")]
+    await asyncio.sleep(0)
+    recorder.release.set()
+    await asyncio.wait_for(asyncio.gather(first, *rest), timeout=1)
+
+    assert recorder.batches == [["a"], ["b", "c"], ["d"]]
+
+
+@pytest.mark.asyncio
+async def test_different_users_run_concurrently():
+    """Serialization is per key."""
+    mailbox = TurnMailbox(policy=COALESCE)
+    recorder = Recorder()
+
+    tasks = [asyncio.create_task(mailbox.submit(user, "a", recorder)) for user in (1, 2)]
+    await asyncio.sleep(0.01)
+    assert recorder.running == 2
+    recorder.release.set()
+    await asyncio.wait_for(asyncio.gather(*tasks), timeout=1)
+
+
+@pytest.mark.asyncio
+async def test_cancel_policy_reruns_merged_turn():
+    """A newer message cancels the in-flight turn, which reruns merged with it."""
+    mailbox = TurnMailbox(policy=CANCEL)
+    recorder = Recorder()
+
+    first = asyncio.create_task(mailbox.submit(1, "a", recorder))
+    await _wait_started(recorder)
+    second = asyncio.create_task(mailbox.submit(1, "b", recorder))
+    await _wait_started(recorder)
+    recorder.release.set()
+    await asyncio.wait_for(asyncio.gather(first, second), timeout=1)
+
+    assert recorder.cancelled == [["a"]]
+    assert recorder.batches == [["a", "b"]]
+
+
+@pytest.mark.asyncio
+async def test_cancel_policy_spares_committing_turn():
+    """A turn past mark_turn_committing finishes; the new message runs after it."""
+    mailbox = TurnMailbox(policy=CANCEL)
+    recorder = Recorder()
+    recorder.commit_first = True
+
+    first = asyncio.create_task(mailbox.submit(1, "a", recorder))
+    await _wait_started(recorder)
+    second = asyncio.create_task(mailbox.submit(1, "b", recorder))
+    await asyncio.sleep(0)
+    recorder.release.set()
+    await asyncio.wait_for(asyncio.gather(first, second), timeout=1)
+
+    assert recorder.cancelled == []
+    assert recorder.batches == [["a"], ["b"]]
+
+
+@pytest.mark.asyncio
+async def test_off_policy_runs_concurrently():
+    """Policy off keeps the old behavior."""
+    mailbox = TurnMailbox(policy=OFF)
+    recorder = Recorder()
+
+    tasks = [asyncio.create_task(mailbox.submit(1, text, recorder)) for text in ("a", "b")]
+    await asyncio.sleep(0.01)
+    assert recorder.running == 2
+    recorder.release.set()
+    await asyncio.wait_for(asyncio.gather(*tasks), timeout=1)
+
+
+@pytest.mark.asyncio
+async def test_failed_turn_does_not_block_mailbox():
+    """An error in one turn is logged and later messages still run."""
+    mailbox = TurnMailbox(policy=COALESCE)
+    runs = []
+
+    async def run(batch):
+        runs.append(batch)
+        if batch == ["boom"]:
+            raise RuntimeError("turn failed")
+
+    await mailbox.submit(1, "boom", run)
+    await mailbox.submit(1, "ok", run)
+
+    assert runs == [["boom"], ["ok"]]
+
+
+def test_unknown_policy_rejected():
+    with pytest.raises(ValueError):
+        TurnMailbox(policy="drop")
+
+
+@pytest.mark.asyncio
+async def test_handler_merges_message_texts():
+    """Coalesced messages reach the pipeline as one action, reply goes to the latest one."""
+    from app.bot.handlers import _run_turn
+
+    first, last = MagicMock(), MagicMock()
+    first.text, last.text = "Открываю дверь", "И захожу внутрь"
+    last.from_user.id = 7
+    state = AsyncMock()
+
+    with patch("app.bot.handlers._process_conversation_turn", new=AsyncMock()) as process:
+        await _run_turn([first, last], state)
+
+    process.assert_awaited_once_with(last, state, "Открываю дверь\nИ захожу внутрь")
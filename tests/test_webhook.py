@@ -0,0 +1,180 @@
+"""Tests for webhook update delivery."""
+
+import asyncio
+import json
+
+import pytest
+from aiogram import Bot, Dispatcher, Router
+from aiogram.types import Message
+from aiohttp import web
+from aiohttp.test_utils import TestClient, TestServer
+
+from app.bot.webhook import BoundedRequestHandler, WebhookServer
+
+SECRET = "test-secret"
+
+
+def make_update(update_id: int, text: str = "Осматриваю комнату") -> dict:
+    return {
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "date": 0,
+            "chat": {"id": 1, "type": "private"},
+            "from": {"id": 1, "is_bot": False, "first_name": "Тест"},
+            "text": text,
+        },
+    }
+
+
+def make_dispatcher(handled: list, release: asyncio.Event | None = None) -> Dispatcher:
+    router = Router()
+
+    @router.message()
+    async def record(message: Message):
+        if release is not None:
+            await release.wait()
+        handled.append(message.text)
+
+    dp = Dispatcher()
+    dp.include_router(router)
+    return dp
+
+
+async def post(client: TestClient, update: dict, secret: str = SECRET):
+    return await client.post(
+        "/webhook",
+        data=json.dumps(update),
+        headers={
+            "Content-Type": "application/json",
+            "X-Telegram-Bot-Api-Secret-Token": secret,
+        },
+    )
+
+
+@pytest.fixture
+def bot():
+    return Bot(token="42:TEST")
+
+
+async def make_client(handler: BoundedRequestHandler) -> TestClient:
+    app = web.Application()
+    handler.register(app, path="/webhook")
+    client = TestClient(TestServer(app))
+    await client.start_server()
+    return client
+
+
+@pytest.mark.asyncio
+async def test_rejects_wrong_secret(bot):
+    """Test requests without the secret token are refused."""
+    handled = []
+    handler = BoundedRequestHandler(make_dispatcher(handled), bot, secret_token=SECRET)
+    client = await make_client(handler)
+
+    try:
+        response = await post(client, make_update(1), secret="wrong")
+        assert response.status == 401
+        await handler.drain(timeout=1)
+        assert handled == []
+    finally:
+        await client.close()
+        await bot.session.close()
+
+
+@pytest.mark.asyncio
+async def test_handles_update_in_background(bot):
+    """Test accepted update is acknowledged and dispatched."""
+    handled = []
+    handler = BoundedRequestHandler(make_dispatcher(handled), bot, secret_token=SECRET)
+    client = await make_client(handler)
+
+    try:
+        response = await post(client, make_update(1))
+        assert response.status == 200
+        await handler.drain(timeout=1)
+        assert handled == ["Осматриваю комнату"]
+    finally:
+        await client.close()
+        await bot.session.close()
+
+
+@pytest.mark.asyncio
+async def test_backpressure_when_pending_limit_reached(bot):
+    """Test replica answers 503 once max_pending updates are unfinished."""
+    handled = []
+    release = asyncio.Event()
+    handler = BoundedRequestHandler(
+        make_dispatcher(handled, release), bot,
+        secret_token=SECRET, max_concurrency=1, max_pending=2,
+    )
+    client = await make_client(handler)
+
+    try:
+        assert (await post(client, make_update(1))).status == 200
+        assert (await post(client, make_update(2))).status == 200
+        assert handler.pending == 2
+
+        response = await post(client, make_update(3))
+        assert response.status == 503
+        assert handler.rejected == 1
+
+        release.set()
+        await handler.drain(timeout=1)
+        assert len(handled) == 2
+    finally:
+        await client.close()
+        await bot.session.close()
+
+
+@pytest.mark.asyncio
+async def test_concurrency_cap(bot):
+    """Test no more than max_concurrency updates run at once."""
+    running = 0
+    peak = 0
+    router = Router()
+
+    @router.message()
+    async def slow(message: Message):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.02)
+        running -= 1
+
+    dp = Dispatcher()
+    dp.include_router(router)
+    handler = BoundedRequestHandler(dp, bot, secret_token=SECRET, max_concurrency=2, max_pending=10)
+    client = await make_client(handler)
+
+    try:
+        for i in range(6):
+            assert (await post(client, make_update(i))).status == 200
+        await handler.drain(timeout=2)
+        assert peak == 2
+    finally:
+        await client.close()
+        await bot.session.close()
+
+
+@pytest.mark.asyncio
+async def test_drain_refuses_new_updates_and_cancels_after_timeout(bot):
+    """Test shutdown: health turns 503, new updates refused, stuck updates cancelled."""
+    handled = []
+    release = asyncio.Event()
+    server = WebhookServer(make_dispatcher(handled, release), bot, secret_token=SECRET)
+    client = await make_client(server.handler)
+
+    try:
+        assert (await post(client, make_update(1))).status == 200
+
+        await server.handler.drain(timeout=0.05)
+
+        assert server.handler.pending == 0
+        assert handled == []
+        assert (await post(client, make_update(2))).status == 503
+        health = await server._handle_health(None)
+        assert health.status == 503
+    finally:
+        await client.close()
+        await bot.session.close()
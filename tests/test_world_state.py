@@ -276,7 +276,7 @@ async def test_load_world_state_existing(sample_character_id):
     mock_conn.fetchrow = AsyncMock(return_value={"state_data": mock_state})
     mock_conn.close = AsyncMock()
     
-    with patch('app.agents.world_state.get_db_connection', return_value=mock_conn):
+    with patch('app.db.supabase.get_db_connection', return_value=mock_conn):
         state = await agent.load_world_state(sample_character_id)
         
         assert state["in_combat"] is True
@@ -293,7 +293,7 @@ async def test_load_world_state_not_found(sample_character_id):
     mock_conn.fetchrow = AsyncMock(return_value=None)
     mock_conn.close = AsyncMock()
     
-    with patch('app.agents.world_state.get_db_connection', return_value=mock_conn):
+    with patch('app.db.supabase.get_db_connection', return_value=mock_conn):
         state = await agent.load_world_state(sample_character_id)
         
         # Should return default state
@@ -308,7 +308,7 @@ async def test_load_world_state_error(sample_character_id):
     agent = WorldStateAgent()
     
     with patch(
-        'app.agents.world_state.get_db_connection',
+        'app.db.supabase.get_db_connection',
         side_effect=Exception("DB connection failed")
     ):
         state = await agent.load_world_state(sample_character_id)
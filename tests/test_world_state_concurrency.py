@@ -0,0 +1,195 @@
+"""Tests for optimistic concurrency on world state saves."""
+
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+from uuid import uuid4
+
+from app.agents.orchestrator import AgentOrchestrator
+from app.agents.world_state import WorldStateAgent, merge_world_state
+from app.db.models import EpisodicMemoryCreate, TurnContext
+from app.db.turn_commit import TurnCommit
+from app.game.character import CharacterSheet
+
+
+def _turn(game_state: dict, version: int) -> TurnContext:
+    return TurnContext(
+        character=CharacterSheet(telegram_user_id=1, name="Hero"),
+        session_id=uuid4(),
+        user_settings={"telegram_user_id": 1, "combat_enabled": True},
+        game_state=game_state,
+        world_state_version=version,
+    )
+
+
+def test_cas_statement_gates_all_writes():
+    """Versioned save is a conditional UPDATE and every other write depends on it."""
+    turn_commit = TurnCommit()
+    session_id = uuid4()
+    turn_commit.save_world_state(uuid4(), {"in_combat": True}, expected_version=3)
+    turn_commit.update_session_stats(session_id, turns_increment=1)
+    turn_commit.add_memory(uuid4(), "Бой начался", [0.1, 0.2], session_id=session_id)
+
+    sql, params = turn_commit.build_statement()
+
+    assert "UPDATE world_state" in sql
+    assert "version = $3" in sql
+    assert params[2] == 3
+    assert "ON CONFLICT (character_id)\n                    DO UPDATE" not in sql
+    assert sql.count("EXISTS (SELECT 1 FROM world_state_upsert)") == 2
+
+
+def test_first_save_inserts_only():
+    """Version 0 (no row read) may only create the row."""
+    turn_commit = TurnCommit()
+    turn_commit.save_world_state(uuid4(), {}, expected_version=0)
+
+    sql, _ = turn_commit.build_statement()
+
+    assert "ON CONFLICT (character_id) DO NOTHING" in sql
+
+
+@pytest.mark.asyncio
+async def test_commit_reports_conflict():
+    """Zero rows from the versioned write means another writer won."""
+    conn = AsyncMock()
+    conn.fetchrow = AsyncMock(return_value={"world_state_rows": 0, "world_state_version": None})
+    turn_commit = TurnCommit()
+    turn_commit.save_world_state(uuid4(), {"in_combat": True}, expected_version=2)
+
+    with patch("app.db.supabase.get_db_connection", return_value=conn):
+        result = await turn_commit.commit()
+
+    assert result is False
+    assert turn_commit.conflict is True
+    assert turn_commit.committed is False
+
+
+def test_merge_keeps_both_sides_changes():
+    """Keys the turn changed win, concurrent changes to other keys survive."""
+    base = {"in_combat": False, "enemies": [], "location": "town", "flags": {}}
+    ours = {"in_combat": True, "enemies": ["орк"], "location": "town", "flags": {}}
+    theirs = {"in_combat": False, "enemies": [], "location": "forest", "flags": {"met_elf": True}}
+
+    merged = merge_world_state(base, ours, theirs)
+
+    assert merged == {
+        "in_combat": True,
+        "enemies": ["орк"],
+        "location": "forest",
+        "flags": {"met_elf": True},
+    }
+
+
+@pytest.mark.asyncio
+async def test_commit_turn_rebases_and_retries():
+    """On conflict the orchestrator reloads, merges and commits at the new version."""
+    orchestrator = AgentOrchestrator()
+    turn = _turn({"in_combat": False, "location": "town"}, version=1)
+    turn_commit = TurnCommit()
+    turn_commit.save_world_state(turn.character.id, {"in_combat": True, "location": "town"}, 1)
+    attempts = []
+
+    async def commit():
+        attempts.append(turn_commit._world_state)
+        turn_commit.conflict = len(attempts) == 1
+        return not turn_commit.conflict
+
+    theirs = ({"in_combat": False, "location": "forest"}, 2)
+    with patch.object(turn_commit, "commit", new=commit), \
+         patch.object(orchestrator.world_state, "load_world_state_versioned",
+                      new=AsyncMock(return_value=theirs)):
+        result = await orchestrator.commit_turn(turn, turn_commit)
+
+    assert result is True
+    assert attempts[1][1:] == ({"in_combat": True, "location": "forest"}, 2)
+
+
+@pytest.mark.asyncio
+async def test_commit_turn_gives_up_after_retries():
+    """Persistent conflicts stop after max_retries."""
+    orchestrator = AgentOrchestrator()
+    turn = _turn({}, version=1)
+    turn_commit = TurnCommit()
+    turn_commit.save_world_state(turn.character.id, {"a": 1}, 1)
+
+    async def commit():
+        turn_commit.conflict = True
+        return False
+
+    with patch.object(turn_commit, "commit", new=AsyncMock(side_effect=commit)) as mock_commit, \
+         patch.object(orchestrator.world_state, "load_world_state_versioned",
+                      new=AsyncMock(return_value=({}, 5))):
+        result = await orchestrator.commit_turn(turn, turn_commit, max_retries=2)
+
+    assert result is False
+    assert mock_commit.await_count == 3
+
+
+@pytest.mark.asyncio
+async def test_memories_enqueued_only_after_commit():
+    """A turn that loses its conflict leaves no memory; a committed one enqueues it."""
+    orchestrator = AgentOrchestrator()
+    turn = _turn({}, version=1)
+    memory = EpisodicMemoryCreate(character_id=turn.character.id, content="Атакую волка → Волк убегает")
+
+    for committed in (False, True):
+        turn_commit = TurnCommit()
+        turn_commit.save_world_state(turn.character.id, {"a": 1}, 1)
+        turn_commit.queue_memory(memory)
+
+        async def commit():
+            turn_commit.conflict = not committed
+            return committed
+
+        with patch.object(turn_commit, "commit", new=commit), \
+             patch.object(orchestrator.world_state, "load_world_state_versioned",
+                          new=AsyncMock(return_value=({}, 5))), \
+             patch("app.agents.orchestrator.memory_write_queue.enqueue",
+                   return_value=True) as enqueue:
+            assert await orchestrator.commit_turn(turn, turn_commit, max_retries=1) is committed
+
+        assert enqueue.call_count == (1 if committed else 0)
+
+
+@pytest.mark.asyncio
+async def test_agent_save_detects_conflict():
+    """Immediate (non-staged) save is compare-and-swap when a version is given."""
+    agent = WorldStateAgent()
+    conn = AsyncMock()
+    conn.fetchval = AsyncMock(return_value=None)
+
+    with patch("app.db.supabase.get_db_connection", return_value=conn):
+        saved = await agent._save_world_state(uuid4(), {"in_combat": True}, expected_version=4)
+
+    sql, _, _, version = conn.fetchval.await_args.args
+    assert "WHERE character_id = $1 AND version = $3" in sql
+    assert version == 4
+    assert saved is False
+
+
+@pytest.mark.asyncio
+async def test_handler_does_not_deliver_uncommitted_turn():
+    """A turn whose commit fails is neither shown nor added to the history."""
+    from app.bot.handlers import _process_conversation_turn, orchestrator
+    from app.config.prompts import UIPrompts
+
+    turn = _turn({}, version=1)
+    message = MagicMock()
+    message.text = "Иду в лес"
+    message.from_user.id = 1
+    message.bot = None
+    message.answer = AsyncMock()
+    state = AsyncMock()
+
+    with patch("app.bot.handlers.load_turn_context", new=AsyncMock(return_value=turn)), \
+         patch("app.bot.handlers.settings.telegram_stream_narrative", False), \
+         patch("app.bot.handlers.conversation_history") as history, \
+         patch.object(orchestrator, "process_turn",
+                      new=AsyncMock(return_value=("Лес шумит.", turn.character, {}))), \
+         patch.object(orchestrator, "commit_turn", new=AsyncMock(return_value=False)):
+        history.recent = AsyncMock(return_value=[])
+        history.append = AsyncMock()
+        await _process_conversation_turn(message, state)
+
+    history.append.assert_not_awaited()
+    message.answer.assert_awaited_once_with(UIPrompts.ERROR_TURN_NOT_SAVED)